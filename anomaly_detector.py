@@ -0,0 +1,275 @@
+# anomaly_detector.py
+import os
+import json
+import math
+import threading
+import numpy as np
+import pandas as pd
+
+from history_cache import CACHE_DIR, atomic_save_json
+from energy_grid import HOUR_NS
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+ANOMALY_DIR = os.path.join(CACHE_DIR, "anomaly")
+STATE_FILE = "state.json"
+EVENTS_FILE = "events.jsonl"
+WINDOW_HOURS = 24 * 7 # 一週 (每小時網格)，與原本 rolling(window=24 * 7) 相同
+THRESHOLD_SIGMA = 2.5 # 超過 平均 + 2.5 倍標準差 視為異常
+STATE_FORMAT_VERSION = 1
+
+# ==========================================
+# 📐 視窗統計 (Welford，加入 / 移出皆 O(1))
+# ==========================================
+class _WelfordWindow:
+    """
+    固定長度視窗的平均與樣本變異數，以 Welford 的遞推式加入 / 移出 (與 pandas rolling var 相同的更新順序)。
+    語意與 rolling(window, min_periods=1).mean() / .std() 相同：NaN 不計入；只有一筆時標準差為 NaN；
+    視窗內連續相同的值涵蓋所有非 NaN 筆數時，平均直接取該值、標準差為 0。
+    環狀緩衝區保存視窗內的原始值 (含 NaN)，整個狀態可直接存成 JSON。
+    """
+    def __init__(self, size):
+        self.size = size
+        self.ring = np.full(size, np.nan)
+        self.pos = 0 # 下一筆寫入的位置
+        self.filled = 0 # 已寫入的筆數 (上限 size)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.run = 0 # 結尾連續相同 (非 NaN) 值的筆數
+        self.run_value = np.nan
+
+    def _add(self, x):
+        if x != x:
+            return
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += (self.count - 1) * delta * delta / self.count
+        if x == self.run_value:
+            self.run += 1
+        else:
+            self.run, self.run_value = 1, x
+
+    def _remove(self, x):
+        if x != x:
+            return
+        self.count -= 1
+        if self.count == 0:
+            self.mean, self.m2 = 0.0, 0.0
+            return
+        delta = x - self.mean
+        self.mean -= delta / self.count
+        self.m2 -= (self.count + 1) * delta * delta / self.count
+
+    def push(self, x):
+        """視窗往前一格 (移出最舊的一筆、加入 x)，回傳加入後的 (平均, 標準差)"""
+        if self.filled == self.size:
+            self._remove(self.ring[self.pos])
+        else:
+            self.filled += 1
+        self.ring[self.pos] = x
+        self.pos = (self.pos + 1) % self.size
+        self._add(x)
+        n = self.count
+        if n == 0:
+            return np.nan, np.nan
+        if self.run >= n:
+            return self.run_value, (0.0 if n > 1 else np.nan)
+        if n == 1:
+            return self.mean, np.nan
+        var = self.m2 / (n - 1)
+        return self.mean, (math.sqrt(var) if var > 0 else 0.0)
+
+    def values(self):
+        """視窗內的值 (由舊到新)"""
+        if self.filled < self.size:
+            return self.ring[:self.filled].copy()
+        return np.concatenate([self.ring[self.pos:], self.ring[:self.pos]])
+
+    def to_state(self):
+        return {"values": [None if v != v else float(v) for v in self.values()], "count": self.count,
+                "mean": self.mean, "m2": self.m2, "run": self.run,
+                "run_value": None if self.run_value != self.run_value else float(self.run_value)}
+
+    @classmethod
+    def from_state(cls, size, state):
+        window = cls(size)
+        values = np.array([np.nan if v is None else v for v in state["values"]], dtype=np.float64)
+        window.filled = len(values)
+        window.ring[:len(values)] = values
+        window.pos = len(values) % size
+        window.count, window.mean, window.m2 = state["count"], state["mean"], state["m2"]
+        window.run = state["run"]
+        window.run_value = np.nan if state["run_value"] is None else state["run_value"]
+        return window
+
+# ==========================================
+# ⚠️ 串流異常偵測
+# ==========================================
+class AnomalyDetector:
+    """
+    取代「掃描異常事件」時整份複製歷史、對每一列重算 rolling mean / std 的作法：
+    - 狀態 (視窗內的原始值 + Welford 累加器 + 已評分到的時間) 存在 ANOMALY_DIR，重啟後接著算。
+    - update() 只對上次之後新進的小時評分，每小時 O(1)；異常事件附加到 events.jsonl (append-only)。
+    - 最後一個小時可能還在累積即時資料，等下一個小時出現才評分。
+    - 已評分的小時若被回補 / 更正 (資料庫的變動紀錄，或重啟後視窗內的值與資料庫不同)，
+      從變動點重建視窗 (O(視窗長度)) 並改寫該點之後的事件，這是唯一不是 append 的情況。
+    整段回補 (backfill) 的結果與原本的 rolling(window=24 * 7, min_periods=1) 計算相同。
+    """
+    def __init__(self, state_dir=None, window=WINDOW_HOURS, sigma=THRESHOLD_SIGMA):
+        self.state_dir = state_dir or ANOMALY_DIR
+        self.window_hours = window
+        self.sigma = sigma
+        self._lock = threading.Lock()
+        self._version = None # 已處理到的資料版本 (只在同一個行程內有意義)
+        self._load()
+
+    # --- 狀態保存 ---
+    def _path(self, name):
+        return os.path.join(self.state_dir, name)
+
+    def _reset(self):
+        self.window = _WelfordWindow(self.window_hours)
+        self.next_ns = None # 下一個要評分的小時
+        self._events = []
+
+    def _load(self):
+        self._reset()
+        try:
+            with open(self._path(STATE_FILE), "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("format") != STATE_FORMAT_VERSION or state.get("window") != self.window_hours \
+                    or state.get("sigma") != self.sigma:
+                return
+            events = []
+            if os.path.exists(self._path(EVENTS_FILE)):
+                with open(self._path(EVENTS_FILE), "r", encoding="utf-8") as f:
+                    events = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError):
+            return
+        if len(events) < state["events"]:
+            return
+        self.window = _WelfordWindow.from_state(self.window_hours, state["stats"])
+        self.next_ns = state["next_ns"]
+        # 狀態檔在事件檔之後寫入：只採用狀態檔記錄的事件數，之後多出來的 (寫到一半中斷) 丟掉
+        self._events = events[:state["events"]]
+        if len(events) > len(self._events):
+            self._rewrite_events()
+
+    def _save_state(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        state = {"format": STATE_FORMAT_VERSION, "window": self.window_hours, "sigma": self.sigma,
+                 "next_ns": self.next_ns, "events": len(self._events), "stats": self.window.to_state()}
+        atomic_save_json(self._path(STATE_FILE), state)
+
+    def _append_events(self, events):
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(self._path(EVENTS_FILE), "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+
+    def _rewrite_events(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp_path = self._path(EVENTS_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for event in self._events:
+                f.write(json.dumps(event) + "\n")
+        os.replace(tmp_path, self._path(EVENTS_FILE))
+
+    # --- 評分 ---
+    def _rewind(self, grid, at_ns):
+        """從 at_ns 重新開始：以網格上 at_ns 之前 window 小時的值重建視窗，丟掉 at_ns 之後的事件"""
+        at_ns = max(at_ns - at_ns % HOUR_NS, grid.start_ns)
+        self.window = _WelfordWindow(self.window_hours)
+        first = (at_ns - grid.start_ns) // HOUR_NS
+        for x in grid.power_kW[max(0, first - self.window_hours):first]:
+            self.window.push(float(x))
+        self.next_ns = at_ns
+        self._events = [e for e in self._events if e["ts"] < at_ns]
+        self._rewrite_events()
+
+    def _first_mismatch(self, grid):
+        """重啟後第一次更新：比對視窗內保存的值與資料庫目前的值，回傳第一個不同的小時 (都相同則 None)"""
+        values = self.window.values()
+        end = (self.next_ns - grid.start_ns) // HOUR_NS
+        start = end - len(values)
+        if start < 0 or end > len(grid):
+            return grid.start_ns
+        current = np.asarray(grid.power_kW[start:end], dtype=np.float64)
+        same = (current == values) | (np.isnan(current) & np.isnan(values))
+        if same.all():
+            return None
+        return grid.start_ns + (start + int(np.argmin(same))) * HOUR_NS
+
+    def update(self, store):
+        """對 store 中尚未評分的完整小時評分，回傳這次新增的異常事件 (list of dict)"""
+        with self._lock:
+            version = store.version
+            if version == self._version:
+                return []
+            grid = store.grid()
+            if len(grid) == 0:
+                return []
+            if self.next_ns is None or self.next_ns < grid.start_ns:
+                self._rewind(grid, grid.start_ns)
+            else:
+                changed = store.changed_since(self._version) if self._version is not None \
+                    else self._first_mismatch(grid)
+                if changed is not None and changed < self.next_ns:
+                    print(f"🔁 [Anomaly] {pd.Timestamp(changed)} 之後的資料有變動，從該處重新評分")
+                    self._rewind(grid, changed)
+            new_events = self._score(grid, len(grid) - 1) # 最後一格可能還沒結束
+            self._version = version
+            return new_events
+
+    def _score(self, grid, end):
+        first = (self.next_ns - grid.start_ns) // HOUR_NS
+        if first >= end:
+            return []
+        power = grid.power_kW
+        new_events = []
+        push, sigma = self.window.push, self.sigma
+        for i in range(first, end):
+            x = float(power[i])
+            mean, std = push(x)
+            threshold = mean + sigma * std
+            if x > threshold:
+                new_events.append({"ts": grid.start_ns + i * HOUR_NS, "power_kW": x,
+                                   "mean": mean, "threshold": threshold})
+        self.next_ns = grid.start_ns + end * HOUR_NS
+        if new_events:
+            self._events.extend(new_events)
+            self._append_events(new_events)
+        self._save_state()
+        return new_events
+
+    def backfill(self, store):
+        """清掉狀態與事件紀錄，從頭對整段歷史重新評分"""
+        with self._lock:
+            self._reset()
+            self._version = None
+        return self.update(store)
+
+    # --- 查詢 ---
+    def events(self, start=None):
+        """異常事件 (index 為時間，欄位 power_kW / mean / threshold)；直接讀記憶體中的事件紀錄"""
+        with self._lock:
+            events = list(self._events)
+        if start is not None:
+            start_ns = pd.Timestamp(start).value
+            events = [e for e in events if e["ts"] >= start_ns]
+        index = pd.DatetimeIndex([e["ts"] for e in events], name="timestamp")
+        return pd.DataFrame({c: [e[c] for e in events] for c in ("power_kW", "mean", "threshold")},
+                            index=index, dtype=np.float64)
+
+_detector = None
+_detector_lock = threading.Lock()
+
+def get_anomaly_detector():
+    global _detector
+    with _detector_lock:
+        if _detector is None:
+            _detector = AnomalyDetector()
+        return _detector
@@ -3,21 +3,25 @@ import streamlit as st
 import time
 import pandas as pd
 from streamlit_lottie import st_lottie
-import concurrent.futures # 【關鍵新增】用於背景執行的函式庫
 
 # 匯入原本的 UI 模組
 from app_utils import load_lottiefile
+from timeseries_store import mark_stale
 from page_home import show_home_page
-from page_dashboard import show_dashboard_page
-from page_analysis import show_analysis_page
 from page_tutorial import show_tutorial_page
+# 儀表板與分析室會用到 Plotly，等使用者真的切過去才匯入 (見下方頁面路由)
 
-# 匯入後端服務
-from model_service import load_resources_and_predict
+# 匯入後端服務 (全行程共用的預測服務；TensorFlow 由它在背景執行緒匯入)
+from forecast_service import request_forecast, get_forecast_service
+from forecast_scheduler import start_forecast_scheduler
+from shared_dataset import get_snapshot
 
 # --- 0. 頁面設定 ---
 st.set_page_config(layout="wide", page_title="智慧電能管家")
 
+# 背景排程：每個行程只啟動一次，定期輪詢即時資料，有新資料才在背景重新預測並換上新的快照
+start_forecast_scheduler()
+
 # --- 1. 初始化 Session State ---
 if "app_ready" not in st.session_state:
     st.session_state.app_ready = False
@@ -27,20 +31,14 @@ if "tutorial_complete" not in st.session_state:
 if "page" not in st.session_state:
     st.session_state.page = "home"
 
-# 用於儲存 AI 計算結果
-if "prediction_result" not in st.session_state:
-    st.session_state.prediction_result = None
-if "current_data" not in st.session_state:
-    st.session_state.current_data = None
+# 只記住這個 session 看到的資料版本 (handle)；資料與預測結果由整個行程共用一份 (shared_dataset)
+if "data_version" not in st.session_state:
+    st.session_state.data_version = None
 
-# 【核心修改 1】初始化背景執行緒
-# 我們把「未來的結果」存成一個 future 物件，而不直接等待它完成
+# 【核心修改 1】向共用的預測服務要一個 future (代表未來的結果)，不會卡住主程式
+# 同時開啟的多個 session 會加入同一個背景工作；資料沒更新時直接拿到快取的結果
 if "load_future" not in st.session_state:
-    # 建立一個執行緒池 (Thread Pool)
-    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
-    # 把重工作提交給它，它會立刻回傳一個 future (代表未來的結果)，不會卡住主程式
-    st.session_state.load_future = executor.submit(load_resources_and_predict)
-    st.session_state.executor = executor # 保留參照以免被回收
+    st.session_state.load_future = request_forecast()
 
 # --- 輔助函式：切換頁面 ---
 def go_to_page(page_name):
@@ -48,48 +46,61 @@ def go_to_page(page_name):
     st.rerun()
 
 # --- 輔助函式：確保資料已載入 ---
+LOADING_POLL_SECONDS = 1.0 # 載入畫面每隔幾秒檢查一次背景預測是否完成
+
+def show_loading_screen(future):
+    """
+    背景還沒跑完時的載入畫面。主程式不等待 future：
+    只有下方的狀態區塊 (fragment) 定期重跑，發現完成 (或已有共用快照) 時整頁重畫一次進入主程式。
+    """
+    lottie_json = load_lottiefile("lottiefiles/loading_animation.json")
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        if lottie_json:
+            st_lottie(lottie_json, speed=1, width=300, height=300, key="loading_wait")
+
+        @st.fragment(run_every=LOADING_POLL_SECONDS)
+        def loading_status():
+            if future.done() or get_snapshot() is not None:
+                st.rerun() # 完成：整頁重畫，ensure_data_loaded 會直接通過
+            st.info(f"⚡ AI 模型正在做最後衝刺...請稍候 (目前階段：{get_forecast_service().stage_label})")
+
+        loading_status()
+
 def ensure_data_loaded():
     """
     這是一個「檢查站」。
     當使用者要進入主功能時，我們呼叫此函式。
-    如果背景還沒跑完，這裡會跳出轉圈圈等待。
-    如果背景早就跑完了，這裡會瞬間通過。
+    如果背景早就跑完了，這裡會瞬間通過 (回傳 True)。
+    如果背景還沒跑完，不會卡住等待：畫出載入畫面後回傳 False，完成時載入畫面會自動整頁重畫。
     """
     if st.session_state.app_ready:
         return True # 資料已經在手上了
 
+    # 已經有預測快照 (背景排程或其他 session 算好的) -> 直接使用，不必等這一輪推論
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        st.session_state.data_version = snapshot.version
+        st.session_state.app_ready = True
+        return True
+
     if "load_future" in st.session_state:
         future = st.session_state.load_future
         
         # 顯示載入畫面 (只有在背景還沒跑完時，使用者才會看到這個)
         if not future.done():
-            lottie_json = load_lottiefile("lottiefiles/loading_animation.json")
-            placeholder = st.empty()
-            with placeholder.container():
-                col1, col2, col3 = st.columns([1, 2, 1])
-                with col2:
-                    if lottie_json:
-                        st_lottie(lottie_json, speed=1, width=300, height=300, key="loading_wait")
-                    else:
-                        st.spinner("載入中...")
-                    st.info("⚡ AI 模型正在做最後衝刺...請稍候")
-            
-            # 這裡會正式「阻塞 (Block)」，直到背景工作完成
-            try:
-                pred_df, curr_df = future.result()
-            except Exception as e:
-                st.error(f"載入失敗: {e}")
-                st.stop()
-            
-            placeholder.empty() # 清除載入動畫
-        else:
-            # 如果早就做完了，直接拿結果
-            pred_df, curr_df = future.result()
+            show_loading_screen(future)
+            return False
+
+        try:
+            pred_df, handle = future.result()
+        except Exception as e:
+            st.error(f"載入失敗: {e}")
+            st.stop()
             
-        # 存入 Session State
+        # 預測結果已由預測服務登記到共用區，Session State 只存版本號
         if pred_df is not None:
-            st.session_state.prediction_result = pred_df
-            st.session_state.current_data = curr_df
+            st.session_state.data_version = handle
             st.session_state.app_ready = True
             return True
         else:
@@ -112,7 +123,7 @@ if not st.session_state.tutorial_complete:
 # 2. 如果導覽看完了 (或略過) -> 進入主程式
 else:
     # 在進入主程式前，必須過「檢查站」
-    # 這時候如果使用者導覽看了很久，資料早就好了，這裡會是 0 秒通過
+    # 這時候如果使用者導覽看了很久，資料早就好了，這裡會是 0 秒通過；還沒好時只畫載入畫面，不會卡住
     if ensure_data_loaded():
         
         # --- 側邊欄導航 ---
@@ -138,16 +149,25 @@ else:
                 
             st.divider()
             if st.button("🔄 重新抓取數據"):
-                # 重置狀態，讓它重新跑一次 loading
-                st.session_state.app_ready = False
-                if "load_future" in st.session_state:
-                    del st.session_state.load_future
+                # 請背景排程立刻完整同步一次 (同步層只會補抓開放季度與即時資料)；
+                # 新的預測算好後會直接換上快照，這裡不必等
+                mark_stale()
+                scheduler = start_forecast_scheduler()
+                if scheduler is not None:
+                    scheduler.trigger()
+                else:
+                    # 沒有啟動排程時沿用原本的做法：重新跑一次 loading
+                    st.session_state.app_ready = False
+                    if "load_future" in st.session_state:
+                        del st.session_state.load_future
                 st.rerun()
 
         # 頁面路由
         if current_page == "dashboard":
+            from page_dashboard import show_dashboard_page
             show_dashboard_page()
         elif current_page == "analysis":
+            from page_analysis import show_analysis_page
             show_analysis_page()
         else:
             show_home_page()
\ No newline at end of file
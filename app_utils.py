@@ -3,13 +3,14 @@ import pandas as pd
 import joblib
 import os
 import json
-import time
-import requests
-from datetime import datetime, timedelta
 
-# --- 設定 Pantry Cloud ID (從模型訓練程式碼取得) ---
-POWER_PANTRY_ID = "6a2e85f5-4af4-4efd-bb9f-c5604fe8475e"
-TARGET_YEARS = [2023, 2024, 2025, 2026] # 設定要抓取的年份範圍
+from timeseries_store import get_store, refresh_store, is_store_fresh
+from energy_grid import HourlyGrid, to_hourly_grid
+from rollups import EnergyRollups
+from tou_engine import TOU_RATES_DATA, season_rates
+from tariff_engine import PROGRESSIVE_RATES, tiered_cost, usage_profile, price_plans
+from tariff_sweep import sweep_tariffs
+from load_shift import savings_frontier, CURRENT_PLAN
 
 # --- 1. Lottie 動畫載入函式 ---
 @st.cache_data
@@ -31,109 +32,35 @@ def load_model(model_path="model.pkl"):
     except Exception:
         return None
 
-# --- 輔助函式：抓取單一 Basket (移植自模型訓練程式碼) ---
-def fetch_basket(pantry_id: str, basket_name: str, max_retries: int = 3):
-    url = f"https://getpantry.cloud/apiv1/pantry/{pantry_id}/basket/{basket_name}"
-    for attempt in range(max_retries):
-        try:
-            r = requests.get(url, timeout=10)
-            if r.status_code == 200:
-                try:
-                    return r.json()
-                except:
-                    return None
-            if r.status_code == 404: 
-                return None # 該季度資料不存在 (例如未來的時間)
-            if r.status_code == 429: # Too Many Requests
-                time.sleep(1.0 * (attempt + 1))
-                continue
-        except:
-            time.sleep(1.0)
-    return None
-
-# --- 核心數據載入函式 (改為雲端多季度抓取) ---
-@st.cache_data(ttl=300) # 5分鐘快取
+# --- 核心數據載入函式 (統一時序資料庫) ---
 def load_data():
     """
-    從 Pantry Cloud 迴圈抓取多個年份與季度的資料，並合併清洗。
+    回傳整個行程共用的時序資料 (CSV + 雲端季度 + 即時資料，已依來源優先權合併)，
+    並統一成每小時標準網格 (power_kW = 該小時平均功率，kwh = 依原生間隔積分的用電量)。
+    頁面只讀目前的 store，不在這裡同步：資料超過 5 分鐘時只請預測服務在背景做一次增量同步
+    (single-flight，背景排程通常早已做過)，這次畫面先用手上的資料，不會卡在 Pantry 上。
     """
-    all_records = []
-    
-    # 顯示進度條，避免使用者以為當機
-    progress_text = "正在從雲端同步歷史數據..."
-    my_bar = st.progress(0, text=progress_text)
-    
-    total_steps = len(TARGET_YEARS) * 4
-    current_step = 0
-    
-    for year in TARGET_YEARS:
-        for q in range(1, 5): # Q1 ~ Q4
-            basket_name = f"{year}-q{q}"
-            
-            # 更新進度條
-            current_step += 1
-            my_bar.progress(current_step / total_steps, text=f"{progress_text} ({basket_name})")
-            
-            # 抓取資料
-            data = fetch_basket(POWER_PANTRY_ID, basket_name)
-            
-            if data and "data" in data:
-                # 這裡假設 "data" 裡面是一個 list of dicts
-                all_records.extend(data["data"])
-            
-            # 稍微休息避免觸發 API 限制
-            time.sleep(0.05)
-            
-    my_bar.empty() # 載入完成後隱藏進度條
-
-    if not all_records:
-        st.error("❌ 無法從雲端取得任何數據，請檢查網路或 Pantry ID。")
-        return pd.DataFrame()
-
-    # --- 資料清洗與轉換 ---
     try:
-        df = pd.DataFrame(all_records)
-        
-        # 1. 處理時間欄位 (模型組用的是 'full_timestamp' 或 'date'+'time')
-        if "full_timestamp" in df.columns:
-            df["timestamp"] = pd.to_datetime(df["full_timestamp"], errors="coerce")
-        elif "date" in df.columns and "time" in df.columns:
-            df["timestamp"] = pd.to_datetime(df["date"].astype(str) + " " + df["time"].astype(str), errors="coerce")
-        else:
-            # 嘗試自動尋找
-            for col in ['created_at', 'Time', 'time']:
-                if col in df.columns:
-                    df["timestamp"] = pd.to_datetime(df[col], errors="coerce")
-                    break
-        
-        # 2. 處理電力欄位 (模型組用的是 'power')
-        if "power" in df.columns:
-            df.rename(columns={"power": "power_kW"}, inplace=True)
-        
-        # 3. 格式標準化
-        df["power_kW"] = pd.to_numeric(df["power_kW"], errors="coerce")
-        df.dropna(subset=["timestamp", "power_kW"], inplace=True)
-        df.set_index("timestamp", inplace=True)
-        df.sort_index(inplace=True)
-        
-        # 去除重複 (因為有些季度交接處可能有重複數據)
-        df = df[~df.index.duplicated(keep='first')]
-        
-        return df[['power_kW']]
-
+        from forecast_service import request_forecast, get_forecast_service
+        if not is_store_fresh():
+            request_forecast() # 背景同步 + 預測，不等結果
+        store = get_store()
+        if len(store) == 0:
+            # 同步進度 (第幾個季度 basket) 由預測服務記錄，與載入畫面顯示的相同
+            st.info(f"⏳ 正在背景同步雲端數據，請稍候再重新整理。(目前階段：{get_forecast_service().stage_label})")
+            return pd.DataFrame()
+        df = store.grid().frame()
     except Exception as e:
         st.error(f"資料解析失敗: {e}")
         return pd.DataFrame()
 
+    if df.empty:
+        st.error("❌ 無法從雲端取得任何數據，請檢查網路或 Pantry ID。")
+        return pd.DataFrame()
+
+    return df
+
 # --- 3. 電價計算邏輯 (保持不變) ---
-PROGRESSIVE_RATES = [
-    (120, 1.68, 1.68), (210, 2.45, 2.16), (170, 3.70, 3.03),
-    (200, 5.04, 4.14), (300, 6.24, 5.07), (float('inf'), 8.46, 6.63)
-]
-TOU_RATES_DATA = {
-    'basic_fee_monthly': 75.0, 'surcharge_kwh_threshold': 2000.0, 'surcharge_rate_per_kwh': 0.99,
-    'rates': {'summer': {'peak': 4.71, 'off_peak': 1.85}, 'nonsummer': {'peak': 4.48, 'off_peak': 1.78}}
-}
 
 def calculate_progressive_cost(total_kwh_month, is_summer):
     cost = 0
@@ -148,6 +75,10 @@ def calculate_progressive_cost(total_kwh_month, is_summer):
     return cost
 
 def get_tou_details(timestamp):
+    """
+    單一時間點的 (尖離峰, 費率, 是否夏月)。
+    只保留作為 tests/test_tou_engine.py (及 benchmarks) 的比對基準 (逐筆寫法的原始規則)；程式內一律使用 tou_engine.tou_details / tou_rates。
+    """
     is_summer = (timestamp.month >= 6) and (timestamp.month <= 9)
     is_weekend = timestamp.dayofweek >= 5
     hour = timestamp.hour
@@ -161,29 +92,79 @@ def get_tou_details(timestamp):
     rate = TOU_RATES_DATA['rates'][season][category]
     return category, rate, is_summer
 
-@st.cache_data
-def analyze_pricing_plans(df_period):
-    df_analysis = df_period.copy()
-    tou_details = df_analysis.index.map(get_tou_details)
-    df_analysis['tou_category'] = [cat for cat, rate, season in tou_details]
-    df_analysis['tou_rate'] = [rate for cat, rate, season in tou_details]
-    df_analysis['kwh'] = df_analysis['power_kW'] * 0.25
-    df_analysis['tou_flow_cost'] = df_analysis['kwh'] * df_analysis['tou_rate']
-    monthly_tou = df_analysis.resample('MS').agg(kwh=('kwh', 'sum'), flow_cost=('tou_flow_cost', 'sum'))
+def rollups_for(df_history):
+    """
+    取得 df_history 的用電彙總表：若就是共用資料庫的網格則直接使用增量維護的彙總表，
+    否則 (例如舊的 session 資料或任意切片) 由該資料現場建一份。
+    """
+    store = get_store()
+    if len(store) and df_history is store.grid().frame():
+        return store.rollups()
+    return EnergyRollups.from_grid(HourlyGrid.from_frame(to_hourly_grid(df_history)))
+
+def _price_daily(daily):
+    """由每日 (尖峰 / 離峰) 用電彙總計算兩種方案的帳單，只需讀取 O(天數) 筆資料"""
+    monthly = daily.resample('MS').sum()
+    is_summer = (monthly.index.month >= 6) & (monthly.index.month <= 9)
+    peak_rate, off_peak_rate = season_rates(is_summer)
+
+    monthly_tou = pd.DataFrame(index=monthly.index)
+    monthly_tou['kwh'] = monthly['kwh']
+    monthly_tou['flow_cost'] = monthly['peak_kwh'] * peak_rate + monthly['off_peak_kwh'] * off_peak_rate
     monthly_tou['basic_fee'] = TOU_RATES_DATA['basic_fee_monthly']
     threshold = TOU_RATES_DATA['surcharge_kwh_threshold']
     surcharge_rate = TOU_RATES_DATA['surcharge_rate_per_kwh']
-    monthly_tou['surcharge'] = monthly_tou['kwh'].apply(lambda x: max(0, x - threshold) * surcharge_rate)
+    monthly_tou['surcharge'] = (monthly_tou['kwh'] - threshold).clip(lower=0) * surcharge_rate
     monthly_tou['total_cost'] = monthly_tou['flow_cost'] + monthly_tou['basic_fee'] + monthly_tou['surcharge']
     total_cost_tou = monthly_tou['total_cost'].sum()
     
-    monthly_prog = df_analysis.resample('MS').agg(kwh=('kwh', 'sum'))
-    monthly_prog['is_summer'] = (monthly_prog.index.month >= 6) & (monthly_prog.index.month <= 9)
-    monthly_prog['total_cost'] = monthly_prog.apply(lambda row: calculate_progressive_cost(row['kwh'], row['is_summer']), axis=1)
-    total_cost_progressive = monthly_prog['total_cost'].sum()
+    total_cost_progressive = tiered_cost(monthly['kwh'].to_numpy(), is_summer).sum()
     
-    results = {'total_kwh': df_analysis['kwh'].sum(), 'cost_progressive': total_cost_progressive, 'cost_tou': total_cost_tou}
-    return results, df_analysis
+    # 每日 x 尖離峰的用電明細 (供圓餅圖等以 tou_category 分組)
+    df_detail = daily[['peak_kwh', 'off_peak_kwh']].rename(columns={'peak_kwh': 'peak', 'off_peak_kwh': 'off_peak'})
+    df_detail = df_detail.reset_index().melt(id_vars='date', var_name='tou_category', value_name='kwh')
+    results = {'total_kwh': daily['kwh'].sum(), 'cost_progressive': total_cost_progressive, 'cost_tou': total_cost_tou}
+    return results, df_detail
+
+def analyze_pricing_plans(df_period):
+    """任意一段資料的方案比較 (先整理成每日彙總再計價)"""
+    return _price_daily(rollups_for(df_period).daily_frame())
+
+def analyze_pricing_period(df_history, start_date, end_date):
+    """
+    df_history 中 start_date ~ end_date (含) 的方案比較，直接讀取每日彙總表。
+    範圍內沒有資料時回傳 (None, None)。
+    """
+    daily = rollups_for(df_history).daily_frame(start_date, end_date)
+    if daily.empty:
+        return None, None
+    return _price_daily(daily)
+
+def compare_plans(df_history, start_date=None, end_date=None, plans=None):
+    """
+    start_date ~ end_date (含) 期間，所有電價方案 (預設 tariff_engine.DEFAULT_PLANS) 一次計價。
+    回傳 (summary, monthly)，依總電費由低到高排序；範圍內沒有資料時回傳 (None, None)。
+    """
+    profile = usage_profile(rollups_for(df_history), start_date, end_date)
+    if len(profile.months) == 0:
+        return None, None
+    summary, monthly = price_plans(profile, plans)
+    return summary.sort_values('total_cost'), monthly
+
+def tariff_sensitivity(df_history, start_date=None, end_date=None, **grid):
+    """
+    start_date ~ end_date (含) 期間的費率 / 尖峰時段 / 預算情境掃描 (參數見 tariff_sweep.sweep_tariffs)。
+    共用資料庫的結果依資料版本快取，拖動參數重跑頁面時不會重算。
+    """
+    return sweep_tariffs(rollups_for(df_history), start_date, end_date, **grid)
+
+def load_shift_frontier(df_history, start_date=None, end_date=None, capacity_kw=None, current_plan=CURRENT_PLAN):
+    """
+    start_date ~ end_date (含) 期間「每天移轉 X kWh 到深夜離峰」在 current_plan 下的節省金額前緣
+    (見 load_shift.savings_frontier)，所有移轉量一次算好並依資料版本快取，滑桿只是查表。
+    """
+    return savings_frontier(rollups_for(df_history), start_date, end_date, capacity_kw=capacity_kw,
+                            current_plan=current_plan)
 
 # --- 4. 核心 KPI 計算函式 (保持不變) ---
 def get_core_kpis(df_history):
@@ -198,43 +179,30 @@ def get_core_kpis(df_history):
         return kpis
 
     try:
-        kwh_last_30d = df_history.last('30D')['power_kW'].sum() * 0.25
-        today = df_history.index.max()
+        # 讀取增量維護的彙總表：滾動區間用每小時前綴和 (O(1))，今日 / 本月直接取每日 / 每月彙總
+        rollups = rollups_for(df_history)
+        today = df_history.index[-1]
+
+        kwh_last_30d, peak_last_30d = rollups.last_hours(30 * 24)
         is_summer_now = (today.month >= 6) & (today.month <= 9)
         kpis['projected_cost'] = calculate_progressive_cost(kwh_last_30d, is_summer_now)
         if kwh_last_30d > 0:
             kpis['PRICE_PER_KWH_AVG'] = kpis['projected_cost'] / kwh_last_30d
         
-        today_start = df_history.index.max().normalize()
-        df_today = df_history.loc[today_start:]
-        kpis['kwh_today_so_far'] = (df_today['power_kW'].sum() * 0.25)
+        kpis['kwh_today_so_far'] = rollups.daily['kwh'][-1]
         kpis['cost_today_so_far'] = kpis['kwh_today_so_far'] * kpis['PRICE_PER_KWH_AVG']
+        kpis['kwh_this_month_so_far'] = rollups.monthly['kwh'][-1]
 
-        today_date = df_history.index.max().date()
-        start_of_month = today_date.replace(day=1)
-        if start_of_month < df_history.index.min().date():
-            start_of_month = df_history.index.min().date()
-        df_this_month = df_history.loc[start_of_month:]
-        kpis['kwh_this_month_so_far'] = (df_this_month['power_kW'].sum() * 0.25)
-
-        df_last_7d = df_history.last('7D')
-        kpis['kwh_last_7_days'] = (df_last_7d['power_kW'].sum() * 0.25)
-        start_of_prev_7d = (df_last_7d.index.min() - timedelta(days=7))
-        end_of_prev_7d = df_last_7d.index.min()
-        
-        if start_of_prev_7d >= df_history.index.min():
-            df_prev_7d = df_history.loc[start_of_prev_7d:end_of_prev_7d]
-            kpis['kwh_previous_7_days'] = (df_prev_7d['power_kW'].sum() * 0.25)
+        week = 7 * 24
+        kpis['kwh_last_7_days'] = rollups.last_hours(week)[0]
+        if len(rollups) >= 2 * week:
+            kpis['kwh_previous_7_days'] = rollups.last_hours(week, offset=week)[0]
             if kpis['kwh_previous_7_days'] > 0: 
                 kpis['weekly_delta_percent'] = ((kpis['kwh_last_7_days'] - kpis['kwh_previous_7_days']) / kpis['kwh_previous_7_days']) * 100
             kpis['status_data_available'] = True
         
-        df_last_30d = df_history.last('30D').copy()
-        tou_details_30d = df_last_30d.index.map(get_tou_details)
-        df_last_30d['tou_category'] = [cat for cat, rate, season in tou_details_30d]
-        df_last_30d['kwh'] = df_last_30d['power_kW'] * 0.25
-        kpis['peak_kwh'] = df_last_30d[df_last_30d['tou_category'] == 'peak']['kwh'].sum()
-        kpis['off_peak_kwh'] = df_last_30d[df_last_30d['tou_category'] == 'off_peak']['kwh'].sum()
+        kpis['peak_kwh'] = peak_last_30d
+        kpis['off_peak_kwh'] = kwh_last_30d - peak_last_30d
 
         kpis['latest_data'] = df_history.iloc[-1]
 
@@ -253,6 +221,7 @@ if __name__ == "__main__":
     # 1. 測試抓取數據
     # 注意：因為沒有 Streamlit 環境，這裡呼叫 load_data 可能會因為 cache 警告而顯示訊息，這是正常的
     try:
+        refresh_store() # 沒有背景排程，這裡直接同步一次
         df_result = load_data()
         
         if df_result.empty:
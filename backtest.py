@@ -0,0 +1,125 @@
+# backtest.py
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from feature_engine import FeatureEngine, TAIL_HOURS, HORIZON_HOURS
+from model_service import hybrid_predict, SEQ_COLS, DIR_COLS
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+ORIGIN_HOUR = 23 # 每天 23:00 當作預測起點 -> 預測隔天 00:00 ~ 23:00
+CHUNK_ORIGINS = 256 # 每批幾個起點 (每批只呼叫一次 lgbm.predict / lstm.predict)
+MAPE_MIN_KW = 0.05 # 實際值低於此值的小時不計入 MAPE (避免除以接近 0 的數)
+MODELS = ["LGBM", "LSTM", "預測值"]
+
+# ==========================================
+# 🧪 滾動起點回測
+# ==========================================
+def load_backtest_history():
+    """歷史 CSV 整理成與線上預測相同的每小時網格"""
+    from history_cache import load_history_csv
+    from timeseries_store import TimeSeriesStore, HISTORY_CSV
+    store = TimeSeriesStore()
+    store.merge("csv", load_history_csv(HISTORY_CSV))
+    return store.grid().frame()
+
+def prepare_series(grid_df):
+    """整段一次 ffill (與 prepare_history 相同的處理)，各起點再從中切出已知歷史"""
+    series = grid_df[["temperature", "humidity"]].ffill()
+    series.insert(0, "power", grid_df["power_kW"].ffill())
+    return series
+
+def backtest_origins(index, origin_hour=ORIGIN_HOUR, start=None, end=None):
+    """可回測的起點位置：每天 origin_hour，前面至少有 TAIL_HOURS 小時歷史、後面有完整 24 小時"""
+    positions = np.flatnonzero(index.hour == origin_hour)
+    positions = positions[(positions + 1 >= TAIL_HOURS) & (positions + HORIZON_HOURS < len(index))]
+    if start is not None:
+        positions = positions[index[positions] >= pd.Timestamp(start)]
+    if end is not None:
+        positions = positions[index[positions] <= pd.Timestamp(end)]
+    return positions
+
+def _chunk_inputs(engine, series, positions):
+    """逐一推進特徵引擎 (每個起點只處理新進的小時)，把整批起點的模型輸入串接起來"""
+    lgbm_rows, seq_rows, dir_rows = [], [], []
+    for pos in positions:
+        engine.update(series.iloc[:pos + 1])
+        lgbm_rows.append(engine.lgbm_features())
+        seq_rows.append(engine.lstm_sequence(SEQ_COLS))
+        dir_rows.append(engine.lstm_features()[DIR_COLS].iloc[:1])
+    return pd.concat(lgbm_rows), pd.concat(seq_rows), pd.concat(dir_rows)
+
+def run_backtest(resources, grid_df=None, origin_hour=ORIGIN_HOUR, start=None, end=None,
+                 chunk_size=CHUNK_ORIGINS, on_progress=None):
+    """
+    讓預測起點滑過整段歷史 (每天一個)，以與線上預測相同的特徵引擎與 hybrid_predict 預測未來 24 小時。
+    每批 chunk_size 個起點的 LSTM X_seq / X_dir 疊成一個批次張量，LightGBM 與 LSTM 每批各只推論一次。
+    回傳每個 (起點, 預測時距) 一列的 DataFrame：起點 / 時間 / 時距 / 實際值 / LGBM / LSTM / 預測值。
+    """
+    grid_df = load_backtest_history() if grid_df is None else grid_df
+    series = prepare_series(grid_df)
+    actual = grid_df["power_kW"].to_numpy(dtype=np.float64)
+    positions = backtest_origins(grid_df.index, origin_hour, start, end)
+    engine = FeatureEngine() # 獨立的引擎，不影響線上預測的狀態
+    horizon = np.arange(1, HORIZON_HOURS + 1)
+    chunks = []
+    for i in range(0, len(positions), chunk_size):
+        batch = positions[i:i + chunk_size]
+        lgbm_feat, seq_data, dir_data = _chunk_inputs(engine, series, batch)
+        pred_lgbm, pred_lstm, pred_final = hybrid_predict(resources, lgbm_feat, seq_data, dir_data)
+        targets = (batch[:, None] + horizon).ravel()
+        chunks.append(pd.DataFrame({
+            "起點": np.repeat(grid_df.index[batch], HORIZON_HOURS),
+            "時間": grid_df.index[targets],
+            "時距": np.tile(horizon, len(batch)),
+            "實際值": actual[targets],
+            "LGBM": pred_lgbm,
+            "LSTM": pred_lstm,
+            "預測值": pred_final,
+        }))
+        if on_progress:
+            on_progress(min(i + chunk_size, len(positions)), len(positions))
+    if not chunks:
+        return pd.DataFrame(columns=["起點", "時間", "時距", "實際值"] + MODELS)
+    return pd.concat(chunks, ignore_index=True)
+
+def summarize_backtest(results):
+    """各模型在每個預測時距 (1 ~ 24 小時) 的 MAE (kW) 與 MAPE (%)，最後一列為全部時距合計"""
+    valid = results.dropna(subset=["實際值"])
+    mape_ok = valid["實際值"] >= MAPE_MIN_KW
+    columns = {}
+    for model in MODELS:
+        error = (valid[model] - valid["實際值"]).abs()
+        pct = (error / valid["實際值"]).where(mape_ok) * 100
+        columns[(model, "MAE")] = error.groupby(valid["時距"]).mean()
+        columns[(model, "MAPE")] = pct.groupby(valid["時距"]).mean()
+        columns[(model, "MAE")].loc["全部"] = error.mean()
+        columns[(model, "MAPE")].loc["全部"] = pct.mean()
+    summary = pd.DataFrame(columns)
+    summary.index.name = "時距"
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="混合模型滾動起點回測")
+    parser.add_argument("--start", help="第一個起點 (含)，例如 2023-01-01")
+    parser.add_argument("--end", help="最後一個起點 (含)")
+    parser.add_argument("--origin-hour", type=int, default=ORIGIN_HOUR)
+    parser.add_argument("--chunk", type=int, default=CHUNK_ORIGINS)
+    parser.add_argument("--output", help="逐筆預測結果輸出的 CSV 路徑")
+    args = parser.parse_args()
+
+    from model_registry import get_model_registry
+    resources = get_model_registry().get()
+    t0 = time.perf_counter()
+    results = run_backtest(resources, origin_hour=args.origin_hour, start=args.start, end=args.end,
+                           chunk_size=args.chunk,
+                           on_progress=lambda done, total: print(f"🧪 [Backtest] {done}/{total} 個起點"))
+    print(f"⏱️ [Backtest] {results['起點'].nunique()} 個起點，耗時 {time.perf_counter() - t0:.1f}s")
+    with pd.option_context("display.width", 200, "display.max_rows", 30):
+        print(summarize_backtest(results).round(3))
+    if args.output:
+        results.to_csv(args.output, index=False, encoding="utf-8-sig")
+        print(f"💾 [Backtest] 逐筆結果已寫入 {args.output}")
@@ -0,0 +1,68 @@
+# benchmarks/bench_backtest.py
+"""
+滾動起點回測：整段歷史 CSV (約四年、每天一個起點) 以批次推論跑完的耗時，
+與逐一起點推論 (chunk = 1，等同每個起點各呼叫一次線上預測) 比較，並檢查兩者的預測一致。
+lgbm_model.pkl 不在版本庫時以簡單的替代模型 (前 7 天平均) 代替 LightGBM，LSTM 與 scaler 用真的模型。
+
+執行方式：python benchmarks/bench_backtest.py [keras|tflite] [逐筆比較的起點數]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+from model_registry import MODEL_FILES, ModelRegistry
+from backtest import load_backtest_history, backtest_origins, run_backtest, summarize_backtest, CHUNK_ORIGINS
+
+PARITY_ATOL = 1e-4 # kW；批次與單筆的 float32 LSTM 推論誤差
+
+class PlaceholderLGBM:
+    """沒有 lgbm_model.pkl 時的替代模型：直接以 ma_7d 當預測值"""
+    def feature_name(self):
+        return ["ma_7d"]
+    def predict(self, X):
+        return X["ma_7d"].to_numpy(dtype=np.float64)
+
+def load_resources(backend):
+    files = {name: path for name, path in MODEL_FILES.items() if os.path.exists(path)}
+    resources = ModelRegistry(files, lstm_backend=backend).get()
+    if "lgbm" not in resources:
+        print("⚠️ 缺少 lgbm_model.pkl，以 ma_7d 替代模型代替 LightGBM")
+        resources["lgbm"] = PlaceholderLGBM()
+    return resources
+
+def main():
+    backend = sys.argv[1] if len(sys.argv) > 1 else "keras"
+    n_single = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    resources = load_resources(backend)
+    grid_df = load_backtest_history()
+    positions = backtest_origins(grid_df.index)
+    print(f"歷史 {grid_df.index[0].date()} ~ {grid_df.index[-1].date()}：{len(positions)} 個起點 (LSTM 後端 {backend})")
+
+    t0 = time.perf_counter()
+    batched = run_backtest(resources, grid_df, chunk_size=CHUNK_ORIGINS)
+    t_batched = time.perf_counter() - t0
+    assert batched["起點"].nunique() == len(positions)
+
+    # 逐一起點只跑前 n_single 個，再依起點數換算整段的耗時
+    end = grid_df.index[positions[min(n_single, len(positions)) - 1]]
+    t0 = time.perf_counter()
+    single = run_backtest(resources, grid_df, end=end, chunk_size=1)
+    t_single = (time.perf_counter() - t0) / single["起點"].nunique()
+    head = batched.iloc[:len(single)]
+    for model in ("LGBM", "LSTM", "預測值"):
+        diff = float(np.abs(head[model].to_numpy() - single[model].to_numpy()).max())
+        assert diff < PARITY_ATOL, (model, diff)
+    print(f"✅ 前 {single['起點'].nunique()} 個起點：批次與逐一推論一致 (誤差 < {PARITY_ATOL} kW)")
+
+    print(f"逐一起點 (估計) {t_single * len(positions):7.1f}s | 每批 {CHUNK_ORIGINS} 個起點 {t_batched:6.1f}s "
+          f"(加速 {t_single * len(positions) / t_batched:.1f}x)")
+    print(summarize_backtest(batched).loc["全部"].round(3).to_string())
+
+if __name__ == "__main__":
+    main()
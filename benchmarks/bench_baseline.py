@@ -0,0 +1,134 @@
+# benchmarks/bench_baseline.py
+"""
+每週時段季節基準：
+1. 從歷史 CSV 建立的門檻表與 pandas groupby (季節, 星期, 小時) 的中位數 / MAD 一致；
+2. 即時資料一批批進來 (含中途重啟、回補已併入的舊資料)，增量更新的門檻表與整段重建相同；
+3. 整段歷史一次 gather 評分、多戶矩陣評分的耗時；
+4. 與一週滑動平均比較：傍晚尖峰 (17~22 時) 被標記為異常的筆數。
+
+執行方式：python benchmarks/bench_baseline.py [戶數]
+"""
+import os
+import sys
+import time
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+import pandas as pd
+from history_cache import load_history_csv
+from timeseries_store import TimeSeriesStore, HISTORY_CSV
+from tou_engine import SUMMER_MONTHS
+from anomaly_detector import AnomalyDetector
+from seasonal_baseline import (SeasonalBaseline, scan_households, MAD_SCALE, ROBUST_Z, MIN_SCALE_KW,
+                               MIN_SAMPLES, HOURS_PER_WEEK)
+
+def reference_cells(index):
+    """參考作法：以 pandas 的月份 / 星期 / 小時算出格子"""
+    season = ((index.month >= SUMMER_MONTHS[0]) & (index.month <= SUMMER_MONTHS[1])).astype(int)
+    return np.asarray(season * HOURS_PER_WEEK + index.dayofweek * 24 + index.hour)
+
+def pandas_table(df):
+    """參考作法：groupby (季節, 每週第幾小時) 算中位數 / MAD"""
+    power = df['power_kW'].dropna()
+    groups = power.groupby(reference_cells(power.index))
+    median = groups.median()
+    mad = groups.apply(lambda s: (s - s.median()).abs().median())
+    table = pd.DataFrame({'count': groups.size(), 'median': median, 'mad': mad})
+    scale = np.maximum(MAD_SCALE * table['mad'], MIN_SCALE_KW)
+    table['threshold'] = (table['median'] + ROBUST_Z * scale).where(table['count'] >= MIN_SAMPLES)
+    return table
+
+def assert_same(baseline, expected):
+    got = baseline.table().reset_index(drop=True)
+    present = got['count'] > 0
+    assert present.sum() == len(expected)
+    got = got[present]
+    np.testing.assert_array_equal(got.index.to_numpy(), expected.index.to_numpy())
+    np.testing.assert_array_equal(got['count'].to_numpy(), expected['count'].to_numpy())
+    for column in ('median', 'mad', 'threshold'):
+        np.testing.assert_allclose(got[column].to_numpy(), expected[column].to_numpy(), rtol=1e-12)
+
+def live_source(start, periods, seed):
+    idx = pd.date_range(start, periods=periods, freq="15min", name="timestamp")
+    rng = np.random.default_rng(seed)
+    power = 0.3 + 0.2 * rng.random(periods)
+    power[rng.random(periods) < 0.01] = 6.0 # 偶發的高耗電
+    return pd.DataFrame({"power_kW": power, "temperature": 26.0, "humidity": 70.0}, index=idx)
+
+def main():
+    households = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    history = load_history_csv(HISTORY_CSV)
+    store = TimeSeriesStore()
+    store.merge("csv", history)
+    df = store.grid().frame()
+
+    # 1. 從 CSV 建立
+    with tempfile.TemporaryDirectory() as state_dir:
+        t0 = time.perf_counter()
+        baseline = SeasonalBaseline(state_dir)
+        t_build = time.perf_counter() - t0
+        assert_same(baseline, pandas_table(df))
+        t0 = time.perf_counter()
+        reloaded = SeasonalBaseline(state_dir)
+        t_reload = time.perf_counter() - t0
+        np.testing.assert_array_equal(reloaded.threshold, baseline.threshold)
+    print(f"✅ {len(df)} 小時建立的門檻表與 pandas groupby 中位數 / MAD 一致 "
+          f"(由 CSV 建立 {t_build * 1000:.0f} ms，重啟載入 {t_reload * 1000:.1f} ms)")
+
+    # 2. 增量更新 vs 整段重建
+    live = live_source(history.index[-1] + pd.Timedelta(hours=1), 4 * 24 * 14, seed=1)
+    with tempfile.TemporaryDirectory() as state_dir:
+        stream = TimeSeriesStore()
+        stream.merge("csv", history)
+        baseline = SeasonalBaseline(state_dir)
+        batches, costs, cells = np.array_split(np.arange(len(live)), 336), [], []
+        for k, rows in enumerate(batches):
+            stream.merge("live", live.iloc[rows])
+            if k == 100:
+                baseline = SeasonalBaseline(state_dir) # 重啟：從保存的序列接著算
+            if k == 200: # 回補一段已併入的舊資料 (不同數值)
+                stream.merge("gap", live_source(live.index[40 * 4], 24, seed=2).assign(power_kW=9.0))
+            t0 = time.perf_counter()
+            cells.append(baseline.update(stream))
+            costs.append(time.perf_counter() - t0)
+        assert_same(baseline, pandas_table(stream.grid().frame()))
+        with tempfile.TemporaryDirectory() as rebuild_dir:
+            rebuilt = SeasonalBaseline(rebuild_dir, source_csv=None)
+            rebuilt.update(stream)
+            np.testing.assert_array_equal(rebuilt.threshold, baseline.threshold)
+    print(f"✅ 串流 {len(batches)} 批 (含重啟、回補舊資料) 與整段重建一致；"
+          f"每批更新 p50 {np.percentile(costs, 50) * 1000:.2f} ms，平均重算 {np.mean(cells):.1f} 格")
+
+    # 3. 評分耗時：整段歷史、多戶矩陣
+    t0 = time.perf_counter()
+    for _ in range(20):
+        anomalies = baseline.scan(df)
+    t_scan = (time.perf_counter() - t0) / 20
+    rng = np.random.default_rng(3)
+    index = df.index[-24 * 365:]
+    power = df['power_kW'].to_numpy()[-24 * 365:] * rng.uniform(0.5, 1.5, (households, 1))
+    thresholds = np.repeat(baseline.threshold[None], households, axis=0) * rng.uniform(0.8, 1.2, (households, 1))
+    t0 = time.perf_counter()
+    mask = scan_households(thresholds, index, power)
+    t_matrix = time.perf_counter() - t0
+    cells = reference_cells(index)
+    for h in range(min(households, 20)):
+        np.testing.assert_array_equal(mask[h], power[h] > thresholds[h][cells])
+    print(f"   整段 {len(df)} 小時評分 {t_scan * 1000:.2f} ms ({len(anomalies)} 筆異常) | "
+          f"{households} 戶 x {len(index)} 小時矩陣評分 {t_matrix * 1000:.1f} ms")
+
+    # 4. 傍晚尖峰誤報：一週滑動平均 vs 每週時段基準
+    with tempfile.TemporaryDirectory() as state_dir:
+        detector = AnomalyDetector(state_dir)
+        detector.backfill(store)
+        rolling = detector.events()
+    for label, events in (("一週滑動平均", rolling), ("每週時段基準", anomalies)):
+        evening = ((events.index.hour >= 17) & (events.index.hour < 22)).sum()
+        print(f"   {label}：{len(events)} 筆異常，其中傍晚 17~22 時 {evening} 筆")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/bench_calendar.py
+"""
+日曆特徵表：與逐列 strftime + isin 的直接算法比對 (2022 ~ 2027 全部小時與表外的時間)，
+並比較兩者在 2000 列 buffer 上的耗時。
+
+執行方式：python benchmarks/bench_calendar.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+import pandas as pd
+from calendar_features import CalendarTable, get_calendar, get_taiwan_holidays, TW_HOLIDAYS
+
+def direct(index):
+    """原本 add_lgbm_features 的算法 (逐列格式化日期字串比對假日)"""
+    hour = index.hour
+    day_of_week = index.dayofweek
+    month = index.month
+    date_strs = index.strftime("%Y-%m-%d")
+    return {
+        "hour": np.asarray(hour),
+        "day_of_week": np.asarray(day_of_week),
+        "month": np.asarray(month),
+        "off_day": np.asarray(((day_of_week >= 5) | date_strs.isin(get_taiwan_holidays())).astype(int)),
+        "hour_sin": np.sin(2 * np.pi * pd.Series(hour) / 24.0).to_numpy(),
+        "hour_cos": np.cos(2 * np.pi * pd.Series(hour) / 24.0).to_numpy(),
+        "week_sin": np.sin(2 * np.pi * pd.Series(day_of_week) / 7.0).to_numpy(),
+        "week_cos": np.cos(2 * np.pi * pd.Series(day_of_week) / 7.0).to_numpy(),
+        "month_sin": np.sin(2 * np.pi * pd.Series(month) / 12.0).to_numpy(),
+        "month_cos": np.cos(2 * np.pi * pd.Series(month) / 12.0).to_numpy(),
+    }
+
+def main():
+    t0 = time.perf_counter()
+    table = CalendarTable()
+    print(f"建表 {table.hours} 小時 / {len(table.holiday_bitmap)} 天：{(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    # 1. 表內每一個小時都與直接算法完全相同 (bit-for-bit)
+    index = pd.date_range("2022-01-01", "2027-12-31 23:00", freq="h")
+    expected, got = direct(index), table.gather(index)
+    for name, values in expected.items():
+        assert np.array_equal(got[name], values), name
+    years = {year: int(table.is_holiday(pd.to_datetime([f"{year}-{d}" for d in days])).sum())
+             for year, days in TW_HOLIDAYS.items()}
+    assert all(count == len(TW_HOLIDAYS[year]) for year, count in years.items())
+    print(f"✅ 2022 ~ 2027 全部 {len(index)} 小時一致，各年假日數 {years}")
+
+    # 2. 非整點與超出範圍的時間 (共用日曆表先自動延伸再取值)
+    odd = pd.DatetimeIndex(["2021-12-31 23:00", "2024-02-09 10:15", "2028-01-01 05:00"])
+    got, expected = get_calendar(odd).gather(odd), direct(odd.floor("h"))
+    for name, values in expected.items():
+        assert np.array_equal(got[name], values), name
+    print("✅ 非整點 / 表外時間一致")
+
+    # 3. 耗時 (2000 列 buffer)
+    get_calendar()
+    buffer = pd.date_range("2025-08-01", periods=2000, freq="h")
+    def best_of(fn, repeat=20):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        return best
+    t_direct = best_of(lambda: direct(buffer))
+    t_table = best_of(lambda: get_calendar().gather(buffer))
+    print(f"2000 列：strftime + isin {t_direct * 1000:.2f} ms | 日曆表取值 {t_table * 1000:.3f} ms")
+
+if __name__ == "__main__":
+    main()
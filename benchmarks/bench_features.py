@@ -0,0 +1,126 @@
+# benchmarks/bench_features.py
+"""
+增量特徵引擎：與原本「整段 full_context 重算 add_lgbm_features / add_lstm_features」在 24 個目標列上比對，
+包含逐小時前進、歷史被更正 (重建)、整段相同值 (std = 0) 的情況，最後比較不同 buffer 大小下的耗時。
+
+執行方式：python benchmarks/bench_features.py
+"""
+import os
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+warnings.simplefilter("ignore", FutureWarning) # concat 全 NaN 欄位的提示
+
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from history_cache import load_history_csv
+from timeseries_store import TimeSeriesStore, HISTORY_CSV
+from model_service import add_lgbm_features, add_lstm_features, prepare_history, LOOKBACK_HOURS
+from feature_engine import FeatureEngine, RESYNC_HOURS
+
+SEQ_COLS = ["power", "temperature", "humidity", "hour_sin", "hour_cos", "is_weekend"]
+
+def reference(df_ready):
+    """舊版 load_resources_and_predict 的特徵計算 (整段重算)"""
+    last_time = df_ready.index[-1]
+    future_dates = [last_time + timedelta(hours=i+1) for i in range(24)]
+    future_df = pd.DataFrame(index=future_dates, columns=df_ready.columns)
+    future_df['temperature'] = df_ready['temperature'].iloc[-1]
+    future_df['humidity'] = df_ready['humidity'].iloc[-1]
+    full_context = pd.concat([df_ready, future_df])
+    df_lgbm = add_lgbm_features(full_context)
+    df_lstm = add_lstm_features(full_context)
+    seq = df_lstm[SEQ_COLS].iloc[-25 - LOOKBACK_HOURS + 1:-24]
+    return df_lgbm.iloc[-24:], df_lstm.iloc[-24:], seq
+
+def assert_same(engine, df_ready):
+    ref_lgbm, ref_lstm, ref_seq = reference(df_ready)
+    worst = 0.0
+    for ref, got in ((ref_lgbm, engine.lgbm_features()), (ref_lstm, engine.lstm_features()),
+                     (ref_seq, engine.lstm_sequence(SEQ_COLS))):
+        assert (ref.index == got.index).all()
+        for col in got.columns:
+            expected = ref[col].to_numpy(dtype=np.float64)
+            actual = got[col].to_numpy(dtype=np.float64)
+            np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-12, err_msg=col)
+            ok = ~np.isnan(expected)
+            if ok.any():
+                worst = max(worst, float(np.max(np.abs(actual[ok] - expected[ok]))))
+    return worst
+
+def main():
+    store = TimeSeriesStore()
+    store.merge("csv", load_history_csv(HISTORY_CSV))
+    combined = store.grid().frame()
+    print(f"歷史資料 {len(combined)} 小時，最新 {combined.index[-1]}")
+
+    # 1. 單次計算與整段重算一致
+    engine = FeatureEngine()
+    df_ready = prepare_history(combined)
+    engine.update(df_ready)
+    worst = assert_same(engine, df_ready)
+    print(f"✅ 目標列特徵一致 (最大絕對誤差 {worst:.2e})")
+
+    # 2. 逐小時前進：只處理新進的小時，RESYNC_HOURS 之內不重建
+    cut = len(combined) - 200
+    engine = FeatureEngine()
+    engine.update(prepare_history(combined.iloc[:cut]))
+    worst = 0.0
+    for end in range(cut + 1, cut + RESYNC_HOURS + 1, 5):
+        df_ready = prepare_history(combined.iloc[:end])
+        engine.update(df_ready)
+        worst = max(worst, assert_same(engine, df_ready))
+    assert engine.rebuilds == 1, engine.rebuilds
+    print(f"✅ 逐小時前進 {RESYNC_HOURS} 小時仍一致，重建 {engine.rebuilds} 次 (最大絕對誤差 {worst:.2e})")
+
+    # 3. 已處理的歷史被更正 -> 自動重建
+    edited = combined.copy()
+    edited.iloc[-30, edited.columns.get_loc("power_kW")] += 1.5
+    df_ready = prepare_history(edited)
+    engine.update(df_ready)
+    assert_same(engine, df_ready)
+    print(f"✅ 歷史更正後重建並一致 (重建 {engine.rebuilds} 次)")
+
+    # 4. 最後 40 小時用電完全相同 (pandas 的 rolling std 會回傳 0)，以及前面有 NaN 的短歷史
+    flat = combined.copy()
+    flat.iloc[-40:, flat.columns.get_loc("power_kW")] = 0.75
+    df_ready = prepare_history(flat)
+    engine.update(df_ready)
+    assert_same(engine, df_ready)
+    short = combined.iloc[-300:].copy()
+    short.iloc[:50, short.columns.get_loc("power_kW")] = np.nan
+    df_ready = prepare_history(short)
+    engine.update(df_ready)
+    assert_same(engine, df_ready)
+    print("✅ 相同值視窗與短歷史 (開頭為 NaN) 一致")
+
+    # 5. 耗時：整段重算隨 buffer 變大，增量引擎只看尾段
+    def best_of(fn, repeat=5):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        return best
+
+    for buffer_size in (2000, 8000, min(len(combined), 20000)):
+        df_ready = prepare_history(combined.iloc[:-1], buffer_size)
+        df_next = prepare_history(combined, buffer_size)
+        t_ref = best_of(lambda: reference(df_next))
+        def incremental():
+            engine = FeatureEngine()
+            engine.update(df_ready)
+            t0 = time.perf_counter()
+            engine.update(df_next) # 新進一小時
+            engine.lgbm_features(), engine.lstm_features(), engine.lstm_sequence(SEQ_COLS)
+            return time.perf_counter() - t0
+        t_inc = min(incremental() for _ in range(5))
+        print(f"buffer {buffer_size:>6}：整段重算 {t_ref * 1000:7.2f} ms | 增量引擎 {t_inc * 1000:6.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_fetch.py
+"""
+冷啟動抓取基準測試：在本機啟動一個模擬 Pantry 的 HTTP 伺服器，
+比較「舊版逐一抓取 (每次新連線 + sleep 0.05)」與「pantry_client 連線池併發抓取」。
+
+執行方式：python benchmarks/bench_fetch.py
+"""
+import os
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+import pantry_client
+
+LATENCY_S = 0.08         # 模擬每個請求的伺服器回應時間
+HANDSHAKE_S = 0.05       # 模擬每條新連線的 TCP/TLS 握手成本
+RECORDS_PER_BASKET = 2000
+TARGET_YEARS = [2023, 2024, 2025, 2026]
+PANTRY_ID = "bench"
+
+def make_payload(basket_name):
+    records = [{"date": "2024-01-01", "time": f"{(i // 4) % 24:02d}:{(i % 4) * 15:02d}", "power": 0.1 + i % 7 * 0.01}
+               for i in range(RECORDS_PER_BASKET)]
+    return json.dumps({"data": records}).encode()
+
+class StandInPantry(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # 支援 keep-alive
+    payloads = {}
+    throttle_once = set()
+    failing = set() # 一律回 500 的 basket (模擬抓取失敗)
+    hits = [] # 收到的請求路徑 (供其他基準測試計算請求數)
+    lock = threading.Lock()
+
+    def setup(self):
+        time.sleep(HANDSHAKE_S)
+        super().setup()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(LATENCY_S)
+        basket = self.path.rsplit("/", 1)[-1]
+        with self.lock:
+            self.hits.append(self.path)
+            throttled = basket in self.throttle_once
+            self.throttle_once.discard(basket)
+            failed = basket in self.failing
+        if throttled:
+            self._reply(429, b"{}")
+        elif failed:
+            self._reply(500, b"{}")
+        elif basket in self.payloads:
+            self._reply(200, self.payloads[basket])
+        else:
+            self._reply(404, b"{}")
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def legacy_fetch_all(base_url, basket_names):
+    """舊版 load_data 的抓取迴圈 (每次 requests.get 新連線、逐一等待)"""
+    results = {}
+    for name in basket_names:
+        data = None
+        for attempt in range(3):
+            r = requests.get(f"{base_url}/{PANTRY_ID}/basket/{name}", timeout=10)
+            if r.status_code == 200:
+                data = r.json()
+                break
+            if r.status_code == 404:
+                break
+            if r.status_code == 429:
+                time.sleep(1.0 * (attempt + 1))
+        results[name] = data
+        time.sleep(0.05)
+    return results
+
+def main():
+    basket_names = [f"{y}-q{q}" for y in TARGET_YEARS for q in range(1, 5)]
+    # 2026-q2 之後視為尚未產生 (404)，與正式環境行為一致
+    StandInPantry.payloads = {name: make_payload(name) for name in basket_names[:14]}
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInPantry)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    for label, throttle in [("無限流", set()), ("含一次 429", {"2024-q3"})]:
+        StandInPantry.throttle_once = set(throttle)
+        t0 = time.perf_counter()
+        legacy = legacy_fetch_all(base_url, basket_names)
+        t_legacy = time.perf_counter() - t0
+
+        StandInPantry.throttle_once = set(throttle)
+        progress = []
+        t0 = time.perf_counter()
+        pooled = pantry_client.fetch_baskets(PANTRY_ID, basket_names, base_url=base_url,
+                                             on_done=lambda done, total, name: progress.append(done))
+        t_pooled = time.perf_counter() - t0
+
+        assert legacy == pooled, "兩種抓取方式的結果不一致"
+        assert progress == list(range(1, len(basket_names) + 1))
+        print(f"[{label}] 舊版逐一抓取: {t_legacy:.2f}s | 連線池併發抓取: {t_pooled:.2f}s "
+              f"(加速 {t_legacy / t_pooled:.1f}x)")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
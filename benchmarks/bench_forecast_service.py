@@ -0,0 +1,99 @@
+# benchmarks/bench_forecast_service.py
+"""
+預測服務負載測試：20 個 session 同時進站，只應觸發一次模型預測；
+資料沒更新時再進站直接拿快取，資料更新後才會再算一次。多日預測 (分析室) 也依資料版本只算一次。
+
+執行方式：python benchmarks/bench_forecast_service.py [session 數]
+"""
+import os
+import sys
+import time
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+import pandas as pd
+from history_cache import load_history_csv
+from timeseries_store import get_store, HISTORY_CSV
+from forecast_service import ForecastService
+from shared_dataset import get_snapshot
+
+PREDICT_SECONDS = 0.5 # 模擬載入模型 + LSTM 推論的耗時
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    store = get_store()
+    store.merge("csv", load_history_csv(HISTORY_CSV))
+    state = {"fresh": False, "refreshes": 0}
+
+    def refresh(on_progress=None):
+        # 以本地資料代替雲端同步 (refresh_store 本身也是 single-flight)
+        state["refreshes"] += 1
+        state["fresh"] = True
+        return store
+
+    def predict(s):
+        time.sleep(PREDICT_SECONDS)
+        df = s.grid().frame()
+        future = pd.date_range(df.index[-1] + pd.Timedelta(hours=1), periods=24, freq="h")
+        return pd.DataFrame({"預測值": np.full(24, df["power_kW"].iloc[-1])}, index=future), s.version
+
+    horizon_calls = []
+    def predict_horizon(grid, hours, freq):
+        horizon_calls.append((grid.end, hours, freq))
+        time.sleep(PREDICT_SECONDS)
+        df = grid.frame()
+        future = pd.date_range(df.index[-1] + pd.Timedelta(hours=1), periods=hours, freq="h")
+        return pd.DataFrame({"預測值": np.full(hours, df["power_kW"].iloc[-1])}, index=future)
+
+    service = ForecastService(predict=predict, refresh=refresh, is_fresh=lambda: state["fresh"],
+                              prepare=lambda: None, preload=False, predict_horizon=predict_horizon)
+
+    def wave(label):
+        results, barrier = [None] * n, threading.Barrier(n)
+        def session(i):
+            barrier.wait() # 所有 session 同時進站
+            results[i] = service.request().result()
+        threads = [threading.Thread(target=session, args=(i,)) for i in range(n)]
+        before = service.computations
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        versions = {handle for _, handle in results}
+        print(f"[{label}] {n} 個 session | 模型預測 {service.computations - before} 次 | {elapsed:.2f}s | 資料版本 {versions}")
+        return results, service.computations - before
+
+    results, computed = wave("同時進站")
+    assert computed == 1 and all(r[0] is results[0][0] for r in results)
+    assert get_snapshot().result is results[0][0]
+
+    _, computed = wave("資料未更新")
+    assert computed == 0
+
+    idx = pd.date_range("2026-01-01", periods=4, freq="15min", name="timestamp")
+    store.merge("live", pd.DataFrame({"power_kW": 0.8, "temperature": 25.0, "humidity": 70.0}, index=idx))
+    state["fresh"] = False # 等同 mark_stale()
+    _, computed = wave("新資料進來")
+    assert computed == 1
+    print(f"✅ {n} 個 session 共用同一個預測工作 (舊作法：每個 session 各自預測 {n} 次)")
+
+    # 多日預測：同一資料版本重畫 n 次只算一次；資料更新後重算
+    frames = [service.request_horizon(72).result() for _ in range(n)]
+    assert len(horizon_calls) == 1 and all(f is frames[0] for f in frames)
+    t0 = time.perf_counter()
+    service.request_horizon(72).result()
+    t_cached = time.perf_counter() - t0
+    store.merge("live", pd.DataFrame({"power_kW": 0.9, "temperature": 25.0, "humidity": 70.0},
+                                     index=idx + pd.Timedelta(hours=1)))
+    service.request_horizon(72).result()
+    assert len(horizon_calls) == 2 and horizon_calls[1][0] == store.grid().end
+    print(f"✅ 多日預測依資料版本快取：重畫 {n} 次只預測 1 次 (快取取用 {t_cached * 1000:.3f} ms)，新資料進來才重算")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# benchmarks/bench_grid.py
+"""
+每小時標準網格：檢查混合解析度 (CSV 每小時 + AMI 每 15 分鐘) 的用電積分是否正確，
+並比較 get_core_kpis 在原始資料 (以時間查找) 與標準網格 (固定步距) 上的耗時。
+
+執行方式：python benchmarks/bench_grid.py
+"""
+import os
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+warnings.simplefilter("ignore", FutureWarning) # df.last() 已被標記棄用
+
+import numpy as np
+import pandas as pd
+from history_cache import load_history_csv
+from timeseries_store import TimeSeriesStore, HISTORY_CSV
+from energy_grid import build_hourly_grid
+from app_utils import get_core_kpis, get_tou_details
+
+def synthetic_source(start, end, freq, seed):
+    idx = pd.date_range(start, end, freq=freq, name="timestamp")
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"power_kW": 0.2 + rng.random(len(idx)), "temperature": 25.0, "humidity": 70.0}, index=idx)
+
+def legacy_kwh(df):
+    """舊版：不論原生間隔一律 power_kW * 0.25"""
+    return df["power_kW"].sum() * 0.25
+
+def main():
+    hist_df = load_history_csv(HISTORY_CSV)
+    ami_df = synthetic_source(hist_df.index[-1] - pd.Timedelta(hours=5), "2026-01-31 23:45", "15min", 1)
+
+    store = TimeSeriesStore()
+    store.merge("csv", hist_df)
+    store.merge("gap", ami_df)
+    raw = store.frame()
+    grid = store.grid()
+    grid_df = grid.frame()
+
+    # 1. 正確性：CSV 每小時一筆 = 1 小時，AMI 每筆 = 0.25 小時；重疊的小時只算 AMI
+    first_ami_hour = ami_df.index[0].floor("h")
+    csv_part = hist_df.loc[:first_ami_hour - pd.Timedelta(hours=1), "power"]
+    expected_total = csv_part.sum() * 1.0 + ami_df["power_kW"].sum() * 0.25
+    assert np.isclose(grid_df["kwh"].sum(), expected_total), (grid_df["kwh"].sum(), expected_total)
+    assert (np.diff(grid_df.index.asi8) == 3_600_000_000_000).all()
+    hourly_ami = (ami_df["power_kW"] * 0.25).resample("h").sum()
+    pd.testing.assert_series_equal(grid_df["kwh"].loc[hourly_ami.index], hourly_ami, check_names=False, check_freq=False)
+    print(f"✅ 積分正確：原始 {len(raw)} 筆 -> 網格 {len(grid)} 格 | 總用電 {expected_total:,.1f} kWh"
+          f" (舊版 ×0.25 算出 {legacy_kwh(raw):,.1f} kWh)")
+
+    # 邊界小時：AMI 從 xx:30 開始時，前半小時仍由 CSV 補上，不會因為「整小時只算 AMI」而少算
+    boundary = hist_df.index[-30] + pd.Timedelta(minutes=30)
+    partial = TimeSeriesStore()
+    partial.merge("csv", hist_df)
+    partial.merge("gap", synthetic_source(boundary, boundary + pd.Timedelta(hours=2), "15min", 3))
+    hour = partial.grid().frame().loc[boundary.floor("h")]
+    expected_hour = (hist_df.loc[boundary.floor("h"), "power"] * 0.5
+                     + partial.frame().loc[boundary:boundary + pd.Timedelta(minutes=15), "power_kW"].sum() * 0.25)
+    assert np.isclose(hour["kwh"], expected_hour) and hour["coverage"] == 1.0, (hour["kwh"], expected_hour)
+    print(f"✅ 邊界小時 {boundary.floor('h')}：CSV 前 30 分鐘 + AMI 後 30 分鐘 = {hour['kwh']:.3f} kWh")
+
+    # 2. KPI：以時間查找 vs 固定步距
+    def best_of(fn, repeat=20):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        return best
+
+    def legacy_kpis(df):
+        df.last("30D")["power_kW"].sum() * 0.25
+        df.loc[df.index.max().normalize():]["power_kW"].sum() * 0.25
+        df.loc[df.index.max().date().replace(day=1):]["power_kW"].sum() * 0.25
+        last_7d = df.last("7D")
+        df.loc[last_7d.index.min() - pd.Timedelta(days=7):last_7d.index.min()]["power_kW"].sum() * 0.25
+        last_30d = df.last("30D").copy()
+        tou = last_30d.index.map(get_tou_details)
+        last_30d["tou_category"] = [cat for cat, rate, season in tou]
+        last_30d["kwh"] = last_30d["power_kW"] * 0.25
+        last_30d[last_30d["tou_category"] == "peak"]["kwh"].sum()
+
+    t_legacy = best_of(lambda: legacy_kpis(raw))
+    t_grid = best_of(lambda: get_core_kpis(grid_df))
+    kpis = get_core_kpis(grid_df)
+    print(f"近 7 天 {kpis['kwh_last_7_days']:.1f} kWh | 本月 {kpis['kwh_this_month_so_far']:.1f} kWh")
+    print(f"舊版時間查找 (原始資料)      : {t_legacy * 1000:6.2f} ms")
+    print(f"get_core_kpis 固定步距       : {t_grid * 1000:6.2f} ms")
+
+    # 3. 網格建立成本 (每個資料版本只建一次；附加資料時只延伸尾端)
+    t0 = time.perf_counter()
+    store.merge("live", synthetic_source("2026-02-01", "2026-02-01 01:00", "15min", 2))
+    extended = store.grid()
+    t_extend = time.perf_counter() - t0
+    n = len(store)
+    t0 = time.perf_counter()
+    rebuilt = build_hourly_grid(store._ts[:n], store._cols["power_kW"][:n], store._step[:n],
+                                store._cols["temperature"][:n], store._cols["humidity"][:n], priority=store._src[:n])
+    t_rebuild = time.perf_counter() - t0
+    pd.testing.assert_frame_equal(extended.frame(), rebuilt.frame())
+    print(f"附加即時資料後：延伸網格 {t_extend * 1000:.2f} ms | 整段重建 {t_rebuild * 1000:.2f} ms (結果相同)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/bench_history_cache.py
+"""
+歷史 CSV 欄式快取：一致性檢查 + 載入時間/記憶體比較。
+
+執行方式：python benchmarks/bench_history_cache.py
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import pandas as pd
+from history_cache import load_history_csv, _read_history_csv
+
+CSV_PATH = "final_training_data_with_humidity.csv"
+
+def measure(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+def main():
+    cache_dir = tempfile.mkdtemp(prefix="history_cache_")
+    try:
+        # 1. 一致性：快取讀回的 DataFrame 必須與 read_csv 完全相同
+        expected = _read_history_csv(CSV_PATH)
+        load_history_csv(CSV_PATH, cache_dir=cache_dir) # 建立快取
+        cached = load_history_csv(CSV_PATH, cache_dir=cache_dir)
+        pd.testing.assert_frame_equal(cached, expected, check_exact=True)
+        print(f"✅ 一致性檢查通過 ({len(cached)} 筆, 欄位 {list(cached.columns)})")
+
+        # 2. 載入時間 / 記憶體
+        _, t_csv, m_csv = measure(lambda: _read_history_csv(CSV_PATH))
+        _, t_mmap, m_mmap = measure(lambda: load_history_csv(CSV_PATH, cache_dir=cache_dir))
+        _, t_copy, m_copy = measure(lambda: load_history_csv(CSV_PATH, cache_dir=cache_dir, mmap=False))
+        print(f"read_csv + to_datetime : {t_csv * 1000:8.1f} ms | 峰值 {m_csv / 1e6:6.1f} MB")
+        print(f"欄式快取 (mmap)        : {t_mmap * 1000:8.1f} ms | 峰值 {m_mmap / 1e6:6.1f} MB")
+        print(f"欄式快取 (載入記憶體)  : {t_copy * 1000:8.1f} ms | 峰值 {m_copy / 1e6:6.1f} MB")
+
+        # 3. CSV 改變後必須自動重建
+        tmp_csv = os.path.join(cache_dir, "history.csv")
+        sub_cache = os.path.join(cache_dir, "sub")
+        expected.iloc[:100].reset_index().to_csv(tmp_csv, index=False)
+        assert len(load_history_csv(tmp_csv, cache_dir=sub_cache)) == 100
+        expected.iloc[:200].reset_index().to_csv(tmp_csv, index=False)
+        assert len(load_history_csv(tmp_csv, cache_dir=sub_cache)) == 200
+        print("✅ CSV 變更後快取自動重建")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_importtime.py
+"""
+冷啟動匯入時間：以 `python -X importtime` 量測 app.py 頂層匯入的模組 (也就是 UI 外殼畫出前必須完成的匯入)，
+列出最耗時的頂層套件，並確認 TensorFlow / LightGBM / Plotly 沒有出現在啟動路徑上。
+
+執行方式：python benchmarks/bench_importtime.py [--runs N] [--max-seconds S]
+"""
+import os
+import re
+import ast
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 必須延後到第一次使用才匯入的套件 (streamlit 本身會匯入 plotly / graph_objects 的延遲載入外殼，只有 express 會真的載入整套)
+DEFERRED = ("tensorflow", "keras", "lightgbm", "plotly.express")
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def startup_imports(path=os.path.join(ROOT, "app.py")):
+    """app.py 模組層級 (不含函式 / 條件內) 的 import 敘述"""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    return [ast.get_source_segment(source, node)
+            for node in ast.parse(source).body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+def measure(statements):
+    """回傳 {頂層模組: 累計秒數} 與所有被匯入的模組名稱"""
+    code = "; ".join(statements)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                         capture_output=True, text=True, env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"))
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr[-2000:])
+    top, modules = {}, set()
+    for line in out.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if not m:
+            continue
+        cumulative, indent, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        modules.add(name)
+        if indent <= 1: # 縮排最少的就是被 app.py 直接 (或第一次) 匯入的模組
+            top[name] = top.get(name, 0) + cumulative / 1e6
+    return top, modules
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float, default=None, help="總匯入時間超過此值時以非 0 結束 (CI 用)")
+    args = parser.parse_args()
+
+    statements = startup_imports()
+    interpreter, _ = measure(["pass"]) # 直譯器本身啟動就會匯入的模組 (site、encodings...) 不列入
+    runs = [measure(statements) for _ in range(args.runs)]
+    best_top, modules = min(runs, key=lambda r: sum(r[0].values()))
+    best_top = {name: sec for name, sec in best_top.items() if name not in interpreter}
+    total = sum(best_top.values())
+
+    print(f"app.py 頂層匯入 ({len(statements)} 行)，取 {args.runs} 次中最快的一次：")
+    for name, seconds in sorted(best_top.items(), key=lambda kv: -kv[1])[:12]:
+        print(f"  {name:32s} {seconds * 1000:8.1f} ms")
+    print(f"  {'合計':30s} {total * 1000:8.1f} ms")
+
+    leaked = sorted({d for d in DEFERRED for m in modules if m == d or m.startswith(d + ".")})
+    if leaked:
+        print(f"❌ 以下套件出現在啟動路徑上: {', '.join(leaked)}")
+        sys.exit(1)
+    print(f"✅ {', '.join(DEFERRED)} 皆未在啟動時匯入")
+    if args.max_seconds is not None and total > args.max_seconds:
+        print(f"❌ 匯入時間 {total:.2f}s 超過上限 {args.max_seconds:.2f}s")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
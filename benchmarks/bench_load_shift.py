@@ -0,0 +1,101 @@
+# benchmarks/bench_load_shift.py
+"""
+移轉用電模擬：
+1. 隨機情境 (不同時段、移轉量、容量上限) 與「真的把每小時用電改掉，再用 price_plans 重新計價」一致；
+2. 數千個情境批次計算的耗時；
+3. 節省金額前緣：首次計算與同一資料版本再查 (拖動滑桿) 的延遲。
+
+執行方式：python benchmarks/bench_load_shift.py [情境數]
+"""
+import os
+import sys
+import copy
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+from history_cache import load_history_csv
+from energy_grid import HOUR_NS
+from timeseries_store import get_store, HISTORY_CSV
+from tariff_engine import usage_profile, price_plans, slot_range
+from load_shift import (ShiftScenario, SHIFT_SOURCES, SHIFT_TARGET, CURRENT_PLAN, simulate_shifts,
+                        savings_frontier, daily_usage)
+
+BANDS = list(SHIFT_SOURCES.values()) + [(14, 16)]
+TARGETS = [SHIFT_TARGET, (1, 5), (22, 24)]
+
+def random_scenarios(n, seed=0):
+    rng = np.random.default_rng(seed)
+    scenarios = []
+    while len(scenarios) < n:
+        source, target = BANDS[rng.integers(len(BANDS))], TARGETS[rng.integers(len(TARGETS))]
+        if source[0] < target[1] and target[0] < source[1]:
+            continue # 重疊的時段不合法
+        capacity = None if rng.random() < 0.5 else float(rng.uniform(0.3, 3.0))
+        scenarios.append(ShiftScenario(float(rng.uniform(0, 12)), source, target, capacity))
+    return scenarios
+
+def shifted_rollups(rollups, scenario, start, end):
+    """直接改寫每小時用電：來源時段依比例扣除、目標時段平均分攤，回傳改寫後的彙總表副本"""
+    lo, hi = slot_range(rollups, start, end)
+    usage = daily_usage(rollups, start, end)
+    kwh = usage.kwh.copy()
+    (s0, s1), (t0, t1) = scenario.source, scenario.target
+    source_kwh = kwh[:, s0:s1].sum(axis=1)
+    capacity = np.inf if scenario.capacity_kw is None else scenario.capacity_kw
+    room = np.maximum(capacity * (t1 - t0) - kwh[:, t0:t1].sum(axis=1), 0.0)
+    moved = np.minimum(np.minimum(scenario.kwh_per_day, source_kwh), room)
+    share = np.divide(moved, source_kwh, out=np.zeros_like(moved), where=source_kwh > 0)
+    kwh[:, s0:s1] *= (1 - share)[:, None]
+    kwh[:, t0:t1] += (moved / (t1 - t0))[:, None]
+    pad = int((rollups.start_ns + lo * HOUR_NS - usage.days[0].value) // HOUR_NS)
+    shifted = copy.copy(rollups)
+    shifted.kwh = rollups.kwh.copy()
+    shifted.kwh[lo:hi] = kwh.ravel()[pad:pad + hi - lo]
+    return shifted, moved.sum()
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    store = get_store()
+    store.merge("csv", load_history_csv(HISTORY_CSV))
+    rollups = store.rollups()
+
+    # 1. 與直接改寫用電後重新計價一致 (整段歷史 + 最近 30 天)
+    for start, end in ((None, None), ("2025-10-02", "2025-10-31")):
+        scenarios = random_scenarios(40, seed=1)
+        result = simulate_shifts(rollups, scenarios, start, end)
+        for i, scenario in enumerate(scenarios):
+            shifted, moved = shifted_rollups(rollups, scenario, start, end)
+            summary, _ = price_plans(usage_profile(shifted, start, end))
+            assert np.isclose(result.loc[i, "moved_kwh"], moved, rtol=1e-10)
+            np.testing.assert_allclose(result.loc[i, list(summary.index)].to_numpy(dtype=float),
+                                       summary["total_cost"].to_numpy(), rtol=1e-10)
+    print("✅ 隨機情境與直接改寫每小時用電後重新計價一致")
+
+    # 2. 批次耗時
+    scenarios = random_scenarios(n)
+    t0 = time.perf_counter()
+    result = simulate_shifts(rollups, scenarios)
+    t_batch = time.perf_counter() - t0
+    days = len(daily_usage(rollups).days)
+    print(f"   {n} 個情境 x {days} 天：{t_batch * 1000:.1f} ms | {CURRENT_PLAN}最多可省 ${result['saving'].max():,.0f}")
+
+    # 3. 節省金額前緣 (頁面滑桿)
+    for capacity in (None, 1.5):
+        t0 = time.perf_counter()
+        frontier = savings_frontier(rollups, "2025-10-02", "2025-10-31", capacity_kw=capacity)
+        t_first = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        again = savings_frontier(rollups, "2025-10-02", "2025-10-31", capacity_kw=capacity)
+        t_cached = time.perf_counter() - t0
+        assert again is frontier
+        label = "不限容量" if capacity is None else f"上限 {capacity} kW"
+        print(f"   前緣 ({label})：首次 {t_first * 1000:.1f} ms，再查 {t_cached * 1e6:.1f} µs | "
+              f"每天移 4 kWh：{frontier.loc[4.0, 'source']} 省 ${frontier.loc[4.0, 'saving']:,.0f} ({CURRENT_PLAN})，"
+              f"改用 {frontier.loc[4.0, 'best_plan']} 共省 ${frontier.loc[4.0, 'best_saving']:,.0f}")
+
+if __name__ == "__main__":
+    main()
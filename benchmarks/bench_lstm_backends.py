@@ -0,0 +1,93 @@
+# benchmarks/bench_lstm_backends.py
+"""
+LSTM 推論後端：keras model.predict vs TFLite 直譯器。
+先檢查兩者輸出一致 (float32 誤差內)，再各以獨立子行程量測載入時間、單次推論延遲與峰值 RSS。
+
+執行方式：python benchmarks/bench_lstm_backends.py [推論次數]
+"""
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+
+LSTM_PATH = "lstm_model.keras"
+PARITY_ATOL = 1e-4 # 模型輸出為縮放後的數值 (0~1 左右)
+
+def sample_inputs(shapes, n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [[rng.random((1,) + tuple(shape[1:])).astype(np.float32) for shape in shapes] for _ in range(n)]
+
+def child(backend, runs):
+    from model_registry import ModelRegistry, _input_shapes
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    registry = ModelRegistry({"lstm": LSTM_PATH}, lstm_backend=backend)
+    t0 = time.perf_counter()
+    model = registry.get()["lstm"]
+    load_s = time.perf_counter() - t0
+    latencies = []
+    for inputs in sample_inputs(_input_shapes(model), runs):
+        t0 = time.perf_counter()
+        model.predict(inputs, verbose=0)
+        latencies.append(time.perf_counter() - t0)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"load_s": load_s, "p50_ms": float(np.median(latencies) * 1000),
+                      "p95_ms": float(np.percentile(latencies, 95) * 1000), "rss_mb": (peak_rss - base_rss) / 1024}))
+
+def parity():
+    from tensorflow import keras
+    from tflite_engine import TFLiteModel, load_or_convert
+    keras_model = keras.models.load_model(LSTM_PATH)
+    tflite_model = TFLiteModel.from_keras(LSTM_PATH) # 第一次會轉換並快取到 .cache/models
+    max_diff = 0.0
+    for inputs in sample_inputs(tflite_model.input_shapes, 20, seed=1):
+        expected = keras_model.predict(inputs, verbose=0)
+        actual = tflite_model.predict(inputs)
+        assert actual.shape == expected.shape
+        max_diff = max(max_diff, float(np.abs(actual - expected).max()))
+    # 多筆輸入 (批次直譯器 + 補 0) 也要與 keras 的批次推論一致
+    batch = [np.concatenate(xs) for xs in zip(*sample_inputs(tflite_model.input_shapes, 40, seed=2))]
+    max_diff = max(max_diff, float(np.abs(tflite_model.predict(batch) - keras_model.predict(batch, verbose=0)).max()))
+    assert max_diff < PARITY_ATOL, max_diff
+    print(f"✅ 數值一致：TFLite 與 keras 最大絕對誤差 {max_diff:.2e} (< {PARITY_ATOL})")
+
+    # 多筆輸入：批次直譯器 (每批一次 invoke) vs 只有 batch = 1 直譯器時的逐筆執行
+    many = [np.concatenate(xs) for xs in zip(*sample_inputs(tflite_model.input_shapes, 256, seed=3))]
+    single_only = TFLiteModel(*load_or_convert(LSTM_PATH))
+    timings = {}
+    for label, model in (("逐筆", single_only), ("批次", tflite_model)):
+        model.predict(many)
+        t0 = time.perf_counter()
+        model.predict(many)
+        timings[label] = time.perf_counter() - t0
+    print(f"✅ TFLite {len(many[0])} 筆輸入：逐筆 {timings['逐筆'] * 1000:.1f} ms | "
+          f"每 {tflite_model.batch_size} 筆一批 {timings['批次'] * 1000:.1f} ms")
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    out = subprocess.run([sys.executable, __file__, "--parity"], capture_output=True, text=True, cwd=ROOT)
+    if out.returncode != 0:
+        raise SystemExit(out.stderr[-3000:])
+    print("\n".join(line for line in out.stdout.strip().splitlines() if line.startswith("✅")))
+
+    for backend in ("keras", "tflite"):
+        out = subprocess.run([sys.executable, __file__, "--child", backend, str(runs)],
+                             capture_output=True, text=True, check=True, cwd=ROOT)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{backend:7s}: 載入 + 暖機 {r['load_s']:5.2f}s | 推論 p50 {r['p50_ms']:7.2f} ms"
+              f" p95 {r['p95_ms']:7.2f} ms | 峰值 RSS 增量 {r['rss_mb']:6.1f} MB")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], int(sys.argv[3]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--parity":
+        parity()
+    else:
+        main()
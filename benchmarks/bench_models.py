@@ -0,0 +1,77 @@
+# benchmarks/bench_models.py
+"""
+模型登錄處：比較「每次預測都重新載入模型」與「行程內只載入 + 暖機一次」的每次預測耗時。
+lgbm_model.pkl 不在版本庫時只測 LSTM 與 scaler。
+
+執行方式：python benchmarks/bench_models.py [預測次數]
+"""
+import importlib
+import os
+import sys
+import time
+import joblib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+from model_registry import MODEL_FILES, ModelRegistry
+
+def available_files():
+    return {name: path for name, path in MODEL_FILES.items() if os.path.exists(path)}
+
+def dummy_inputs(lstm):
+    rng = np.random.default_rng(0)
+    return [rng.random((1,) + tuple(t.shape[1:])).astype(np.float32) for t in lstm.inputs]
+
+def legacy_forecast(files):
+    """舊作法：每次預測都 joblib.load / keras load_model，再做一次 LSTM 推論"""
+    from tensorflow import keras
+    resources = {name: (keras.models.load_model(path) if name == "lstm" else joblib.load(path))
+                 for name, path in files.items()}
+    return resources["lstm"].predict(dummy_inputs(resources["lstm"]), verbose=0)
+
+def registry_forecast(registry):
+    resources = registry.get()
+    return resources["lstm"].predict(dummy_inputs(resources["lstm"]), verbose=0)
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    files = available_files()
+    print(f"模型檔案: {', '.join(files)}" + ("" if "lgbm" in files else " (缺少 lgbm_model.pkl，略過 LightGBM)"))
+
+    importlib.import_module("tensorflow") # 先匯入一次，匯入時間不計入比較
+    legacy = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        expected = legacy_forecast(files)
+        legacy.append(time.perf_counter() - t0)
+
+    registry = ModelRegistry(files)
+    t0 = time.perf_counter()
+    registry.get()
+    cold = time.perf_counter() - t0
+    warm = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        actual = registry_forecast(registry)
+        warm.append(time.perf_counter() - t0)
+    np.testing.assert_allclose(actual, expected, rtol=1e-5)
+
+    # 檔案有變動 (mtime 改變) 才會重新載入
+    path = files["weights"]
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 1))
+    before = dict(registry.timings)
+    registry.get()
+    reloaded = [name for name in registry.timings if registry.timings[name] is not before[name]]
+    assert reloaded == ["weights"], reloaded
+
+    print("舊作法 每次預測 (載入 + 推論)     : " + " / ".join(f"{t:.2f}s" for t in legacy))
+    print(f"登錄處 冷啟動 (載入 + 暖機，只一次): {cold:.2f}s")
+    print("登錄處 之後每次預測 (只有推論)     : " + " / ".join(f"{t * 1000:.0f}ms" for t in warm))
+    print(f"✅ 結果一致；檔案變動時只重新載入 {reloaded}")
+
+if __name__ == "__main__":
+    main()
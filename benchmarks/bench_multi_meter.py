@@ -0,0 +1,113 @@
+# benchmarks/bench_multi_meter.py
+"""
+多電表批次推論：以真實歷史產生 1 / 100 / 1000 個合成電表 (各自縮放、錯開時間、加雜訊)，
+比較「逐一電表、批次 1」與「全部電表疊成一批，lgbm / lstm 各呼叫一次」的吞吐量 (電表 / 秒)，
+並確認兩者的預測結果一致。
+
+lgbm_model.pkl 不存在時，以歷史資料現場訓練一個小的 LightGBM 代替 (只用來量測吞吐量)。
+
+執行方式：python benchmarks/bench_multi_meter.py [電表數 ...]
+"""
+import os
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+warnings.simplefilter("ignore", UserWarning)
+
+import numpy as np
+import pandas as pd
+from history_cache import load_history_csv
+from timeseries_store import TimeSeriesStore, HISTORY_CSV
+from model_registry import ModelRegistry, MODEL_FILES
+from model_service import hybrid_predict, prepare_history, SEQ_COLS, DIR_COLS
+from feature_engine import FeatureEngine, TAIL_HOURS
+from multi_meter import MultiMeterForecaster
+
+HISTORY_HOURS = TAIL_HOURS + 48
+SEQUENTIAL_CAP = 100 # 逐一模式最多實際跑幾個電表 (吞吐量以此推算)
+
+def synthetic_meters(grid_df, n, seed=0):
+    rng = np.random.default_rng(seed)
+    base = grid_df.iloc[-(HISTORY_HOURS + 24 * 30):]
+    meters = {}
+    for i in range(n):
+        shift = int(rng.integers(0, 24 * 30))
+        df = base.iloc[shift:shift + HISTORY_HOURS].copy()
+        df.index = base.index[-HISTORY_HOURS:] # 對齊到同一段時間
+        noise = rng.normal(1.0, 0.05, len(df))
+        df["power_kW"] = df["power_kW"] * rng.uniform(0.5, 3.0) * noise
+        meters[f"meter_{i:04d}"] = prepare_history(df)
+    return meters
+
+def substitute_lgbm(grid_df):
+    """以歷史資料訓練一個 200 棵樹的 LightGBM，特徵與線上模型使用的欄位相同"""
+    import lightgbm as lgb
+    engine, rows, targets = FeatureEngine(), [], []
+    history = prepare_history(grid_df, buffer_size=24 * 120)
+    for end in range(TAIL_HOURS, len(history) - 24, 24):
+        engine.update(history.iloc[:end])
+        rows.append(engine.lgbm_features())
+        targets.append(history["power"].iloc[end:end + 24].to_numpy())
+    X = pd.concat(rows).drop(columns=["humidity"])
+    booster = lgb.train({"objective": "regression", "verbose": -1, "num_threads": 1},
+                        lgb.Dataset(X, np.concatenate(targets)), num_boost_round=200)
+    return booster
+
+def load_resources(grid_df):
+    files = dict(MODEL_FILES)
+    substitute = not os.path.exists(files["lgbm"])
+    if substitute:
+        files.pop("lgbm")
+    resources = ModelRegistry(files).get()
+    if substitute:
+        print("⚠️ 找不到 lgbm_model.pkl，改用現場訓練的代替 LightGBM")
+        resources["lgbm"] = substitute_lgbm(grid_df)
+    return resources
+
+def run_sequential(resources, meters):
+    """舊作法：每個電表各自算特徵、各自呼叫一次 lgbm / lstm (批次 1)"""
+    results = {}
+    for meter_id, df_ready in meters.items():
+        engine = FeatureEngine()
+        engine.update(df_ready)
+        lgbm_feat = engine.lgbm_features()
+        pred = hybrid_predict(resources, lgbm_feat, engine.lstm_sequence(SEQ_COLS),
+                              engine.lstm_features()[DIR_COLS].iloc[:1])
+        results[meter_id] = pred[2]
+    return results
+
+def run_batched(resources, meters):
+    forecaster = MultiMeterForecaster()
+    for meter_id, df_ready in meters.items():
+        forecaster.update(meter_id, df_ready)
+    return {k: v["預測值"].to_numpy() for k, v in forecaster.forecast(resources).items()}
+
+def main():
+    counts = [int(x) for x in sys.argv[1:]] or [1, 100, 1000]
+    store = TimeSeriesStore()
+    store.merge("csv", load_history_csv(HISTORY_CSV))
+    grid_df = store.grid().frame()
+    resources = load_resources(grid_df)
+    run_batched(resources, synthetic_meters(grid_df, 2)) # 暖機
+
+    for n in counts:
+        meters = synthetic_meters(grid_df, n)
+        sample = dict(list(meters.items())[:SEQUENTIAL_CAP])
+        t0 = time.perf_counter()
+        sequential = run_sequential(resources, sample)
+        t_seq = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        batched = run_batched(resources, meters)
+        t_batch = time.perf_counter() - t0
+        worst = max(np.abs(batched[k] - v).max() for k, v in sequential.items())
+        assert worst < 1e-4, worst
+        note = f" (實測 {len(sample)} 個推算)" if len(sample) < n else ""
+        print(f"{n:>5} 個電表 | 逐一：{len(sample) / t_seq:8.1f} 電表/秒{note} | "
+              f"批次：{n / t_batch:8.1f} 電表/秒 ({t_batch:.2f}s) | 最大差異 {worst:.1e}")
+
+if __name__ == "__main__":
+    main()
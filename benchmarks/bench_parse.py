@@ -0,0 +1,118 @@
+# benchmarks/bench_parse.py
+"""
+basket 解析基準測試：json.loads + list of dicts vs 串流欄式解析。
+以合成的多年份 15 分鐘 basket 比較解析時間 (最佳 3 次) 與峰值 RSS (每種模式各跑一個子行程，互不干擾)。
+
+執行方式：python benchmarks/bench_parse.py [年數]
+"""
+import os
+import sys
+import json
+import time
+import resource
+import tracemalloc
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+REPEAT = 3
+
+def make_basket(path, years):
+    idx = pd.date_range("2022-01-01", periods=years * 365 * 96, freq="15min")
+    rng = np.random.default_rng(0)
+    power = np.round(rng.gamma(2.0, 0.2, len(idx)), 4)
+    power[rng.random(len(idx)) < 0.01] = 0.0
+    dates = idx.strftime("%Y-%m-%d")
+    times = idx.strftime("%H:%M")
+    with open(path, "w") as f:
+        f.write('{"data": [')
+        for i in range(len(idx)):
+            if i:
+                f.write(", ")
+            json.dump({"date": dates[i], "time": times[i], "power": float(power[i]),
+                       "isMissingData": int(power[i] == 0.0), "temperature": 25.0 + (i % 96) / 10,
+                       "humidity": 70.0}, f)
+        f.write("]}")
+    return len(idx)
+
+def rss_kb(field):
+    """/proc/self/status 中的 VmRSS (目前) 或 VmHWM (峰值)，單位 kB；沒有 /proc 時退回 ru_maxrss"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def reset_peak_rss():
+    """把 VmHWM 重設為目前的 RSS (Linux：clear_refs 寫入 5)，之後量到的峰值只含解析本身"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def child(mode, path):
+    from pantry_parser import parse_basket_payload, parse_basket_stream
+    with open(path, "rb") as f:
+        payload = f.read()
+    parse = (lambda: parse_basket_payload(json.loads(payload))) if mode == "json" else (lambda: parse_basket_stream(payload))
+
+    # 載入 payload 與匯入模組時的峰值不算進來：先重設峰值，再以解析前的 RSS 為基準
+    reset_peak_rss()
+    base_rss = rss_kb("VmRSS")
+    t0 = time.perf_counter()
+    df = parse()
+    elapsed = time.perf_counter() - t0
+    peak_rss = rss_kb("VmHWM")
+    del df
+    for _ in range(REPEAT - 1): # 解析時間取最佳值，減少機器雜訊
+        t0 = time.perf_counter()
+        parse()
+        elapsed = min(elapsed, time.perf_counter() - t0)
+
+    # tracemalloc 追蹤 Python 物件與 numpy 陣列的配置，作為 RSS 以外的第二個指標
+    tracemalloc.start()
+    parse()
+    _, peak_alloc = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(json.dumps({"seconds": elapsed, "rss_kb": peak_rss - base_rss, "alloc_bytes": peak_alloc}))
+
+def main():
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        n = make_basket(path, years)
+        size_mb = os.path.getsize(path) / 1e6
+
+        # 一致性：兩種解析方式的數值必須完全相同
+        from pantry_parser import parse_basket_payload, parse_basket_stream
+        with open(path, "rb") as f:
+            payload = f.read()
+        pd.testing.assert_frame_equal(parse_basket_stream(payload), parse_basket_payload(json.loads(payload)),
+                                      check_dtype=False)
+        del payload
+        print(f"✅ 一致性檢查通過 | 合成 basket: {years} 年, {n} 筆, {size_mb:.1f} MB")
+
+        for label, mode in [("json.loads + DataFrame(list of dicts)", "json"), ("串流欄式解析", "stream")]:
+            out = subprocess.run([sys.executable, __file__, "--child", mode, path],
+                                 capture_output=True, text=True, check=True, cwd=ROOT)
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{label:38s}: {r['seconds']:6.2f} s | 峰值 RSS 增量 {r['rss_kb'] / 1024:7.1f} MB"
+                  f" | 峰值配置 {r['alloc_bytes'] / 1e6:7.1f} MB")
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main()
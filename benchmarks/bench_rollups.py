@@ -0,0 +1,122 @@
+# benchmarks/bench_rollups.py
+"""
+用電彙總表：與直接掃描原始序列 (get_tou_details + resample / last) 的結果比對，
+並確認增量更新與整份重建一致，最後比較 KPI / 方案比較的耗時。
+
+執行方式：python benchmarks/bench_rollups.py
+"""
+import os
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+warnings.simplefilter("ignore", FutureWarning) # df.last() 已被標記棄用
+
+import numpy as np
+import pandas as pd
+from history_cache import load_history_csv
+from timeseries_store import get_store, HISTORY_CSV
+from rollups import EnergyRollups, tou_peak_mask
+from app_utils import (get_core_kpis, get_tou_details, analyze_pricing_period, calculate_progressive_cost,
+                       TOU_RATES_DATA)
+
+def synthetic_source(start, end, freq, seed):
+    idx = pd.date_range(start, end, freq=freq, name="timestamp")
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"power_kW": 0.2 + rng.random(len(idx)), "temperature": 25.0, "humidity": 70.0}, index=idx)
+
+def raw_tables(df):
+    """直接掃描每小時序列：逐筆 get_tou_details 分類，再 resample 成每日 / 每月"""
+    detail = df[["kwh"]].copy()
+    detail["tou_category"] = [cat for cat, rate, season in df.index.map(get_tou_details)]
+    detail["peak_kwh"] = detail["kwh"].where(detail["tou_category"] == "peak", 0.0)
+    detail["off_peak_kwh"] = detail["kwh"] - detail["peak_kwh"]
+    cols = ["kwh", "peak_kwh", "off_peak_kwh"]
+    return detail, detail[cols].resample("D").sum(), detail[cols].resample("MS").sum()
+
+def raw_pricing(detail):
+    """舊版 analyze_pricing_plans 的逐筆計價"""
+    tou = detail.index.map(get_tou_details)
+    flow = detail["kwh"] * np.array([rate for cat, rate, season in tou])
+    monthly = pd.DataFrame({"kwh": detail["kwh"], "flow": flow}).resample("MS").sum()
+    threshold, surcharge = TOU_RATES_DATA["surcharge_kwh_threshold"], TOU_RATES_DATA["surcharge_rate_per_kwh"]
+    cost_tou = sum(f + TOU_RATES_DATA["basic_fee_monthly"] + max(0, k - threshold) * surcharge
+                   for k, f in zip(monthly["kwh"], monthly["flow"]))
+    cost_prog = sum(calculate_progressive_cost(k, 6 <= m.month <= 9) for m, k in monthly["kwh"].items())
+    return monthly["kwh"].sum(), cost_prog, cost_tou
+
+def assert_tables(rollups, df):
+    detail, daily, monthly = raw_tables(df)
+    np.testing.assert_allclose(rollups.daily_frame().to_numpy(), daily.to_numpy(), atol=1e-9)
+    np.testing.assert_allclose(rollups.monthly_frame().to_numpy(), monthly.to_numpy(), atol=1e-9)
+    np.testing.assert_allclose(rollups.last_hours(720), (df["kwh"].iloc[-720:].sum(),
+                               detail["peak_kwh"].iloc[-720:].sum()), atol=1e-9)
+    return detail
+
+def main():
+    store = get_store() # KPI / 方案比較只有在共用資料庫上才會讀取增量維護的彙總表
+    store.merge("csv", load_history_csv(HISTORY_CSV))
+    store.merge("gap", synthetic_source("2025-11-01", "2025-12-31 23:45", "15min", 1))
+    rollups = store.rollups()
+    df = store.grid().frame()
+
+    # 1. 尖離峰規則與 get_tou_details 完全一致
+    expected_peak = np.array([cat == "peak" for cat, rate, season in df.index.map(get_tou_details)])
+    assert (tou_peak_mask(df.index) == expected_peak).all()
+
+    # 2. 每日 / 每月 / 滾動區間彙總與直接掃描一致
+    detail = assert_tables(rollups, df)
+    print(f"✅ 彙總表與原始序列一致：{len(df)} 小時 -> {len(rollups.daily['kwh'])} 天 / {len(rollups.monthly['kwh'])} 月")
+
+    # 3. 增量更新 (附加即時資料、回補較早月份) 與整份重建一致
+    store.merge("live", synthetic_source("2026-01-01", "2026-01-03 12:00", "15min", 2))
+    store.merge("gap", synthetic_source("2025-12-20", "2025-12-22", "15min", 3))
+    store.merge("live", synthetic_source("2026-02-10", "2026-02-10 05:00", "15min", 4)) # 中間有空窗
+    grid = store.grid()
+    t0 = time.perf_counter()
+    rollups = store.rollups()
+    t_incremental = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    rebuilt = EnergyRollups.from_grid(grid)
+    t_full = time.perf_counter() - t0
+    for name in ("kwh", "is_peak", "cum_kwh", "cum_peak"):
+        np.testing.assert_allclose(getattr(rollups, name), getattr(rebuilt, name), atol=1e-9)
+    df = store.grid().frame()
+    detail = assert_tables(rollups, df)
+    print(f"✅ 增量更新與整份重建一致 | 增量 {t_incremental * 1000:.2f} ms vs 重建 {t_full * 1000:.2f} ms")
+
+    # 4. 方案比較：每日彙總計價 vs 逐筆計價
+    start, end = pd.Timestamp("2025-06-01"), df.index[-1].normalize()
+    expected = raw_pricing(detail.loc[start.strftime("%Y-%m-%d"):end.strftime("%Y-%m-%d")]) # 與頁面的日期切片相同 (含結束日)
+    results, _ = analyze_pricing_period(df, start, end)
+    np.testing.assert_allclose([results["total_kwh"], results["cost_progressive"], results["cost_tou"]], expected)
+    print(f"✅ 方案比較一致：累進 {results['cost_progressive']:,.0f} / 時間電價 {results['cost_tou']:,.0f}")
+
+    # 5. KPI 與直接掃描一致
+    kpis = get_core_kpis(df)
+    last = df.index[-1]
+    assert np.isclose(kpis["kwh_today_so_far"], df.loc[last.normalize():, "kwh"].sum())
+    assert np.isclose(kpis["kwh_this_month_so_far"], df.loc[last.normalize().replace(day=1):, "kwh"].sum())
+    assert np.isclose(kpis["kwh_last_7_days"], df["kwh"].iloc[-168:].sum())
+    assert np.isclose(kpis["kwh_previous_7_days"], df["kwh"].iloc[-336:-168].sum())
+    assert np.isclose(kpis["peak_kwh"], detail["peak_kwh"].iloc[-720:].sum())
+    print("✅ KPI 與直接掃描一致")
+
+    def best_of(fn, repeat=10):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        return best
+
+    t_raw = best_of(lambda: raw_pricing(raw_tables(df.loc[start.strftime("%Y-%m-%d"):end.strftime("%Y-%m-%d")])[0]))
+    t_rollup = best_of(lambda: analyze_pricing_period(df, start, end))
+    print(f"方案比較 ({(end - start).days} 天)：逐筆 {t_raw * 1000:.1f} ms | 彙總表 {t_rollup * 1000:.2f} ms")
+    print(f"get_core_kpis：{best_of(lambda: get_core_kpis(df)) * 1000:.3f} ms")
+
+if __name__ == "__main__":
+    main()
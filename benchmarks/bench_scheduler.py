@@ -0,0 +1,105 @@
+# benchmarks/bench_scheduler.py
+"""
+背景預測排程：以假的即時資料輪詢推進 watermark，確認
+1. 只有 watermark 前進時才重新預測，資料沒變的輪詢不會觸發推論；
+2. 預測進行中，讀取快照的 session 不會被卡住 (讀取延遲 vs 推論時間)；
+3. 讀到的快照永遠是一致的 (版本與預測結果屬於同一次發佈)。
+
+執行方式：python benchmarks/bench_scheduler.py
+"""
+import os
+import sys
+import time
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+import pandas as pd
+from history_cache import load_history_csv
+from timeseries_store import get_store, HISTORY_CSV
+from forecast_service import ForecastService
+from forecast_scheduler import ForecastScheduler
+from shared_dataset import get_snapshot
+
+PREDICT_SECONDS = 0.3 # 模擬推論耗時
+
+def main():
+    store = get_store()
+    store.merge("csv", load_history_csv(HISTORY_CSV))
+    live = {"next": store.watermark + pd.Timedelta(minutes=15), "pending": 0}
+    predictions = []
+
+    def poll():
+        # 假的 LIVE_DATA_URL：pending > 0 時附加幾筆新的 15 分鐘資料
+        if not live["pending"]:
+            return 0
+        idx = pd.date_range(live["next"], periods=live["pending"], freq="15min", name="timestamp")
+        store.merge("live", pd.DataFrame({"power_kW": 0.5, "temperature": 26.0, "humidity": 70.0}, index=idx))
+        live["next"] = idx[-1] + pd.Timedelta(minutes=15)
+        added, live["pending"] = live["pending"], 0
+        return added
+
+    def predict(s):
+        version = s.version
+        time.sleep(PREDICT_SECONDS)
+        predictions.append(version)
+        future = pd.date_range(s.watermark.ceil("h"), periods=24, freq="h")
+        # 預測值寫入版本號，方便檢查快照的一致性
+        return pd.DataFrame({"預測值": np.full(24, float(version))}, index=future), version
+
+    service = ForecastService(predict=predict, refresh=lambda on_progress=None: store, is_fresh=lambda: True,
+                              prepare=lambda: None, preload=False)
+    scheduler = ForecastScheduler(service=service, poll=poll, interval=0.05).start()
+
+    # 讀取端：不停讀快照，記錄延遲並檢查一致性
+    stop, latencies, inconsistent = threading.Event(), [], []
+    def reader():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            snapshot = get_snapshot()
+            latencies.append(time.perf_counter() - t0)
+            if snapshot is not None and snapshot.result["預測值"].iloc[0] != snapshot.version:
+                inconsistent.append(snapshot.version)
+            time.sleep(0.001)
+    readers = [threading.Thread(target=reader) for _ in range(8)]
+    for t in readers:
+        t.start()
+
+    def wait_for(version, timeout=10):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            snapshot = get_snapshot()
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+            time.sleep(0.01)
+        raise TimeoutError(version)
+
+    wait_for(store.version)
+    assert len(predictions) == 1
+    time.sleep(0.5) # 約 10 次沒有新資料的輪詢
+    assert len(predictions) == 1, predictions
+    print(f"✅ 沒有新資料：輪詢 {scheduler.polls} 次，預測只跑 1 次")
+
+    for step in range(3):
+        live["pending"] = 4
+        scheduler.trigger()
+        time.sleep(0.05)
+        snapshot = wait_for(store.version)
+        print(f"   watermark -> {snapshot.watermark} | 快照版本 {snapshot.version}")
+    assert len(predictions) == 4, predictions
+    print(f"✅ watermark 前進 3 次 -> 預測 {len(predictions)} 次 (含啟動時 1 次)")
+
+    stop.set()
+    for t in readers:
+        t.join()
+    scheduler.stop()
+    assert not inconsistent, inconsistent
+    lat = np.array(latencies) * 1e6
+    print(f"✅ {len(lat)} 次快照讀取皆一致；讀取延遲 p50 {np.percentile(lat, 50):.1f} µs / "
+          f"max {lat.max():.0f} µs (推論本身 {PREDICT_SECONDS * 1000:.0f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_sessions.py
+"""
+共用資料集：模擬多個 session 陸續進站 (期間資料持續更新)，
+比較「每個 session 各自保存 DataFrame」與「只保存版本號」的常駐記憶體。
+
+執行方式：python benchmarks/bench_sessions.py [session 數]
+"""
+import os
+import sys
+import gc
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+import pandas as pd
+from history_cache import load_history_csv
+from timeseries_store import get_store, HISTORY_CSV
+from shared_dataset import get_dataset, publish_forecast, get_snapshot
+
+def live_tick(i):
+    idx = pd.date_range("2026-01-01", periods=4, freq="15min", name="timestamp") + pd.Timedelta(hours=i)
+    return pd.DataFrame({"power_kW": 0.5 + i % 7 * 0.1, "temperature": 25.0, "humidity": 70.0}, index=idx)
+
+def fake_forecast(df):
+    future = pd.date_range(df.index[-1] + pd.Timedelta(hours=1), periods=24, freq="h")
+    return pd.DataFrame({"預測值": np.full(24, df["power_kW"].iloc[-1])}, index=future)
+
+def run(n_sessions, keep_frames):
+    """每個 session 進站前都有一筆新的即時資料 (資料版本 +1)，回傳結束時的常駐配置 (bytes)"""
+    store = get_store()
+    sessions = []
+    gc.collect()
+    tracemalloc.start()
+    for i in range(n_sessions):
+        store.merge("live", live_tick(i + (0 if keep_frames else n_sessions)))
+        df = get_dataset()
+        forecast = fake_forecast(df)
+        if keep_frames:
+            # 舊作法：session_state.current_data / prediction_result 各存一份 (各自留住當時的版本)
+            sessions.append({"current_data": df.copy(), "prediction_result": forecast})
+        else:
+            handle = store.version # session 只需要存這個整數
+            publish_forecast(handle, forecast)
+            sessions.append({"data_version": handle})
+    # 所有 session 再各讀一次畫面需要的資料
+    for session in sessions:
+        view = session["current_data"] if keep_frames else get_dataset()
+        view["kwh"].iloc[-168:].sum()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    store = get_store()
+    store.merge("csv", load_history_csv(HISTORY_CSV))
+    get_dataset()
+
+    # 唯讀保護：共用的 DataFrame 不能被原地修改，要改必須先 copy
+    shared = get_dataset()
+    try:
+        shared.loc[shared.index[-1], "power_kW"] = 0.0
+        raise AssertionError("共用資料集應為唯讀")
+    except ValueError:
+        pass
+    local = shared.iloc[-24:].copy()
+    local["power_kW"] = 0.0
+    assert get_dataset()["power_kW"].iloc[-1] != 0.0
+    print("✅ 共用資料集為唯讀，session 自己的修改不影響其他人")
+
+    for sessions in (1, n):
+        per_session = run(sessions, keep_frames=True)
+        shared_mem = run(sessions, keep_frames=False)
+        print(f"{sessions:3d} 個 session | 各自保存 DataFrame: {per_session / 1e6:7.1f} MB"
+              f" | 只保存版本號: {shared_mem / 1e6:6.2f} MB")
+    assert get_snapshot() is not None
+
+if __name__ == "__main__":
+    main()
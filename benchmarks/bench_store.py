@@ -0,0 +1,62 @@
+# benchmarks/bench_store.py
+"""
+統一時序資料庫：與舊版 pd.concat + duplicated + sort_index 合併結果比對，並比較合併時間。
+
+執行方式：python benchmarks/bench_store.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+import pandas as pd
+from history_cache import load_history_csv
+from timeseries_store import TimeSeriesStore, HISTORY_CSV, STORE_COLUMNS
+
+def synthetic_source(start, end, freq, value, seed):
+    idx = pd.date_range(start, end, freq=freq, name="timestamp")
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"power_kW": value + rng.random(len(idx)), "temperature": 25.0, "humidity": 70.0}, index=idx)
+
+def legacy_combine(hist_df, gap_df, live_df):
+    combined = pd.concat([hist_df, gap_df, live_df])
+    return combined[~combined.index.duplicated(keep='last')].sort_index()
+
+def main():
+    hist_df = load_history_csv(HISTORY_CSV).rename(columns={"power": "power_kW"})[list(STORE_COLUMNS)]
+    gap_df = synthetic_source("2025-10-01", "2025-12-31 23:45", "15min", 10.0, 1)
+    live_df = synthetic_source("2025-12-30", "2026-01-02", "15min", 20.0, 2)
+
+    t0 = time.perf_counter()
+    expected = legacy_combine(hist_df, gap_df, live_df)
+    t_legacy = time.perf_counter() - t0
+
+    store = TimeSeriesStore()
+    t0 = time.perf_counter()
+    store.merge("csv", hist_df)
+    store.merge("gap", gap_df)
+    store.merge("live", live_df)
+    t_store = time.perf_counter() - t0
+
+    actual = store.frame()
+    pd.testing.assert_frame_equal(actual, expected.rename_axis("timestamp"), check_freq=False)
+    print(f"✅ 合併結果與舊版一致 ({len(actual)} 筆)")
+    print(f"舊版 concat + duplicated + sort : {t_legacy * 1000:7.1f} ms")
+    print(f"TimeSeriesStore 線性合併        : {t_store * 1000:7.1f} ms")
+
+    # 即時資料每次只多幾筆：只合併插入點之後的部分
+    tick = synthetic_source("2026-01-02 00:15", "2026-01-02 01:00", "15min", 30.0, 3)
+    t0 = time.perf_counter()
+    legacy_combine(expected, tick.iloc[:0], tick)
+    t_legacy_tick = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    store.merge("live", tick)
+    t_store_tick = time.perf_counter() - t0
+    print(f"附加 {len(tick)} 筆即時資料：舊版 {t_legacy_tick * 1000:.2f} ms | store {t_store_tick * 1000:.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/bench_sync.py
+"""
+增量同步基準測試 (走頁面 / 排程實際使用的 StoreFeed.refresh)：
+1. 冷快取 vs 暖快取時，一次同步會發出多少請求、花多少時間，重啟後 store 內容相同，沒有新資料時版本不變；
+2. 封存季度第一次抓取失敗 (HTTP 500 或回應被截斷)、下一次成功時，該季度仍會併入 store；
+3. 季度封存後，tail 中被涵蓋的即時資料會被移除，不會無限成長；
+4. 多電表 (multi_meter) 同時同步的耗時，以及 TTL 內再次呼叫不發出任何請求。
+
+執行方式：python benchmarks/bench_sync.py
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from bench_fetch import StandInPantry
+import data_sync
+import multi_meter
+from data_sync import QuarterSync, quarter_baskets, quarter_bounds, QUARTER_CLOSE_GRACE
+from timeseries_store import TimeSeriesStore, StoreFeed, HISTORY_YEARS
+
+TARGET_YEARS = [2023, 2024, 2025, 2026]
+PANTRY_ID = "bench"
+
+def quarter_payload(basket_name, until):
+    start, end = quarter_bounds(basket_name)
+    idx = pd.date_range(start, min(end, until), freq="15min", inclusive="left")
+    records = [{"date": ts.strftime("%Y-%m-%d"), "time": ts.strftime("%H:%M"), "power": 0.1 + (i % 11) * 0.01}
+               for i, ts in enumerate(idx)]
+    return json.dumps({"data": records}).encode()
+
+def live_payload(start, periods):
+    idx = pd.date_range(start, periods=periods, freq="15min")
+    records = [{"date": ts.strftime("%Y-%m-%d"), "time": ts.strftime("%H:%M"), "power": 0.5} for ts in idx]
+    return json.dumps({"status": 1, "data": records}).encode()
+
+def main():
+    now = pd.Timestamp.now().floor("15min")
+    basket_names = quarter_baskets(TARGET_YEARS)
+    StandInPantry.payloads = {name: quarter_payload(name, now - pd.Timedelta(hours=2))
+                              for name in basket_names if quarter_bounds(name)[0] <= now}
+    StandInPantry.payloads["new"] = live_payload(now - pd.Timedelta(hours=3), 12)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInPantry)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    live_url = f"{base_url}/live/basket/new"
+    sync_dirs = []
+
+    def new_feed(sync_dir=None):
+        if sync_dir is None:
+            sync_dir = tempfile.mkdtemp(prefix="sync_")
+            sync_dirs.append(sync_dir)
+        sync = QuarterSync(PANTRY_ID, sync_dir=sync_dir, base_url=base_url)
+        return StoreFeed(TimeSeriesStore(), PANTRY_ID, live_url=live_url, years=TARGET_YEARS, sync=sync,
+                         label="Bench"), sync_dir
+
+    def run(label, feed):
+        StandInPantry.hits.clear()
+        t0 = time.perf_counter()
+        store = feed.refresh(max_age=0)
+        elapsed = time.perf_counter() - t0
+        print(f"[{label}] {len(StandInPantry.hits):2d} 個請求 | {elapsed:.2f}s | {len(store)} 筆 | "
+              f"watermark {feed.sync.watermark}")
+        return store.frame()
+
+    try:
+        # 1. 冷快取 / 重啟後暖快取 / 同一行程的暖快取
+        feed, sync_dir = new_feed()
+        cold = run("冷快取", feed)
+        # 新的 QuarterSync + store 模擬重新啟動的行程：封存季度與 tail 直接從磁碟讀取
+        warm = run("暖快取 (重啟後)", new_feed(sync_dir)[0])
+        pd.testing.assert_frame_equal(cold, warm)
+        version = feed.store.version
+        run("暖快取", feed)
+        assert feed.store.version == version # 沒有新資料：重新抓取的開放季度內容相同，不產生新版本
+        StandInPantry.payloads["new"] = live_payload(now - pd.Timedelta(hours=3), 16) # 即時資料前進 1 小時
+        refreshed = run("暖快取 + 新即時資料", feed)
+        assert refreshed.index.max() == now + pd.Timedelta(minutes=45) and refreshed.index.is_unique
+        print("✅ 暖快取只請求開放季度與即時資料，沒有新資料時版本不變，新資料以附加方式併入")
+
+        # 2. 封存季度第一次抓取失敗 (HTTP 500 / 回應被截斷)，下一次成功
+        failed = "2024-q2"
+        full_payload = StandInPantry.payloads[failed]
+        start, end = quarter_bounds(failed)
+        for mode in ("HTTP 500", "回應被截斷"):
+            if mode == "HTTP 500":
+                StandInPantry.failing = {failed}
+            else:
+                StandInPantry.payloads[failed] = full_payload[:len(full_payload) // 2]
+            feed, _ = new_feed()
+            partial = run(f"{failed} 抓取失敗 ({mode})", feed)
+            assert not feed.sync.is_archived(failed) and partial.loc[start:end - pd.Timedelta(minutes=15)].empty
+            StandInPantry.failing = set()
+            StandInPantry.payloads[failed] = full_payload
+            recovered = run(f"{failed} 重試成功", feed)
+            pd.testing.assert_frame_equal(recovered, refreshed)
+        print("✅ 抓取失敗或內容無法解析的封存季度不會封存為空，下一次同步時補進 store")
+
+        # 3. 開放季度過了寬限期而封存後，tail 只保留尚未封存的部分
+        open_quarter = next(n for n in basket_names if quarter_bounds(n)[0] <= now < quarter_bounds(n)[1])
+        later = quarter_bounds(open_quarter)[1] + QUARTER_CLOSE_GRACE + pd.Timedelta(days=1)
+        sync = feed.sync
+        rows_before = len(sync.tail)
+        sync.load_baskets(basket_names, now=later)
+        assert sync.is_archived(open_quarter) and sync.tail.empty
+        assert QuarterSync(PANTRY_ID, sync_dir=sync.sync_dir, base_url=base_url).tail.empty
+        print(f"✅ {open_quarter} 封存後 tail 由 {rows_before} 筆縮減為 {len(sync.tail)} 筆 (磁碟上同步更新)")
+
+        # 4. 多電表：各電表的 QuarterSync 指向本機的模擬 Pantry
+        meters = [multi_meter.Meter(f"bench_{i}", f"bench_meter_{i}", live_url) for i in range(4)]
+        for meter in meters:
+            sync_dirs.append(tempfile.mkdtemp(prefix="sync_"))
+            data_sync._syncs[meter.pantry_id] = QuarterSync(meter.pantry_id, sync_dir=sync_dirs[-1],
+                                                            base_url=base_url)
+        for label, max_age in (("冷快取", 0), ("TTL 內", 300)):
+            StandInPantry.hits.clear()
+            t0 = time.perf_counter()
+            stores = multi_meter.refresh_meter_stores(meters, max_age=max_age)
+            elapsed = time.perf_counter() - t0
+            print(f"[{len(meters)} 個電表 {label}] {len(StandInPantry.hits):2d} 個請求 | {elapsed:.2f}s")
+        assert not StandInPantry.hits and len(stores) == len(meters)
+        expected = refreshed[refreshed.index >= pd.Timestamp(year=min(HISTORY_YEARS), month=1, day=1)]
+        for store in stores.values():
+            pd.testing.assert_frame_equal(store.frame(), expected)
+        print("✅ 多電表同時同步，TTL 內不重複請求")
+    finally:
+        server.shutdown()
+        for sync_dir in sync_dirs:
+            shutil.rmtree(sync_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/bench_tariff.py
+"""
+多方案電價模擬：
+1. 預設的累進 / 二段式方案與原本的 analyze_pricing_period (逐月 calculate_progressive_cost) 結果一致；
+2. 三段式等含假日 / 週六時段的方案，與「逐小時以 pandas 屬性判斷時段再加總」的直接計算一致；
+3. 四年資料 x 數十個方案：逐方案逐月 Python 迴圈 vs tariff_engine 一次計價的耗時。
+
+執行方式：python benchmarks/bench_tariff.py [方案數]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+import pandas as pd
+from history_cache import load_history_csv
+from timeseries_store import get_store, HISTORY_CSV
+from app_utils import analyze_pricing_period, compare_plans, rollups_for
+from calendar_features import get_calendar
+from tariff_engine import DEFAULT_PLANS, EXAMPLE_THREE_STAGE_PLAN, compile_plans, usage_profile, price_plans
+
+def synthetic_source(start, end, freq, seed):
+    idx = pd.date_range(start, end, freq=freq, name="timestamp")
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"power_kW": 0.2 + rng.random(len(idx)), "temperature": 25.0, "humidity": 70.0}, index=idx)
+
+def plan_variants(n, seed=0):
+    """以預設方案為底，隨機調整費率 / 時段 / 基本費，產生 n 個方案"""
+    rng = np.random.default_rng(seed)
+    bases = DEFAULT_PLANS + [EXAMPLE_THREE_STAGE_PLAN]
+    plans = list(bases)
+    while len(plans) < n:
+        base = bases[len(plans) % len(bases)]
+        scale = rng.uniform(0.8, 1.2)
+        plan = dict(base, name=f"{base['name']} #{len(plans)}",
+                    basic_fee_monthly=float(rng.choice([0.0, 75.0, 105.0])))
+        if 'tiers' in base:
+            plan['tiers'] = [(w, a * scale, b * scale) for w, a, b in base['tiers']]
+        if 'rates' in base:
+            plan['rates'] = {s: {p: r * scale for p, r in v.items()} for s, v in base['rates'].items()}
+            shift = int(rng.integers(-2, 3))
+            plan['schedule'] = {s: {d: {p: [(min(24, max(0, a + shift)), min(24, max(0, b + shift))) for a, b in spans]
+                                        for p, spans in periods.items()} for d, periods in days.items()}
+                                for s, days in base['schedule'].items()}
+            if rng.random() < 0.5:
+                plan['schedule'] = {s: dict(days, saturday={'half_peak': [(9, 24)]}) if 'half_peak' in plan['rates'][s]
+                                    else days for s, days in plan['schedule'].items()}
+        plans.append(plan)
+    return plans
+
+def direct_pricing(detail, plans):
+    """直接計算：逐小時以 pandas 的 month / dayofweek / hour 屬性查時段費率，再逐方案逐月加總"""
+    index = detail.index
+    is_summer = ((index.month >= 6) & (index.month <= 9)).astype(int)
+    holiday = get_calendar().is_holiday(index)
+    dow = index.dayofweek
+    day_type = np.where(dow == 5, 1, np.where(dow == 6, 2, np.where(holiday, 3, 0)))
+    table = compile_plans(plans)
+    months = detail["kwh"].resample("MS").sum()
+    totals = {}
+    for p, plan in enumerate(plans):
+        rate = table.slot_rates[p, is_summer, day_type, index.hour]
+        flow = (detail["kwh"] * rate).resample("MS").sum()
+        cost = 0.0
+        for month, kwh in months.items():
+            summer = 6 <= month.month <= 9
+            tier = 0.0
+            remaining = kwh
+            for width, summer_rate, nonsummer_rate in plan.get('tiers', ()):
+                if remaining <= 0:
+                    break
+                tier += min(remaining, width) * (summer_rate if summer else nonsummer_rate)
+                remaining -= min(remaining, width)
+            surcharge = max(0, kwh - plan.get('surcharge_kwh_threshold', np.inf)) * plan.get('surcharge_rate_per_kwh', 0.0)
+            cost += flow[month] + tier + plan.get('basic_fee_monthly', 0.0) + surcharge
+        totals[plan['name']] = cost
+    return pd.Series(totals)
+
+def main():
+    n_plans = int(sys.argv[1]) if len(sys.argv) > 1 else 36
+    store = get_store()
+    store.merge("csv", load_history_csv(HISTORY_CSV))
+    store.merge("gap", synthetic_source("2025-11-01", "2025-12-31 23:45", "15min", 1))
+    df = store.grid().frame()
+    rollups = rollups_for(df)
+
+    # 1. 預設方案與原本的方案比較一致 (整段 + 幾個任意區間)
+    for start, end in ((None, None), ("2023-03-15", "2023-09-02"), ("2025-12-31", "2025-12-31")):
+        start = start or df.index[0].date()
+        end = end or df.index[-1].date()
+        results, _ = analyze_pricing_period(df, start, end)
+        summary, _ = compare_plans(df, start, end)
+        assert np.isclose(summary.loc["累進電價", "total_cost"], results["cost_progressive"], rtol=1e-12)
+        assert np.isclose(summary.loc["時間電價 (二段式)", "total_cost"], results["cost_tou"], rtol=1e-12)
+        assert np.isclose(summary["kwh"].iloc[0], results["total_kwh"], rtol=1e-12)
+    print("✅ 累進 / 二段式與 analyze_pricing_period 一致 (含任意日期區間)")
+
+    # 2. 所有方案 (含週六半尖峰、假日離峰) 與逐小時直接計算一致
+    plans = plan_variants(n_plans)
+    detail = df[["kwh"]].fillna(0.0)
+    t0 = time.perf_counter()
+    expected = direct_pricing(detail, plans)
+    t_direct = time.perf_counter() - t0
+    summary, monthly = price_plans(usage_profile(rollups), plans)
+    np.testing.assert_allclose(summary.loc[expected.index, "total_cost"], expected, rtol=1e-10)
+    np.testing.assert_allclose(monthly.sum().to_numpy(), summary["total_cost"].to_numpy(), rtol=1e-12)
+    print(f"✅ {len(plans)} 個方案與逐小時直接計算一致 ({len(monthly)} 個月)")
+
+    # 3. 耗時
+    table = compile_plans(plans)
+    runs = 20
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        profile = usage_profile(rollups)
+        price_plans(profile, table)
+    t_engine = (time.perf_counter() - t0) / runs
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        price_plans(profile, table)
+    t_price = (time.perf_counter() - t0) / runs
+    print(f"   {len(df)} 小時 x {len(plans)} 方案 | 直接計算 {t_direct * 1000:8.1f} ms | "
+          f"tariff_engine {t_engine * 1000:6.2f} ms (其中計價 {t_price * 1000:.2f} ms)")
+
+    cheapest = summary["total_cost"].idxmin()
+    print(f"   最省方案：{cheapest} (${summary.loc[cheapest, 'total_cost']:,.0f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/bench_tariff_sweep.py
+"""
+電價情境掃描：
+1. 網格中每個情境與「把該情境寫成一個方案，再用 tariff_engine.price_plans 計價」的結果一致；
+2. 一次向量化掃描 vs 逐情境編譯方案計價的耗時，以及超大網格的分批 / 多行程計算；
+3. 同一資料版本重複查詢直接回傳快取，資料更新後重新計算。
+
+執行方式：python benchmarks/bench_tariff_sweep.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+import pandas as pd
+from history_cache import load_history_csv
+from timeseries_store import get_store, HISTORY_CSV
+from tariff_engine import DEFAULT_PLANS, EXAMPLE_THREE_STAGE_PLAN, usage_profile, price_plans
+from tariff_sweep import run_sweep, sweep_tariffs, sweep_frame, SWEEP_WORKERS
+
+PEAK_SCALES = np.arange(0.7, 1.31, 0.05)
+OFF_PEAK_SCALES = np.arange(0.8, 1.21, 0.1)
+PEAK_SHIFTS = np.arange(-4, 5)
+BUDGETS = [800.0, 1500.0, 3000.0]
+
+def scenario_plan(base, peak_scale, off_peak_scale, shift):
+    """把一個情境寫成方案定義：費率乘上倍數、所有非離峰時段位移 shift 小時 (超出 0~24 的部分捨去)"""
+    scales = {'off_peak': off_peak_scale, 'half_peak': peak_scale, 'peak': peak_scale}
+    clip = lambda h: min(24, max(0, h + shift))
+    return dict(
+        base, name=f"{peak_scale:.2f}/{off_peak_scale:.2f}/{shift:+d}",
+        rates={s: {p: r * scales[p] for p, r in v.items()} for s, v in base['rates'].items()},
+        schedule={s: {d: {p: [(clip(a), clip(b)) for a, b in spans] for p, spans in periods.items()}
+                      for d, periods in days.items()} for s, days in base['schedule'].items()},
+    )
+
+def main():
+    store = get_store()
+    store.merge("csv", load_history_csv(HISTORY_CSV))
+    rollups = store.rollups()
+    profile = usage_profile(rollups)
+
+    # 1. 每個情境與直接計價一致 (二段式與三段式皆驗證)
+    for base in DEFAULT_PLANS[1:] + [EXAMPLE_THREE_STAGE_PLAN]:
+        result = run_sweep(profile, PEAK_SCALES, OFF_PEAK_SCALES, PEAK_SHIFTS, BUDGETS, base_plan=base)
+        plans = [scenario_plan(base, p, o, s) for p in PEAK_SCALES for o in OFF_PEAK_SCALES for s in PEAK_SHIFTS]
+        summary, monthly = price_plans(profile, plans)
+        np.testing.assert_allclose(result.total_cost.ravel(), summary["total_cost"].to_numpy(), rtol=1e-12)
+        np.testing.assert_allclose(result.max_monthly_cost.ravel(), monthly.max().to_numpy(), rtol=1e-12)
+        expected_over = np.stack([(monthly > b).sum().to_numpy() for b in BUDGETS], axis=1)
+        assert (result.months_over_budget.reshape(len(plans), -1) == expected_over).all()
+        reference = price_plans(profile, DEFAULT_PLANS[:1])[0]["total_cost"].iloc[0]
+        assert np.isclose(result.reference_cost, reference, rtol=1e-12)
+    print(f"✅ {len(plans)} 個情境 x 2 個基準方案與 price_plans 逐方案計價一致 ({len(profile.months)} 個月)")
+
+    # 2. 耗時
+    base = DEFAULT_PLANS[1]
+    t0 = time.perf_counter()
+    plans = [scenario_plan(base, p, o, s) for p in PEAK_SCALES for o in OFF_PEAK_SCALES for s in PEAK_SHIFTS]
+    price_plans(profile, plans)
+    t_plans = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    run_sweep(profile, PEAK_SCALES, OFF_PEAK_SCALES, PEAK_SHIFTS, BUDGETS)
+    t_sweep = time.perf_counter() - t0
+    print(f"   {len(plans)} 個情境 | 逐情境編譯方案 {t_plans * 1000:7.1f} ms | 向量化掃描 {t_sweep * 1000:6.2f} ms")
+
+    big = dict(peak_scales=np.linspace(0.5, 1.5, 101), off_peak_scales=np.linspace(0.5, 1.5, 101),
+               peak_shifts=np.arange(-12, 13), budgets=BUDGETS)
+    n = 101 * 101 * 25
+    pools = sorted({1, max(2, SWEEP_WORKERS)})
+    timings = {}
+    for workers in pools:
+        t0 = time.perf_counter()
+        results = run_sweep(profile, workers=workers, **big)
+        timings[workers] = time.perf_counter() - t0
+        if workers == 1:
+            single = results
+    np.testing.assert_allclose(results.total_cost, single.total_cost, rtol=1e-12)
+    print(f"   {n:,} 個情境 | " + " | ".join(f"{w} 個行程 {t:.2f}s" for w, t in timings.items())
+          + f" (本機 {os.cpu_count()} 核心)")
+
+    # 3. 依資料版本快取
+    args = dict(peak_scales=PEAK_SCALES, off_peak_scales=[1.0], peak_shifts=PEAK_SHIFTS, budgets=[1500.0])
+    t0 = time.perf_counter()
+    first = sweep_tariffs(store.rollups(), **args)
+    t_first = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    again = sweep_tariffs(store.rollups(), **args)
+    t_cached = time.perf_counter() - t0
+    assert again is first
+    idx = pd.date_range(store.watermark + pd.Timedelta(hours=1), periods=24, freq="h", name="timestamp")
+    store.merge("live", pd.DataFrame({"power_kW": 5.0, "temperature": 26.0, "humidity": 70.0}, index=idx))
+    updated = sweep_tariffs(store.rollups(), **args)
+    assert updated is not first and updated.version == store.version
+    assert (updated.total_cost > first.total_cost).all()
+    print(f"✅ 快取：首次 {t_first * 1000:.2f} ms，同版本再查 {t_cached * 1e6:.1f} µs；資料更新後重新計算")
+    print(sweep_frame(first).sort_values("total_cost").head(3).round(1).to_string())
+
+if __name__ == "__main__":
+    main()
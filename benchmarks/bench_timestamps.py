@@ -0,0 +1,136 @@
+# benchmarks/bench_timestamps.py
+"""
+process_raw_data_to_df 時間欄位解析微基準：逐列組字串 + 格式推斷 (舊版) vs 一次判斷格式 + 向量化轉換。
+每種資料格式 (full_timestamp / date+time / 外層日期 Key + time) 各測一次，並檢查結果一致。
+
+執行方式：python benchmarks/bench_timestamps.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from pantry_parser import process_raw_data_to_df, detect_timestamp_layout, build_timestamps
+
+# --- 舊版實作 (保留作為比對基準) ---
+def legacy_process_raw_data_to_df(target_list, date_context):
+    """
+    【核心修正】增強時間解析能力，防止散裝資料被誤判為今天
+    """
+    if not target_list:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(target_list)
+    
+    # 欄位重新命名
+    if 'power' in df.columns:
+        df = df.rename(columns={'power': 'power_kW'})
+    
+    # --- 時間組合邏輯 (修正重點) ---
+    try:
+        if 'full_timestamp' in df.columns:
+            # 優先使用完整的 timestamp 欄位
+            df['timestamp'] = pd.to_datetime(df['full_timestamp'], errors='coerce')
+            
+        elif 'date' in df.columns and 'time' in df.columns:
+            # 如果資料裡自帶 date 欄位，就用它
+            df['timestamp'] = pd.to_datetime(df['date'].astype(str) + " " + df['time'].astype(str), errors='coerce')
+            
+        elif 'time' in df.columns:
+            if date_context:
+                # 如果有外層包裹的日期 Key，就用它
+                df['timestamp'] = pd.to_datetime(f"{date_context} " + df['time'], errors='coerce')
+            else:
+                # ⚠️ 危險區：沒有日期 Key，也沒有 date 欄位
+                # 嘗試看看有沒有隱藏的日期資訊，若無，這裡確實會變成今天
+                # 但大多數歷史資料應該都會有 date 欄位
+                df['timestamp'] = pd.to_datetime(df['time'], errors='coerce')
+                
+        else:
+            return pd.DataFrame() # 沒時間資訊，無法處理
+            
+    except Exception as e:
+        print(f"⚠️ 時間解析失敗: {e}")
+        return pd.DataFrame()
+
+    if 'timestamp' not in df.columns or 'power_kW' not in df.columns:
+        return pd.DataFrame()
+
+    df = df.dropna(subset=['timestamp'])
+    df = df.set_index('timestamp').sort_index(kind='stable')
+    df['power_kW'] = pd.to_numeric(df['power_kW'], errors='coerce')
+    
+    # --- 資料清洗 ---
+    if 'isMissingData' in df.columns:
+        df.loc[df['isMissingData'] == 1, 'power_kW'] = np.nan
+        df.loc[df['isMissingData'] == '1', 'power_kW'] = np.nan
+    
+    df['power_kW'] = df['power_kW'].replace(0, np.nan)
+    df['power_kW'] = df['power_kW'].replace(0.0, np.nan)
+    df['power_kW'] = df['power_kW'].ffill().bfill()
+    
+    if 'temperature' not in df.columns:
+        df['temperature'] = 25.0
+        df['humidity'] = 70.0
+        
+    return df[['power_kW', 'temperature', 'humidity']]
+
+def legacy_timestamp_column(df, date_context):
+    """舊版只有時間欄位那一步 (與上面 legacy_process_raw_data_to_df 的分支相同)"""
+    if 'full_timestamp' in df.columns:
+        return pd.to_datetime(df['full_timestamp'], errors='coerce')
+    if 'date' in df.columns and 'time' in df.columns:
+        return pd.to_datetime(df['date'].astype(str) + " " + df['time'].astype(str), errors='coerce')
+    return pd.to_datetime(f"{date_context} " + df['time'], errors='coerce')
+
+def make_records(layout, periods):
+    idx = pd.date_range("2025-10-01", periods=periods, freq="15min")
+    rng = np.random.default_rng(0)
+    power = np.round(rng.gamma(2.0, 0.2, periods), 4)
+    power[rng.random(periods) < 0.02] = 0.0
+    dates, times = idx.strftime("%Y-%m-%d"), idx.strftime("%H:%M")
+    records = []
+    for i in range(periods):
+        rec = {"power": float(power[i]), "isMissingData": int(rng.random() < 0.01),
+               "temperature": 25.0, "humidity": 70.0}
+        if layout == "full_timestamp":
+            rec["full_timestamp"] = f"{dates[i]} {times[i]}:00"
+        elif layout == "date_time":
+            rec["date"], rec["time"] = dates[i], times[i]
+        else:
+            rec["time"] = times[i % 96]
+        records.append(rec)
+    return records
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main():
+    periods = 92 * 96 # 一季的 15 分鐘資料
+    for layout, context in [("full_timestamp", None), ("date_time", None), ("context_time", "2025-10-01")]:
+        records = make_records(layout, periods if context is None else 96)
+        expected = legacy_process_raw_data_to_df(records, context)
+        actual = process_raw_data_to_df(records, context)
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+        t_old = best_of(lambda: legacy_process_raw_data_to_df(records, context))
+        t_new = best_of(lambda: process_raw_data_to_df(records, context))
+        # 只看時間欄位那一步 (整體耗時大半是 DataFrame(list of dicts) 本身，兩版相同)
+        df = pd.DataFrame(records)
+        layout_found = detect_timestamp_layout(df.columns, context)
+        ts_old = best_of(lambda: legacy_timestamp_column(df, context))
+        ts_new = best_of(lambda: build_timestamps(layout_found, full_timestamp=df.get('full_timestamp'),
+                                                  date=df.get('date'), time=df.get('time'), date_context=context))
+        print(f"{layout:15s} ({len(records):5d} 筆): 舊版 {t_old * 1000:7.2f} ms | 向量化 {t_new * 1000:7.2f} ms "
+              f"(加速 {t_old / t_new:.1f}x) | 時間欄位 {ts_old * 1000:6.2f} -> {ts_new * 1000:5.2f} ms "
+              f"({ts_old / ts_new:.1f}x) ✅ 結果一致")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# benchmarks/bench_tou.py
+"""
+向量化時間電價：一整年的 15 分鐘時間點，比較 tou_engine.tou_details 與逐筆 get_tou_details 的耗時。
+(兩者結果一致由 tests/test_tou_engine.py 檢查)
+
+執行方式：python benchmarks/bench_tou.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+import pandas as pd
+from app_utils import get_tou_details
+from tou_engine import tou_details
+
+def reference(index):
+    """舊作法：index.map(get_tou_details) 再用 list comprehension 拆開 tuple"""
+    tou = index.map(get_tou_details)
+    return ([cat for cat, rate, season in tou], np.array([rate for cat, rate, season in tou]),
+            np.array([season for cat, rate, season in tou]))
+
+def main():
+    year = pd.date_range("2023-12-31 22:00", "2024-12-31 23:45", freq="15min", name="timestamp")
+    print(f"{len(year)} 個 15 分鐘時間點：")
+    for label, fn in (("index.map(get_tou_details)", reference), ("tou_details (NumPy)", tou_details)):
+        t0 = time.perf_counter()
+        for _ in range(3):
+            fn(year)
+        print(f"   {label:<28} {(time.perf_counter() - t0) / 3 * 1000:9.2f} ms")
+
+if __name__ == "__main__":
+    main()
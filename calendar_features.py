@@ -0,0 +1,132 @@
+# calendar_features.py
+import threading
+import numpy as np
+import pandas as pd
+
+from energy_grid import HOUR_NS, DAY_NS
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+CALENDAR_START = pd.Timestamp("2022-01-01")
+CALENDAR_END = pd.Timestamp("2028-01-01") # 不含
+
+# 台灣國定假日與補假 (只需列出落在平日的放假日；週末本來就算休息日)。
+# 依人事行政總處公告的行事曆；2027 年尚未公告，先依紀念日及節日實施條例的補假規則推算。
+# 與原本的做法相同，不處理補行上班的週六。
+TW_HOLIDAYS = {
+    2022: ["01-31", "02-01", "02-02", "02-03", "02-04", "02-28", "04-04", "04-05", "05-02",
+           "06-03", "09-09", "10-10"],
+    2023: ["01-02", "01-20", "01-23", "01-24", "01-25", "01-26", "01-27", "02-27", "02-28",
+           "04-03", "04-04", "04-05", "05-01", "06-22", "06-23", "09-29", "10-09", "10-10"],
+    2024: ["01-01", "02-08", "02-09", "02-10", "02-11", "02-12", "02-13", "02-14", "02-28",
+           "04-04", "04-05", "05-01", "06-10", "09-17", "10-10"],
+    2025: ["01-01", "01-27", "01-28", "01-29", "01-30", "01-31", "02-28", "04-03", "04-04",
+           "05-01", "05-30", "09-29", "10-06", "10-10", "10-24", "12-25"],
+    2026: ["01-01", "02-16", "02-17", "02-18", "02-19", "02-20", "02-27", "04-03", "04-06",
+           "05-01", "06-19", "09-25", "09-28", "10-09", "10-26", "12-25"],
+    2027: ["01-01", "02-04", "02-05", "02-08", "02-09", "02-10", "03-01", "04-05", "04-06",
+           "06-09", "09-15", "09-28", "10-11", "10-25", "12-24"],
+}
+
+def get_taiwan_holidays():
+    """所有年份的假日字串 (YYYY-MM-DD)"""
+    return [f"{year}-{day}" for year, days in TW_HOLIDAYS.items() for day in days]
+
+def _calendar_columns(index, holiday):
+    hour = index.hour.to_numpy()
+    day_of_week = index.dayofweek.to_numpy()
+    month = index.month.to_numpy()
+    return {
+        "hour": hour,
+        "day_of_week": day_of_week,
+        "month": month,
+        "off_day": ((day_of_week >= 5) | holiday).astype(int),
+        "hour_sin": np.sin(2 * np.pi * hour / 24.0),
+        "hour_cos": np.cos(2 * np.pi * hour / 24.0),
+        "week_sin": np.sin(2 * np.pi * day_of_week / 7.0),
+        "week_cos": np.cos(2 * np.pi * day_of_week / 7.0),
+        "month_sin": np.sin(2 * np.pi * month / 12.0),
+        "month_cos": np.cos(2 * np.pi * month / 12.0),
+    }
+
+# ==========================================
+# 📅 預先算好的每小時日曆特徵表
+# ==========================================
+class CalendarTable:
+    """
+    CALENDAR_START ~ CALENDAR_END 每小時一列的日曆特徵 (hour / day_of_week / month / 休息日 / sin / cos)，
+    只在第一次使用時建一次。查詢時把時間換成「距起點的小時數」直接以整數位置取值，不做任何字串格式化。
+    假日以「距起點的天數」為索引的 bitmap 表示，所有年份都涵蓋。
+    sin / cos 的公式與原本 add_lgbm_features / add_lstm_features 相同，取出的數值完全一致。
+    """
+    def __init__(self, start=CALENDAR_START, end=CALENDAR_END, holidays=None):
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end)
+        self.start_ns = self.start.value
+        index = pd.date_range(start, end, freq="h", inclusive="left")
+        n_days = len(index) // 24
+        self.holiday_bitmap = np.zeros(n_days, dtype=bool)
+        for day in pd.to_datetime(get_taiwan_holidays() if holidays is None else holidays):
+            offset = (day.value - self.start_ns) // DAY_NS
+            if 0 <= offset < n_days:
+                self.holiday_bitmap[offset] = True
+        self.columns = _calendar_columns(index, np.repeat(self.holiday_bitmap, 24))
+        for values in self.columns.values():
+            values.flags.writeable = False
+        self.hours = len(index)
+
+    def offsets(self, index):
+        """時間 -> 表中的整數位置 (向下取整到小時；時區資訊以當地時間看待)"""
+        index = pd.DatetimeIndex(index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return (index.asi8 - self.start_ns) // HOUR_NS
+
+    def covers(self, index):
+        pos = self.offsets(index)
+        return len(pos) == 0 or (pos.min() >= 0 and pos.max() < self.hours)
+
+    def gather(self, index, names=None):
+        """
+        回傳 {欄位: 陣列}；所有時間都必須落在表的範圍內 (先以 get_calendar(index) 延伸共用的日曆表)。
+        """
+        names = list(self.columns) if names is None else names
+        if not self.covers(index):
+            raise ValueError(f"時間超出日曆表範圍 ({self.start.date()} ~ {self.end.date()})，請先以 get_calendar(index) 延伸")
+        pos = self.offsets(index)
+        return {name: self.columns[name][pos] for name in names}
+
+    def is_holiday(self, index):
+        """國定假日 (不含一般週末) 的布林陣列"""
+        days = (self.offsets(index) * HOUR_NS) // DAY_NS
+        inside = (days >= 0) & (days < len(self.holiday_bitmap))
+        result = np.zeros(len(days), dtype=bool)
+        result[inside] = self.holiday_bitmap[days[inside]]
+        return result
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+def get_calendar(index=None):
+    """
+    共用的日曆表；給定 index 時確保表涵蓋這些時間：超出範圍就以整年為單位延伸 (多留一年) 後重建一次，
+    之後同一範圍內的查詢都直接取值。TW_HOLIDAYS 尚未列入的年份只有週末算休息日。
+    """
+    global _calendar
+    with _calendar_lock:
+        if _calendar is None:
+            _calendar = CalendarTable()
+        if index is not None and not _calendar.covers(index):
+            index = pd.DatetimeIndex(index)
+            start = min(_calendar.start, pd.Timestamp(year=index.min().year, month=1, day=1))
+            end = max(_calendar.end, pd.Timestamp(year=index.max().year + 2, month=1, day=1))
+            _calendar = CalendarTable(start, end)
+            last_listed = max(TW_HOLIDAYS)
+            note = f" ({last_listed} 年之後的國定假日尚未列入)" if end.year - 1 > last_listed else ""
+            print(f"📅 [Calendar] 日曆表延伸為 {start.date()} ~ {end.date()}{note}")
+        return _calendar
+
+def calendar_features(index, names=None):
+    """共用日曆表的查詢入口 (超出範圍時自動延伸)"""
+    return get_calendar(index).gather(index, names)
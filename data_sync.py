@@ -0,0 +1,217 @@
+# data_sync.py
+import os
+import json
+import threading
+import functools
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+
+from history_cache import CACHE_DIR, save_columnar, load_columnar, atomic_save_json
+from pantry_client import PANTRY_BASE_URL, LIVE_DATA_URL, fetch_baskets, fetch_basket_result, fetch_json
+from pantry_parser import BasketParseError, parse_basket_bytes, parse_live_payload
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+SYNC_DIR = os.path.join(CACHE_DIR, "sync")
+STATE_FILE = "state.json"
+QUARTER_CLOSE_GRACE = timedelta(days=7) # 季度結束後仍可能補傳資料的寬限期，過了才封存
+
+# ==========================================
+# 🗓️ 季度工具
+# ==========================================
+def quarter_bounds(basket_name):
+    """'2024-q3' -> (2024-07-01, 2024-10-01)"""
+    year, q = basket_name.lower().split("-q")
+    start = pd.Timestamp(year=int(year), month=3 * (int(q) - 1) + 1, day=1)
+    return start, start + pd.DateOffset(months=3)
+
+def quarter_baskets(years):
+    return [f"{year}-q{q}" for year in years for q in range(1, 5)]
+
+# ==========================================
+# 🔄 增量同步層
+# ==========================================
+class QuarterSync:
+    """
+    一個 Pantry ID 的本地同步狀態：
+    - 已結束的季度 (closed) 下載一次後永久存成欄式快取，之後不再請求。
+    - 尚未結束的季度 (open) 每次同步都重新抓取 (通常只有一個)。
+    - LIVE_DATA_URL 中尚未被封存季度涵蓋的列與 tail 比對，只把新增或數值有更正的列寫入 tail，並持久化
+      (開放季度中比 watermark 舊的更正也會保留)；已被封存季度涵蓋的列在下一次 load_baskets 時從 tail 移除，
+      tail 只保留尚未封存的部分。
+    """
+    def __init__(self, pantry_id, sync_dir=None, base_url=PANTRY_BASE_URL):
+        self.pantry_id = pantry_id
+        self.base_url = base_url
+        self.sync_dir = sync_dir or os.path.join(SYNC_DIR, pantry_id)
+        self._lock = threading.RLock()
+        self._closed_frames = {} # 行程內快取：已封存季度只解析/讀取一次
+        self._state = self._load_state()
+        self._tail = load_columnar(self._path("tail"), mmap=False)
+        if self._tail is None:
+            self._tail = pd.DataFrame()
+
+    # --- 狀態持久化 ---
+    def _path(self, *parts):
+        return os.path.join(self.sync_dir, *parts)
+
+    def _load_state(self):
+        try:
+            with open(self._path(STATE_FILE), "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault("watermark", None) # 已見過的最新時間 (epoch ns)
+        state.setdefault("closed", {}) # 封存季度 -> 筆數 (0 代表該季度不存在)
+        return state
+
+    def _save_state(self):
+        os.makedirs(self.sync_dir, exist_ok=True)
+        atomic_save_json(self._path(STATE_FILE), self._state)
+
+    @property
+    def watermark(self):
+        wm = self._state["watermark"]
+        return pd.Timestamp(wm) if wm is not None else None
+
+    @property
+    def tail(self):
+        """即時資料中尚未被季度 basket 涵蓋的部分"""
+        return self._tail
+
+    def _advance_watermark(self, df):
+        if df is None or df.empty:
+            return
+        latest = df.index.max().value
+        if self._state["watermark"] is None or latest > self._state["watermark"]:
+            self._state["watermark"] = int(latest)
+
+    # --- 季度 ---
+    def is_closed(self, basket_name, now=None):
+        now = now or pd.Timestamp.now()
+        return quarter_bounds(basket_name)[1] + QUARTER_CLOSE_GRACE <= now
+
+    def is_archived(self, basket_name):
+        """季度是否已封存在本地 (確定拿到資料或確定不存在)；抓取失敗的季度不算，下次同步會再試"""
+        return basket_name in self._state["closed"]
+
+    def _load_closed(self, basket_name):
+        if basket_name not in self._closed_frames:
+            df = None
+            if self._state["closed"].get(basket_name):
+                df = load_columnar(self._path("quarters", basket_name))
+            self._closed_frames[basket_name] = df if df is not None else pd.DataFrame()
+        return self._closed_frames[basket_name]
+
+    def load_baskets(self, basket_names, now=None, on_progress=None):
+        """
+        取得多個季度的 DataFrame (dict，順序同 basket_names)。
+        已封存的季度直接讀本地快取；其餘才上網抓取，未來的季度直接略過。
+        """
+        now = now or pd.Timestamp.now()
+        with self._lock:
+            to_fetch = []
+            for name in basket_names:
+                if quarter_bounds(name)[0] > now:
+                    continue # 未來季度：必定 404，不浪費請求
+                if self.is_closed(name, now) and name in self._state["closed"]:
+                    continue
+                to_fetch.append(name)
+
+            # 以原始 bytes 下載，交給串流解析，避免建立整棵 JSON 物件樹
+            fetched = fetch_baskets(self.pantry_id, to_fetch, on_done=on_progress, base_url=self.base_url,
+                                   fetcher=functools.partial(fetch_basket_result, raw=True))
+
+            frames = {}
+            for name in basket_names:
+                if name in fetched:
+                    status, df = fetched[name].status, pd.DataFrame()
+                    if status == "ok":
+                        try:
+                            df = parse_basket_bytes(fetched[name].data)
+                        except BasketParseError as e:
+                            status = "error" # 被截斷或不是 JSON 的回應：與網路錯誤相同，下次再試
+                            print(f"⚠️ [Sync] {name} 內容無法解析，下次同步再試: {e}")
+                    # 只有「確定拿到」(成功解析) 或「確定不存在」(404) 的封存季度才寫入快取，其餘下次再試
+                    if self.is_closed(name, now) and status in ("ok", "missing"):
+                        if not df.empty:
+                            save_columnar(self._path("quarters", name), df)
+                        self._state["closed"][name] = len(df)
+                        self._closed_frames[name] = df
+                    frames[name] = df
+                elif name in self._state["closed"]:
+                    frames[name] = self._load_closed(name)
+                else:
+                    frames[name] = pd.DataFrame()
+                self._advance_watermark(frames[name])
+
+            self._save_state()
+            self._prune_tail()
+            return frames
+
+    def _archived_mask(self, index):
+        """index 中落在已封存季度 (有資料) 內的位置"""
+        ts = index.asi8
+        covered = np.zeros(len(ts), dtype=bool)
+        for name, rows in self._state["closed"].items():
+            if rows:
+                start, end = quarter_bounds(name)
+                covered |= (ts >= start.value) & (ts < end.value)
+        return covered
+
+    def _prune_tail(self):
+        """tail 中已被封存季度 (有資料) 涵蓋的列不再需要保留，避免 tail 與每次輪詢的寫檔無限成長"""
+        if self._tail.empty:
+            return
+        covered = self._archived_mask(self._tail.index)
+        if covered.any():
+            self._tail = self._tail[~covered]
+            save_columnar(self._path("tail"), self._tail)
+
+    # --- 即時資料 ---
+    def sync_live(self, live_url=LIVE_DATA_URL):
+        """
+        抓取即時資料，回傳新增或數值有更正的列 (已寫入 tail)。
+        開放季度內比 watermark 舊的更正 (例如補傳的時段) 也會回傳，由 store 以即時資料的優先權覆蓋；
+        落在已封存季度的列不再變動，略過並記錄筆數。
+        """
+        live_df = parse_live_payload(fetch_json(live_url))
+        if live_df is None or live_df.empty:
+            return pd.DataFrame()
+        with self._lock:
+            archived = self._archived_mask(live_df.index)
+            if archived.any():
+                print(f"⚠️ [Sync] 即時資料有 {int(archived.sum())} 筆落在已封存季度，略過")
+                live_df = live_df[~archived]
+            if self._tail.empty:
+                delta = live_df
+            else:
+                known = self._tail.reindex(index=live_df.index, columns=live_df.columns)
+                same = ((known == live_df) | (known.isna() & live_df.isna())).all(axis=1)
+                delta = live_df[~same.to_numpy()]
+            if not delta.empty:
+                wm = self._state["watermark"]
+                late = 0 if wm is None else int((delta.index.asi8 <= wm).sum())
+                if late:
+                    print(f"📝 [Sync] 即時資料更正 {late} 筆 watermark 之前的時段")
+                kept = self._tail[~self._tail.index.isin(delta.index)] if not self._tail.empty else self._tail
+                tail = pd.concat([kept, delta]) if not kept.empty else delta
+                if not tail.index.is_monotonic_increasing:
+                    tail = tail.sort_index(kind="stable")
+                self._tail = tail
+                save_columnar(self._path("tail"), self._tail)
+                self._advance_watermark(delta)
+                self._save_state()
+            return delta
+
+_syncs = {}
+_syncs_lock = threading.Lock()
+
+def get_quarter_sync(pantry_id):
+    """每個 Pantry ID 在整個行程中共用一個 QuarterSync"""
+    with _syncs_lock:
+        if pantry_id not in _syncs:
+            _syncs[pantry_id] = QuarterSync(pantry_id)
+        return _syncs[pantry_id]
@@ -0,0 +1,210 @@
+# energy_grid.py
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+GRID_FREQ = "1h" # 標準網格：每小時一格 (與歷史 CSV、模型的 24 / 168 小時特徵一致)
+HOUR_NS = 3_600_000_000_000
+DAY_NS = 24 * HOUR_NS
+# 可辨識的原生資料間隔 (秒)；AMI 為 15 分鐘，歷史 CSV 為 1 小時
+NATIVE_INTERVALS = (900, 1800, 3600)
+DEFAULT_INTERVAL = {"csv": 3600, "gap": 900, "live": 900} # 資料太少無法推斷時使用
+SLOT_SECONDS = min(NATIVE_INTERVALS) # 多來源重疊時，以最細的原生間隔 (15 分鐘) 為單位決定採用哪個來源
+SLOT_NS = SLOT_SECONDS * 1_000_000_000
+
+# ==========================================
+# 🔍 原生間隔推斷
+# ==========================================
+def infer_interval(ts_ns, default=900):
+    """
+    以相鄰時間差的中位數推斷一批資料的原生間隔 (秒)，並對齊到 NATIVE_INTERVALS。
+    少於兩筆或差距不在合理範圍時回傳 default。
+    """
+    ts_ns = np.asarray(ts_ns, dtype=np.int64)
+    if len(ts_ns) < 2:
+        return default
+    diffs = np.diff(ts_ns)
+    diffs = diffs[diffs > 0]
+    if len(diffs) == 0:
+        return default
+    step = np.median(diffs) / 1e9
+    candidates = np.array(NATIVE_INTERVALS)
+    nearest = int(candidates[np.argmin(np.abs(candidates - step))])
+    return nearest if abs(nearest - step) <= nearest / 2 else default
+
+# ==========================================
+# ⚡ 每小時標準網格
+# ==========================================
+class HourlyGrid:
+    """
+    固定間距 (1 小時) 的用電網格，索引只存起點，第 i 格的時間為 start + i 小時。
+    - kwh：該小時內實際量測到的用電量 (功率 × 原生間隔，依來源各自積分)
+    - power_kW：該小時的平均功率 (kwh / 有資料的時數)
+    - coverage：該小時有資料的比例 (0 ~ 1)，0 代表整小時缺資料
+    下游可直接用固定步距切片 (例如最近 7 天 = 最後 168 格)，不需再以時間查找。
+    """
+    def __init__(self, start_ns, kwh, power_kW, temperature, humidity, coverage):
+        self.start_ns = int(start_ns)
+        self.kwh = kwh
+        self.power_kW = power_kW
+        self.temperature = temperature
+        self.humidity = humidity
+        self.coverage = coverage
+        self._frame = None
+
+    def __len__(self):
+        return len(self.kwh)
+
+    @classmethod
+    def from_frame(cls, df):
+        """由 frame() / to_hourly_grid() 產生的 DataFrame 還原 (不複製陣列)"""
+        if df is None or df.empty:
+            empty = np.empty(0)
+            return cls(0, empty, empty, empty, empty, empty)
+        return cls(df.index[0].value, df["kwh"].to_numpy(), df["power_kW"].to_numpy(),
+                   df["temperature"].to_numpy(), df["humidity"].to_numpy(), df["coverage"].to_numpy())
+
+    @property
+    def start(self):
+        return pd.Timestamp(self.start_ns)
+
+    @property
+    def end(self):
+        """最後一格的時間 (無資料時為 None)"""
+        return pd.Timestamp(self.start_ns + (len(self) - 1) * HOUR_NS) if len(self) else None
+
+    def slot(self, timestamp):
+        """時間 -> 格子位置 (向下取整到小時，可能超出範圍，由呼叫端自行截斷)"""
+        return int((pd.Timestamp(timestamp).value - self.start_ns) // HOUR_NS)
+
+    def index(self):
+        return pd.date_range(self.start, periods=len(self), freq=GRID_FREQ, name="timestamp")
+
+    def frame(self):
+        """以唯讀 DataFrame 回傳 (只組一次；要修改請先 .copy())"""
+        if self._frame is None:
+            columns = {
+                "power_kW": self.power_kW,
+                "kwh": self.kwh,
+                "temperature": self.temperature.astype(np.float64),
+                "humidity": self.humidity.astype(np.float64),
+                "coverage": self.coverage.astype(np.float64),
+            }
+            # 全行程共用同一份：陣列設為唯讀且不複製，任何原地修改都會直接報錯
+            for values in columns.values():
+                values.flags.writeable = False
+            self._frame = pd.DataFrame(columns, index=self.index(), copy=False)
+        return self._frame
+
+def _weighted_mean(bins, values, weights, n_bins):
+    ok = ~np.isnan(values)
+    total = np.bincount(bins[ok], weights=values[ok] * weights[ok], minlength=n_bins)
+    weight = np.bincount(bins[ok], weights=weights[ok], minlength=n_bins)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(weight > 0, total / weight, np.nan)
+
+def _resolve_slots(ts_ns, interval_s, priority, rows):
+    """
+    把 rows 這幾筆資料展開成各自涵蓋的 15 分鐘槽位，同一槽位有多個來源時只保留優先權最高者
+    (同優先權時保留較早的那筆)。回傳 (資料列索引, 槽位起點 ns)，每個槽位一筆。
+    """
+    width = np.maximum(interval_s[rows] // SLOT_SECONDS, 1).astype(np.int64)
+    expanded = np.repeat(rows, width)
+    offset = np.arange(len(expanded)) - np.repeat(np.cumsum(width) - width, width)
+    slot_ns = ts_ns[expanded] + offset * SLOT_NS
+    order = np.lexsort((-priority[expanded], slot_ns)) # 先依槽位，再依優先權 (高者在前)
+    expanded, slot_ns = expanded[order], slot_ns[order]
+    first = np.ones(len(slot_ns), dtype=bool)
+    first[1:] = slot_ns[1:] != slot_ns[:-1]
+    return expanded[first], slot_ns[first]
+
+def build_hourly_grid(ts_ns, power_kW, interval_s, temperature=None, humidity=None, priority=None):
+    """
+    把不同解析度的資料 (已排序的 int64 ns 時間) 積分到每小時標準網格。
+    每筆資料代表「從該時間起算、長度為 interval_s 的區間」，用電量 = 功率 × 間隔時數。
+    同一小時內若有多個來源 (priority 不同)，以 15 分鐘槽位為單位只採用優先權最高的來源：
+    整點的每小時資料與 15 分鐘資料不會重複計算，高優先權來源只涵蓋部分小時時，
+    其餘槽位仍由低優先權來源補上。
+    """
+    ts_ns = np.asarray(ts_ns, dtype=np.int64)
+    n = len(ts_ns)
+    if n == 0:
+        empty = np.empty(0)
+        return HourlyGrid(0, empty, empty, empty.astype(np.float32), empty.astype(np.float32),
+                          empty.astype(np.float32))
+
+    start_ns = ts_ns[0] - ts_ns[0] % HOUR_NS
+    bins = (ts_ns - start_ns) // HOUR_NS
+    n_bins = int(bins[-1]) + 1
+    interval_s = np.broadcast_to(np.asarray(interval_s, dtype=np.int64), (n,))
+    rows = np.arange(n)
+    hours = interval_s / 3600.0
+
+    if priority is not None:
+        priority = np.asarray(priority)
+        # bins 已排序：以 reduceat 找出混有多個來源的小時，只有這些小時需要逐槽位比較優先權
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(bins)) + 1])
+        counts = np.diff(np.append(starts, n))
+        mixed = np.repeat(np.maximum.reduceat(priority, starts) != np.minimum.reduceat(priority, starts), counts)
+        if mixed.any():
+            slot_rows, slot_ns = _resolve_slots(ts_ns, interval_s, priority, np.flatnonzero(mixed))
+            rows = np.concatenate([rows[~mixed], slot_rows])
+            bins = np.concatenate([bins[~mixed], (slot_ns - start_ns) // HOUR_NS])
+            hours = np.concatenate([hours[~mixed], np.full(len(slot_rows), SLOT_SECONDS / 3600.0)])
+    power = np.asarray(power_kW, dtype=np.float64)[rows]
+
+    measured = ~np.isnan(power)
+    kwh = np.bincount(bins[measured], weights=power[measured] * hours[measured], minlength=n_bins)
+    covered = np.bincount(bins[measured], weights=hours[measured], minlength=n_bins)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_power = np.where(covered > 0, kwh / covered, np.nan)
+
+    def weather(values):
+        if values is None:
+            return np.full(n_bins, np.nan, dtype=np.float32)
+        values = np.asarray(values, dtype=np.float64)[rows]
+        return _weighted_mean(bins, values, hours, n_bins).astype(np.float32)
+
+    return HourlyGrid(start_ns, kwh, mean_power, weather(temperature), weather(humidity),
+                      np.minimum(covered, 1.0).astype(np.float32))
+
+def splice_hourly_grid(head, tail):
+    """
+    以 tail 取代 head 從 tail.start 起的部分 (tail 必須從 head 範圍內或之後的整點開始)，
+    中間若有空缺的小時補上缺資料的格子。用於資料只在尾端變動時延伸既有網格，不必整段重建。
+    """
+    if len(head) == 0 or len(tail) == 0:
+        return tail if len(tail) else head
+    cut = (tail.start_ns - head.start_ns) // HOUR_NS
+    keep = min(cut, len(head))
+    gap = cut - keep
+
+    def join(a, b, fill):
+        return np.concatenate([a[:keep], np.full(gap, fill, dtype=a.dtype), b])
+
+    return HourlyGrid(head.start_ns, join(head.kwh, tail.kwh, 0.0), join(head.power_kW, tail.power_kW, np.nan),
+                      join(head.temperature, tail.temperature, np.nan), join(head.humidity, tail.humidity, np.nan),
+                      join(head.coverage, tail.coverage, 0.0))
+
+def to_hourly_grid(df, interval_s=None):
+    """
+    把任意 DataFrame (時間索引 + power_kW 欄位) 轉成每小時網格的 DataFrame。
+    已經是標準網格 (有 kwh 欄位且間距固定 1 小時) 時直接回傳原物件。
+    """
+    if df is None or df.empty:
+        return df
+    if "kwh" in df.columns and (len(df) < 2 or df.index.freq == GRID_FREQ or
+                                (np.diff(df.index.asi8) == HOUR_NS).all()):
+        return df
+    if "power" in df.columns and "power_kW" not in df.columns:
+        df = df.rename(columns={"power": "power_kW"})
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind="stable")
+    ts = df.index.asi8
+    if interval_s is None:
+        interval_s = infer_interval(ts)
+    return build_hourly_grid(ts, df["power_kW"].to_numpy(dtype=np.float64), interval_s,
+                             df["temperature"].to_numpy(dtype=np.float64) if "temperature" in df.columns else None,
+                             df["humidity"].to_numpy(dtype=np.float64) if "humidity" in df.columns else None).frame()
@@ -0,0 +1,319 @@
+# feature_engine.py
+import math
+import threading
+import numpy as np
+import pandas as pd
+
+from energy_grid import HOUR_NS
+from calendar_features import calendar_features
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+HORIZON_HOURS = 24
+LOOKBACK_HOURS = 168
+
+LGBM_LAGS = (24, 168, 720) # lag_{n}h = power.shift(n)
+TEMP_LAGS = (1, 2, 3) # temp_lag_{n} = temperature.shift(n)
+LGBM_WINDOWS = {7: 7 * 24, 14: 14 * 24, 30: 30 * 24} # ma_/std_{天}d = power.shift(1).rolling(小時)
+LSTM_SHIFT = 24
+LSTM_LAGS = (24, 168)
+LSTM_WINDOWS = { # power.shift(24).rolling(小時) -> (平均欄位, 標準差欄位)
+    24: ("rolling_mean_24h_safe", "rolling_std_24h_safe"),
+    168: ("rolling_mean_168h", "rolling_std_168h"),
+}
+PEAK_HOURS = (10, 11, 12, 13, 14, 15, 17, 18, 19, 20)
+
+# 只需保留最近 720 小時 (最長的 lag 與視窗)；多留 RESYNC_HOURS 的空間給新進的小時，
+# 滿了就從尾端重建一次累加器 (同時消除長時間加減累積的浮點誤差)
+TAIL_HOURS = max(max(LGBM_LAGS), max(LGBM_WINDOWS.values()), LSTM_SHIFT - 1 + max(LSTM_WINDOWS), LOOKBACK_HOURS)
+RESYNC_HOURS = 7 * 24
+
+# ==========================================
+# 📐 滑動視窗累加器
+# ==========================================
+class _RunningWindow:
+    """
+    固定長度的滑動視窗，以 Welford 遞推式累計非 NaN 的筆數、平均與離差平方和 (與 anomaly_detector 的
+    _WelfordWindow 相同)，加入 / 移出一筆都是 O(1)；變異數遠小於平均時也不會像「平方和 - 總和 x 平均」那樣失去精度。
+    結果與 pandas rolling(min_periods=1).mean() / .std() 在浮點誤差內相同 (不保證逐位元相同)：NaN 不計入；
+    視窗內的值全部相同時平均直接取該值、標準差為 0；只有一筆時標準差為 NaN。
+    """
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self, values=()):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.count = len(values)
+        self.mean = math.fsum(values) / self.count if self.count else 0.0
+        self.m2 = math.fsum((values - self.mean) ** 2) if self.count else 0.0 # 兩次掃描：起點就是精確值
+
+    def copy(self):
+        other = _RunningWindow.__new__(_RunningWindow)
+        other.count, other.mean, other.m2 = self.count, self.mean, self.m2
+        return other
+
+    def add(self, x):
+        if x == x:
+            self.count += 1
+            delta = x - self.mean
+            self.mean += delta / self.count
+            self.m2 += (self.count - 1) * delta * delta / self.count
+
+    def remove(self, x):
+        if x == x:
+            self.count -= 1
+            if self.count == 0:
+                self.mean, self.m2 = 0.0, 0.0
+                return
+            delta = x - self.mean
+            self.mean -= delta / self.count
+            self.m2 -= (self.count + 1) * delta * delta / self.count
+
+    def stats(self, run, run_value):
+        """run / run_value：視窗結尾連續相同 (非 NaN) 值的筆數與該值，用來判斷視窗內是否全部相同"""
+        n = self.count
+        if n == 0:
+            return np.nan, np.nan
+        if run >= n:
+            return run_value, (0.0 if n > 1 else np.nan)
+        if n == 1:
+            return self.mean, np.nan
+        var = self.m2 / (n - 1)
+        return self.mean, (math.sqrt(var) if var > 0 else 0.0)
+
+# ==========================================
+# ⚡ 增量特徵引擎
+# ==========================================
+class FeatureEngine:
+    """
+    取代對整段 full_context 呼叫 add_lgbm_features / add_lstm_features：
+    - update() 只處理比上次更新更新的小時：計算這些小時的日曆欄位，並以 O(1) 更新各滑動視窗的累加器。
+      已處理過的尾段若被更正 (與上次不同)，就從新的尾段重建 (最多 TAIL_HOURS 筆)。
+    - lgbm_features() / lstm_features() 只產生未來 horizon 個目標時間點的特徵，
+      數值與原本的函式在目標列上相同，耗時與 buffer 大小無關。
+    輸入的歷史須為時間遞增、已 ffill 的 power / temperature / humidity (與 model_service 的 df_ready 相同)。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._len = 0
+        self._capacity = TAIL_HOURS + RESYNC_HOURS
+        self.rebuilds = 0 # 重建次數 (觀察用)
+
+    # ---------- 歷史尾段 ----------
+    def _rebuild(self, ts, power, temperature, humidity, index):
+        n, cap = len(ts), self._capacity
+        self._ts = np.empty(cap, dtype=np.int64)
+        self._cols = {name: np.empty(cap, dtype=np.float64)
+                      for name in ("power", "temperature", "humidity", "hour_sin", "hour_cos", "is_weekend")}
+        self._run = np.zeros(cap, dtype=np.int64)
+        self._run_value = np.full(cap, np.nan)
+        self._len = 0
+        self._windows = {}
+        self._append(ts, power, temperature, humidity, index)
+        # 累加器一次算好 (math.fsum)，之後每進一小時才做 O(1) 的加減
+        x = self._cols["power"][:n]
+        for hours in LGBM_WINDOWS.values():
+            self._windows[("lgbm", hours)] = _RunningWindow(x[max(n - hours, 0):])
+        end = n - LSTM_SHIFT + 1 # 第一個目標列的視窗結尾 (不含)
+        for hours in LSTM_WINDOWS:
+            self._windows[("lstm", hours)] = _RunningWindow(x[max(end - hours, 0):max(end, 0)])
+        self.rebuilds += 1
+
+    def _append(self, ts, power, temperature, humidity, index):
+        start, n = self._len, len(ts)
+        stop = start + n
+        calendar = calendar_features(index)
+        self._ts[start:stop] = ts
+        self._cols["power"][start:stop] = power
+        self._cols["temperature"][start:stop] = temperature
+        self._cols["humidity"][start:stop] = humidity
+        self._cols["hour_sin"][start:stop] = calendar["hour_sin"]
+        self._cols["hour_cos"][start:stop] = calendar["hour_cos"]
+        self._cols["is_weekend"][start:stop] = calendar["off_day"]
+        x, run, run_value = self._cols["power"], self._run, self._run_value
+        for i in range(start, stop):
+            prev_run, prev_value = (run[i - 1], run_value[i - 1]) if i > 0 else (0, np.nan)
+            if x[i] != x[i]:
+                run[i], run_value[i] = prev_run, prev_value
+            elif x[i] == prev_value:
+                run[i], run_value[i] = prev_run + 1, prev_value
+            else:
+                run[i], run_value[i] = 1, x[i]
+            if not self._windows:
+                continue # 重建時累加器稍後一次算好
+            for hours in LGBM_WINDOWS.values():
+                window = self._windows[("lgbm", hours)]
+                window.add(x[i])
+                if i - hours >= 0:
+                    window.remove(x[i - hours])
+            end = i + 1 - LSTM_SHIFT # 新增這一小時後，第一個目標列的視窗結尾
+            for hours in LSTM_WINDOWS:
+                window = self._windows[("lstm", hours)]
+                if end >= 0:
+                    window.add(x[end])
+                if end - hours >= 0:
+                    window.remove(x[end - hours])
+        self._len = stop
+
+    def update(self, df):
+        """餵入已知的每小時歷史 (只讀取最後 TAIL_HOURS 筆)"""
+        tail = df.iloc[-TAIL_HOURS:]
+        ts = tail.index.asi8
+        cols = [tail[name].to_numpy(dtype=np.float64) for name in ("power", "temperature", "humidity")]
+        with self._lock:
+            n = self._len
+            pos = np.searchsorted(ts, self._ts[n - 1]) if n else 0
+            if n and pos < len(ts) and ts[pos] == self._ts[n - 1]:
+                overlap = min(pos + 1, n)
+                lo = pos + 1 - overlap
+                same = np.array_equal(ts[lo:pos + 1], self._ts[n - overlap:n]) and all(
+                    np.array_equal(new[lo:pos + 1], self._cols[name][n - overlap:n], equal_nan=True)
+                    for new, name in zip(cols, ("power", "temperature", "humidity")))
+                fresh = len(ts) - (pos + 1)
+                if same and n + fresh <= self._capacity:
+                    if fresh:
+                        self._append(ts[pos + 1:], *(c[pos + 1:] for c in cols), tail.index[pos + 1:])
+                    return
+            self._rebuild(ts, *cols, tail.index)
+
+    def append(self, df):
+        """
+        直接接在目前尾段之後加入新的小時 (不做重疊檢查)，例如遞迴預測時把上一段的預測值當作已知。
+        df 的第一筆必須是目前最後一小時的下一小時。
+        """
+        ts = df.index.asi8
+        cols = [df[name].to_numpy(dtype=np.float64) for name in ("power", "temperature", "humidity")]
+        with self._lock:
+            n = self._len
+            if n + len(ts) <= self._capacity:
+                self._append(ts, *cols, df.index)
+                return
+            # 空間不夠：與既有尾段合併後從最後 TAIL_HOURS 筆重建
+            ts = np.concatenate([self._ts[:n], ts])[-TAIL_HOURS:]
+            cols = [np.concatenate([self._cols[name][:n], new])[-TAIL_HOURS:]
+                    for new, name in zip(cols, ("power", "temperature", "humidity"))]
+            self._rebuild(ts, *cols, pd.DatetimeIndex(ts))
+
+    # ---------- 目標列特徵 ----------
+    def _targets(self, horizon, future_temperature, future_humidity):
+        n = self._len
+        if n == 0:
+            raise ValueError("FeatureEngine 尚未 update() 任何歷史資料")
+        last_ns = self._ts[n - 1]
+        index = pd.DatetimeIndex(last_ns + HOUR_NS * np.arange(1, horizon + 1))
+        # 未提供未來氣象時沿用最後一筆 (與原本 future_df 的做法相同)
+        temperature = np.empty(horizon)
+        temperature[:] = self._cols["temperature"][n - 1] if future_temperature is None else future_temperature
+        humidity = np.empty(horizon)
+        humidity[:] = self._cols["humidity"][n - 1] if future_humidity is None else future_humidity
+        # 已知歷史 + 未來 (未來的 power 未知 = NaN)，目標列 k (1..horizon) 位於 n - 1 + k
+        power_ext = np.concatenate([self._cols["power"][:n], np.full(horizon, np.nan)])
+        temp_ext = np.concatenate([self._cols["temperature"][:n], temperature])
+        return index, temperature, humidity, power_ext, temp_ext
+
+    @staticmethod
+    def _shifted(values, positions, lag):
+        src = positions - lag
+        out = np.full(len(positions), np.nan)
+        ok = src >= 0
+        out[ok] = values[src[ok]]
+        return out
+
+    def _run_at(self, pos):
+        pos = min(pos, self._len - 1)
+        return (self._run[pos], self._run_value[pos]) if pos >= 0 else (0, np.nan)
+
+    def lgbm_features(self, horizon=HORIZON_HOURS, future_temperature=None, future_humidity=None):
+        """與 add_lgbm_features(full_context).iloc[-horizon:] 相同的欄位與數值"""
+        with self._lock:
+            index, temperature, humidity, power_ext, temp_ext = self._targets(horizon, future_temperature, future_humidity)
+            n = self._len
+            positions = np.arange(n, n + horizon)
+            calendar = calendar_features(index)
+            is_peak = np.isin(calendar["hour"], PEAK_HOURS).astype(int)
+            out = {
+                "temperature": temperature,
+                "humidity": humidity,
+                "hour": calendar["hour"],
+                "day_of_week": calendar["day_of_week"],
+                "month": calendar["month"],
+                "is_holiday_or_weekend": calendar["off_day"],
+                "is_weekend": calendar["off_day"],
+            }
+            for name in ("hour_sin", "hour_cos", "week_sin", "week_cos", "month_sin", "month_cos"):
+                out[name] = calendar[name]
+            out["is_peak"] = is_peak
+            for lag in LGBM_LAGS:
+                out[f"lag_{lag}h"] = self._shifted(power_ext, positions, lag)
+            for lag in TEMP_LAGS:
+                out[f"temp_lag_{lag}"] = self._shifted(temp_ext, positions, lag)
+            # shift(1).rolling(hours)：目標列 k 的視窗為 [n-1+k-hours, n-2+k]，未來部分是 NaN，
+            # 等於已知尾段的視窗每往後一列就從前端移出一筆
+            run = self._run_at(n - 1)
+            x = self._cols["power"]
+            for days, hours in LGBM_WINDOWS.items():
+                window = self._windows[("lgbm", hours)].copy()
+                means, stds = np.empty(horizon), np.empty(horizon)
+                for k in range(horizon):
+                    if k:
+                        drop = n - hours + k - 1
+                        if 0 <= drop < n:
+                            window.remove(x[drop])
+                    means[k], stds[k] = window.stats(*run)
+                out[f"ma_{days}d"], out[f"std_{days}d"] = means, stds
+            out["temp_x_peak"] = temperature * is_peak
+            out["temp_squared"] = temperature ** 2
+            return pd.DataFrame(out, index=index)
+
+    def lstm_features(self, horizon=HORIZON_HOURS, future_temperature=None, future_humidity=None):
+        """與 add_lstm_features(full_context).iloc[-horizon:] 相同的欄位與數值"""
+        with self._lock:
+            index, temperature, humidity, power_ext, temp_ext = self._targets(horizon, future_temperature, future_humidity)
+            n = self._len
+            positions = np.arange(n, n + horizon)
+            calendar = calendar_features(index)
+            out = {
+                "temperature": temperature,
+                "humidity": humidity,
+                "hour": calendar["hour"].astype(float),
+                "is_weekend": calendar["off_day"].astype(float),
+                "day_of_week": calendar["day_of_week"].astype(float),
+            }
+            for name in ("hour_sin", "hour_cos", "week_sin", "week_cos"):
+                out[name] = calendar[name]
+            out["temp_squared"] = temperature ** 2
+            for lag in LSTM_LAGS:
+                out[f"lag_{lag}h"] = self._shifted(power_ext, positions, lag)
+            # shift(24).rolling(hours)：目標列 k 的視窗結尾是 n - 1 + k - 24，每往後一列視窗整體滑動一格
+            for hours, (mean_col, std_col) in LSTM_WINDOWS.items():
+                window = self._windows[("lstm", hours)].copy()
+                means, stds = np.empty(horizon), np.empty(horizon)
+                for k in range(horizon):
+                    end = n + k - LSTM_SHIFT
+                    if k:
+                        if end >= 0:
+                            window.add(power_ext[end])
+                        if end - hours >= 0:
+                            window.remove(power_ext[end - hours])
+                    means[k], stds[k] = window.stats(*self._run_at(end))
+                out[mean_col], out[std_col] = means, stds
+            return pd.DataFrame(out, index=index)
+
+    def lstm_sequence(self, columns, lookback=LOOKBACK_HOURS):
+        """LSTM 的序列輸入：最後 lookback 個已知小時 (只保留了尾段，不需重算整個 buffer)"""
+        with self._lock:
+            n = self._len
+            lo = max(n - lookback, 0)
+            index = pd.DatetimeIndex(self._ts[lo:n])
+            return pd.DataFrame({name: self._cols[name][lo:n] for name in columns}, index=index)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_feature_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = FeatureEngine()
+        return _engine
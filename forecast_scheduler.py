@@ -0,0 +1,130 @@
+# forecast_scheduler.py
+import os
+import time
+import threading
+
+from timeseries_store import get_store, poll_live, is_store_fresh
+from shared_dataset import get_snapshot
+from anomaly_detector import get_anomaly_detector
+from seasonal_baseline import get_seasonal_baseline
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+# 多久輪詢一次 LIVE_DATA_URL (秒)；設為 0 則不啟動排程 (退回「進站 / 按重新抓取才預測」)
+POLL_INTERVAL_SECONDS = float(os.environ.get("POWER_APP_POLL_SECONDS", "60"))
+# 有多電表設定檔 (multi_meter.METERS_FILE) 時，多久同步並批次預測一次所有電表 (秒)
+METER_INTERVAL_SECONDS = float(os.environ.get("POWER_APP_METER_SECONDS", "900"))
+
+# ==========================================
+# ⏰ 背景預測排程
+# ==========================================
+class ForecastScheduler:
+    """
+    行程啟動時就開始在背景執行緒工作，不必等有人進站：
+    1. 第一次先做完整同步 + 預測 (部署後的第一個快照，之後進站的 session 直接讀它)。
+    2. 之後每 interval 秒只輪詢一次即時資料；watermark 前進 (資料版本改變) 才重新預測，
+       store 過期時順便做一次完整同步 (季度資料)。每次輪詢也讓異常偵測評分新進的小時。
+    3. 有多電表設定檔時，每 meter_interval 秒同步所有電表並批次預測一次 (multi_meter.forecast_meters)，
+       結果由 multi_meter.get_meter_forecasts() 提供。
+    預測交給 ForecastService (single-flight)，完成的結果由它整包換成新的快照 (shared_dataset)。
+    頁面只讀快照，永遠不會卡在模型推論上。
+    """
+    def __init__(self, service=None, poll=poll_live, interval=POLL_INTERVAL_SECONDS,
+                 meter_interval=METER_INTERVAL_SECONDS):
+        if service is None:
+            from forecast_service import get_forecast_service
+            service = get_forecast_service()
+        self._service = service
+        self._poll = poll
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.polls = 0
+        self.requests = 0 # 交給預測服務的次數 (資料沒變時服務會直接回傳快取)
+        self.last_poll = None # time.time()
+        self.meter_interval = meter_interval
+        self.last_meter_run = None # time.monotonic()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="forecast-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def trigger(self):
+        """立刻輪詢一次 (例如使用者按下「重新抓取數據」)，不等下一個週期"""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.tick()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def tick(self):
+        """
+        輪詢一次；快照落後於目前的資料版本，或 store 已過期 (TTL / 使用者要求重新抓取) 時交給預測服務，
+        在這條背景執行緒上等結果。完整同步後資料沒變化時預測服務會直接沿用快取，不會重算。
+        """
+        try:
+            self._poll()
+        except Exception as e:
+            print(f"⚠️ [Scheduler] 即時資料輪詢失敗: {e}")
+        self.polls += 1
+        self.last_poll = time.time()
+        try:
+            get_anomaly_detector().update(get_store()) # 只評分新進的小時
+            get_seasonal_baseline().update(get_store()) # 只重算被改到的 (季節, 每週時段) 格子
+        except Exception as e:
+            print(f"⚠️ [Scheduler] 異常偵測更新失敗: {e}")
+        updated = self._forecast()
+        self._forecast_meters() # 排在主要預測之後，不延誤快照
+        return updated
+
+    def _forecast(self):
+        snapshot = get_snapshot()
+        if snapshot is not None and snapshot.version == get_store().version and is_store_fresh():
+            return False
+        try:
+            pred_df, handle = self._service.request().result()
+        except Exception as e:
+            print(f"❌ [Scheduler] 背景預測失敗: {e}")
+            return False
+        self.requests += 1
+        return pred_df is not None
+
+    def _forecast_meters(self):
+        """多電表設定檔存在且距離上次超過 meter_interval 秒時，同步並批次預測所有電表"""
+        from multi_meter import has_meters_file, forecast_meters
+        if self.meter_interval <= 0 or not has_meters_file():
+            return
+        now = time.monotonic()
+        if self.last_meter_run is not None and now - self.last_meter_run < self.meter_interval:
+            return
+        self.last_meter_run = now
+        try:
+            forecast_meters()
+        except Exception as e:
+            print(f"❌ [Scheduler] 多電表預測失敗: {e}")
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_forecast_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ForecastScheduler()
+        return _scheduler
+
+def start_forecast_scheduler():
+    """每個行程只會啟動一次 (Streamlit 每次重跑腳本都會呼叫，之後的呼叫直接回傳)"""
+    if POLL_INTERVAL_SECONDS <= 0:
+        return None
+    return get_forecast_scheduler().start()
@@ -0,0 +1,150 @@
+# forecast_service.py
+import threading
+import concurrent.futures
+
+from timeseries_store import refresh_store, is_store_fresh, get_store
+from shared_dataset import publish_forecast
+
+# 啟動階段 (給載入畫面顯示用)
+STAGE_LABELS = {
+    "idle": "等待中",
+    "syncing": "同步雲端數據",
+    "loading_models": "載入 AI 模型",
+    "predicting": "計算未來 24 小時預測",
+    "ready": "完成",
+}
+
+# ==========================================
+# 🔮 全行程共用的預測服務 (single-flight)
+# ==========================================
+class ForecastService:
+    """
+    整個行程只有一個背景執行緒在做「同步資料 + 載入模型 + 預測」：
+    - 已有工作在跑時，新的請求直接加入同一個 future，不會重複計算。
+    - 資料沒有新版本 (watermark 未前進) 時直接回傳快取的預測結果。
+    - 完成的結果登記到 shared_dataset，供所有 session 讀取。
+    啟動分階段進行：建立服務時就在另一條背景執行緒預先匯入 TensorFlow、載入模型 (prepare)，
+    與資料同步同時進行；UI 不必等任何一項就能先畫出來。
+    """
+    def __init__(self, predict=None, refresh=refresh_store, is_fresh=is_store_fresh, prepare=None,
+                 preload=True, predict_horizon=None):
+        if predict is None:
+            from model_service import load_resources_and_predict as predict
+        if predict_horizon is None:
+            from model_service import forecast_horizon as predict_horizon
+        if prepare is None:
+            from model_registry import get_model_registry
+            prepare = lambda: get_model_registry().get()
+        self._predict = predict
+        self._predict_horizon = predict_horizon
+        self._prepare = prepare
+        self._refresh = refresh
+        self._is_fresh = is_fresh
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="forecast")
+        self._inflight = None # 目前正在跑的 future
+        self._cached = None # (資料版本號, 完成的 future)
+        self._horizons = {} # (資料版本號, 小時數, 解析度) -> 多日預測的 future
+        self.computations = 0 # 實際跑過幾次模型預測 (觀察用)
+        self.stage = "idle"
+        self.sync_progress = None # 同步雲端季度的進度 (已完成數, 總數, basket 名稱)，給載入畫面顯示
+        if preload:
+            threading.Thread(target=self._prepare_quietly, name="model-preload", daemon=True).start()
+
+    def _prepare_quietly(self):
+        try:
+            self._prepare()
+        except Exception as e:
+            # 模型檔缺少等錯誤留給真正預測時處理 (load_resources_and_predict 會回報並回傳 None)
+            print(f"⚠️ [Forecast] 模型預先載入失敗: {e}")
+
+    def _on_sync_progress(self, done, total, basket_name):
+        self.sync_progress = (done, total, basket_name)
+
+    @property
+    def stage_label(self):
+        """目前階段的說明；同步中附上季度 basket 的下載進度"""
+        label = STAGE_LABELS.get(self.stage, self.stage)
+        progress = self.sync_progress
+        if self.stage == "syncing" and progress is not None:
+            done, total, basket_name = progress
+            label += f" {done}/{total} ({basket_name})"
+        return label
+
+    def request(self):
+        """
+        取得預測結果的 future，結果為 (預測 DataFrame, 資料版本號)。
+        資料仍新鮮且已有同版本的預測時回傳已完成的 future；否則加入或啟動唯一的背景工作。
+        """
+        with self._lock:
+            if self._inflight is not None and not self._inflight.done():
+                return self._inflight # 加入進行中的工作
+            cached = self._cached
+            if cached is not None and self._is_fresh() and cached[0] == get_store().version:
+                return cached[1]
+            self._inflight = self._executor.submit(self._run)
+            return self._inflight
+
+    def _run(self):
+        try:
+            self.sync_progress = None
+            self.stage = "syncing"
+            store = self._refresh(on_progress=self._on_sync_progress)
+            version = store.version
+            cached = self._cached
+            if cached is not None and cached[0] == version:
+                # 同步後資料沒有變化：沿用上一次的預測
+                return cached[1].result()
+
+            self.stage = "loading_models" # 預先載入通常早已完成，這裡只是等它 (或補做)
+            self._prepare_quietly()
+            self.stage = "predicting"
+            self.computations += 1
+            pred_df, handle = self._predict(store)
+        finally:
+            self.stage = "ready"
+        if pred_df is None:
+            return pred_df, handle
+
+        result = (pred_df, handle)
+        done = concurrent.futures.Future()
+        done.set_result(result)
+        with self._lock:
+            self._cached = (handle, done)
+        publish_forecast(handle, pred_df)
+        return result
+
+    def request_horizon(self, hours=72, freq="h"):
+        """
+        多日預測的 future (結果為 DataFrame)，依資料版本 (watermark) 快取：
+        同一版本的同一種預測整個行程只算一次，所有 session 共用；資料更新後舊版本的結果直接丟掉。
+        與 24 小時預測排在同一條背景執行緒，不會同時搶 CPU。
+        """
+        # 版本號與網格一起取：背景工作用的就是這個版本的 (不可變) 網格，之後併入的新資料不會混進這個快取鍵
+        version, grid = get_store().versioned_grid()
+        key = (version, hours, freq)
+        with self._lock:
+            future = self._horizons.get(key)
+            if future is None or (future.done() and future.exception() is not None):
+                self._horizons = {k: f for k, f in self._horizons.items() if k[0] == version}
+                future = self._executor.submit(self._predict_horizon, grid, hours, freq)
+                self._horizons[key] = future
+            return future
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_forecast_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ForecastService()
+        return _service
+
+def request_forecast():
+    """各 session 呼叫的入口：回傳共用的 future"""
+    return get_forecast_service().request()
+
+def request_horizon_forecast(hours=72, freq="h"):
+    """分析室用的多日預測 (共用、依資料版本快取的 future)"""
+    return get_forecast_service().request_horizon(hours, freq)
@@ -0,0 +1,122 @@
+# history_cache.py
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+CACHE_DIR = os.environ.get("POWER_APP_CACHE_DIR", ".cache")
+CACHE_FORMAT_VERSION = 1
+INDEX_FILE = "__index__.npy"
+META_FILE = "meta.json"
+
+# ==========================================
+# 🗄️ 欄式 (Columnar) 存取工具
+# ==========================================
+def _file_signature(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def file_sha1(path, chunk_size=1 << 20):
+    """分段讀取計算檔案內容的 SHA1 (CSV 快取與 TFLite 轉換快取共用)"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _atomic_save_npy(path, array):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+def atomic_save_json(path, obj):
+    """先寫入暫存檔再 os.replace，讀取端不會看到寫到一半的 JSON"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, META_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_columnar(cache_dir, df, extra_meta=None):
+    """
+    把 DatetimeIndex 的 DataFrame 拆成「一欄一個 .npy」存到 cache_dir。
+    時間索引存成 int64 (epoch ns)，其餘欄位保留原始 dtype。
+    meta.json 最後才寫入，當作整批寫入完成的標記。
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    _atomic_save_npy(os.path.join(cache_dir, INDEX_FILE), df.index.asi8)
+    for col in df.columns:
+        _atomic_save_npy(os.path.join(cache_dir, f"{col}.npy"), np.ascontiguousarray(df[col].to_numpy()))
+    meta = {
+        "format": CACHE_FORMAT_VERSION,
+        "index_name": df.index.name,
+        "columns": list(df.columns),
+        "rows": len(df),
+    }
+    meta.update(extra_meta or {})
+    atomic_save_json(os.path.join(cache_dir, META_FILE), meta)
+    return meta
+
+def load_columnar(cache_dir, mmap=True):
+    """讀回 save_columnar 的結果；mmap=True 時欄位以唯讀記憶體映射載入，不佔用額外 RAM"""
+    meta = read_meta(cache_dir)
+    if meta is None or meta.get("format") != CACHE_FORMAT_VERSION:
+        return None
+    mmap_mode = "r" if mmap else None
+    def _load(name):
+        # .view(np.ndarray)：保留記憶體映射，但讓 pandas 看到的是一般 ndarray
+        return np.load(os.path.join(cache_dir, name), mmap_mode=mmap_mode).view(np.ndarray)
+    index = pd.DatetimeIndex(_load(INDEX_FILE).view("datetime64[ns]"), name=meta["index_name"])
+    data = {col: _load(f"{col}.npy") for col in meta["columns"]}
+    return pd.DataFrame(data, index=index, copy=False)
+
+# ==========================================
+# 📄 歷史 CSV 快取
+# ==========================================
+def _read_history_csv(csv_path):
+    df = pd.read_csv(csv_path)
+    df['datetime'] = pd.to_datetime(df['datetime'])
+    return df.set_index('datetime').sort_index()
+
+def load_history_csv(csv_path, cache_dir=None, mmap=True):
+    """
+    讀取歷史 CSV 的快速版本。
+    第一次會照舊 read_csv + to_datetime，並轉存成欄式 .npy 快取；
+    之後只要 CSV 的大小/mtime (或內容 SHA1) 沒變，就直接從快取 memory-map 載入。
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(CACHE_DIR, "history", os.path.splitext(os.path.basename(csv_path))[0])
+
+    signature = _file_signature(csv_path)
+    meta = read_meta(cache_dir)
+    if meta is not None and meta.get("source") == signature:
+        cached = load_columnar(cache_dir, mmap=mmap)
+        if cached is not None:
+            return cached
+
+    # mtime 變了但內容沒變 (例如 git checkout)，只更新簽章，不重建
+    sha1 = file_sha1(csv_path)
+    if meta is not None and meta.get("source_sha1") == sha1:
+        cached = load_columnar(cache_dir, mmap=mmap)
+        if cached is not None:
+            meta["source"] = signature
+            atomic_save_json(os.path.join(cache_dir, META_FILE), meta)
+            return cached
+
+    df = _read_history_csv(csv_path)
+    try:
+        save_columnar(cache_dir, df, {"source": signature, "source_sha1": sha1})
+    except OSError as e:
+        print(f"⚠️ [Cache] 無法寫入歷史快取: {e}")
+    return df
@@ -0,0 +1,159 @@
+# load_shift.py
+import threading
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+from energy_grid import HOUR_NS, DAY_NS
+from tariff_engine import (compile_plans, day_types, summer_months, slot_range, usage_profile,
+                           price_plans)
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+# 可移轉的用電時段 (起始小時, 結束小時)，以及移入的離峰時段
+SHIFT_SOURCES = {
+    "傍晚 (17~22 時)": (17, 22),
+    "白天 (9~17 時)": (9, 17),
+    "晚間 (19~24 時)": (19, 24),
+}
+SHIFT_TARGET = (0, 6) # 深夜 (0~6 時)，所有方案皆為離峰
+SHIFT_LEVELS = np.arange(0.0, 10.01, 0.5) # 每日移轉量 (kWh)
+# 節省金額以「目前方案、不移轉」為基準。累進電價只看總度數，移轉用電不會改變電費，預設以時間電價計算
+CURRENT_PLAN = '時間電價 (二段式)'
+SHIFT_CHUNK = 1024 # 每批計算的情境數 (控制 情境 x 天數 的中間陣列大小)
+
+# kwh_per_day: 每天最多移轉的 kWh；source / target: (起始小時, 結束小時)；
+# capacity_kw: 移入時段的平均功率上限 (含原本的用電)，None 表示不限制
+ShiftScenario = namedtuple("ShiftScenario", ["kwh_per_day", "source", "target", "capacity_kw"])
+
+# 每日 x 24 小時的用電矩陣 (依日期補齊首尾不完整的一天)
+DailyUsage = namedtuple("DailyUsage", ["days", "kwh", "is_summer", "day_type"])
+
+# ==========================================
+# 📊 每日 x 小時用電
+# ==========================================
+def daily_usage(rollups, start=None, end=None):
+    """彙總表 start ~ end (含，日期) 的每小時用電，整理成 (天數, 24) 矩陣；範圍內沒有資料時回傳 None"""
+    lo, hi = slot_range(rollups, start, end)
+    if hi == lo:
+        return None
+    first_ns = rollups.start_ns + lo * HOUR_NS
+    pad = int((first_ns % DAY_NS) // HOUR_NS)
+    n_days = -(-(pad + hi - lo) // 24)
+    kwh = np.zeros(n_days * 24)
+    kwh[pad:pad + hi - lo] = rollups.kwh[lo:hi]
+    day_ns = first_ns - pad * HOUR_NS + np.arange(n_days, dtype=np.int64) * DAY_NS
+    return DailyUsage(days=pd.DatetimeIndex(day_ns, name="date"), kwh=kwh.reshape(n_days, 24),
+                      is_summer=summer_months(day_ns), day_type=day_types(day_ns))
+
+def _band_masks(bands):
+    masks = np.zeros((24, len(bands)))
+    for b, (start, end) in enumerate(bands):
+        if not 0 <= start < end <= 24:
+            raise ValueError(f"時段 {(start, end)} 必須在 0~24 時之間")
+        masks[start:end, b] = 1.0
+    return masks
+
+# ==========================================
+# 🔌 移轉用電情境 (批次)
+# ==========================================
+def simulate_shifts(rollups, scenarios, start_date=None, end_date=None, plans=None, current_plan=CURRENT_PLAN):
+    """
+    批次模擬「每天把來源時段的用電移到目標時段」後，各方案的期間電費。
+    每天的移轉量 = min(情境的 kWh, 當天來源時段實際用電, 目標時段剩餘容量)；
+    來源時段依各小時用電比例扣除、目標時段平均分攤。總用電量不變，所以累進電費與超額加價不變，
+    時段電價只差「移轉量 x (目標平均費率 - 來源加權費率)」，每組情境是一次 (天數 x 方案) 的矩陣乘法。
+    回傳每個情境一列：moved_kwh、各方案電費、saving (current_plan 移轉前後的電費差，即移轉本身省下的錢)、
+    best_plan / best_cost / best_saving (移轉後改用最省的方案，相對 current_plan 不移轉)；範圍內沒有資料時回傳 None。
+    """
+    usage = daily_usage(rollups, start_date, end_date)
+    if usage is None:
+        return None
+    table = compile_plans(plans)
+    base_cost = price_plans(usage_profile(rollups, start_date, end_date), table)[0]["total_cost"].to_numpy()
+
+    bands = sorted({s.source for s in scenarios} | {s.target for s in scenarios})
+    masks = _band_masks(bands)
+    band_hours = masks.sum(axis=0)
+    rates = table.slot_rates[:, usage.is_summer.astype(np.intp), usage.day_type]   # (方案, 天, 24)
+    band_kwh = usage.kwh @ masks                                                # (天, 時段)
+    band_cost = (rates * usage.kwh[None]) @ masks                               # (方案, 天, 時段)
+    band_rate = (rates @ masks) / band_hours                                    # 目標時段平均費率
+
+    kwh_per_day = np.array([s.kwh_per_day for s in scenarios], dtype=np.float64)
+    capacity = np.array([np.inf if s.capacity_kw is None else s.capacity_kw for s in scenarios], dtype=np.float64)
+    source = np.array([bands.index(s.source) for s in scenarios], dtype=np.intp)
+    target = np.array([bands.index(s.target) for s in scenarios], dtype=np.intp)
+    if (masks[:, source] * masks[:, target]).sum(axis=0).any():
+        raise ValueError("來源時段與目標時段不可重疊")
+
+    moved_total = np.zeros(len(scenarios))
+    delta = np.zeros((len(table.names), len(scenarios)))
+    for sb, tb in set(zip(source.tolist(), target.tolist())):
+        group = np.flatnonzero((source == sb) & (target == tb))
+        unit_source = np.divide(band_cost[:, :, sb], band_kwh[:, sb], out=np.zeros_like(band_cost[:, :, sb]),
+                                where=band_kwh[:, sb] > 0)
+        rate_diff = band_rate[:, :, tb] - unit_source                            # (方案, 天)
+        for i in range(0, len(group), SHIFT_CHUNK):
+            members = group[i:i + SHIFT_CHUNK]
+            room = np.maximum(capacity[members, None] * band_hours[tb] - band_kwh[None, :, tb], 0.0)
+            moved = np.minimum(np.minimum(kwh_per_day[members, None], band_kwh[None, :, sb]), room)
+            moved_total[members] = moved.sum(axis=1)
+            delta[:, members] = rate_diff @ moved.T
+
+    costs = base_cost[:, None] + delta                                          # (方案, 情境)
+    best = costs.argmin(axis=0)
+    result = pd.DataFrame({
+        'kwh_per_day': kwh_per_day,
+        'source': [s.source for s in scenarios],
+        'target': [s.target for s in scenarios],
+        'capacity_kw': capacity,
+        'moved_kwh': moved_total,
+    })
+    for p, name in enumerate(table.names):
+        result[name] = costs[p]
+    result['best_plan'] = np.array(table.names, dtype=object)[best]
+    result['best_cost'] = costs[best, np.arange(len(scenarios))]
+    current = table.names.index(current_plan)
+    result['saving'] = -delta[current]
+    result['best_saving'] = base_cost[current] - result['best_cost']
+    return result
+
+# ==========================================
+# 📈 節省金額前緣 (依資料版本快取)
+# ==========================================
+_frontier_cache = {} # (資料版本號, 起訖日期, 移轉量, 容量, 來源 / 目標時段, 目前方案) -> DataFrame
+_frontier_lock = threading.Lock()
+
+def savings_frontier(rollups, start_date=None, end_date=None, levels=SHIFT_LEVELS, capacity_kw=None,
+                     sources=None, target=SHIFT_TARGET, current_plan=CURRENT_PLAN):
+    """
+    每個每日移轉量下 (levels)，在所有來源時段 (sources，預設 SHIFT_SOURCES) 中讓 current_plan 電費省最多的做法：
+    以每日移轉量為索引，欄位 source / moved_kwh / saving / best_plan / best_cost / best_saving (欄位意義見 simulate_shifts)。
+    一次算好所有移轉量，頁面拖動滑桿只是查表；同一資料版本的結果整個行程共用。範圍內沒有資料時回傳 None。
+    """
+    sources = SHIFT_SOURCES if sources is None else sources
+    version = rollups.version
+    key = (version, str(start_date), str(end_date), tuple(np.asarray(levels).tolist()), capacity_kw,
+           tuple(sorted(sources.items())), target, current_plan)
+    if version is not None:
+        with _frontier_lock:
+            cached = _frontier_cache.get(key)
+        if cached is not None:
+            return cached
+    scenarios = [ShiftScenario(float(x), band, target, capacity_kw) for x in levels for band in sources.values()]
+    result = simulate_shifts(rollups, scenarios, start_date, end_date, current_plan=current_plan)
+    if result is None:
+        return None
+    names = {band: name for name, band in sources.items()}
+    result['source'] = result['source'].map(names)
+    best = result.loc[result.groupby('kwh_per_day', sort=True)['saving'].idxmax()]
+    frontier = best.set_index('kwh_per_day')[['source', 'moved_kwh', 'saving', 'best_plan', 'best_cost',
+                                               'best_saving']]
+    if version is not None:
+        with _frontier_lock:
+            for k in [k for k in _frontier_cache if k[0] != version]:
+                del _frontier_cache[k]
+            _frontier_cache[key] = frontier
+    return frontier
@@ -0,0 +1,119 @@
+# model_registry.py
+import os
+import time
+import threading
+import joblib
+import numpy as np
+
+# ==========================================
+# 🚑 [設定] TensorFlow 相容性設定 (必須在第一次匯入 TensorFlow 之前)
+# ==========================================
+os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
+os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"
+os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+MODEL_FILES = {
+    "lgbm": "lgbm_model.pkl",
+    "lstm": "lstm_model.keras",
+    "scaler_seq": "scaler_seq.pkl",
+    "scaler_dir": "scaler_dir.pkl",
+    "scaler_target": "scaler_target.pkl",
+    "weights": "ensemble_weights.pkl",
+}
+# LSTM 推論後端："keras" (預設) 或 "tflite" (轉成 TFLite flatbuffer，批次 1 的推論成本低很多)
+LSTM_BACKEND = os.environ.get("POWER_APP_LSTM_BACKEND", "keras")
+
+# ==========================================
+# 📦 載入與暖機
+# ==========================================
+def _load_keras(path):
+    from tensorflow import keras # TensorFlow 只在真的要載入 LSTM 時才匯入 (通常在背景執行緒)
+    return keras.models.load_model(path)
+
+def _load_lstm(path, backend=None):
+    backend = backend or LSTM_BACKEND
+    if backend == "tflite":
+        from tflite_engine import TFLiteModel
+        return TFLiteModel.from_keras(path)
+    if backend != "keras":
+        raise ValueError(f"未知的 LSTM 後端: {backend}")
+    return _load_keras(path)
+
+def _input_shapes(model):
+    shapes = getattr(model, "input_shapes", None) # TFLiteModel
+    return shapes if shapes is not None else [(1,) + tuple(t.shape[1:]) for t in model.inputs]
+
+def _warm_lstm(model):
+    """以全 0 的假資料跑一次推論，讓 predict 的計算圖 (或 TFLite 直譯器的張量配置) 在第一個使用者之前就建好"""
+    dummy = [np.zeros((1,) + tuple(shape[1:]), dtype=np.float32) for shape in _input_shapes(model)]
+    model.predict(dummy, verbose=0)
+
+def _warm_lgbm(model):
+    import pandas as pd
+    names = model.feature_name()
+    model.predict(pd.DataFrame(np.zeros((1, len(names))), columns=names))
+
+WARMERS = {"lstm": _warm_lstm, "lgbm": _warm_lgbm}
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+# ==========================================
+# 🗂️ 模型登錄處 (每個行程只載入一次)
+# ==========================================
+class ModelRegistry:
+    """
+    集中管理 LightGBM / LSTM / scaler / 權重：
+    - 第一次 get() 時全部載入，模型各自跑一次暖機推論。
+    - 之後每次 get() 只比對檔案大小與修改時間，有變動的檔案才重新載入 (並重新暖機)。
+    - timings 記錄每個檔案最近一次的載入與暖機秒數。
+    - LSTM 依 lstm_backend (預設為 LSTM_BACKEND 設定) 載入成 keras 模型或 TFLiteModel，兩者都提供 predict()。
+    """
+    def __init__(self, files=None, warmup=True, lstm_backend=None):
+        self.files = dict(MODEL_FILES if files is None else files)
+        self.warmup = warmup
+        self.lstm_backend = lstm_backend or LSTM_BACKEND
+        self.timings = {}
+        self._lock = threading.Lock()
+        self._resources = {}
+        self._signatures = {}
+
+    def _load(self, name, path, signature):
+        t0 = time.perf_counter()
+        obj = _load_lstm(path, self.lstm_backend) if name == "lstm" else joblib.load(path)
+        load_s = time.perf_counter() - t0
+        warm_s = 0.0
+        if self.warmup and name in WARMERS:
+            t0 = time.perf_counter()
+            WARMERS[name](obj)
+            warm_s = time.perf_counter() - t0
+        self._resources[name] = obj
+        self._signatures[name] = signature
+        self.timings[name] = {"load": load_s, "warmup": warm_s}
+        print(f"📦 [Models] {name}: 載入 {load_s:.2f}s | 暖機 {warm_s:.2f}s")
+
+    def get(self):
+        """回傳 {名稱: 物件}；檔案不存在時丟出 FileNotFoundError (與直接 joblib.load 相同)"""
+        with self._lock:
+            for name, path in self.files.items():
+                signature = _signature(path)
+                if self._signatures.get(name) != signature:
+                    self._load(name, path, signature)
+            return dict(self._resources)
+
+    def total_seconds(self):
+        return sum(t["load"] + t["warmup"] for t in self.timings.values())
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_model_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
@@ -0,0 +1,166 @@
+# multi_meter.py
+import os
+import sys
+import json
+import time
+import threading
+import concurrent.futures
+from collections import namedtuple
+import pandas as pd
+
+from pantry_client import LIVE_DATA_URL
+from timeseries_store import TimeSeriesStore, StoreFeed, HISTORY_PANTRY_ID, STORE_TTL_SECONDS, refresh_store
+from feature_engine import FeatureEngine, LOOKBACK_HOURS
+from model_service import hybrid_predict, prepare_history, SEQ_COLS, DIR_COLS
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+# 多電表設定檔：JSON list，每筆 {"meter_id": ..., "pantry_id": ..., "live_url": ...}
+# 檔案不存在時只有原本的單一電表 (HISTORY_PANTRY_ID + LIVE_DATA_URL)
+METERS_FILE = os.environ.get("POWER_APP_METERS", "meters.json")
+METER_SYNC_WORKERS = 4 # 同時同步幾個電表 (每個電表的季度抓取另外共用 pantry_client 的連線池與限速)
+
+Meter = namedtuple("Meter", ["meter_id", "pantry_id", "live_url"])
+DEFAULT_METER = Meter("default", HISTORY_PANTRY_ID, LIVE_DATA_URL)
+
+def has_meters_file(path=None):
+    return os.path.exists(path or METERS_FILE)
+
+def load_meters(path=None):
+    path = path or METERS_FILE
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return [DEFAULT_METER]
+    return [Meter(e["meter_id"], e["pantry_id"], e.get("live_url")) for e in entries]
+
+# ==========================================
+# 📥 各電表的資料 (每個電表一個 TimeSeriesStore + StoreFeed)
+# ==========================================
+_meter_feeds = {} # meter_id -> StoreFeed
+_meter_lock = threading.Lock()
+
+def _meter_feed(meter):
+    with _meter_lock:
+        feed = _meter_feeds.get(meter.meter_id)
+        if feed is None:
+            feed = _meter_feeds[meter.meter_id] = StoreFeed(
+                TimeSeriesStore(), meter.pantry_id, live_url=meter.live_url, label=f"Meter {meter.meter_id}")
+        return feed
+
+def refresh_meter_store(meter, max_age=STORE_TTL_SECONDS):
+    """
+    同步單一電表並回傳它的 store (資料超過 max_age 秒才同步)。原本的電表沿用全行程共用的 refresh_store
+    (含歷史 CSV)；其他電表只有雲端季度 + 即時資料，匯入流程與 refresh_store 相同 (StoreFeed)。
+    """
+    if meter.meter_id == DEFAULT_METER.meter_id:
+        return refresh_store(max_age)
+    return _meter_feed(meter).refresh(max_age)
+
+def refresh_meter_stores(meters, max_age=STORE_TTL_SECONDS, max_workers=METER_SYNC_WORKERS):
+    """同時同步多個電表，回傳 {meter_id: store}；同步失敗的電表略過"""
+    stores = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="meter-sync") as pool:
+        futures = {pool.submit(refresh_meter_store, meter, max_age): meter for meter in meters}
+        for future in concurrent.futures.as_completed(futures):
+            meter = futures[future]
+            try:
+                stores[meter.meter_id] = future.result()
+            except Exception as e:
+                print(f"❌ [MultiMeter] {meter.meter_id} 同步失敗: {e}")
+    return {meter.meter_id: stores[meter.meter_id] for meter in meters if meter.meter_id in stores}
+
+# ==========================================
+# ⚡ 多電表批次推論
+# ==========================================
+class MultiMeterForecaster:
+    """
+    每個電表各有一個增量 FeatureEngine；forecast() 把所有電表的 LightGBM 目標列、
+    LSTM X_seq / X_dir 疊成同一批，整批只呼叫一次 lgbm.predict 與一次 lstm.predict。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engines = {}
+
+    def update(self, meter_id, df_ready):
+        """餵入某個電表已準備好的每小時歷史 (prepare_history 的結果)"""
+        with self._lock:
+            engine = self._engines.get(meter_id)
+            if engine is None:
+                engine = self._engines[meter_id] = FeatureEngine()
+        engine.update(df_ready)
+
+    def forecast(self, resources, meter_ids=None):
+        """回傳 {meter_id: 預測結果 DataFrame} (欄位與 load_resources_and_predict 相同)；歷史不足一週的電表略過"""
+        meter_ids = list(self._engines) if meter_ids is None else meter_ids
+        ready, lgbm_rows, seq_rows, dir_rows = [], [], [], []
+        for meter_id in meter_ids:
+            engine = self._engines[meter_id]
+            seq_data = engine.lstm_sequence(SEQ_COLS)
+            if len(seq_data) < LOOKBACK_HOURS:
+                print(f"⚠️ [MultiMeter] {meter_id}: 歷史不足 {LOOKBACK_HOURS} 小時，略過")
+                continue
+            ready.append(meter_id)
+            lgbm_rows.append(engine.lgbm_features())
+            seq_rows.append(seq_data)
+            dir_rows.append(engine.lstm_features()[DIR_COLS].iloc[:1])
+        if not ready:
+            return {}
+        pred_lgbm, pred_lstm, pred_final = hybrid_predict(
+            resources, pd.concat(lgbm_rows), pd.concat(seq_rows), pd.concat(dir_rows))
+        results = {}
+        for i, (meter_id, target) in enumerate(zip(ready, lgbm_rows)):
+            rows = slice(i * len(target), (i + 1) * len(target))
+            results[meter_id] = pd.DataFrame({
+                "預測值": pred_final[rows],
+                "LGBM": pred_lgbm[rows],
+                "LSTM": pred_lstm[rows],
+            }, index=pd.Index(target.index, name="時間"))
+        return results
+
+_forecaster = MultiMeterForecaster()
+
+# 最近一次多電表預測：created_at 為 time.time()，versions 為 {meter_id: 資料版本號}
+MeterForecasts = namedtuple("MeterForecasts", ["created_at", "versions", "results"])
+_latest = None
+_latest_lock = threading.Lock()
+
+def get_meter_forecasts():
+    """最近一次 forecast_meters 的結果 (MeterForecasts)；還沒跑過時為 None"""
+    return _latest
+
+def forecast_meters(meters=None, resources=None, max_age=STORE_TTL_SECONDS):
+    """
+    同步所有電表並一次批次預測未來 24 小時，回傳 {meter_id: 預測結果 DataFrame}。
+    所有電表的資料版本都沒變時直接回傳上一次的結果，不重新推論。
+    """
+    global _latest
+    meters = load_meters() if meters is None else meters
+    stores = refresh_meter_stores(meters, max_age)
+    versions = {meter_id: store.version for meter_id, store in stores.items() if len(store)}
+    latest = _latest
+    if latest is not None and latest.versions == versions:
+        return latest.results
+    if resources is None:
+        from model_registry import get_model_registry
+        resources = get_model_registry().get()
+    for meter_id in versions:
+        _forecaster.update(meter_id, prepare_history(stores[meter_id].grid().frame()))
+    results = _forecaster.forecast(resources, list(versions))
+    with _latest_lock:
+        _latest = MeterForecasts(time.time(), versions, results)
+    print(f"🏘️ [MultiMeter] {len(results)} / {len(meters)} 個電表完成 24 小時預測")
+    return results
+
+# ==========================================
+# 🧪 批次執行入口：python multi_meter.py [輸出資料夾]
+# ==========================================
+if __name__ == "__main__":
+    out_dir = sys.argv[1] if len(sys.argv) > 1 else "meter_forecasts"
+    os.makedirs(out_dir, exist_ok=True)
+    for meter_id, pred_df in forecast_meters().items():
+        path = os.path.join(out_dir, f"{meter_id}.csv")
+        pred_df.to_csv(path)
+        print(f"💾 [MultiMeter] {meter_id} -> {path}")
@@ -8,8 +8,16 @@ import numpy as np
 # 從 app_utils 匯入我們需要的函式
 from app_utils import (
     load_model, load_data, get_core_kpis, 
-    analyze_pricing_plans, TOU_RATES_DATA
+    analyze_pricing_period, compare_plans, tariff_sensitivity, load_shift_frontier, TOU_RATES_DATA
 )
+from forecast_service import request_horizon_forecast
+from anomaly_detector import get_anomaly_detector
+from seasonal_baseline import get_seasonal_baseline
+from timeseries_store import get_store
+from tariff_engine import DEFAULT_PLANS
+from load_shift import CURRENT_PLAN
+
+HORIZON_POLL_SECONDS = 2 # 多日預測還在背景計算時，圖表區塊多久檢查一次 future
 
 # 從 model_trainer 匯入特徵工程函式 (保留介面，若未來要用)
 try:
@@ -68,51 +76,61 @@ def show_analysis_page():
         df_actual['Type'] = '真實數據 (Actual)'
         
         # 2. 準備數據：未來 3 天 (虛線/預測)
-        future_periods = 96 * 3 # 預測未來 3 天 (15分鐘一筆)
-        future_timestamps = pd.date_range(start=last_timestamp + timedelta(minutes=15), periods=future_periods, freq='15T')
-        
-        # 生成模擬預測數據
-        last_val = df_actual['value'].iloc[-1]
-        t_steps = np.arange(future_periods)
-        daily_pattern = np.sin(t_steps / 96 * 2 * np.pi - np.pi/2) * 0.5 + 0.5 
-        forecast_values = []
-        current_val = last_val
-        for i in range(future_periods):
-            noise = np.random.normal(0, 0.05)
-            trend = (kpis['kwh_last_7_days']/7/24 - current_val) * 0.01 
-            current_val = current_val + noise + trend + (daily_pattern[i] * 0.1)
-            current_val = max(0.1, current_val)
-            forecast_values.append(current_val)
-
-        df_forecast = pd.DataFrame({
-            'time': future_timestamps,
-            'value': forecast_values,
-            'Type': 'AI 預測 (Forecast)'
-        })
-
-        # 3. 合併數據並繪圖
-        df_chart = pd.concat([df_actual, df_forecast])
-        
-        # 使用 Plotly 繪製
-        fig = px.line(df_chart, x='time', y='value', color='Type',
-                      line_dash='Type', 
-                      line_dash_map={'真實數據 (Actual)': 'solid', 'AI 預測 (Forecast)': 'dash'},
-                      color_discrete_map={'真實數據 (Actual)': '#00CC96', 'AI 預測 (Forecast)': '#EF553B'},
-                      template="plotly_dark")
-        
-        fig.add_vline(x=last_timestamp.timestamp() * 1000, line_width=2, line_dash="dot", line_color="white")
-        fig.add_annotation(x=last_timestamp.timestamp() * 1000, y=df_chart['value'].max()*0.9, 
-                           text="Now (修正點)", showarrow=True, arrowhead=1, ax=40, ay=0)
-        
-        fig.update_layout(
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-            margin=dict(l=20, r=20, t=20, b=20),
-            height=450,
-            xaxis_title="時間",
-            yaxis_title="功率 (kW)"
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        # 由混合模型遞迴滾動預測；同一個資料版本整個行程只算一次，之後每次重畫都直接取快取。
+        # 還在背景計算時先畫歷史數據與提示，只有圖表區塊 (fragment) 定期檢查 future，不卡住整個頁面
+        resolution = st.radio("預測解析度", ["每小時", "每 15 分鐘"], horizontal=True)
+        freq = "h" if resolution == "每小時" else "15min"
+        future = request_horizon_forecast(hours=24 * 3, freq=freq)
+        pending = not future.done()
+
+        @st.fragment(run_every=HORIZON_POLL_SECONDS if pending else None)
+        def forecast_chart():
+            df_pred = None
+            if not future.done():
+                st.info("⏳ AI 正在背景滾動預測未來 3 天，完成後預測線會自動補上。")
+            elif pending:
+                st.rerun() # 預測剛完成：整頁重畫一次 (不再定期檢查)
+            else:
+                try:
+                    df_pred = future.result()
+                except Exception as e:
+                    print(f"❌ [Analysis] 多日預測失敗: {e}")
+                if df_pred is None:
+                    st.warning("⚠️ 目前無法產生 AI 預測 (模型或資料尚未就緒)，僅顯示歷史數據。")
+            if df_pred is None:
+                df_pred = pd.DataFrame({"預測值": []}, index=pd.DatetimeIndex([], name="時間"))
+
+            df_forecast = pd.DataFrame({
+                'time': df_pred.index,
+                'value': df_pred['預測值'].to_numpy(),
+                'Type': 'AI 預測 (Forecast)'
+            })
+
+            # 3. 合併數據並繪圖
+            df_chart = pd.concat([df_actual, df_forecast])
+            
+            # 使用 Plotly 繪製
+            fig = px.line(df_chart, x='time', y='value', color='Type',
+                          line_dash='Type', 
+                          line_dash_map={'真實數據 (Actual)': 'solid', 'AI 預測 (Forecast)': 'dash'},
+                          color_discrete_map={'真實數據 (Actual)': '#00CC96', 'AI 預測 (Forecast)': '#EF553B'},
+                          template="plotly_dark")
+            
+            fig.add_vline(x=last_timestamp.timestamp() * 1000, line_width=2, line_dash="dot", line_color="white")
+            fig.add_annotation(x=last_timestamp.timestamp() * 1000, y=df_chart['value'].max()*0.9, 
+                               text="Now (修正點)", showarrow=True, arrowhead=1, ax=40, ay=0)
+            
+            fig.update_layout(
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                margin=dict(l=20, r=20, t=20, b=20),
+                height=450,
+                xaxis_title="時間",
+                yaxis_title="功率 (kW)"
+            )
+            
+            st.plotly_chart(fig, use_container_width=True)
+
+        forecast_chart()
         
         with st.expander("ℹ️ 技術解密：為什麼這條曲線會越來越準？", expanded=True):
             c1, c2 = st.columns([1, 1])
@@ -149,13 +167,13 @@ def show_analysis_page():
             end_date = st.date_input("結束日期", value=max_date, min_value=start_date, max_value=max_date)
             
         if st.button("🚀 開始分析", use_container_width=True):
-            analysis_df = df_history.loc[start_date.strftime('%Y-%m-%d'):end_date.strftime('%Y-%m-%d')]
+            # 直接讀取每日用電彙總表，不必切出整段原始資料
+            results, df_detailed = analyze_pricing_period(df_history, start_date, end_date)
             
-            if analysis_df.empty:
+            if results is None:
                 st.error("選取範圍無資料。")
             else:
                 with st.spinner("AI 正在精算每一度電的成本..."):
-                    results, df_detailed = analyze_pricing_plans(analysis_df)
                     cost_prog = results['cost_progressive']
                     cost_tou = results['cost_tou']
                     diff = cost_prog - cost_tou
@@ -180,6 +198,67 @@ def show_analysis_page():
                                      template="plotly_dark")
                     st.plotly_chart(fig_pie, use_container_width=True)
 
+                    # 所有方案 (累進 / 二段式 ...) 一次計價
+                    df_plans, _ = compare_plans(df_history, start_date, end_date)
+                    st.markdown("#### 📋 多方案比較")
+                    st.dataframe(df_plans.style.format("{:,.0f}"), use_container_width=True)
+
+        # --- 敏感度分析：費率調整 x 尖峰時段位移 (依資料版本快取，可即時調整) ---
+        with st.expander("🔬 電價敏感度分析 (時間電價費率 / 尖峰時段 / 每月預算)"):
+            c1, c2 = st.columns(2)
+            with c1:
+                peak_range = st.slider("尖峰費率調整 (%)", -30, 30, (-20, 20), step=5)
+                off_peak_pct = st.slider("離峰費率調整 (%)", -30, 30, 0, step=5)
+            with c2:
+                shift_range = st.slider("尖峰時段位移 (小時)", -4, 4, (-3, 3))
+                budget = st.number_input("每月電費預算 (元)", value=1500, step=100)
+            peak_pcts = np.arange(peak_range[0], peak_range[1] + 1, 5)
+            sweep = tariff_sensitivity(
+                df_history, start_date, end_date,
+                peak_scales=1 + peak_pcts / 100, off_peak_scales=[1 + off_peak_pct / 100],
+                peak_shifts=np.arange(shift_range[0], shift_range[1] + 1), budgets=[budget])
+            if sweep is None:
+                st.error("選取範圍無資料。")
+            else:
+                saving = sweep.reference_cost - sweep.total_cost[:, 0, :]
+                fig_heat = px.imshow(saving, x=[f"{s:+d}h" for s in sweep.axes['peak_shift']],
+                                     y=[f"{p:+d}%" for p in peak_pcts], aspect="auto",
+                                     color_continuous_scale="RdYlGn", template="plotly_dark",
+                                     labels={'x': '尖峰時段位移', 'y': '尖峰費率調整', 'color': '比累進省 (元)'})
+                fig_heat.update_layout(title=f"時間電價相對累進電價可省金額 ({sweep.n_months} 個月)")
+                st.plotly_chart(fig_heat, use_container_width=True)
+                over = sweep.months_over_budget[:, 0, :, 0]
+                st.caption(f"單月電費超過 ${budget:,.0f} 的月數：最少 {over.min()} / 最多 {over.max()} 個月 "
+                           f"(共 {sweep.n_months} 個月)")
+
+        # --- 移轉用電模擬：每天把部分用電挪到深夜離峰，可以省多少 ---
+        with st.expander("🔌 移轉用電模擬 (洗衣、烘衣、熱水器、電動車充電...)"):
+            c1, c2 = st.columns(2)
+            with c1:
+                shift_kwh = st.slider("每天移到深夜 (0~6 時) 的用電 (kWh)", 0.0, 10.0, 2.0, step=0.5)
+            with c2:
+                capacity = st.number_input("深夜用電功率上限 (kW，0 = 不限制)", value=0.0, step=0.5)
+            plan_names = [p['name'] for p in DEFAULT_PLANS]
+            current_plan = st.radio("目前的電價方案", plan_names, index=plan_names.index(CURRENT_PLAN), horizontal=True)
+            frontier = load_shift_frontier(df_history, start_date, end_date,
+                                           capacity_kw=capacity if capacity > 0 else None, current_plan=current_plan)
+            if frontier is None:
+                st.error("選取範圍無資料。")
+            else:
+                row = frontier.loc[shift_kwh]
+                c1, c2, c3, c4 = st.columns(4)
+                c1.metric("建議移轉時段", row['source'])
+                c2.metric("實際可移轉", f"{row['moved_kwh']:,.0f} kWh")
+                c3.metric(f"移轉後仍用{current_plan}", f"省 ${row['saving']:,.0f}")
+                c4.metric(f"最省方案：{row['best_plan']}", f"${row['best_cost']:,.0f}", f"省 ${row['best_saving']:,.0f}",
+                          delta_color="normal")
+                if not (frontier['saving'] > 0).any():
+                    st.caption(f"{current_plan}不分時段計價，移轉用電時段不會改變電費；改用時間電價才有節省。")
+                fig_frontier = px.line(frontier.reset_index(), x='kwh_per_day', y='saving', markers=True,
+                                       hover_data=['source', 'best_plan'], template="plotly_dark",
+                                       labels={'kwh_per_day': '每日移轉量 (kWh)', 'saving': f'{current_plan}可節省 (元)'})
+                st.plotly_chart(fig_frontier, use_container_width=True)
+
     # ==========================================
     # Tab 3: 異常耗電偵測 (已修正 x='timestamp')
     # ==========================================
@@ -187,22 +266,30 @@ def show_analysis_page():
         st.subheader("⚠️ AI 用電異常分析")
         st.markdown("利用統計模型偵測歷史數據中的**異常高耗電**事件。")
         
+        anomaly_method = st.radio("基準", ["每週時段基準 (季節 x 星期 x 小時)", "一週滑動平均"], horizontal=True)
+        
         if st.button("🔍 掃描異常事件"):
             with st.spinner("正在掃描歷史數據..."):
-                # 簡單的異常偵測邏輯 (Rolling Mean + 2.5*Std)
-                df_anom = df_history.copy()
-                window = 96 * 7 # 一週
-                df_anom['mean'] = df_anom['power_kW'].rolling(window=window, min_periods=1).mean()
-                df_anom['std'] = df_anom['power_kW'].rolling(window=window, min_periods=1).std()
-                df_anom['threshold'] = df_anom['mean'] + 2.5 * df_anom['std']
-                
-                anomalies = df_anom[df_anom['power_kW'] > df_anom['threshold']]
+                if anomaly_method.startswith("每週時段"):
+                    # 預先算好的 (季節, 每週第幾小時) 中位數 / MAD 門檻：整段歷史是一次查表 + 比較，
+                    # 傍晚尖峰這類每天固定出現的高用電不會被當成異常
+                    baseline = get_seasonal_baseline()
+                    baseline.update(get_store())
+                    anomalies = baseline.scan(df_history)
+                    columns = ['power_kW', 'baseline', 'threshold']
+                else:
+                    # 串流偵測 (一週滑動平均 + 2.5*Std)：背景排程每次輪詢只評分新進的小時，
+                    # 這裡補上尚未評分的部分 (通常沒有) 後直接讀事件紀錄
+                    detector = get_anomaly_detector()
+                    detector.update(get_store())
+                    anomalies = detector.events()
+                    columns = ['power_kW', 'mean', 'threshold']
                 
                 if anomalies.empty:
                     st.success("✅ 檢測完畢，未發現顯著異常。")
                 else:
                     st.warning(f"⚠️ 偵測到 {len(anomalies)} 筆異常高耗電紀錄！")
-                    st.dataframe(anomalies[['power_kW', 'mean', 'threshold']].style.format("{:.2f}"))
+                    st.dataframe(anomalies[columns].style.format("{:.2f}"))
                     
                     # 畫圖
                     st.markdown("#### 異常點分佈圖")
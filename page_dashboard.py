@@ -5,8 +5,10 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import numpy as np 
+import time
 
 from app_utils import load_data, get_core_kpis
+from shared_dataset import get_dataset, get_snapshot, is_current
 
 # --- 模擬帳單週期與費率計算函式 ---
 def get_billing_status(current_kwh, predicted_kwh_add=0):
@@ -42,14 +44,23 @@ def show_dashboard_page():
     """
     顯示「用電儀表板」的內容
     """
-    # --- 1. 嘗試從 Session State 獲取最新的合併數據 ---
-    if "current_data" in st.session_state and st.session_state.current_data is not None:
-        df_history = st.session_state.current_data
-        data_source_msg = "🟢 即時數據 (Live Data)"
+    # --- 1. 從全行程共用的資料集取得最新的合併數據 (session 只持有版本號) ---
+    if st.session_state.get("data_version") is not None:
+        df_history = get_dataset()
+        data_source_msg = "🟢 即時數據 (Live Data)" if is_current(st.session_state.data_version) else "🟢 即時數據 (已更新)"
     else:
         # Fallback 到讀取 CSV
         df_history = load_data()
         data_source_msg = "🟠 歷史存檔 (Offline Data)"
+    # 預測由背景排程產生，頁面只讀目前的快照 (不會等推論)
+    snapshot = get_snapshot()
+    prediction_result = snapshot.result if snapshot is not None else None
+    if snapshot is not None:
+        age_minutes = (time.time() - snapshot.created_at) / 60
+        watermark = f"{snapshot.watermark:%m/%d %H:%M}" if snapshot.watermark is not None else "-"
+        forecast_msg = f"AI 預測快照：{age_minutes:.0f} 分鐘前更新 (資料至 {watermark})"
+    else:
+        forecast_msg = "AI 預測計算中..."
     
     if df_history is None or df_history.empty:
         st.warning("儀表板無資料可顯示。")
@@ -58,7 +69,7 @@ def show_dashboard_page():
     kpis = get_core_kpis(df_history)
 
     st.title("💡 家庭智慧電管家")
-    st.caption(f"{data_source_msg} | AI 滾動修正模組：Online") 
+    st.caption(f"{data_source_msg} | AI 滾動修正模組：Online | {forecast_msg}") 
 
     if not kpis['status_data_available']:
         st.warning("資料量不足，部分指標可能無法計算。")
@@ -70,8 +81,8 @@ def show_dashboard_page():
     
     # 計算未來 24 小時預測總量 (如果有)
     pred_sum_24h = 0
-    if "prediction_result" in st.session_state and st.session_state.prediction_result is not None:
-        pred_sum_24h = st.session_state.prediction_result['預測值'].sum()
+    if prediction_result is not None:
+        pred_sum_24h = prediction_result['預測值'].sum()
 
     bill_status = get_billing_status(kpis['kwh_this_month_so_far'], predicted_kwh_add=pred_sum_24h)
     
@@ -153,8 +164,8 @@ def show_dashboard_page():
         
         # 2. 準備預測資料
         df_pred_plot = pd.DataFrame()
-        if "prediction_result" in st.session_state and st.session_state.prediction_result is not None:
-            pred_res = st.session_state.prediction_result.copy()
+        if prediction_result is not None:
+            pred_res = prediction_result.copy()
             
             # 【關鍵修改】讓預測線跟歷史線「無縫接軌」
             # 我們把歷史數據的最後一個點，加到預測數據的最前面，這樣圖表中間就不會斷掉
@@ -3,7 +3,7 @@ from datetime import timedelta, datetime
 import pandas as pd
 
 # 匯入共用函式
-from app_utils import load_data, get_core_kpis, analyze_pricing_plans
+from app_utils import load_data, get_core_kpis, analyze_pricing_period
 
 # [模擬函式] 取得預算狀態
 def get_budget_health(current_kwh):
@@ -38,14 +38,13 @@ def show_home_page():
     # 電價分析
     last_date = df_history.index.max().date()
     start_date = last_date - timedelta(days=29)
-    analysis_df = df_history.loc[start_date.strftime('%Y-%m-%d'):last_date.strftime('%Y-%m-%d')].copy()
     plan_savings = 0
-    if not analysis_df.empty:
-        try:
-            res, _ = analyze_pricing_plans(analysis_df)
+    try:
+        res, _ = analyze_pricing_period(df_history, start_date, last_date)
+        if res is not None:
             plan_savings = res['cost_progressive'] - res['cost_tou']
-        except:
-            pass
+    except:
+        pass
 
     # --- 1. AI 總結語 ---
     welcome_msg = ""
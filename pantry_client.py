@@ -0,0 +1,133 @@
+# pantry_client.py
+import time
+import threading
+import concurrent.futures
+from collections import namedtuple
+import requests
+from requests.adapters import HTTPAdapter
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+PANTRY_BASE_URL = "https://getpantry.cloud/apiv1/pantry"
+LIVE_DATA_URL = "https://getpantry.cloud/apiv1/pantry/6e282296-e38a-454b-9895-a86d12a82731/basket/new"
+MAX_CONCURRENT_FETCHES = 4 # 同時進行的請求上限 (Pantry 對併發很敏感，不宜開太大)
+
+_session = None
+_session_lock = threading.Lock()
+
+# ==========================================
+# 🔌 共用連線池 (Keep-Alive Session)
+# ==========================================
+def get_session():
+    """
+    回傳整個行程共用的 requests.Session。
+    所有 basket 請求共用同一組 keep-alive 連線，省去每次重新 TCP/TLS 握手。
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_FETCHES)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+class RateLimitGate:
+    """
+    退避閘門：任何一條執行緒收到 429 或請求失敗，整個執行緒池都會一起暫停，
+    避免其他執行緒繼續轟炸 API 而延長限流時間。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def wait(self):
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def backoff(self, seconds):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+_rate_gate = RateLimitGate()
+
+# ==========================================
+# 📥 Basket 抓取
+# ==========================================
+def basket_url(pantry_id: str, basket_name: str, base_url: str = PANTRY_BASE_URL):
+    return f"{base_url}/{pantry_id}/basket/{basket_name}"
+
+# status: "ok" (取得資料) / "missing" (404，該季度不存在) / "error" (網路錯誤或重試用盡)
+BasketResult = namedtuple("BasketResult", ["status", "data"])
+
+def fetch_basket_result(pantry_id: str, basket_name: str, max_retries: int = 3, base_url: str = PANTRY_BASE_URL,
+                        raw: bool = False):
+    """raw=True 時 data 為未解碼的原始 bytes，交給 pantry_parser.parse_basket_bytes 串流解析"""
+    url = basket_url(pantry_id, basket_name, base_url)
+    session = get_session()
+    for attempt in range(max_retries):
+        _rate_gate.wait()
+        try:
+            r = session.get(url, timeout=10)
+            if r.status_code == 200:
+                if raw:
+                    return BasketResult("ok", r.content)
+                try:
+                    return BasketResult("ok", r.json())
+                except ValueError:
+                    return BasketResult("error", None)
+            if r.status_code == 404:
+                return BasketResult("missing", None) # 該季度資料不存在 (例如未來的時間)
+            if r.status_code == 429: # Too Many Requests -> 整個池一起退避
+                _rate_gate.backoff(1.0 * (attempt + 1))
+                continue
+        except Exception:
+            pass
+        # 網路錯誤或其他失敗狀態 (例如 5xx)：同樣經由閘門退避，避免 N 條執行緒同時失敗後又同時重試
+        if attempt + 1 < max_retries:
+            _rate_gate.backoff(1.0)
+    return BasketResult("error", None)
+
+def fetch_basket(pantry_id: str, basket_name: str, max_retries: int = 3, base_url: str = PANTRY_BASE_URL):
+    return fetch_basket_result(pantry_id, basket_name, max_retries, base_url).data
+
+def fetch_json(url: str, timeout: float = 5):
+    """以共用連線抓取單一 JSON (例如 LIVE_DATA_URL)，失敗時回傳 None"""
+    _rate_gate.wait()
+    try:
+        r = get_session().get(url, timeout=timeout)
+        if r.status_code == 429:
+            _rate_gate.backoff(1.0)
+            return None
+        return r.json()
+    except Exception:
+        return None
+
+def fetch_baskets(pantry_id: str, basket_names, on_done=None,
+                  max_workers: int = MAX_CONCURRENT_FETCHES, base_url: str = PANTRY_BASE_URL,
+                  fetcher=fetch_basket):
+    """
+    以有上限的執行緒池同時抓取多個 basket。
+    on_done(done_count, total, basket_name) 會在「呼叫端執行緒」中依完成順序被呼叫，
+    因此可以安全地在裡面更新 Streamlit 進度條。
+    回傳 dict，順序與 basket_names 相同；fetcher 可換成 fetch_basket_result 以區分 404 與錯誤。
+    """
+    basket_names = list(basket_names)
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(fetcher, pantry_id, name, base_url=base_url): name
+            for name in basket_names
+        }
+        for done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+            name = futures[future]
+            results[name] = future.result()
+            if on_done:
+                on_done(done, len(futures), name)
+    return {name: results[name] for name in basket_names}
@@ -0,0 +1,571 @@
+# pantry_parser.py
+import re
+import json
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from energy_grid import DAY_NS
+
+# ==========================================
+# 🧩 Pantry JSON -> DataFrame 解析
+# (原本位於 model_service，抽出來讓 app_utils / 同步層也能共用，且不必匯入 TensorFlow)
+# ==========================================
+def find_data_list(data_dict):
+    target_key = "listAMIBase15MinData"
+    if target_key in data_dict:
+        return data_dict[target_key], None
+    for key, value in data_dict.items():
+        date_match = re.match(r"^\d{4}-\d{2}-\d{2}$", str(key))
+        current_date = key if date_match else None
+        if isinstance(value, dict):
+            found, sub_date = find_data_list(value)
+            if found: return found, (sub_date if sub_date else current_date)
+        if isinstance(value, list) and len(value) > 0 and current_date:
+            if isinstance(value[0], dict) and ("power" in value[0] or "power_kW" in value[0]):
+                return value, current_date
+    return None, None
+
+# --- 時間欄位：先判斷格式一次，再整欄向量化轉換 ---
+FULL_TIMESTAMP_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M",
+                          "%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M"]
+NaT_NS = np.iinfo(np.int64).min
+# ISO 日期整數運算用的查表 (datetime64[ns] 可表示的年份 1678~2261；月份以 1~12 索引)
+_MIN_YEAR = 1678
+_YEAR_START_DAY = (np.arange(_MIN_YEAR, 2263) - 1970).astype("datetime64[Y]").astype("datetime64[D]").astype(np.int64)
+_LEAP_YEAR = np.diff(_YEAR_START_DAY) == 366
+_YEAR_START_DAY = _YEAR_START_DAY[:-1]
+_DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+_DAYS_BEFORE_MONTH = np.concatenate([[0], np.cumsum(_DAYS_IN_MONTH[:-1])])
+
+def detect_timestamp_layout(columns, date_context=None):
+    """回傳 'full_timestamp' / 'date_time' / 'context_time' / 'time_only'，沒有時間資訊時回傳 None"""
+    if 'full_timestamp' in columns:
+        return 'full_timestamp' # 優先使用完整的 timestamp 欄位
+    if 'date' in columns and 'time' in columns:
+        return 'date_time' # 資料裡自帶 date 欄位
+    if 'time' in columns:
+        return 'context_time' if date_context else 'time_only'
+    return None
+
+def _as_text(values):
+    values = np.asarray(values)
+    if values.dtype.kind == "S":
+        return np.char.decode(values, "utf-8")
+    return pd.Index(values).astype(str)
+
+def _detect_format(values, candidates):
+    """用第一個非空值找出符合的明確格式，找不到時回傳 None (交給 pandas 推斷)"""
+    sample = pd.Series(values).dropna()
+    if sample.empty:
+        return None
+    first = sample.iloc[0]
+    first = first.decode("utf-8") if isinstance(first, bytes) else str(first)
+    for fmt in candidates:
+        try:
+            datetime.strptime(first, fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+def _factorized_ns(values, parse_uniques):
+    """
+    AMI 資料的日期與時刻重複率極高 (一季只有約 90 個日期、96 個時刻)，
+    先 factorize 只解析不重複的值，再用整數索引展開回每一列。
+    回傳 int64 ns 陣列，無法解析者為 NaT 的整數值。
+    """
+    codes, uniques = pd.factorize(np.asarray(values))
+    parsed = parse_uniques(_as_text(uniques))
+    out = np.full(len(codes), NaT_NS, dtype=np.int64)
+    ok = codes >= 0
+    out[ok] = parsed[codes[ok]]
+    return out
+
+def _parse_dates_ns(text):
+    return pd.to_datetime(text, errors='coerce').asi8
+
+def _parse_times_ns(text):
+    # 以 1970-01-01 為基準解析時刻，得到「當天經過的 ns」；24:00 等非法值與舊版一樣視為 NaT
+    parsed = pd.to_datetime(pd.Index(text).map(lambda t: f"1970-01-01 {t}"), errors='coerce')
+    return parsed.asi8
+
+def build_timestamps(layout, full_timestamp=None, date=None, time=None, date_context=None):
+    """依 detect_timestamp_layout 的結果組出 datetime64[ns] 陣列 (無法解析者為 NaT)"""
+    if layout == 'full_timestamp':
+        ts_ns = _iso_timestamps_ns(full_timestamp) # 常見的 ISO 定寬格式：與 date + time 相同的整數運算
+        if ts_ns is not None:
+            return ts_ns.view("datetime64[ns]")
+        fmt = _detect_format(full_timestamp, FULL_TIMESTAMP_FORMATS)
+        text = _as_text(full_timestamp) if np.asarray(full_timestamp).dtype.kind == "S" else full_timestamp
+        return pd.to_datetime(text, format=fmt, errors='coerce').to_numpy(dtype="datetime64[ns]")
+
+    if layout == 'date_time':
+        date_ns = _iso_dates_ns(date) # ISO 定寬格式直接整數運算，其他格式才逐個不重複值交給 pandas
+        if date_ns is None:
+            date_ns = _factorized_ns(date, _parse_dates_ns)
+    elif layout == 'context_time':
+        # 如果有外層包裹的日期 Key，就用它
+        base = pd.to_datetime(date_context, errors='coerce')
+        date_ns = np.full(len(time), NaT_NS if pd.isna(base) else base.value, dtype=np.int64)
+    elif layout == 'time_only':
+        # ⚠️ 危險區：沒有日期 Key，也沒有 date 欄位，這裡確實會變成今天
+        # 但大多數歷史資料應該都會有 date 欄位
+        return pd.to_datetime(pd.Series(time), errors='coerce').to_numpy(dtype="datetime64[ns]")
+    else:
+        raise ValueError(f"未知的時間格式: {layout}")
+
+    time_ns = _clock_times_ns(time)
+    if time_ns is None:
+        time_ns = _factorized_ns(time, _parse_times_ns)
+    valid = (date_ns != NaT_NS) & (time_ns != NaT_NS)
+    return np.where(valid, date_ns + time_ns, NaT_NS).view("datetime64[ns]")
+
+def clean_power_frame(timestamps, power, is_missing=None, temperature=None, humidity=None):
+    """
+    一次完成資料清洗：isMissingData 與 0 值視為缺值、丟掉無法解析的時間、排序後前後補值。
+    temperature 不存在時補上預設溫濕度 (25°C / 70%)。
+    """
+    power = pd.to_numeric(pd.Series(power), errors='coerce').to_numpy(dtype=np.float64)
+    bad = power == 0
+    if is_missing is not None:
+        bad |= np.asarray(is_missing, dtype=bool)
+    power = np.where(bad, np.nan, power)
+
+    n = len(power)
+    if temperature is None:
+        temperature = np.full(n, 25.0)
+        humidity = np.full(n, 70.0)
+    elif humidity is None:
+        humidity = np.full(n, np.nan)
+    temperature, humidity = np.asarray(temperature), np.asarray(humidity) # 避免 Series 依舊索引對齊
+
+    df = pd.DataFrame({'power_kW': power, 'temperature': temperature, 'humidity': humidity},
+                      index=pd.DatetimeIndex(timestamps, name='timestamp'))
+    df = df[df.index.notna()].sort_index(kind='stable')
+    df['power_kW'] = df['power_kW'].ffill().bfill()
+    return df
+
+def process_raw_data_to_df(target_list, date_context):
+    """
+    【核心修正】增強時間解析能力，防止散裝資料被誤判為今天
+    時間格式只判斷一次，之後整欄以明確格式 / 整數運算轉換，不再逐列組字串。
+    """
+    if not target_list:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(target_list)
+    
+    # 欄位重新命名
+    if 'power' in df.columns:
+        df = df.rename(columns={'power': 'power_kW'})
+    
+    layout = detect_timestamp_layout(df.columns, date_context)
+    if layout is None or 'power_kW' not in df.columns:
+        return pd.DataFrame() # 沒時間資訊，無法處理
+
+    try:
+        timestamps = build_timestamps(layout, full_timestamp=df.get('full_timestamp'), date=df.get('date'),
+                                      time=df.get('time'), date_context=date_context)
+    except Exception as e:
+        print(f"⚠️ 時間解析失敗: {e}")
+        return pd.DataFrame()
+
+    is_missing = None
+    if 'isMissingData' in df.columns:
+        flag = df['isMissingData']
+        is_missing = ((flag == 1) | (flag == '1')).to_numpy()
+
+    return clean_power_frame(timestamps, df['power_kW'], is_missing,
+                             df.get('temperature'), df.get('humidity'))
+
+def is_flat_record_list(items):
+    """判斷是否為「散裝」格式：list 裡直接就是含 power 欄位的紀錄"""
+    return (isinstance(items, list) and len(items) > 0 and isinstance(items[0], dict)
+            and ("power" in items[0] or "power_kW" in items[0]))
+
+def parse_live_payload(data_json):
+    """
+    解析 LIVE_DATA_URL 回傳的 JSON。
+    status != 1 或找不到資料時回傳 None。
+    """
+    if not isinstance(data_json, dict) or data_json.get('status') != 1:
+        return None
+
+    raw_data = data_json.get('data')
+    # 檢查散裝
+    if is_flat_record_list(raw_data):
+        return process_raw_data_to_df(raw_data, None)
+
+    # 檢查包裝
+    target_list = []
+    date_context = None
+    if isinstance(raw_data, list) and len(raw_data) > 0:
+        target_list, date_context = find_data_list(raw_data[0])
+    elif isinstance(raw_data, dict):
+        target_list, date_context = find_data_list(raw_data)
+
+    if target_list:
+        return process_raw_data_to_df(target_list, date_context)
+    return None
+
+def parse_basket_payload(data):
+    """
+    解析歷史季度 basket ({"data": [...]})，支援散裝與「日期 Key 包裝」兩種格式。
+    回傳已排序、去重的 DataFrame (可能為空)。
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("data"), list):
+        return pd.DataFrame()
+
+    raw_items = data["data"]
+    frames = []
+    if is_flat_record_list(raw_items):
+        # 這裡傳入 None，強制 process_raw_data_to_df 去找內部的 date 欄位
+        df = process_raw_data_to_df(raw_items, None)
+        if not df.empty:
+            frames.append(df)
+    else:
+        for item in raw_items:
+            if not isinstance(item, dict):
+                continue
+            target_list, date_context = find_data_list(item)
+            if target_list:
+                sub_df = process_raw_data_to_df(target_list, date_context)
+                if not sub_df.empty:
+                    frames.append(sub_df)
+
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames).sort_index(kind='stable')
+    return df[~df.index.duplicated(keep='first')]
+
+# ==========================================
+# 🌊 串流解析 (不建立 list of dicts)
+# ==========================================
+STREAM_SEGMENT_BYTES = 1 << 20 # 每次掃描約 1MB，暫存的位置陣列大小與整體 payload 無關
+MAX_VALUE_BYTES = 64 # 單一欄位值的最大長度，超過時退回完整 JSON 解析
+
+_FLAT_OBJECT_RE = re.compile(rb'\{[^{}\[\]]*\}')
+_COMPLETE_TAIL_RE = re.compile(rb'\]\s*\}\s*$') # 完整的 basket 以 ...]} 結尾
+_NUMERIC_FIELDS = ("power", "isMissingData", "temperature", "humidity")
+_FIELD_ALIASES = {"power_kW": "power"}
+_WANTED_FIELDS = {"full_timestamp", "date", "time", "power", "isMissingData", "temperature", "humidity"}
+_STRIP_CHARS = b' \t\r\n"'
+
+_LBRACE, _RBRACE, _LBRACKET, _RBRACKET, _COLON, _COMMA, _QUOTE = b'{}[]:,"'
+
+class StreamParseUnsupported(ValueError):
+    """payload 不是「扁平紀錄 + 每筆欄位順序一致」的格式，需要退回完整 JSON 解析"""
+
+class BasketParseError(ValueError):
+    """basket 內容不是合法的 {"data": [...]} JSON (例如被截斷、或拿到 HTML 錯誤頁)，應視為抓取失敗"""
+
+def _record_schema(payload):
+    """以第一筆含 power 的扁平紀錄決定欄位順序，回傳 [(key bytes, 欄位名稱)]"""
+    for m in _FLAT_OBJECT_RE.finditer(payload):
+        if b'"power' not in m.group(0):
+            continue
+        try:
+            first = json.loads(m.group(0))
+        except ValueError:
+            break
+        schema = [(b'"' + key.encode() + b'"', _FIELD_ALIASES.get(key, key)) for key in first]
+        if "power" not in [name for _, name in schema]:
+            break
+        return schema
+    raise StreamParseUnsupported("找不到扁平的 power 紀錄")
+
+def _iter_segments(payload, segment_bytes):
+    """以紀錄結尾的 '}' 為界切段，保證每段都只包含完整的紀錄"""
+    view = memoryview(payload)
+    start, n = 0, len(payload)
+    while start < n:
+        end = min(start + segment_bytes, n)
+        if end < n:
+            cut = payload.rfind(b"}", start, end)
+            end = n if cut < 0 else cut + 1
+        yield view[start:end]
+        start = end
+
+def _key_mismatch(padded, key_starts, key):
+    """
+    每筆紀錄在 key_starts 的 bytes 是否都等於 key：每 8 bytes 以一個 uint64 比較
+    (padded 尾端至少補 8 個 0，最後一段超出 key 的部分以遮罩忽略)。
+    """
+    words = np.ndarray((len(padded) - 7,), dtype=np.uint64, buffer=padded, strides=(1,)) # 任意位移的 8-byte 視圖
+    for offset in range(0, len(key), 8):
+        chunk = key[offset:offset + 8]
+        expected = np.frombuffer(chunk.ljust(8, b"\0"), dtype=np.uint64)[0]
+        mask = np.frombuffer(b"\xff" * len(chunk) + b"\0" * (8 - len(chunk)), dtype=np.uint64)[0]
+        if ((words[key_starts + offset] & mask) != expected).any():
+            return True
+    return False
+
+def _field_spans(padded, n_bytes, schema):
+    """
+    找出一段 bytes (padded[:n_bytes]，尾端補零) 中所有扁平紀錄的欄位值範圍，
+    回傳 (starts, ends)，形狀皆為 (筆數, 欄位數)。
+    結構字元前面有偶數個引號才算在字串外 (引號的累計 XOR 只查結構字元的位置)；
+    每筆紀錄內的結構字元必須剛好是「冒號、逗號」交替，且每個冒號前的 key 與 schema 相同，
+    否則丟出 StreamParseUnsupported。
+    """
+    buf = padded[:n_bytes]
+    in_string = np.logical_xor.accumulate(buf == _QUOTE)
+    marks = np.flatnonzero((buf == _LBRACE) | (buf == _RBRACE) | (buf == _COLON) | (buf == _COMMA)
+                           | (buf == _LBRACKET) | (buf == _RBRACKET))
+    marks = marks[~in_string[marks]]
+    kind = buf[marks]
+    braces = np.flatnonzero((kind != _COLON) & (kind != _COMMA))
+    flat = (kind[braces[:-1]] == _LBRACE) & (kind[braces[1:]] == _RBRACE) # 中間沒有巢狀結構的 {...}
+    opens, closes = braces[:-1][flat], braces[1:][flat] # marks 中的索引
+    n_fields = len(schema)
+    if len(opens) == 0:
+        return np.empty((0, n_fields), dtype=np.intp), np.empty((0, n_fields), dtype=np.intp)
+
+    pattern = np.tile([_COLON, _COMMA], n_fields)[:2 * n_fields - 1]
+    if (closes - opens != len(pattern) + 1).any():
+        raise StreamParseUnsupported("紀錄的欄位數不一致")
+    inner = opens[:, None] + 1 + np.arange(len(pattern)) # (筆數, 2K-1)：每筆紀錄內的冒號 / 逗號
+    if (kind[inner] != pattern).any():
+        raise StreamParseUnsupported("紀錄的欄位數不一致")
+    colons = marks[inner[:, 0::2]]
+
+    # 需要的欄位：冒號前緊接著的 bytes 必須是對應的 "key" (欄位順序不一致時退回完整 JSON 解析)
+    for j, (key, name) in enumerate(schema):
+        if name in _WANTED_FIELDS and _key_mismatch(padded, colons[:, j] - len(key), key):
+            raise StreamParseUnsupported("部分紀錄的欄位順序不一致")
+    ends = np.concatenate([marks[inner[:, 1::2]], marks[closes][:, None]], axis=1)
+    return colons + 1, ends
+
+def _span_values(windows, starts, ends, strip=True):
+    """
+    把每筆的 [start, end) 收成一個定寬 bytes 陣列 (右側補 NUL)；strip 時去掉空白與引號。
+    windows 為 sliding_window_view(buf, MAX_VALUE_BYTES)，每筆只複製一段連續的 bytes。
+    """
+    lengths = ends - starts
+    width = int(lengths.max())
+    if width > MAX_VALUE_BYTES:
+        raise StreamParseUnsupported("欄位值過長")
+    block = windows[starts, :width]
+    block[np.arange(width) >= lengths[:, None]] = 0
+    values = block.view(f"S{width}").ravel()
+    return np.char.strip(values, _STRIP_CHARS) if strip else values
+
+def _fixed_width(values, width):
+    """bytes 陣列的每個值都剛好 width 個字元時，回傳 (筆數, width) 的 uint8 矩陣，否則回傳 None"""
+    values = np.asarray(values)
+    if values.dtype.kind != "S" or len(values) == 0 or values.dtype.itemsize < width:
+        return None
+    block = values.view(np.uint8).reshape(len(values), values.dtype.itemsize)
+    if not block[:, width - 1].all() or block[:, width:].any(): # 比 width 短 (右側補 NUL) 或比 width 長
+        return None
+    return block[:, :width]
+
+def _ascii_block(values):
+    """
+    str 陣列的每個值都是同樣長度的 ASCII 字串時，回傳 (筆數, 長度) 的 uint8 矩陣，否則 (含缺值) 回傳 None。
+    以換行串接後一次編碼 (比逐個 astype("S") 快)：換行剛好 n 個且都落在每列最後一格，每個值的長度就都相同。
+    """
+    n = len(values)
+    if n == 0:
+        return None
+    try:
+        buf = ("\n".join(values) + "\n").encode("ascii")
+    except (TypeError, UnicodeEncodeError):
+        return None
+    if len(buf) % n or buf.count(b"\n") != n:
+        return None
+    block = np.frombuffer(buf, dtype=np.uint8).reshape(n, len(buf) // n)
+    if (block[:, -1] != ord("\n")).any():
+        return None
+    return block[:, :-1]
+
+def _text_block(values, widths):
+    """bytes 或 str 陣列的每個值都是同一個寬度 (widths 之一) 時，回傳 (筆數, 寬度) 的 uint8 矩陣，否則回傳 None"""
+    values = np.asarray(values)
+    if values.dtype.kind in "OU":
+        block = _ascii_block(values)
+        return block if block is not None and block.shape[1] in widths else None
+    for width in widths:
+        block = _fixed_width(values, width)
+        if block is not None:
+            return block
+    return None
+
+def _digits(block, start, count):
+    """定寬矩陣中 [start, start + count) 的十進位整數；有任何非數字字元時回傳 None"""
+    digits = block[:, start:start + count] - np.uint8(ord("0")) # 非數字字元在 uint8 下會繞回 > 9
+    if (digits > 9).any():
+        return None
+    return digits @ (10 ** np.arange(count - 1, -1, -1, dtype=np.int64))
+
+def _unique_rows(block, columns):
+    """
+    每列取 columns 這幾格 (最多 8 個，分隔字元已另外檢查過) 打包成一個 uint64 後 factorize。
+    AMI 資料一季只有約 90 個日期、96 個時刻：回傳 (每列的代碼, 不重複的列 (不重複數, len(columns)))，
+    之後的整數運算只做在不重複的列上，再以代碼展開回每一列。
+    """
+    packed = np.zeros((len(block), 8), dtype=np.uint8)
+    packed[:, :len(columns)] = block[:, columns]
+    codes, uniques = pd.factorize(packed.view(np.uint64).ravel())
+    return codes, np.ascontiguousarray(uniques, dtype=np.uint64).view(np.uint8).reshape(-1, 8)
+
+def _date_block_ns(block):
+    """(筆數, 10) 的 'YYYY-MM-DD' 矩陣 -> ns (不存在的日期為 NaT)；不是這個格式時回傳 None"""
+    if (block[:, 4] != ord("-")).any() or (block[:, 7] != ord("-")).any():
+        return None
+    codes, uniques = _unique_rows(block, [0, 1, 2, 3, 5, 6, 8, 9])
+    year, month, day = _digits(uniques, 0, 4), _digits(uniques, 4, 2), _digits(uniques, 6, 2)
+    if year is None or month is None or day is None:
+        return None
+    year = year - _MIN_YEAR
+    valid = (month >= 1) & (month <= 12) & (year >= 0) & (year < len(_YEAR_START_DAY))
+    year, month = np.where(valid, year, 0), np.where(valid, month, 1)
+    leap = _LEAP_YEAR[year] & (month == 2)
+    valid &= (day >= 1) & (day <= _DAYS_IN_MONTH[month] + leap)
+    # 查表組出 1970-01-01 起算的天數 (不需要逐列做除法 / 取餘數)
+    days = _YEAR_START_DAY[year] + _DAYS_BEFORE_MONTH[month] + (_LEAP_YEAR[year] & (month > 2)) + day - 1
+    return np.where(valid, days * DAY_NS, NaT_NS)[codes]
+
+def _clock_block_ns(block):
+    """(筆數, 5 或 8) 的 'HH:MM' / 'HH:MM:SS' 矩陣 -> 當天經過的 ns (24:00 等非法值為 NaT)；格式不符時回傳 None"""
+    width = block.shape[1]
+    if (block[:, 2] != ord(":")).any() or (width == 8 and (block[:, 5] != ord(":")).any()):
+        return None
+    codes, uniques = _unique_rows(block, [0, 1, 3, 4, 6, 7] if width == 8 else [0, 1, 3, 4])
+    hour, minute = _digits(uniques, 0, 2), _digits(uniques, 2, 2)
+    second = _digits(uniques, 4, 2) if width == 8 else 0
+    if hour is None or minute is None or second is None:
+        return None
+    if width == 8 and (second >= 60).any():
+        return None # 秒數 60 / 61：pandas 會進位到下一分鐘，交給 pandas 保持相同結果
+    valid = (hour < 24) & (minute < 60)
+    return np.where(valid, ((hour * 60 + minute) * 60 + second) * 1_000_000_000, NaT_NS)[codes]
+
+def _iso_dates_ns(values):
+    """
+    'YYYY-MM-DD' 定寬 bytes 直接以整數運算轉成 ns (不存在的日期為 NaT，與 pd.to_datetime 相同)；
+    不是這個格式時回傳 None。
+    """
+    block = _text_block(values, (10,))
+    return None if block is None else _date_block_ns(block)
+
+def _clock_times_ns(values):
+    """
+    'HH:MM' / 'HH:MM:SS' 定寬 bytes 直接轉成「當天經過的 ns」(24:00 等非法值為 NaT)；
+    不是這兩種格式時回傳 None。
+    """
+    block = _text_block(values, (5, 8))
+    return None if block is None else _clock_block_ns(block)
+
+def _iso_timestamps_ns(values):
+    """
+    'YYYY-MM-DD HH:MM[:SS]' / 'YYYY-MM-DDTHH:MM[:SS]' 定寬值 (bytes 或 str)：日期與時刻兩段直接在同一個矩陣上
+    以整數運算轉成 ns。每列寬度與分隔字元都相同時才處理，否則 (含缺值、非 ASCII) 回傳 None。
+    """
+    block = _text_block(values, (16, 19))
+    if block is None or (block[:, 10] != block[0, 10]).any() or block[0, 10] not in b" T":
+        return None
+    date_ns, time_ns = _date_block_ns(block[:, :10]), _clock_block_ns(block[:, 11:])
+    if date_ns is None or time_ns is None:
+        return None
+    return np.where((date_ns != NaT_NS) & (time_ns != NaT_NS), date_ns + time_ns, NaT_NS)
+
+def _stream_timestamps(values):
+    """
+    串流解析的時間欄位：只處理 ISO 定寬格式 (date 'YYYY-MM-DD' + time 'HH:MM[:SS]'，
+    或 full_timestamp 'YYYY-MM-DD HH:MM[:SS]' / 'YYYY-MM-DDTHH:MM[:SS]')，以整數運算直接轉成 ns。
+    其他格式丟出 StreamParseUnsupported，交給完整 JSON 解析 (由整份資料判斷一次格式，語意不變)。
+    """
+    if "full_timestamp" in values:
+        ts_ns = _iso_timestamps_ns(values["full_timestamp"])
+        if ts_ns is None:
+            raise StreamParseUnsupported("full_timestamp 不是 ISO 定寬格式")
+        return ts_ns.view("datetime64[ns]")
+    date_ns, time_ns = _iso_dates_ns(values["date"]), _clock_times_ns(values["time"])
+    if date_ns is None or time_ns is None:
+        raise StreamParseUnsupported("日期 / 時刻不是 ISO 定寬格式")
+    valid = (date_ns != NaT_NS) & (time_ns != NaT_NS)
+    return np.where(valid, date_ns + time_ns, NaT_NS).view("datetime64[ns]")
+
+def _to_float(text):
+    try:
+        return text.astype(np.float64) # 常見情況：全部都是數字 (前後空白不影響轉換)
+    except ValueError:
+        pass
+    text = np.char.strip(text, _STRIP_CHARS)
+    text[text == b"null"] = b"nan"
+    text[text == b"true"] = b"1"
+    text[text == b"false"] = b"0"
+    try:
+        return text.astype(np.float64)
+    except ValueError:
+        # 少數非數值字串：交給 pandas 轉換 (與 pd.to_numeric(errors="coerce") 相同)
+        return pd.to_numeric(pd.Series(text.astype("U")), errors="coerce").to_numpy(dtype=np.float64)
+
+def parse_basket_stream(payload, segment_bytes=STREAM_SEGMENT_BYTES):
+    """
+    直接從 basket 的原始 bytes 掃出 timestamp / power / isMissingData / temperature / humidity 欄位，
+    不經過 json.loads 的物件樹，也不建立每筆一個 dict / tuple：
+    先以 "power" 出現次數預先配置各欄陣列，再逐段用 numpy 找出結構字元與欄位值範圍，直接寫入對應位置。
+    只支援扁平紀錄 (每筆都自帶 ISO 格式的 date+time 或 full_timestamp，欄位順序一致)，
+    其他格式丟出 StreamParseUnsupported。
+    結果的數值與 parse_basket_payload(json.loads(payload)) 相同 (欄位一律為 float64)。
+    """
+    if b'"power' not in payload:
+        raise StreamParseUnsupported("找不到 power 欄位") # 例如 {"data": []}，交給完整 JSON 解析
+    if _COMPLETE_TAIL_RE.search(payload[-64:]) is None:
+        raise StreamParseUnsupported("payload 結尾不完整") # 可能被截斷，交給完整 JSON 解析判斷
+    schema = _record_schema(payload)
+    names = [name for _, name in schema]
+    if "full_timestamp" not in names and not {"date", "time"} <= set(names):
+        raise StreamParseUnsupported("紀錄沒有自帶日期 (需要外層日期 Key)")
+    wanted = [(j, name) for j, name in enumerate(names) if name in _WANTED_FIELDS]
+
+    # 每一筆紀錄都恰好有一個 power 欄位：依此預先配置輸出陣列
+    n = payload.count(next(key for key, name in schema if name == "power"))
+    timestamps = np.empty(n, dtype="datetime64[ns]")
+    cols = {name: np.empty(n, dtype=np.float64) for _, name in wanted if name in _NUMERIC_FIELDS}
+    total = 0
+    for segment in _iter_segments(payload, segment_bytes):
+        padded = np.zeros(len(segment) + MAX_VALUE_BYTES, dtype=np.uint8) # 尾端補零，讓最後幾筆也有完整的視窗
+        padded[:len(segment)] = np.frombuffer(segment, dtype=np.uint8)
+        starts, ends = _field_spans(padded, len(segment), schema)
+        rows = len(starts)
+        if rows == 0:
+            continue
+        if total + rows > n:
+            raise StreamParseUnsupported("紀錄數與 power 欄位數不一致")
+        windows = np.lib.stride_tricks.sliding_window_view(padded, MAX_VALUE_BYTES)
+        values = {name: _span_values(windows, starts[:, j], ends[:, j], strip=name not in _NUMERIC_FIELDS)
+                  for j, name in wanted}
+        timestamps[total:total + rows] = _stream_timestamps(values)
+        for name, out in cols.items():
+            out[total:total + rows] = _to_float(values[name])
+        total += rows
+
+    # 每一筆含 power 的紀錄都必須被掃到，否則代表有不支援的結構 (例如巢狀或欄位不一致)
+    if total != n:
+        raise StreamParseUnsupported("部分紀錄的欄位順序不一致")
+
+    is_missing = cols["isMissingData"] == 1 if "isMissingData" in cols else None
+    df = clean_power_frame(timestamps, cols["power"], is_missing, cols.get("temperature"), cols.get("humidity"))
+    return df[~df.index.duplicated(keep='first')]
+
+def parse_basket_bytes(payload, streaming=True):
+    """
+    解析 basket 原始 bytes：優先走串流解析，格式不支援時退回完整 JSON 解析。
+    內容不是合法的 {"data": [...]} 時丟出 BasketParseError (與網路錯誤一樣，不能當成「季度沒有資料」)。
+    """
+    if streaming:
+        try:
+            return parse_basket_stream(payload)
+        except StreamParseUnsupported:
+            pass
+    try:
+        data = json.loads(payload)
+    except ValueError as e:
+        raise BasketParseError(f"JSON 解析失敗: {e}") from e
+    if not isinstance(data, dict) or not isinstance(data.get("data"), list):
+        raise BasketParseError("缺少 data 列表")
+    return parse_basket_payload(data)
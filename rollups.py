@@ -0,0 +1,158 @@
+# rollups.py
+import threading
+import numpy as np
+import pandas as pd
+
+from energy_grid import HOUR_NS, DAY_NS
+from tou_engine import tou_peak_mask # 尖離峰規則與 app_utils.get_tou_details 相同
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+ROLLUP_COLUMNS = ("kwh", "peak_kwh", "off_peak_kwh")
+
+# ==========================================
+# 📚 增量維護的用電彙總表
+# ==========================================
+class EnergyRollups:
+    """
+    建立在每小時網格上的彙總表，資料更新時只重算「變動點之後」的部分：
+    - 每小時：kWh 與尖峰 kWh 的前綴和 (任意區間的用電量都是 O(1) 的相減)
+    - 每日 / 每月：kwh、peak_kwh、off_peak_kwh (以陣列儲存，第 i 列 = 起始日 / 月 + i)
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.start_ns = None
+        self.version = None
+        self.kwh = np.empty(0)
+        self.is_peak = np.empty(0, dtype=bool)
+        self.cum_kwh = np.zeros(1)
+        self.cum_peak = np.zeros(1)
+        self.day0 = 0 # 第一天的序號 (epoch 起算天數)
+        self.daily = {c: np.empty(0) for c in ROLLUP_COLUMNS}
+        self.month0 = 0 # 第一個月的序號 (year * 12 + month - 1)
+        self.monthly = {c: np.empty(0) for c in ROLLUP_COLUMNS}
+
+    def __len__(self):
+        return len(self.kwh)
+
+    @classmethod
+    def from_grid(cls, grid):
+        rollups = cls()
+        rollups.update(grid)
+        return rollups
+
+    # --- 更新 ---
+    def _slot_ns(self, slots):
+        return self.start_ns + np.asarray(slots, dtype=np.int64) * HOUR_NS
+
+    def update(self, grid, changed_from_ns=None, version=None):
+        """
+        以最新的 HourlyGrid 更新彙總表。changed_from_ns 為本次最早變動的時間 (None 代表全部重算)。
+        變動點之前的每小時前綴和、每日與每月彙總直接沿用。
+        """
+        with self._lock:
+            n = len(grid)
+            full = (changed_from_ns is None or self.start_ns != grid.start_ns or n < len(self.kwh))
+            if n == 0:
+                self._reset()
+                self.version = version
+                return self
+            if full:
+                self.start_ns = grid.start_ns
+                first = 0
+            else:
+                # 從變動點 (若晚於目前尾端，則以尾端為準) 所在月份的第一個小時開始重算，
+                # 每日 / 每月表就只需要覆寫尾端
+                changed_from_ns = min(changed_from_ns, grid.start_ns + len(self.kwh) * HOUR_NS)
+                changed = pd.Timestamp(max(changed_from_ns, grid.start_ns))
+                month_start = changed.normalize().replace(day=1).value
+                first = int(max(0, (month_start - grid.start_ns) // HOUR_NS))
+
+            slot_ns = self._slot_ns(np.arange(first, n))
+            kwh = np.nan_to_num(np.asarray(grid.kwh[first:n], dtype=np.float64))
+            is_peak = tou_peak_mask(slot_ns)
+
+            self.kwh = np.concatenate([self.kwh[:first], kwh])
+            self.is_peak = np.concatenate([self.is_peak[:first], is_peak])
+            peak_kwh = np.where(is_peak, kwh, 0.0)
+            self.cum_kwh = np.concatenate([self.cum_kwh[:first + 1], self.cum_kwh[first] + np.cumsum(kwh)])
+            self.cum_peak = np.concatenate([self.cum_peak[:first + 1], self.cum_peak[first] + np.cumsum(peak_kwh)])
+
+            # 每日彙總：只重算變動點所在日之後的天數
+            days = slot_ns // DAY_NS
+            if full:
+                self.day0 = int(days[0])
+            d_first = int(days[0]) - self.day0
+            d_codes = days - days[0]
+            n_days = int(d_codes[-1]) + 1
+            day_kwh = np.bincount(d_codes, weights=kwh, minlength=n_days)
+            day_peak = np.bincount(d_codes, weights=peak_kwh, minlength=n_days)
+            self.daily = self._splice(self.daily, d_first, day_kwh, day_peak)
+
+            # 每月彙總：由變動後的每日資料再彙總一次 (first 一定是月初或網格起點)
+            months = self._month_codes(slot_ns[:1])[0]
+            if full:
+                self.month0 = int(months)
+            m_first = int(months) - self.month0
+            day_index = pd.to_datetime((self.day0 + d_first + np.arange(n_days)) * DAY_NS)
+            m_codes = (day_index.year * 12 + day_index.month - 1).to_numpy() - int(months)
+            n_months = int(m_codes[-1]) + 1
+            month_kwh = np.bincount(m_codes, weights=day_kwh, minlength=n_months)
+            month_peak = np.bincount(m_codes, weights=day_peak, minlength=n_months)
+            self.monthly = self._splice(self.monthly, m_first, month_kwh, month_peak)
+
+            self.version = version
+            return self
+
+    @staticmethod
+    def _month_codes(ts_ns):
+        index = pd.DatetimeIndex(np.asarray(ts_ns, dtype=np.int64))
+        return (index.year * 12 + index.month - 1).to_numpy()
+
+    @staticmethod
+    def _splice(table, first, kwh, peak_kwh):
+        return {
+            "kwh": np.concatenate([table["kwh"][:first], kwh]),
+            "peak_kwh": np.concatenate([table["peak_kwh"][:first], peak_kwh]),
+            "off_peak_kwh": np.concatenate([table["off_peak_kwh"][:first], kwh - peak_kwh]),
+        }
+
+    # --- 查詢 ---
+    def slot(self, timestamp):
+        """時間 -> 每小時格子位置 (截斷在 0 ~ len 之間)"""
+        pos = (pd.Timestamp(timestamp).value - self.start_ns) // HOUR_NS
+        return int(min(max(pos, 0), len(self.kwh)))
+
+    def window(self, start_slot, end_slot):
+        """[start_slot, end_slot) 的 (總 kWh, 尖峰 kWh)，O(1)"""
+        start_slot = max(0, start_slot)
+        end_slot = min(len(self.kwh), end_slot)
+        if end_slot <= start_slot:
+            return 0.0, 0.0
+        total = self.cum_kwh[end_slot] - self.cum_kwh[start_slot]
+        peak = self.cum_peak[end_slot] - self.cum_peak[start_slot]
+        return float(total), float(peak)
+
+    def last_hours(self, hours, offset=0):
+        """最後 hours 小時 (往前再跳過 offset 小時) 的 (總 kWh, 尖峰 kWh)"""
+        end = len(self.kwh) - offset
+        return self.window(end - hours, end)
+
+    def daily_frame(self, start=None, end=None):
+        """每日彙總 (index 為日期)，可用 start / end (含) 篩選日期，只讀取範圍內的天數"""
+        n = len(self.daily["kwh"])
+        lo = 0 if start is None else int(min(max(pd.Timestamp(start).value // DAY_NS - self.day0, 0), n))
+        hi = n if end is None else int(min(max(pd.Timestamp(end).value // DAY_NS - self.day0 + 1, 0), n))
+        index = pd.to_datetime((self.day0 + np.arange(lo, max(lo, hi))) * DAY_NS)
+        return pd.DataFrame({c: self.daily[c][lo:max(lo, hi)] for c in ROLLUP_COLUMNS},
+                            index=index.rename("date"))
+
+    def monthly_frame(self):
+        codes = self.month0 + np.arange(len(self.monthly["kwh"]))
+        index = pd.to_datetime({"year": codes // 12, "month": codes % 12 + 1, "day": 1})
+        return pd.DataFrame({c: self.monthly[c] for c in ROLLUP_COLUMNS},
+                            index=pd.DatetimeIndex(index, name="month"))
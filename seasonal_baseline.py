@@ -0,0 +1,176 @@
+# seasonal_baseline.py
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from history_cache import CACHE_DIR, save_columnar, load_columnar, load_history_csv
+from energy_grid import HOUR_NS, DAY_NS, to_hourly_grid
+from tariff_engine import summer_months
+from timeseries_store import HISTORY_CSV
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+BASELINE_DIR = os.path.join(CACHE_DIR, "baseline")
+HOURS_PER_WEEK = 24 * 7
+N_CELLS = 2 * HOURS_PER_WEEK # (非夏月 / 夏月) x 每週第幾小時
+MAD_SCALE = 1.4826 # MAD -> 常態分佈標準差
+ROBUST_Z = 3.5 # 穩健 z 分數超過此值視為異常
+MIN_SCALE_KW = 0.05 # 尺度下限，避免幾乎不變的時段 (MAD = 0) 任何波動都被標記
+MIN_SAMPLES = 4 # 樣本數不足的時段不評分
+REFRESH_ALL_CELLS = 32 # 需要重算的格子超過此數時，改為整份排序一次分組
+
+def baseline_cells(ts_ns):
+    """時間 (int64 奈秒) -> 基準格子：is_summer * 168 + 星期 (Monday = 0) * 24 + 小時"""
+    ts_ns = np.asarray(ts_ns, dtype=np.int64)
+    hour_of_week = ((ts_ns // DAY_NS + 3) % 7) * 24 + (ts_ns // HOUR_NS) % 24 # 1970-01-01 是星期四
+    return summer_months(ts_ns).astype(np.intp) * HOURS_PER_WEEK + hour_of_week
+
+# ==========================================
+# 📏 每週時段 x 季節的穩健基準
+# ==========================================
+class SeasonalBaseline:
+    """
+    每個 (季節, 每週第幾小時) 格子的中位數與 MAD，預先算成門檻表 (median + ROBUST_Z x 尺度)：
+    - 保存整段每小時平均功率 (BASELINE_DIR，欄位式 .npy)，重啟後直接載入；第一次以歷史 CSV 建立。
+    - update() 只比對資料庫中變動過的區段，只重算被改到的格子 (新進一小時 = 重算 1 格)。
+    - 評分是「時間 -> 格子 -> 門檻」的一次 gather 與比較，與歷史長度無關；多戶可疊成矩陣一起比較。
+    """
+    def __init__(self, state_dir=None, source_csv=HISTORY_CSV):
+        self.state_dir = state_dir or BASELINE_DIR
+        self._lock = threading.Lock()
+        self._version = None # 已併入的資料版本 (只在同一個行程內有意義)
+        self.start_ns = None
+        self.values = np.empty(0)
+        self.cells = np.empty(0, dtype=np.intp)
+        self.count = np.zeros(N_CELLS, dtype=np.int64)
+        self.median = np.full(N_CELLS, np.nan)
+        self.mad = np.full(N_CELLS, np.nan)
+        self.threshold = np.full(N_CELLS, np.nan)
+        self._load(source_csv)
+
+    # --- 建立 / 保存 ---
+    def _load(self, source_csv):
+        cached = load_columnar(self.state_dir, mmap=False)
+        if cached is not None and len(cached):
+            self._merge(cached.index[0].value, np.array(cached["power_kW"], dtype=np.float64))
+        elif source_csv and os.path.exists(source_csv):
+            grid_df = to_hourly_grid(load_history_csv(source_csv))
+            self._merge(grid_df.index[0].value, grid_df["power_kW"].to_numpy(dtype=np.float64))
+            self._save()
+        self._refresh_cells(np.arange(N_CELLS))
+
+    def _save(self):
+        index = pd.DatetimeIndex(self.start_ns + np.arange(len(self.values), dtype=np.int64) * HOUR_NS,
+                                 name="timestamp")
+        save_columnar(self.state_dir, pd.DataFrame({"power_kW": self.values}, index=index))
+
+    def _merge(self, start_ns, power):
+        """把一段每小時功率寫入保存的序列 (必要時往前 / 往後延伸)，回傳數值有變動的位置"""
+        power = np.asarray(power, dtype=np.float64)
+        if self.start_ns is None:
+            self.start_ns, self.values = int(start_ns), power.copy()
+            self.cells = baseline_cells(self.start_ns + np.arange(len(power), dtype=np.int64) * HOUR_NS)
+            return np.arange(len(power))
+        first = min(self.start_ns, start_ns)
+        end = max(self.start_ns + len(self.values) * HOUR_NS, start_ns + len(power) * HOUR_NS)
+        if first != self.start_ns or end != self.start_ns + len(self.values) * HOUR_NS:
+            values = np.full((end - first) // HOUR_NS, np.nan)
+            offset = (self.start_ns - first) // HOUR_NS
+            values[offset:offset + len(self.values)] = self.values
+            self.start_ns, self.values = first, values
+            self.cells = baseline_cells(first + np.arange(len(values), dtype=np.int64) * HOUR_NS)
+        lo = (start_ns - self.start_ns) // HOUR_NS
+        old = self.values[lo:lo + len(power)]
+        changed = ~((old == power) | (np.isnan(old) & np.isnan(power)))
+        self.values[lo:lo + len(power)] = power
+        return lo + np.flatnonzero(changed)
+
+    def _refresh_cells(self, cells):
+        """重算指定格子的中位數 / MAD / 門檻"""
+        if len(cells) > REFRESH_ALL_CELLS:
+            order = np.argsort(self.cells, kind="stable")
+            bounds = np.searchsorted(self.cells[order], np.arange(N_CELLS + 1))
+            groups = ((c, self.values[order[bounds[c]:bounds[c + 1]]]) for c in cells)
+        else:
+            groups = ((c, self.values[self.cells == c]) for c in cells)
+        for c, values in groups:
+            values = values[~np.isnan(values)]
+            self.count[c] = len(values)
+            if len(values) == 0:
+                self.median[c] = self.mad[c] = np.nan
+                continue
+            self.median[c] = np.median(values)
+            self.mad[c] = np.median(np.abs(values - self.median[c]))
+        scale = np.maximum(MAD_SCALE * self.mad, MIN_SCALE_KW)
+        self.threshold = np.where(self.count >= MIN_SAMPLES, self.median + ROBUST_Z * scale, np.nan)
+
+    def update(self, store):
+        """併入 store 中變動過的小時，只重算被改到的格子；回傳重算的格子數"""
+        with self._lock:
+            version = store.version
+            if version == self._version:
+                return 0
+            grid = store.grid()
+            if len(grid) == 0:
+                return 0
+            changed_ns = store.changed_since(self._version) if self._version is not None else None
+            lo = 0 if changed_ns is None else max(0, (changed_ns - grid.start_ns) // HOUR_NS)
+            changed = self._merge(grid.start_ns + lo * HOUR_NS, grid.power_kW[lo:])
+            self._version = version
+            if len(changed) == 0:
+                return 0
+            cells = np.unique(self.cells[changed])
+            self._refresh_cells(cells)
+            self._save()
+            return len(cells)
+
+    # --- 評分 ---
+    def score(self, index, power):
+        """回傳 (基準中位數, 門檻, 是否異常) 三個陣列：一次 gather + 比較"""
+        index = pd.DatetimeIndex(index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        cells = baseline_cells(index.asi8)
+        threshold = self.threshold[cells]
+        power = np.asarray(power, dtype=np.float64)
+        return self.median[cells], threshold, power > threshold
+
+    def scan(self, df):
+        """df (時間索引 + power_kW) 中超過基準門檻的小時，欄位 power_kW / baseline / threshold"""
+        baseline, threshold, flagged = self.score(df.index, df["power_kW"].to_numpy())
+        result = pd.DataFrame({"power_kW": df["power_kW"].to_numpy(dtype=np.float64),
+                               "baseline": baseline, "threshold": threshold}, index=df.index)
+        return result[flagged]
+
+    def table(self):
+        """門檻表 (季節, 每週第幾小時) 的 DataFrame，方便檢視或畫圖"""
+        index = pd.MultiIndex.from_product([["nonsummer", "summer"], range(HOURS_PER_WEEK)],
+                                           names=["season", "hour_of_week"])
+        return pd.DataFrame({"count": self.count, "median": self.median, "mad": self.mad,
+                             "threshold": self.threshold}, index=index)
+
+# ==========================================
+# 🏘️ 多戶一次評分
+# ==========================================
+def scan_households(thresholds, index, power):
+    """
+    thresholds: (戶數, N_CELLS) 各戶的門檻表 (例如 np.stack([b.threshold for b in baselines]))；
+    power: (戶數, 時間) 同一組時間點的每小時功率。回傳 (戶數, 時間) 的異常遮罩：一次 gather + 比較。
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    cells = baseline_cells(index.asi8)
+    return np.asarray(power, dtype=np.float64) > np.asarray(thresholds)[:, cells]
+
+_baseline = None
+_baseline_lock = threading.Lock()
+
+def get_seasonal_baseline():
+    global _baseline
+    with _baseline_lock:
+        if _baseline is None:
+            _baseline = SeasonalBaseline()
+        return _baseline
@@ -0,0 +1,45 @@
+# shared_dataset.py
+import time
+import threading
+from collections import namedtuple
+
+from timeseries_store import get_store
+
+# ==========================================
+# 🤝 全行程共用的唯讀資料集
+# ==========================================
+# 每個瀏覽器 session 只保存「資料版本號」(handle)，實際的 DataFrame 由整個行程共用一份：
+# - 資料：TimeSeriesStore 的每小時網格，每個版本只建一次，陣列為唯讀 (原地修改會直接報錯)。
+# - 預測：同一個資料版本只保留一份預測結果。
+# 舊版本不會被保留，session 之間也不會各自複製，因此常駐記憶體不隨 session 數增加。
+# 頁面若要加欄位或篩選後修改，請先 .copy() (copy-on-write)。
+_lock = threading.Lock()
+
+# 預測快照：整包不可變，發佈時整個換掉 (單一參考的指派是原子的)，讀取端不需要上鎖
+ForecastSnapshot = namedtuple("ForecastSnapshot", ["version", "result", "watermark", "created_at"])
+_snapshot = None
+
+def is_current(handle):
+    return handle is not None and handle == get_store().version
+
+def get_dataset():
+    """
+    回傳共用的唯讀每小時網格 DataFrame (最新版本)。
+    舊版本不保留：session 的 handle 過期時也一律拿到最新版本 (資料只會變多或被更正)。
+    """
+    return get_store().grid().frame()
+
+def publish_forecast(handle, result_df):
+    """登記某個資料版本的預測結果 (較舊版本的結果不會覆蓋較新的)"""
+    global _snapshot
+    if result_df is None:
+        return
+    with _lock:
+        current = _snapshot
+        if current is not None and current.version is not None and handle is not None and handle < current.version:
+            return
+        _snapshot = ForecastSnapshot(handle, result_df, get_store().watermark, time.time())
+
+def get_snapshot():
+    """目前的預測快照 (version / result / watermark / created_at)，沒有時回傳 None"""
+    return _snapshot
@@ -0,0 +1,231 @@
+# tariff_engine.py
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+from energy_grid import HOUR_NS, DAY_NS
+from tou_engine import TOU_RATES_DATA, SEASONS, SUMMER_MONTHS
+from calendar_features import get_calendar
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+PERIODS = ("off_peak", "half_peak", "peak")             # 時段 (二段式只用 off_peak / peak)
+DAY_TYPES = ("weekday", "saturday", "sunday", "holiday") # holiday = 落在平日的國定假日
+
+# 累進電價級距：(該級距 kWh, 夏月費率, 非夏月費率)
+PROGRESSIVE_RATES = [
+    (120, 1.68, 1.68), (210, 2.45, 2.16), (170, 3.70, 3.03),
+    (200, 5.04, 4.14), (300, 6.24, 5.07), (float('inf'), 8.46, 6.63)
+]
+
+# ==========================================
+# 📋 方案定義
+# ==========================================
+# 每個方案是一個 dict，各部分皆可省略：
+#   name                   方案名稱
+#   basic_fee_monthly      每月基本費
+#   tiers                  [(級距 kWh, 夏月費率, 非夏月費率), ...]，依每月總用電量分級計價
+#   rates                  {季節: {時段: 費率}}，時段電價 (與 schedule 搭配)
+#   schedule               {季節: {日別: {時段: [(起始小時, 結束小時), ...]}}}；
+#                          沒列到的小時為 off_peak，沒列到的日別：holiday 同 weekday、其餘全天離峰
+#   surcharge_kwh_threshold / surcharge_rate_per_kwh   每月超過門檻的每度加價
+_TOU_RATES = TOU_RATES_DATA['rates']
+_TOU_SURCHARGE = {
+    'surcharge_kwh_threshold': TOU_RATES_DATA['surcharge_kwh_threshold'],
+    'surcharge_rate_per_kwh': TOU_RATES_DATA['surcharge_rate_per_kwh'],
+}
+
+DEFAULT_PLANS = [
+    {'name': '累進電價', 'tiers': PROGRESSIVE_RATES},
+    {
+        # 與 tou_engine / get_tou_details 相同 (不另計國定假日)
+        'name': '時間電價 (二段式)',
+        'basic_fee_monthly': TOU_RATES_DATA['basic_fee_monthly'],
+        'rates': _TOU_RATES,
+        'schedule': {
+            'summer': {'weekday': {'peak': [(9, 24)]}},
+            'nonsummer': {'weekday': {'peak': [(6, 11), (14, 24)]}},
+        },
+        **_TOU_SURCHARGE,
+    },
+]
+
+# 三段式的方案結構範例 (時段依台電簡易型三段式，費率為示意值，不是公告費率)。
+# 不列入 DEFAULT_PLANS (頁面的方案比較只放有公告費率的方案)；填入最新公告費率後可當自訂方案傳入，
+# 基準測試用它驗證半尖峰 / 國定假日時段的計價。
+EXAMPLE_THREE_STAGE_PLAN = {
+    'name': '時間電價 (三段式，示意費率)',
+    'basic_fee_monthly': TOU_RATES_DATA['basic_fee_monthly'],
+    'rates': {
+        'summer': {'peak': 6.92, 'half_peak': 4.54, 'off_peak': 1.85},
+        'nonsummer': {'half_peak': 4.33, 'off_peak': 1.78},
+    },
+    'schedule': {
+        'summer': {'weekday': {'peak': [(16, 22)], 'half_peak': [(9, 16), (22, 24)]}, 'holiday': {}},
+        'nonsummer': {'weekday': {'half_peak': [(6, 11), (14, 24)]}, 'holiday': {}},
+    },
+    **_TOU_SURCHARGE,
+}
+
+# 編譯後的方案表 (P = 方案數，T = 最多級距數)：
+#   slot_rates   (P, 2 季節, 4 日別, 24 小時) 每度費率
+#   tier_widths  (P, T) 級距 kWh (不足 T 級補 0)；tier_rates (P, 2 季節, T)
+TariffTable = namedtuple("TariffTable", ["names", "slot_rates", "tier_widths", "tier_rates",
+                                         "basic_fee", "surcharge_threshold", "surcharge_rate"])
+
+def period_codes(plan):
+    """方案的時段表 (2 季節, 4 日別, 24 小時)，值為 PERIODS 的索引"""
+    schedule = plan.get('schedule', {})
+    codes = np.zeros((len(SEASONS), len(DAY_TYPES), 24), dtype=np.intp)
+    for s, season in enumerate(SEASONS):
+        days = schedule.get(season, {})
+        for d, day_type in enumerate(DAY_TYPES):
+            periods = days.get(day_type, days.get('weekday', {}) if day_type == 'holiday' else {})
+            for period, spans in periods.items():
+                if period not in PERIODS:
+                    raise ValueError(f"方案 {plan.get('name')} 的時段 {period!r} 不在 {PERIODS}")
+                for start, end in spans:
+                    codes[s, d, start:end] = PERIODS.index(period)
+    return codes
+
+def period_rates(plan, codes=None):
+    """方案的時段費率 (2 季節, 3 時段)；時段表用到卻沒有費率的時段視為設定錯誤"""
+    rates = plan.get('rates', {})
+    table = np.array([[rates.get(season, {}).get(p, 0.0) for p in PERIODS] for season in SEASONS])
+    if rates:
+        codes = period_codes(plan) if codes is None else codes
+        for s, season in enumerate(SEASONS):
+            missing = {PERIODS[c] for c in np.unique(codes[s])} - set(rates.get(season, {}))
+            if missing:
+                raise ValueError(f"方案 {plan.get('name')} 缺少 {season} 的費率: {sorted(missing)}")
+    return table
+
+def _slot_rates(plan):
+    codes = period_codes(plan)
+    return np.take_along_axis(period_rates(plan, codes), codes.reshape(len(SEASONS), -1), axis=1).reshape(codes.shape)
+
+def compile_plans(plans=None):
+    """把方案定義整理成陣列 (TariffTable)，之後所有方案可一次計價"""
+    plans = DEFAULT_PLANS if plans is None else plans
+    n_tiers = max([len(p.get('tiers', ())) for p in plans] + [1])
+    tier_widths = np.zeros((len(plans), n_tiers))
+    tier_rates = np.zeros((len(plans), len(SEASONS), n_tiers))
+    for i, plan in enumerate(plans):
+        for t, (width, summer_rate, nonsummer_rate) in enumerate(plan.get('tiers', ())):
+            tier_widths[i, t] = width
+            tier_rates[i, :, t] = (nonsummer_rate, summer_rate)
+    return TariffTable(
+        names=[p.get('name', f"方案 {i + 1}") for i, p in enumerate(plans)],
+        slot_rates=np.stack([_slot_rates(p) for p in plans]),
+        tier_widths=tier_widths,
+        tier_rates=tier_rates,
+        basic_fee=np.array([p.get('basic_fee_monthly', 0.0) for p in plans], dtype=np.float64),
+        surcharge_threshold=np.array([p.get('surcharge_kwh_threshold', np.inf) for p in plans], dtype=np.float64),
+        surcharge_rate=np.array([p.get('surcharge_rate_per_kwh', 0.0) for p in plans], dtype=np.float64),
+    )
+
+# ==========================================
+# 📊 用電輪廓 (每月 x 日別 x 小時)
+# ==========================================
+# months: 每月第一天；slot_kwh: (月數, 4 日別, 24 小時) 的用電量；kwh: 每月總用電量
+UsageProfile = namedtuple("UsageProfile", ["months", "is_summer", "slot_kwh", "kwh"])
+
+def _month_codes(ts_ns):
+    return np.asarray(ts_ns, dtype=np.int64).astype("datetime64[ns]").astype("datetime64[M]").astype(np.int64)
+
+def day_types(ts_ns):
+    """時間 (int64 奈秒) -> DAY_TYPES 的索引 (週六 / 週日 / 落在平日的國定假日 / 其餘平日)"""
+    ts_ns = np.asarray(ts_ns, dtype=np.int64)
+    dayofweek = (ts_ns // DAY_NS + 3) % 7 # 1970-01-01 是星期四 (Monday = 0)
+    return np.select([dayofweek == 5, dayofweek == 6, get_calendar().is_holiday(ts_ns)], [1, 2, 3], 0)
+
+def summer_months(ts_ns):
+    """時間 (int64 奈秒) -> 是否為夏月"""
+    month = _month_codes(ts_ns) % 12 + 1
+    return (month >= SUMMER_MONTHS[0]) & (month <= SUMMER_MONTHS[1])
+
+def slot_range(rollups, start=None, end=None):
+    """start ~ end (含，日期) 在彙總表每小時陣列中的 [lo, hi) 位置"""
+    lo = 0 if start is None else rollups.slot(pd.Timestamp(start).normalize())
+    hi = len(rollups.kwh) if end is None else rollups.slot(pd.Timestamp(end).normalize() + pd.Timedelta(days=1))
+    return lo, max(lo, hi)
+
+def usage_profile(rollups, start=None, end=None):
+    """
+    由彙總表的每小時用電 (rollups.kwh) 取 start ~ end (含，日期) 的範圍，一次 bincount 成
+    (月, 日別, 小時) 三維表。任何方案的時段都以整點切分，計價只需要這張表，不必再掃描原始序列。
+    """
+    lo, hi = slot_range(rollups, start, end)
+    if hi == lo:
+        return UsageProfile(pd.DatetimeIndex([], name="month"), np.empty(0, dtype=bool),
+                            np.zeros((0, len(DAY_TYPES), 24)), np.empty(0))
+    ts_ns = rollups.start_ns + np.arange(lo, hi, dtype=np.int64) * HOUR_NS
+    kwh = rollups.kwh[lo:hi]
+
+    months = _month_codes(ts_ns)
+    month_idx = months - months[0]
+    n_months = int(month_idx[-1]) + 1
+    hour = (ts_ns // HOUR_NS) % 24
+    flat = (month_idx * len(DAY_TYPES) + day_types(ts_ns)) * 24 + hour
+    slot_kwh = np.bincount(flat, weights=kwh, minlength=n_months * len(DAY_TYPES) * 24)
+
+    month_index = (months[0] + np.arange(n_months)).astype("datetime64[M]").astype("datetime64[ns]")
+    return UsageProfile(
+        months=pd.DatetimeIndex(month_index, name="month"),
+        is_summer=summer_months(month_index.astype(np.int64)),
+        slot_kwh=slot_kwh.reshape(n_months, len(DAY_TYPES), 24),
+        kwh=np.bincount(month_idx, weights=kwh, minlength=n_months),
+    )
+
+# ==========================================
+# 💰 多方案一次計價
+# ==========================================
+def tiered_cost(monthly_kwh, is_summer, tiers=PROGRESSIVE_RATES):
+    """calculate_progressive_cost 的向量化版本：一次計算多個月的累進電費"""
+    table = compile_plans([{'tiers': tiers}])
+    kwh = np.asarray(monthly_kwh, dtype=np.float64)
+    return _tier_cost(table, kwh, np.asarray(is_summer).astype(np.intp))[0]
+
+def _tier_cost(table, kwh, season):
+    """累積級距：每一級用電 = clip(月用電 - 級距下限, 0, 級距寬度)，回傳 (方案, 月)"""
+    widths = table.tier_widths
+    lower = np.concatenate([np.zeros((len(widths), 1)), np.cumsum(widths, axis=1)[:, :-1]], axis=1)
+    in_tier = np.clip(kwh[None, :, None] - lower[:, None, :], 0.0, widths[:, None, :])
+    return (in_tier * table.tier_rates[:, season]).sum(axis=2)
+
+def price_matrix(profile, table):
+    """
+    各方案每月帳單的三個部分 (energy, basic, surcharge)，皆為 (方案, 月) 陣列。
+    時段電價先把用電輪廓攤平成 (月, 日別 x 小時)，與各方案兩個季節的費率做一次矩陣乘法，再依月份取季節。
+    """
+    season = profile.is_summer.astype(np.intp)
+    n_plans, n_months = len(table.names), len(profile.months)
+    flow = profile.slot_kwh.reshape(n_months, -1) @ table.slot_rates.reshape(n_plans * len(SEASONS), -1).T
+    flow = flow.reshape(n_months, n_plans, len(SEASONS))[np.arange(n_months), :, season].T
+    energy = flow + _tier_cost(table, profile.kwh, season)
+    basic = np.broadcast_to(table.basic_fee[:, None], energy.shape)
+    surcharge = np.maximum(profile.kwh[None, :] - table.surcharge_threshold[:, None], 0.0)
+    surcharge = surcharge * table.surcharge_rate[:, None]
+    return energy, basic, surcharge
+
+def price_plans(profile, plans=None):
+    """
+    一次計算所有方案在 profile 每個月的帳單。plans 可以是方案定義 list 或已編譯的 TariffTable。
+    回傳 (summary, monthly)：
+      summary  以方案名稱為索引，欄位 kwh / energy_cost / basic_fee / surcharge / total_cost
+      monthly  每月各方案的總電費 (列 = 月份，欄 = 方案)
+    """
+    table = plans if isinstance(plans, TariffTable) else compile_plans(plans)
+    energy, basic, surcharge = price_matrix(profile, table)
+    total = energy + basic + surcharge
+
+    summary = pd.DataFrame({
+        'kwh': profile.kwh.sum(),
+        'energy_cost': energy.sum(axis=1),
+        'basic_fee': basic.sum(axis=1),
+        'surcharge': surcharge.sum(axis=1),
+        'total_cost': total.sum(axis=1),
+    }, index=pd.Index(table.names, name="plan"))
+    monthly = pd.DataFrame(total.T, index=profile.months, columns=table.names)
+    return summary, monthly
@@ -0,0 +1,165 @@
+# tariff_sweep.py
+import os
+import threading
+import concurrent.futures
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+from tariff_engine import (DEFAULT_PLANS, PERIODS, compile_plans, period_codes, period_rates,
+                           price_matrix, usage_profile)
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+DEFAULT_BASE_PLAN = '時間電價 (二段式)'
+REFERENCE_PLAN = '累進電價'   # 結果附上此方案的總電費，方便畫「可省多少」
+SWEEP_CHUNK = 16384           # 每批計價的情境數 (控制中間陣列大小：情境 x 月)
+POOL_MIN_SCENARIOS = 200_000  # 情境數超過此值才分給多個行程
+SWEEP_WORKERS = int(os.environ.get("POWER_APP_SWEEP_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+
+# 掃描結果 (G = 網格形狀 (尖峰費率倍數, 離峰費率倍數, 尖峰時段位移)，B = 預算數)：
+#   axes              {軸名稱: 數值陣列}，順序即 G 的維度
+#   total_cost        (G) 期間總電費；max_monthly_cost (G) 最高單月電費
+#   months_over_budget (G + (B,)) 單月電費超過各預算的月數
+#   reference_cost    REFERENCE_PLAN 在同一期間的總電費
+SweepResult = namedtuple("SweepResult", ["version", "axes", "budgets", "n_months", "total_cost",
+                                         "max_monthly_cost", "months_over_budget", "reference_cost"])
+
+# ==========================================
+# 🔬 情境網格
+# ==========================================
+def _shifted_codes(codes, shifts):
+    """把非離峰時段整段往後移 k 小時 (移出 0~24 的部分捨去、空出來的小時為離峰)，回傳 (K, 2, 4, 24)"""
+    hours = np.arange(24)
+    src = hours[None, :] - np.asarray(shifts)[:, None]          # (K, 24)
+    inside = (src >= 0) & (src < 24)
+    shifted = codes[..., np.clip(src, 0, 23)]                    # (2, 4, K, 24)
+    shifted = np.where(inside, shifted, 0)
+    return np.moveaxis(shifted, 2, 0)
+
+def _period_kwh(profile, codes):
+    """各位移下，每月在各時段的用電量 (K, 月, 3)；用電輪廓只需掃一次"""
+    season = profile.is_summer.astype(np.intp)
+    onehot = codes[..., None] == np.arange(len(PERIODS))        # (K, 2, 4, 24, 3)
+    by_month = onehot[:, season]                                 # (K, 月, 4, 24, 3)
+    return np.einsum("mdh,kmdht->kmt", profile.slot_kwh, by_month)
+
+def _price_chunk(off_cost, on_cost, peak_scale, off_peak_scale, shift_idx, fixed, budgets):
+    """
+    一批情境的帳單 (可在子行程執行)。off_cost / on_cost 為各位移下每月以基準費率計的離峰 / 非離峰電費，
+    情境的費率倍數只是乘上去 (半尖峰跟著尖峰倍數)；固定部分 (基本費 / 累進 / 超額加價) 逐月直接相加。
+    """
+    monthly = off_cost[shift_idx] * off_peak_scale[:, None] + on_cost[shift_idx] * peak_scale[:, None]
+    monthly += fixed[None, :]
+    over = (monthly[:, :, None] > budgets[None, None, :]).sum(axis=1)
+    return monthly.sum(axis=1), monthly.max(axis=1), over
+
+def _resolve_plan(base_plan):
+    if isinstance(base_plan, dict):
+        return base_plan
+    for plan in DEFAULT_PLANS:
+        if plan['name'] == base_plan:
+            return plan
+    raise ValueError(f"找不到方案 {base_plan!r}")
+
+def run_sweep(profile, peak_scales=(1.0,), off_peak_scales=(1.0,), peak_shifts=(0,), budgets=(),
+              base_plan=DEFAULT_BASE_PLAN, workers=None):
+    """
+    以 base_plan (時間電價方案) 為基準，計算「尖峰費率倍數 x 離峰費率倍數 x 尖峰時段位移」整個網格
+    在 profile 期間的電費。用電輪廓依位移先算成 (位移, 月, 時段) 的用電量，之後每個情境只是
+    3 個時段的加權和；情境很多時分批計算，超過 POOL_MIN_SCENARIOS 時分給 ProcessPoolExecutor。
+    """
+    plan = _resolve_plan(base_plan)
+    if not plan.get('rates'):
+        raise ValueError(f"方案 {plan.get('name')} 沒有時段費率，無法做費率 / 時段掃描")
+    axes = {
+        'peak_scale': np.asarray(peak_scales, dtype=np.float64),
+        'off_peak_scale': np.asarray(off_peak_scales, dtype=np.float64),
+        'peak_shift': np.asarray(peak_shifts, dtype=np.intp),
+    }
+    budgets = np.asarray(budgets, dtype=np.float64)
+    shape = tuple(len(v) for v in axes.values())
+    if 0 in shape or len(profile.months) == 0:
+        raise ValueError("掃描網格與資料期間皆不可為空")
+
+    # 與費率倍數無關的部分：基準方案的基本費 + 累進級距 + 超額加價 (時段費率設為 0 後計價)
+    table = compile_plans([plan, _resolve_plan(REFERENCE_PLAN)])
+    slot_rates = table.slot_rates.copy()
+    slot_rates[0] = 0.0
+    energy, basic, surcharge = price_matrix(profile, table._replace(slot_rates=slot_rates))
+    fixed = energy[0] + basic[0] + surcharge[0]
+    reference_cost = float((energy[1] + basic[1] + surcharge[1]).sum())
+
+    codes = period_codes(plan)
+    period_kwh = _period_kwh(profile, _shifted_codes(codes, axes['peak_shift']))
+    base_cost = period_kwh * period_rates(plan, codes)[profile.is_summer.astype(np.intp)][None] # (K, 月, 3)
+    off_cost, on_cost = base_cost[:, :, 0], base_cost[:, :, 1:].sum(axis=2)
+
+    grid = np.indices(shape).reshape(len(shape), -1)
+    n = grid.shape[1]
+    chunks = [slice(i, min(i + SWEEP_CHUNK, n)) for i in range(0, n, SWEEP_CHUNK)]
+    jobs = [(off_cost, on_cost, axes['peak_scale'][grid[0, c]], axes['off_peak_scale'][grid[1, c]],
+             grid[2, c], fixed, budgets) for c in chunks]
+    workers = SWEEP_WORKERS if workers is None else workers
+    if n >= POOL_MIN_SCENARIOS and workers > 1 and len(jobs) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_price_chunk, *zip(*jobs)))
+    else:
+        parts = [_price_chunk(*job) for job in jobs]
+
+    total, peak_month, over = (np.concatenate(p) for p in zip(*parts))
+    return SweepResult(
+        version=None, axes=axes, budgets=budgets, n_months=len(profile.months),
+        total_cost=total.reshape(shape), max_monthly_cost=peak_month.reshape(shape),
+        months_over_budget=over.reshape(shape + (len(budgets),)), reference_cost=reference_cost,
+    )
+
+def sweep_frame(result):
+    """攤平成長表 (每列一個情境)，方便篩選或畫熱圖 (pivot_table)"""
+    index = pd.MultiIndex.from_product(list(result.axes.values()), names=list(result.axes))
+    df = pd.DataFrame({
+        'total_cost': result.total_cost.ravel(),
+        'max_monthly_cost': result.max_monthly_cost.ravel(),
+        'saving_vs_reference': result.reference_cost - result.total_cost.ravel(),
+    }, index=index)
+    over = result.months_over_budget.reshape(len(df), -1)
+    for b, budget in enumerate(result.budgets):
+        df[f'months_over_{budget:g}'] = over[:, b]
+    return df
+
+# ==========================================
+# 🗃️ 依資料版本快取
+# ==========================================
+_sweep_cache = {} # (資料版本號, 起訖日期, 方案, 網格, 預算) -> SweepResult
+_sweep_lock = threading.Lock()
+
+def _as_key(values):
+    return tuple(np.asarray(values).tolist())
+
+def sweep_tariffs(rollups, start_date=None, end_date=None, peak_scales=(1.0,), off_peak_scales=(1.0,),
+                  peak_shifts=(0,), budgets=(), base_plan=DEFAULT_BASE_PLAN):
+    """
+    對彙總表 start_date ~ end_date (含) 的用電做情境掃描。彙總表有資料版本號 (共用資料庫) 時，
+    同一版本、同一組參數的結果整個行程只算一次；資料更新後舊版本的結果直接丟掉。
+    範圍內沒有資料時回傳 None。
+    """
+    version = rollups.version
+    plan_key = base_plan if isinstance(base_plan, str) else repr(sorted(base_plan.items()))
+    key = (version, str(start_date), str(end_date), plan_key, _as_key(peak_scales), _as_key(off_peak_scales),
+           _as_key(peak_shifts), _as_key(budgets))
+    if version is not None:
+        with _sweep_lock:
+            cached = _sweep_cache.get(key)
+        if cached is not None:
+            return cached
+    profile = usage_profile(rollups, start_date, end_date)
+    if len(profile.months) == 0:
+        return None
+    result = run_sweep(profile, peak_scales, off_peak_scales, peak_shifts, budgets, base_plan)._replace(version=version)
+    if version is not None:
+        with _sweep_lock:
+            for k in [k for k in _sweep_cache if k[0] != version]:
+                del _sweep_cache[k]
+            _sweep_cache[key] = result
+    return result
@@ -0,0 +1,92 @@
+# tests/test_anomaly_detector.py
+"""串流異常偵測：整段回補與 rolling(24 * 7, min_periods=1) 的平均 + 2.5 倍標準差一致；分批串流、重啟接續的結果與整段回補相同"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_detector import AnomalyDetector, WINDOW_HOURS, THRESHOLD_SIGMA, STATE_FILE
+from timeseries_store import TimeSeriesStore
+
+def make_history(hours, seed=0, base=0.3, start="2024-01-01"):
+    idx = pd.date_range(start, periods=hours, freq="h", name="timestamp")
+    rng = np.random.default_rng(seed)
+    power = base + 0.2 * rng.random(hours) + 0.3 * ((idx.hour >= 18) & (idx.hour < 22))
+    power[rng.random(hours) < 0.01] = base + 6.0 # 偶發的高耗電
+    power[200:212] = np.nan # 一段缺值
+    power[500:530] = base + 0.25 # 一段完全相同的值 (標準差為 0)
+    return pd.DataFrame({"power_kW": power, "temperature": 26.0, "humidity": 70.0}, index=idx)
+
+def make_store(df):
+    store = TimeSeriesStore()
+    store.merge("csv", df)
+    return store
+
+def rolling_anomalies(df):
+    """原本「掃描異常事件」的作法；最後一個小時尚未評分，比對時排除"""
+    power = df['power_kW']
+    mean = power.rolling(window=WINDOW_HOURS, min_periods=1).mean()
+    std = power.rolling(window=WINDOW_HOURS, min_periods=1).std()
+    threshold = mean + THRESHOLD_SIGMA * std
+    expected = pd.DataFrame({"power_kW": power, "mean": mean, "threshold": threshold})[power > threshold]
+    return expected[expected.index < df.index[-1]]
+
+def assert_same(events, expected):
+    assert events.index.equals(expected.index), (len(events), len(expected))
+    np.testing.assert_allclose(events.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-9)
+
+def test_backfill_matches_rolling(tmp_path):
+    store = make_store(make_history(24 * 60))
+    events = AnomalyDetector(str(tmp_path)).backfill(store)
+    expected = rolling_anomalies(store.grid().frame())
+    assert len(expected) > 0
+    assert len(events) == len(expected)
+    assert_same(AnomalyDetector(str(tmp_path)).events(), expected)
+
+@pytest.mark.parametrize("chunk", [1, 7, 24 * 3])
+def test_streaming_chunks_match_backfill(tmp_path, chunk):
+    df = make_history(24 * 30, seed=1)
+    full = AnomalyDetector(str(tmp_path / "full"))
+    full.backfill(make_store(df))
+
+    stream, detector = TimeSeriesStore(), AnomalyDetector(str(tmp_path / "stream"))
+    for start in range(0, len(df), chunk):
+        stream.merge("live", df.iloc[start:start + chunk])
+        detector.update(stream)
+    assert_same(detector.events(), full.events())
+    assert detector.next_ns == full.next_ns
+
+def test_restart_resumes_from_saved_state(tmp_path):
+    df = make_history(24 * 30, seed=2)
+    expected = AnomalyDetector(str(tmp_path / "full"))
+    expected.backfill(make_store(df))
+
+    state_dir = str(tmp_path / "stream")
+    stream = make_store(df.iloc[:24 * 12])
+    first = AnomalyDetector(state_dir)
+    first.update(stream)
+    assert (tmp_path / "stream" / STATE_FILE).exists()
+
+    resumed = AnomalyDetector(state_dir) # 新的行程：只靠 JSON 狀態檔與事件檔接著算
+    assert resumed.next_ns == first.next_ns
+    np.testing.assert_array_equal(resumed.window.values(), first.window.values())
+    stream.merge("live", df.iloc[24 * 12:])
+    resumed.update(stream)
+    assert_same(resumed.events(), expected.events())
+
+def test_restart_rescores_changed_history(tmp_path):
+    df = make_history(24 * 30, seed=3)
+    state_dir = str(tmp_path)
+    AnomalyDetector(state_dir).update(make_store(df))
+
+    changed = df.copy()
+    changed.iloc[24 * 29 - 10:24 * 29, 0] = 9.0 # 重啟前已評分、仍在視窗內的小時被更正
+    resumed = AnomalyDetector(state_dir)
+    resumed.update(make_store(changed))
+    assert_same(resumed.events(), rolling_anomalies(changed))
+
+def test_long_series_does_not_drift(tmp_path):
+    # 兩年的每小時資料、平均遠大於變動幅度：Welford 加入 / 移出累積的誤差會讓標準差偏掉
+    df = make_history(24 * 365 * 2, seed=4, base=1000.0, start="2022-01-01")
+    detector = AnomalyDetector(str(tmp_path))
+    detector.backfill(make_store(df))
+    assert_same(detector.events(), rolling_anomalies(df))
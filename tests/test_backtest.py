@@ -0,0 +1,81 @@
+# tests/test_backtest.py
+"""滾動起點回測：整批起點一次推論的結果與逐一起點呼叫 hybrid_predict (線上預測的作法) 相同"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import run_backtest, prepare_series, backtest_origins
+from feature_engine import FeatureEngine, TAIL_HOURS, HORIZON_HOURS
+from model_service import hybrid_predict, SEQ_COLS, DIR_COLS
+
+def hourly_grid(days, seed=0):
+    """與 store.grid().frame() 欄位相同的每小時資料 (含整小時缺資料的格子)"""
+    idx = pd.date_range("2024-03-01", periods=TAIL_HOURS + days * 24, freq="h", name="timestamp")
+    rng = np.random.default_rng(seed)
+    power = 0.6 + 0.4 * np.sin(2 * np.pi * np.asarray(idx.hour) / 24) + 0.2 * rng.random(len(idx))
+    power[rng.random(len(idx)) < 0.01] = np.nan
+    return pd.DataFrame({"kwh": power, "power_kW": power, "temperature": 25 + 5 * rng.random(len(idx)),
+                         "humidity": 60 + 20 * rng.random(len(idx)), "coverage": 1.0}, index=idx)
+
+class RowScaler:
+    """逐欄線性縮放 (與 StandardScaler 一樣只看單列的值)"""
+    def __init__(self, n):
+        self.scale = 1.0 + np.arange(n) / 10.0
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64) / self.scale
+    def inverse_transform(self, X):
+        return np.asarray(X) * self.scale[0]
+
+class StubLGBM:
+    """每一列的預測只取決於該列特徵：列順序錯位或起點對錯都會改變結果"""
+    FEATURES = ["lag_24h", "lag_168h", "ma_7d", "temperature", "hour_sin", "is_weekend"]
+    def feature_name(self):
+        return list(self.FEATURES)
+    def predict(self, X):
+        return np.nan_to_num(np.asarray(X, dtype=np.float64)) @ np.linspace(0.1, 0.6, len(self.FEATURES))
+
+class StubLSTM:
+    """輸出 (起點數, 24)：序列最後 24 小時的第一欄加上直接特徵的加權和"""
+    def predict(self, inputs, verbose=0):
+        X_seq, X_dir = inputs
+        return X_seq[:, -HORIZON_HOURS:, 0] + np.nan_to_num(X_dir) @ np.linspace(0.01, 0.14, X_dir.shape[1])[:, None]
+
+@pytest.fixture
+def resources():
+    return {"lgbm": StubLGBM(), "lstm": StubLSTM(), "scaler_seq": RowScaler(len(SEQ_COLS)),
+            "scaler_dir": RowScaler(len(DIR_COLS)), "scaler_target": RowScaler(1),
+            "weights": {"w_lgbm": 0.4, "w_lstm": 0.6}}
+
+def per_origin(resources, grid_df, pos):
+    """線上預測的作法：全新的特徵引擎，只有一個起點"""
+    engine = FeatureEngine()
+    engine.update(prepare_series(grid_df).iloc[:pos + 1])
+    return hybrid_predict(resources, engine.lgbm_features(), engine.lstm_sequence(SEQ_COLS),
+                          engine.lstm_features()[DIR_COLS].iloc[:1])
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 256])
+def test_batched_chunks_match_per_origin_predictions(resources, chunk_size):
+    grid_df = hourly_grid(days=8)
+    results = run_backtest(resources, grid_df, chunk_size=chunk_size)
+    positions = backtest_origins(grid_df.index)
+    assert results["起點"].nunique() == len(positions) == 8
+    for pos in positions[[0, 3, -1]]:
+        rows = results[results["起點"] == grid_df.index[pos]]
+        pred_lgbm, pred_lstm, pred_final = per_origin(resources, grid_df, pos)
+        np.testing.assert_allclose(rows["LGBM"], pred_lgbm, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(rows["LSTM"], pred_lstm, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(rows["預測值"], pred_final, rtol=1e-12, atol=1e-12)
+        targets = grid_df.index[pos + 1:pos + 1 + HORIZON_HOURS]
+        assert (rows["時間"].to_numpy() == targets.to_numpy()).all()
+        np.testing.assert_array_equal(rows["實際值"], grid_df["power_kW"].iloc[pos + 1:pos + 1 + HORIZON_HOURS])
+
+def test_start_end_limit_origins(resources):
+    grid_df = hourly_grid(days=8)
+    first = backtest_origins(grid_df.index)[2]
+    results = run_backtest(resources, grid_df, start=grid_df.index[first], end=grid_df.index[first])
+    assert list(results["起點"].unique()) == [grid_df.index[first]]
+    assert list(results["時距"]) == list(range(1, HORIZON_HOURS + 1))
+
+def test_no_origins_returns_empty_frame(resources):
+    results = run_backtest(resources, hourly_grid(days=0))
+    assert results.empty and "預測值" in results.columns
@@ -0,0 +1,55 @@
+# tests/test_calendar_features.py
+"""日曆特徵表：2022 ~ 2027 每一年與原本 strftime + isin(假日) 的算法完全相同，表外的時間先延伸再取值"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import calendar_features
+from calendar_features import calendar_features as lookup, get_calendar, get_taiwan_holidays, TW_HOLIDAYS
+
+@pytest.fixture(autouse=True)
+def fresh_calendar(monkeypatch):
+    # 共用日曆表延伸後不會縮回，每個測試從預設範圍開始
+    monkeypatch.setattr(calendar_features, "_calendar", None)
+
+def direct(index):
+    """原本 add_lgbm_features 的算法 (逐列格式化日期字串比對假日)"""
+    hour, day_of_week, month = index.hour, index.dayofweek, index.month
+    date_strs = index.strftime("%Y-%m-%d")
+    return {
+        "hour": np.asarray(hour),
+        "day_of_week": np.asarray(day_of_week),
+        "month": np.asarray(month),
+        "off_day": np.asarray(((day_of_week >= 5) | date_strs.isin(get_taiwan_holidays())).astype(int)),
+        "hour_sin": np.sin(2 * np.pi * pd.Series(hour) / 24.0).to_numpy(),
+        "hour_cos": np.cos(2 * np.pi * pd.Series(hour) / 24.0).to_numpy(),
+        "week_sin": np.sin(2 * np.pi * pd.Series(day_of_week) / 7.0).to_numpy(),
+        "week_cos": np.cos(2 * np.pi * pd.Series(day_of_week) / 7.0).to_numpy(),
+        "month_sin": np.sin(2 * np.pi * pd.Series(month) / 12.0).to_numpy(),
+        "month_cos": np.cos(2 * np.pi * pd.Series(month) / 12.0).to_numpy(),
+    }
+
+def assert_same(got, expected):
+    assert set(got) == set(expected)
+    for name, values in expected.items():
+        np.testing.assert_array_equal(got[name], values, err_msg=name)
+
+@pytest.mark.parametrize("year", sorted(TW_HOLIDAYS))
+def test_year_matches_strftime_isin(year):
+    index = pd.date_range(f"{year}-01-01", f"{year}-12-31 23:00", freq="h")
+    assert_same(lookup(index), direct(index))
+    holidays = pd.to_datetime([f"{year}-{day}" for day in TW_HOLIDAYS[year]])
+    assert get_calendar().is_holiday(holidays).all()
+    assert get_calendar().start == calendar_features.CALENDAR_START # 表內的查詢不會重建
+
+def test_out_of_range_extends_the_table():
+    odd = pd.DatetimeIndex(["2021-12-31 23:00", "2024-02-09 10:15", "2028-01-01 05:00", "2031-06-02 13:59"])
+    with pytest.raises(ValueError):
+        get_calendar().gather(odd) # 預設範圍不含這些時間
+    assert_same(lookup(odd), direct(odd.floor("h")))
+    table = get_calendar()
+    assert table.start <= pd.Timestamp("2021-01-01") and table.end > pd.Timestamp("2031-12-31")
+    assert get_calendar(odd) is table # 已涵蓋：不再重建
+    # 2027 之後的國定假日尚未列入：只有週末算休息日
+    later = pd.date_range("2030-01-01", "2030-12-31 23:00", freq="h")
+    assert_same(lookup(later), direct(later))
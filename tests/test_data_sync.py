@@ -0,0 +1,123 @@
+# tests/test_data_sync.py
+"""QuarterSync：封存季度只抓一次、抓取失敗下次再試、watermark 前進，以及即時資料的增量與更正 (以假的抓取函式代替 Pantry)"""
+import json
+
+import pandas as pd
+import pytest
+
+import data_sync
+from data_sync import QuarterSync
+from pantry_client import BasketResult
+
+NOW = pd.Timestamp("2024-08-15 12:00") # 2024-q1 / q2 已封存，q3 開放，q4 尚未開始
+BASKETS = ["2024-q1", "2024-q2", "2024-q3", "2024-q4"]
+
+def basket_bytes(start, periods, power=0.5):
+    idx = pd.date_range(start, periods=periods, freq="15min")
+    records = [{"date": t.strftime("%Y-%m-%d"), "time": t.strftime("%H:%M"), "power": power + i % 4 * 0.1}
+               for i, t in enumerate(idx)]
+    return json.dumps({"data": records}).encode()
+
+def live_json(start, periods, power=0.5):
+    idx = pd.date_range(start, periods=periods, freq="15min")
+    return {"status": 1, "data": [{"full_timestamp": t.strftime("%Y-%m-%d %H:%M"), "power": power}
+                                  for t in idx]}
+
+class StubPantry:
+    def __init__(self):
+        self.baskets = {"2024-q1": basket_bytes("2024-01-01", 96), "2024-q2": basket_bytes("2024-04-01", 96),
+                        "2024-q3": basket_bytes("2024-07-01", 96)}
+        self.failing = set()
+        self.live = None
+        self.requested = []
+
+    def fetch_baskets(self, pantry_id, names, on_done=None, base_url=None, fetcher=None):
+        self.requested.append(list(names))
+        out = {}
+        for name in names:
+            if name in self.failing:
+                out[name] = BasketResult("error", None)
+            elif name in self.baskets:
+                out[name] = BasketResult("ok", self.baskets[name])
+            else:
+                out[name] = BasketResult("missing", None)
+        return out
+
+    def fetch_json(self, url):
+        return self.live
+
+@pytest.fixture
+def pantry(monkeypatch):
+    stub = StubPantry()
+    monkeypatch.setattr(data_sync, "fetch_baskets", stub.fetch_baskets)
+    monkeypatch.setattr(data_sync, "fetch_json", stub.fetch_json)
+    return stub
+
+def test_closed_quarters_are_fetched_once(pantry, tmp_path):
+    sync = QuarterSync("pid", sync_dir=str(tmp_path))
+    frames = sync.load_baskets(BASKETS, now=NOW)
+    assert pantry.requested == [["2024-q1", "2024-q2", "2024-q3"]] # 未來季度不請求
+    assert [len(frames[n]) for n in BASKETS] == [96, 96, 96, 0]
+    assert sync.is_archived("2024-q1") and sync.is_archived("2024-q2") and not sync.is_archived("2024-q3")
+    assert sync.watermark == frames["2024-q3"].index.max()
+
+    again = sync.load_baskets(BASKETS, now=NOW)
+    assert pantry.requested[-1] == ["2024-q3"] # 只重抓開放季度
+    pd.testing.assert_frame_equal(again["2024-q1"], frames["2024-q1"])
+
+    # 重啟後封存季度直接從磁碟讀取
+    restarted = QuarterSync("pid", sync_dir=str(tmp_path))
+    reloaded = restarted.load_baskets(BASKETS, now=NOW)
+    assert pantry.requested[-1] == ["2024-q3"]
+    pd.testing.assert_frame_equal(reloaded["2024-q2"], frames["2024-q2"], check_freq=False)
+    assert restarted.watermark == sync.watermark
+
+def test_failed_closed_quarter_is_retried(pantry, tmp_path):
+    sync = QuarterSync("pid", sync_dir=str(tmp_path))
+    pantry.failing = {"2024-q2"}
+    frames = sync.load_baskets(BASKETS, now=NOW)
+    assert frames["2024-q2"].empty and not sync.is_archived("2024-q2")
+
+    pantry.failing = set()
+    frames = sync.load_baskets(BASKETS, now=NOW)
+    assert "2024-q2" in pantry.requested[-1] and sync.is_archived("2024-q2")
+    assert len(frames["2024-q2"]) == 96
+
+def test_unparseable_closed_quarter_is_not_archived(pantry, tmp_path):
+    sync = QuarterSync("pid", sync_dir=str(tmp_path))
+    pantry.baskets["2024-q1"] = pantry.baskets["2024-q1"][:-40] # 被截斷的回應
+    sync.load_baskets(BASKETS, now=NOW)
+    assert not sync.is_archived("2024-q1")
+
+def test_live_appends_new_rows_and_keeps_open_quarter_corrections(pantry, tmp_path, capsys):
+    sync = QuarterSync("pid", sync_dir=str(tmp_path))
+    sync.load_baskets(BASKETS, now=NOW)
+    wm = sync.watermark
+
+    pantry.live = live_json(wm - pd.Timedelta(minutes=45), 8)
+    delta = sync.sync_live()
+    assert len(delta) == 8 and len(sync.tail) == 8 # 第一次：整段 (含開放季度內 watermark 之前的列)
+    assert sync.watermark == delta.index.max()
+
+    assert sync.sync_live().empty # 內容沒變：沒有新增
+
+    # 同一段再多一個時段，並更正 watermark 之前的一個時段
+    corrected = live_json(wm - pd.Timedelta(minutes=45), 9)
+    corrected["data"][1]["power"] = 0.9
+    pantry.live = corrected
+    delta = sync.sync_live()
+    assert list(delta.index) == [wm - pd.Timedelta(minutes=30), wm + pd.Timedelta(minutes=75)]
+    assert sync.tail.loc[wm - pd.Timedelta(minutes=30), "power_kW"] == 0.9
+    assert len(sync.tail) == 9 and sync.tail.index.is_monotonic_increasing
+    assert "更正 1 筆" in capsys.readouterr().out
+
+    # 重啟後 tail 從磁碟讀回
+    pd.testing.assert_frame_equal(QuarterSync("pid", sync_dir=str(tmp_path)).tail, sync.tail, check_freq=False)
+
+def test_live_rows_in_archived_quarters_are_logged_and_skipped(pantry, tmp_path, capsys):
+    sync = QuarterSync("pid", sync_dir=str(tmp_path))
+    sync.load_baskets(BASKETS, now=NOW)
+    pantry.live = live_json("2024-06-30 23:30", 4) # 前兩筆落在已封存的 2024-q2
+    delta = sync.sync_live()
+    assert list(delta.index) == [pd.Timestamp("2024-07-01 00:00"), pd.Timestamp("2024-07-01 00:15")]
+    assert "2 筆落在已封存季度" in capsys.readouterr().out
@@ -0,0 +1,89 @@
+# tests/test_energy_grid.py
+"""每小時標準網格：依各筆資料的原生間隔積分 kWh，15 分鐘與每小時來源重疊時以槽位取優先權最高者"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from energy_grid import HOUR_NS, build_hourly_grid, splice_hourly_grid
+
+T0 = pd.Timestamp("2024-03-01").value
+MIN_NS = 60_000_000_000
+
+def grid_columns(grid):
+    return {c: getattr(grid, c) for c in ("kwh", "power_kW", "temperature", "humidity", "coverage")}
+
+def test_hourly_and_quarter_hour_sources_are_integrated_by_interval():
+    ts = np.array([T0, T0 + HOUR_NS] + [T0 + 2 * HOUR_NS + k * 15 * MIN_NS for k in range(4)])
+    power = np.array([2.0, 3.0, 1.0, 2.0, 3.0, 4.0])
+    interval = np.array([3600, 3600, 900, 900, 900, 900])
+    grid = build_hourly_grid(ts, power, interval)
+    # 每小時資料 = 功率 × 1 小時；15 分鐘資料 = 功率 × 0.25 小時 (不是一律 × 0.25)
+    np.testing.assert_allclose(grid.kwh, [2.0, 3.0, 2.5])
+    np.testing.assert_allclose(grid.power_kW, [2.0, 3.0, 2.5])
+    np.testing.assert_array_equal(grid.coverage, [1.0, 1.0, 1.0])
+
+def test_overlapping_sources_use_slot_priority():
+    # 同一小時：CSV 每小時一筆 (優先權 0)，AMI 從 xx:30 起兩筆 15 分鐘 (優先權 2)
+    ts = np.array([T0, T0 + 30 * MIN_NS, T0 + 45 * MIN_NS])
+    power = np.array([1.0, 4.0, 8.0])
+    interval = np.array([3600, 900, 900])
+    temperature = np.array([20.0, 30.0, 30.0])
+    grid = build_hourly_grid(ts, power, interval, temperature=temperature, priority=np.array([0, 2, 2]))
+    # 前 30 分鐘由 CSV 補上，後 30 分鐘只算 AMI：不會重複計算，也不會少算
+    assert grid.kwh[0] == pytest.approx(1.0 * 0.5 + 4.0 * 0.25 + 8.0 * 0.25)
+    assert grid.coverage[0] == 1.0
+    assert grid.temperature[0] == pytest.approx(25.0) # 依涵蓋時數加權
+
+    # 低優先權來源出現在後面 (同一小時的 15 分鐘補洞 + 較晚併入的 CSV)：結果相同
+    flipped = build_hourly_grid(ts, power, interval, temperature=temperature, priority=np.array([1, 2, 2]))
+    assert flipped.kwh[0] == grid.kwh[0]
+
+    # 全由高優先權的 15 分鐘資料涵蓋時，CSV 完全不計
+    full = build_hourly_grid(np.array([T0] + [T0 + k * 15 * MIN_NS for k in range(4)]),
+                             np.array([9.0, 1.0, 1.0, 1.0, 1.0]), np.array([3600, 900, 900, 900, 900]),
+                             priority=np.array([0, 2, 2, 2, 2]))
+    assert full.kwh[0] == pytest.approx(1.0)
+
+def test_partial_and_missing_hours():
+    ts = np.array([T0, T0 + 15 * MIN_NS, T0 + 2 * HOUR_NS, T0 + 3 * HOUR_NS, T0 + 3 * HOUR_NS + 15 * MIN_NS])
+    power = np.array([2.0, 4.0, 1.0, np.nan, np.nan])
+    grid = build_hourly_grid(ts, power, 900)
+    assert len(grid) == 4
+    # 只有半小時的資料：kwh 是實際量到的，平均功率只以有資料的時數計算
+    assert grid.kwh[0] == pytest.approx(1.5)
+    assert grid.power_kW[0] == pytest.approx(3.0)
+    assert grid.coverage[0] == pytest.approx(0.5)
+    # 中間整小時沒有資料、或只有缺值 (NaN) 的小時：kwh 0、功率 NaN、涵蓋率 0
+    for hour in (1, 3):
+        assert grid.kwh[hour] == 0.0 and np.isnan(grid.power_kW[hour]) and grid.coverage[hour] == 0.0
+    assert grid.coverage[2] == pytest.approx(0.25)
+
+@pytest.mark.parametrize("cut_hour", [0, 30, 47, 48, 52])
+def test_splice_matches_full_rebuild(cut_hour):
+    rng = np.random.default_rng(cut_hour)
+    hourly = T0 + np.arange(48) * HOUR_NS
+    quarter = T0 + 48 * HOUR_NS + np.arange(4 * 24) * 15 * MIN_NS
+    quarter = quarter[quarter >= T0 + 52 * HOUR_NS] if cut_hour == 52 else quarter # 中間缺幾小時
+    ts = np.concatenate([hourly, quarter])
+    power = 0.2 + rng.random(len(ts))
+    power[rng.random(len(ts)) < 0.05] = np.nan
+    interval = np.where(np.arange(len(ts)) < len(hourly), 3600, 900)
+    temperature, humidity = 20 + rng.random(len(ts)), 60 + rng.random(len(ts))
+
+    full = build_hourly_grid(ts, power, interval, temperature, humidity)
+    split = np.searchsorted(ts, T0 + cut_hour * HOUR_NS)
+    head = build_hourly_grid(ts[:split], power[:split], interval[:split], temperature[:split], humidity[:split]) \
+        if split else build_hourly_grid(ts[:0], power[:0], interval[:0])
+    tail = build_hourly_grid(ts[split:], power[split:], interval[split:], temperature[split:], humidity[split:])
+    spliced = splice_hourly_grid(head, tail)
+
+    assert spliced.start_ns == full.start_ns
+    for name, values in grid_columns(full).items():
+        np.testing.assert_array_equal(grid_columns(spliced)[name], values, err_msg=name)
+
+def test_splice_replaces_the_overlapping_tail():
+    ts = T0 + np.arange(10) * HOUR_NS
+    head = build_hourly_grid(ts, np.ones(10), 3600)
+    tail = build_hourly_grid(ts[6:], np.full(4, 2.0), 3600) # 從第 6 小時起的資料被更正
+    spliced = splice_hourly_grid(head, tail)
+    np.testing.assert_array_equal(spliced.kwh, [1.0] * 6 + [2.0] * 4)
@@ -0,0 +1,97 @@
+# tests/test_feature_engine.py
+"""增量特徵引擎：與整段重算 add_lgbm_features / add_lstm_features 的 24 個目標列一致"""
+import warnings
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_engine import FeatureEngine, RESYNC_HOURS
+from model_service import add_lgbm_features, add_lstm_features, prepare_history, LOOKBACK_HOURS
+
+SEQ_COLS = ["power", "temperature", "humidity", "hour_sin", "hour_cos", "is_weekend"]
+
+def hourly_grid(hours, seed=0):
+    """與 store.grid().frame() 欄位相同的每小時資料 (含整小時缺資料的格子)"""
+    idx = pd.date_range("2024-03-01", periods=hours, freq="h", name="timestamp")
+    rng = np.random.default_rng(seed)
+    daily = 0.6 + 0.4 * np.sin(2 * np.pi * np.asarray(idx.hour) / 24)
+    power = daily + 0.2 * rng.random(hours)
+    power[rng.random(hours) < 0.01] = np.nan
+    return pd.DataFrame({"kwh": power, "power_kW": power, "temperature": 25 + 5 * rng.random(hours),
+                         "humidity": 60 + 20 * rng.random(hours), "coverage": 1.0}, index=idx)
+
+def reference(df_ready):
+    """舊版 load_resources_and_predict 的特徵計算 (整段 full_context 重算)"""
+    last_time = df_ready.index[-1]
+    future_df = pd.DataFrame(index=[last_time + timedelta(hours=i + 1) for i in range(24)], columns=df_ready.columns)
+    future_df['temperature'] = df_ready['temperature'].iloc[-1]
+    future_df['humidity'] = df_ready['humidity'].iloc[-1]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning) # concat 全 NaN 欄位的提示
+        full_context = pd.concat([df_ready, future_df])
+    df_lgbm = add_lgbm_features(full_context)
+    df_lstm = add_lstm_features(full_context)
+    return df_lgbm.iloc[-24:], df_lstm.iloc[-24:], df_lstm[SEQ_COLS].iloc[-25 - LOOKBACK_HOURS + 1:-24]
+
+def assert_same(engine, df_ready):
+    ref_lgbm, ref_lstm, ref_seq = reference(df_ready)
+    for ref, got in ((ref_lgbm, engine.lgbm_features()), (ref_lstm, engine.lstm_features()),
+                     (ref_seq, engine.lstm_sequence(SEQ_COLS))):
+        assert (ref.index == got.index).all()
+        for col in got.columns:
+            np.testing.assert_allclose(got[col].to_numpy(dtype=np.float64), ref[col].to_numpy(dtype=np.float64),
+                                       rtol=1e-9, atol=1e-12, err_msg=col)
+
+@pytest.fixture(scope="module")
+def combined():
+    return hourly_grid(2400)
+
+def test_single_update_matches_reference(combined):
+    engine = FeatureEngine()
+    df_ready = prepare_history(combined)
+    engine.update(df_ready)
+    assert_same(engine, df_ready)
+
+def test_hourly_advance_matches_reference(combined):
+    cut = len(combined) - 100
+    engine = FeatureEngine()
+    engine.update(prepare_history(combined.iloc[:cut]))
+    for end in range(cut + 1, cut + min(RESYNC_HOURS, 60), 7):
+        df_ready = prepare_history(combined.iloc[:end])
+        engine.update(df_ready)
+        assert_same(engine, df_ready)
+    assert engine.rebuilds == 1
+
+def test_corrected_history_rebuilds(combined):
+    engine = FeatureEngine()
+    engine.update(prepare_history(combined.iloc[:-10]))
+    corrected = combined.copy()
+    corrected.iloc[-50:-30, corrected.columns.get_loc("power_kW")] = 5.0
+    df_ready = prepare_history(corrected)
+    engine.update(df_ready)
+    assert_same(engine, df_ready)
+
+def test_constant_series_matches_reference():
+    flat = hourly_grid(600).assign(power_kW=0.5, temperature=25.0, humidity=70.0)
+    engine = FeatureEngine()
+    df_ready = prepare_history(flat)
+    engine.update(df_ready)
+    assert_same(engine, df_ready)
+
+def test_small_variance_on_large_mean_keeps_precision():
+    # 平均遠大於變動幅度：以「平方和 - 總和 x 平均」算變異數會相消掉有效位數，Welford 不會
+    grid = hourly_grid(1200, seed=3)
+    grid["power_kW"] = 1e5 + 1e-3 * np.sin(np.arange(len(grid)) / 5.0)
+    cut = len(grid) - RESYNC_HOURS // 2
+    engine = FeatureEngine()
+    engine.update(prepare_history(grid.iloc[:cut]))
+    for end in range(cut + 1, len(grid) + 1, 13):
+        df_ready = prepare_history(grid.iloc[:end])
+        engine.update(df_ready)
+        ref_lgbm, ref_lstm, _ = reference(df_ready)
+        for ref, got in ((ref_lgbm, engine.lgbm_features()), (ref_lstm, engine.lstm_features())):
+            for col in [c for c in got.columns if "std" in c]:
+                np.testing.assert_allclose(got[col].to_numpy(dtype=np.float64), ref[col].to_numpy(dtype=np.float64),
+                                           rtol=1e-6, err_msg=col)
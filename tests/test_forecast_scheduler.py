@@ -0,0 +1,114 @@
+# tests/test_forecast_scheduler.py
+"""ForecastScheduler.tick：資料版本前進或 store 過期時才交給預測服務，版本沒變時什麼都不做"""
+from concurrent.futures import Future
+
+import pandas as pd
+import pytest
+
+import forecast_scheduler
+import shared_dataset
+from forecast_scheduler import ForecastScheduler
+from timeseries_store import TimeSeriesStore
+
+def live_tick(hour):
+    idx = pd.date_range("2026-01-01", periods=4, freq="15min", name="timestamp") + pd.Timedelta(hours=hour)
+    return pd.DataFrame({"power_kW": 0.5 + hour * 0.1, "temperature": 25.0, "humidity": 70.0}, index=idx)
+
+class StubService:
+    """與 ForecastService 一樣：預測完成後發佈目前資料版本的快照"""
+    def __init__(self, store):
+        self.store = store
+        self.calls = 0
+        self.fail = False
+
+    def request(self):
+        self.calls += 1
+        future = Future()
+        if self.fail:
+            future.set_exception(RuntimeError("模型載入失敗"))
+            return future
+        handle = self.store.version
+        pred_df = pd.DataFrame({"pred": [float(self.calls)]})
+        shared_dataset.publish_forecast(handle, pred_df)
+        future.set_result((pred_df, handle))
+        return future
+
+class StubPoll:
+    """每次輪詢併入 pending 裡的資料 (沒有就什麼都不做)"""
+    def __init__(self, store):
+        self.store = store
+        self.pending = []
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        while self.pending:
+            self.store.merge("live", self.pending.pop(0))
+
+class StubUpdater:
+    def update(self, store):
+        pass
+
+@pytest.fixture
+def store(monkeypatch):
+    store = TimeSeriesStore()
+    store.merge("live", live_tick(0))
+    fresh = {"value": True}
+    monkeypatch.setattr(forecast_scheduler, "get_store", lambda: store)
+    monkeypatch.setattr(forecast_scheduler, "is_store_fresh", lambda: fresh["value"])
+    monkeypatch.setattr(forecast_scheduler, "get_anomaly_detector", StubUpdater)
+    monkeypatch.setattr(forecast_scheduler, "get_seasonal_baseline", StubUpdater)
+    monkeypatch.setattr(shared_dataset, "get_store", lambda: store)
+    monkeypatch.setattr(shared_dataset, "_snapshot", None)
+    store.fresh = fresh
+    return store
+
+@pytest.fixture
+def scheduler(store):
+    service, poll = StubService(store), StubPoll(store)
+    scheduler = ForecastScheduler(service=service, poll=poll, interval=0, meter_interval=0)
+    return scheduler, service, poll
+
+def test_unchanged_version_does_nothing(store, scheduler):
+    scheduler, service, poll = scheduler
+    assert scheduler.tick() is True # 第一次沒有快照，一定要預測
+    snapshot = shared_dataset.get_snapshot()
+    for _ in range(3):
+        assert scheduler.tick() is False
+    assert poll.calls == scheduler.polls == 4
+    assert service.calls == scheduler.requests == 1
+    assert shared_dataset.get_snapshot() is snapshot
+
+def test_version_change_triggers_recompute(store, scheduler):
+    scheduler, service, poll = scheduler
+    scheduler.tick()
+    version = store.version
+    poll.pending.append(live_tick(1))
+    assert scheduler.tick() is True
+    assert store.version != version
+    assert service.calls == 2
+    assert shared_dataset.get_snapshot().version == store.version
+    assert scheduler.tick() is False
+    assert service.calls == 2
+
+def test_stale_store_triggers_request_without_new_data(store, scheduler):
+    scheduler, service, poll = scheduler
+    scheduler.tick()
+    store.fresh["value"] = False
+    assert scheduler.tick() is True
+    assert service.calls == 2
+    store.fresh["value"] = True
+    assert scheduler.tick() is False
+    assert service.calls == 2
+
+def test_poll_and_service_failures_do_not_stop_the_tick(store, scheduler):
+    scheduler, service, poll = scheduler
+    def broken_poll():
+        raise ConnectionError("連線逾時")
+    scheduler._poll = broken_poll
+    service.fail = True
+    assert scheduler.tick() is False
+    assert scheduler.polls == 1 and scheduler.requests == 0
+    service.fail = False
+    assert scheduler.tick() is True
+    assert scheduler.requests == 1
@@ -0,0 +1,158 @@
+# tests/test_forecast_service.py
+"""ForecastService：同時進站的請求共用同一個背景工作 (single-flight)，資料版本沒變時沿用快取"""
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import forecast_service
+import shared_dataset
+from forecast_service import ForecastService
+from timeseries_store import TimeSeriesStore
+
+def live_tick(hour):
+    idx = pd.date_range("2026-01-01", periods=4, freq="15min", name="timestamp") + pd.Timedelta(hours=hour)
+    return pd.DataFrame({"power_kW": 0.5 + hour * 0.1, "temperature": 25.0, "humidity": 70.0}, index=idx)
+
+@pytest.fixture
+def store(monkeypatch):
+    store = TimeSeriesStore()
+    store.merge("live", live_tick(0))
+    monkeypatch.setattr(forecast_service, "get_store", lambda: store)
+    monkeypatch.setattr(shared_dataset, "get_store", lambda: store)
+    monkeypatch.setattr(shared_dataset, "_snapshot", None)
+    return store
+
+class StubForecast:
+    """可控制的 refresh / predict：predict 會等 release 之後才回傳"""
+    def __init__(self, store):
+        self.store = store
+        self.fresh = False
+        self.refreshes = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def refresh(self, on_progress=None):
+        self.refreshes += 1
+        self.fresh = True
+        return self.store
+
+    def predict(self, store):
+        self.started.set()
+        assert self.release.wait(5)
+        future = pd.date_range(store.watermark + pd.Timedelta(hours=1), periods=24, freq="h")
+        return pd.DataFrame({"預測值": np.arange(24.0)}, index=future), store.version
+
+    def service(self):
+        return ForecastService(predict=self.predict, refresh=self.refresh, is_fresh=lambda: self.fresh,
+                               prepare=lambda: None, preload=False, predict_horizon=lambda *a: None)
+
+def test_concurrent_requests_join_one_job(store):
+    stub = StubForecast(store)
+    stub.release.clear()
+    service = stub.service()
+
+    first = service.request()
+    assert stub.started.wait(5)
+    futures = [None] * 8
+    barrier = threading.Barrier(len(futures))
+    def session(i):
+        barrier.wait() # 所有 session 同時進站
+        futures[i] = service.request()
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(len(futures))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(f is first for f in futures)
+    stub.release.set()
+    pred_df, version = first.result(timeout=5)
+    assert service.computations == 1 and stub.refreshes == 1
+    assert version == store.version
+    assert shared_dataset.get_snapshot().result is pred_df
+
+def test_fresh_data_returns_cached_future(store):
+    stub = StubForecast(store)
+    service = stub.service()
+    result = service.request().result(timeout=5)
+
+    cached = service.request()
+    assert cached.done() and cached.result() is result
+    assert service.computations == 1 and stub.refreshes == 1
+
+def test_stale_but_unchanged_data_reuses_forecast(store):
+    stub = StubForecast(store)
+    service = stub.service()
+    result = service.request().result(timeout=5)
+
+    stub.fresh = False # 重新整理按鈕：要求重新同步，但雲端沒有新資料
+    again = service.request().result(timeout=5)
+    assert again is result
+    assert service.computations == 1 and stub.refreshes == 2
+
+def test_new_data_version_recomputes(store):
+    stub = StubForecast(store)
+    service = stub.service()
+    old_df, old_version = service.request().result(timeout=5)
+
+    store.merge("live", live_tick(1))
+    new_df, new_version = service.request().result(timeout=5)
+    assert new_version == store.version > old_version
+    assert new_df is not old_df
+    assert service.computations == 2
+    assert shared_dataset.get_snapshot().version == new_version
+
+def test_stage_label_shows_basket_progress(store):
+    stub = StubForecast(store)
+    labels = []
+    def refresh(on_progress=None):
+        for done, name in enumerate(["2025Q3", "2025Q4", "2026Q1"], 1):
+            on_progress(done, 3, name)
+            labels.append(service.stage_label)
+        return stub.refresh()
+    service = ForecastService(predict=stub.predict, refresh=refresh, is_fresh=lambda: stub.fresh,
+                              prepare=lambda: None, preload=False, predict_horizon=lambda *a: None)
+    service.request().result(timeout=5)
+    assert labels == ["同步雲端數據 1/3 (2025Q3)", "同步雲端數據 2/3 (2025Q4)", "同步雲端數據 3/3 (2026Q1)"]
+    assert service.stage_label == "完成"
+
+def test_failed_prediction_is_not_cached(store):
+    stub = StubForecast(store)
+    calls = []
+    def predict(s):
+        calls.append(s.version)
+        return None, s.version
+    service = ForecastService(predict=predict, refresh=stub.refresh, is_fresh=lambda: stub.fresh,
+                              prepare=lambda: None, preload=False, predict_horizon=lambda *a: None)
+    assert service.request().result(timeout=5) == (None, store.version)
+    assert service.request().result(timeout=5) == (None, store.version)
+    assert len(calls) == 2
+    assert shared_dataset.get_snapshot() is None
+
+def test_horizon_is_computed_on_the_version_it_is_keyed_by(store):
+    stub = StubForecast(store)
+    stub.release.clear()
+    grids = []
+    def predict_horizon(grid, hours, freq):
+        grids.append(grid)
+        return pd.DataFrame({"預測值": np.zeros(hours)}, index=grid.end + pd.Timedelta(hours=1) * np.arange(1, hours + 1))
+    service = ForecastService(predict=stub.predict, refresh=stub.refresh, is_fresh=lambda: stub.fresh,
+                              prepare=lambda: None, preload=False, predict_horizon=predict_horizon)
+
+    busy = service.request() # 佔住唯一的背景執行緒，多日預測排在後面
+    assert stub.started.wait(5)
+    old_end = store.grid().end
+    queued = service.request_horizon(48)
+    store.merge("live", live_tick(1)) # 排隊期間有新資料進來
+    stub.release.set()
+    busy.result(timeout=5)
+    assert queued.result(timeout=5).index[0] == old_end + pd.Timedelta(hours=1)
+    assert grids[0].end == old_end
+
+    fresh = service.request_horizon(48)
+    assert fresh is not queued
+    assert fresh.result(timeout=5).index[0] == store.grid().end + pd.Timedelta(hours=1)
+    assert service.request_horizon(48) is fresh and len(grids) == 2
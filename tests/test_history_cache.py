@@ -0,0 +1,40 @@
+# tests/test_history_cache.py
+"""欄式快取：save_columnar / load_columnar / load_history_csv 讀回的內容與原始資料一致"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from history_cache import save_columnar, load_columnar, load_history_csv, read_meta, _read_history_csv
+
+def sample_frame():
+    idx = pd.date_range("2024-01-01", periods=200, freq="h", name="datetime")
+    rng = np.random.default_rng(0)
+    power = rng.random(200)
+    power[[3, 50]] = np.nan
+    return pd.DataFrame({"power": power, "temperature": rng.normal(25, 3, 200).astype(np.float32),
+                         "count": np.arange(200, dtype=np.int64)}, index=idx)
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_columnar_round_trip(tmp_path, mmap):
+    df = sample_frame()
+    meta = save_columnar(tmp_path, df, {"source": "test"})
+    loaded = load_columnar(tmp_path, mmap=mmap)
+    pd.testing.assert_frame_equal(loaded, df, check_freq=False)
+    assert meta["rows"] == len(df) and read_meta(tmp_path)["source"] == "test"
+
+def test_missing_or_outdated_cache_returns_none(tmp_path):
+    assert load_columnar(tmp_path) is None
+    save_columnar(tmp_path, sample_frame(), {"format": -1})
+    assert load_columnar(tmp_path) is None
+
+def test_history_csv_cache_matches_read_csv(tmp_path):
+    csv_path = tmp_path / "history.csv"
+    df = sample_frame()[["power", "temperature"]].astype(np.float64)
+    df.reset_index().to_csv(csv_path, index=False)
+    cache_dir = tmp_path / "cache"
+    expected = _read_history_csv(csv_path)
+    first = load_history_csv(str(csv_path), cache_dir=str(cache_dir))
+    cached = load_history_csv(str(csv_path), cache_dir=str(cache_dir))
+    assert read_meta(cache_dir) is not None
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(cached, expected)
@@ -0,0 +1,83 @@
+# tests/test_load_shift.py
+"""移轉用電情境：節省金額只來自移轉本身 (移轉量 0 時為 0)，且與「直接改寫每小時用電後重新計價」的結果相同"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app_utils import compare_plans
+from energy_grid import HOUR_NS
+import load_shift
+from load_shift import savings_frontier, simulate_shifts, ShiftScenario, CURRENT_PLAN, SHIFT_TARGET
+from tariff_engine import DEFAULT_PLANS, usage_profile, price_plans
+from timeseries_store import TimeSeriesStore
+
+START, END = "2024-05-03", "2024-07-28"
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    # 前緣依資料版本號快取 (行程內只有一個共用資料庫)；各測試自己建的 store 版本號會重複，先清空
+    monkeypatch.setattr(load_shift, "_frontier_cache", {})
+
+def make_store(scale, seed=0):
+    idx = pd.date_range("2024-04-20", "2024-08-10 23:00", freq="h", name="timestamp")
+    rng = np.random.default_rng(seed)
+    power = scale * (0.2 + 0.3 * rng.random(len(idx)) + 0.8 * ((idx.hour >= 17) & (idx.hour < 22)))
+    store = TimeSeriesStore()
+    store.merge("csv", pd.DataFrame({"power_kW": power, "temperature": 25.0, "humidity": 70.0}, index=idx))
+    return store
+
+def rollups_frame(rollups):
+    """compare_plans 接受 DataFrame：直接由彙總表的每小時用電組回去"""
+    index = pd.DatetimeIndex(rollups.start_ns + np.arange(len(rollups.kwh), dtype=np.int64) * HOUR_NS,
+                             name="timestamp")
+    return pd.DataFrame({"kwh": rollups.kwh, "power_kW": rollups.kwh, "temperature": 25.0, "humidity": 70.0,
+                         "coverage": 1.0}, index=index)
+
+@pytest.mark.parametrize("scale", [0.5, 3.0]) # 用電少時累進電價最便宜、用電多時時間電價最便宜
+def test_frontier_saving_comes_only_from_moving_load(scale):
+    rollups = make_store(scale).rollups()
+    summary, _ = compare_plans(rollups_frame(rollups), START, END)
+    frontier = savings_frontier(rollups, START, END)
+    zero = frontier.loc[0.0]
+    assert zero['moved_kwh'] == 0.0 and zero['saving'] == 0.0
+    assert frontier['saving'].is_monotonic_increasing
+    assert (frontier['saving'].drop(0.0) > 0).all() # 時間電價下，把傍晚用電移到深夜一定省錢
+    assert zero['best_cost'] == pytest.approx(summary['total_cost'].min(), rel=1e-12)
+    assert zero['best_saving'] == pytest.approx(summary.loc[CURRENT_PLAN, 'total_cost'] - summary['total_cost'].min(),
+                                                rel=1e-12, abs=1e-9)
+
+def test_progressive_plan_gains_nothing_from_moving_load():
+    rollups = make_store(scale=0.5).rollups()
+    summary, _ = compare_plans(rollups_frame(rollups), START, END)
+    assert summary.index[0] == '累進電價'
+    frontier = savings_frontier(rollups, START, END, current_plan='累進電價')
+    assert (frontier['saving'] == 0.0).all() # 累進電價只看總度數
+    assert (frontier['best_saving'] >= 0.0).all()
+    assert savings_frontier(rollups, START, END) is not frontier # 快取依目前方案分開
+    with pytest.raises(ValueError):
+        savings_frontier(rollups, START, END, current_plan='不存在的方案')
+
+@pytest.mark.parametrize("kwh_per_day, capacity_kw", [(2.0, None), (50.0, None), (3.0, 0.9)])
+def test_shift_equals_repricing_shifted_usage(kwh_per_day, capacity_kw):
+    rollups = make_store(scale=3.0).rollups()
+    source, target = (17, 22), SHIFT_TARGET
+    result = simulate_shifts(rollups, [ShiftScenario(kwh_per_day, source, target, capacity_kw)], START, END)
+
+    # 直接改寫每小時用電：來源時段依比例扣除、目標時段平均分攤
+    frame = rollups_frame(rollups).loc[START:f"{END} 23:00"]
+    kwh = frame["kwh"].to_numpy().reshape(-1, 24).copy()
+    src, tgt = kwh[:, source[0]:source[1]], kwh[:, target[0]:target[1]]
+    room = np.inf if capacity_kw is None else np.maximum(capacity_kw * tgt.shape[1] - tgt.sum(axis=1), 0.0)
+    moved = np.minimum(np.minimum(kwh_per_day, src.sum(axis=1)), room)
+    kwh[:, source[0]:source[1]] = src - src / src.sum(axis=1, keepdims=True) * moved[:, None]
+    kwh[:, target[0]:target[1]] = tgt + moved[:, None] / tgt.shape[1]
+    shifted = TimeSeriesStore()
+    shifted.merge("csv", pd.DataFrame({"power_kW": kwh.ravel(), "temperature": 25.0, "humidity": 70.0}, index=frame.index))
+    summary, _ = price_plans(usage_profile(shifted.rollups(), START, END), DEFAULT_PLANS)
+
+    assert result.loc[0, 'moved_kwh'] == pytest.approx(moved.sum(), rel=1e-12)
+    for plan in summary.index:
+        assert result.loc[0, plan] == pytest.approx(summary.loc[plan, 'total_cost'], rel=1e-9)
+    before, _ = price_plans(usage_profile(rollups, START, END), DEFAULT_PLANS)
+    assert result.loc[0, 'saving'] == pytest.approx(before.loc[CURRENT_PLAN, 'total_cost'] -
+                                                    summary.loc[CURRENT_PLAN, 'total_cost'], rel=1e-9)
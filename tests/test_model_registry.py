@@ -0,0 +1,53 @@
+# tests/test_model_registry.py
+"""ModelRegistry：檔案大小與修改時間沒變就沿用已載入的物件，只有變動的檔案會重新載入"""
+import os
+
+import joblib
+import pytest
+
+from model_registry import ModelRegistry
+
+@pytest.fixture
+def files(tmp_path):
+    paths = {}
+    for name, obj in {"scaler_seq": {"scale": 1.0}, "weights": [0.6, 0.4]}.items():
+        path = tmp_path / f"{name}.pkl"
+        joblib.dump(obj, path)
+        paths[name] = str(path)
+    return paths
+
+def test_unchanged_files_are_not_reloaded(files):
+    registry = ModelRegistry(files, warmup=False)
+    first = registry.get()
+    timings = dict(registry.timings)
+    second = registry.get()
+    assert second == {"scaler_seq": {"scale": 1.0}, "weights": [0.6, 0.4]}
+    assert all(second[name] is first[name] for name in files)
+    assert all(registry.timings[name] is timings[name] for name in files)
+
+def test_mtime_change_reloads_only_that_file(files):
+    registry = ModelRegistry(files, warmup=False)
+    first = registry.get()
+    path = files["weights"]
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    second = registry.get()
+    assert second["scaler_seq"] is first["scaler_seq"]
+    assert second["weights"] is not first["weights"]
+    assert second["weights"] == first["weights"]
+
+def test_size_change_reloads_new_contents(files):
+    registry = ModelRegistry(files, warmup=False)
+    first = registry.get()
+    path = files["weights"]
+    stat = os.stat(path)
+    joblib.dump([0.5, 0.3, 0.2], path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns)) # 修改時間不變，只靠大小判斷
+    second = registry.get()
+    assert second["weights"] == [0.5, 0.3, 0.2]
+    assert second["scaler_seq"] is first["scaler_seq"]
+
+def test_missing_file_raises(files, tmp_path):
+    registry = ModelRegistry(dict(files, lgbm=str(tmp_path / "missing.pkl")), warmup=False)
+    with pytest.raises(FileNotFoundError):
+        registry.get()
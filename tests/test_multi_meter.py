@@ -0,0 +1,120 @@
+# tests/test_multi_meter.py
+"""多電表：設定檔讀取、整批推論與逐一電表 hybrid_predict 一致、同步失敗的電表略過、資料沒變時沿用上次結果"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import multi_meter
+from multi_meter import Meter, DEFAULT_METER, MultiMeterForecaster, load_meters, refresh_meter_stores, forecast_meters
+from feature_engine import FeatureEngine, TAIL_HOURS, HORIZON_HOURS
+from model_service import hybrid_predict, prepare_history, SEQ_COLS, DIR_COLS
+from timeseries_store import TimeSeriesStore
+
+def meter_frame(hours, scale, seed):
+    idx = pd.date_range("2024-03-01", periods=hours, freq="h", name="timestamp")
+    rng = np.random.default_rng(seed)
+    power = scale * (0.6 + 0.4 * np.sin(2 * np.pi * np.asarray(idx.hour) / 24) + 0.2 * rng.random(hours))
+    return pd.DataFrame({"power_kW": power, "temperature": 25 + 5 * rng.random(hours),
+                         "humidity": 60 + 20 * rng.random(hours)}, index=idx)
+
+class RowScaler:
+    def __init__(self, n):
+        self.scale = 1.0 + np.arange(n) / 10.0
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64) / self.scale
+    def inverse_transform(self, X):
+        return np.asarray(X) * self.scale[0]
+
+class StubLGBM:
+    FEATURES = ["lag_24h", "lag_168h", "ma_7d", "temperature", "hour_sin"]
+    def __init__(self):
+        self.calls = 0
+    def feature_name(self):
+        return list(self.FEATURES)
+    def predict(self, X):
+        self.calls += 1
+        return np.nan_to_num(np.asarray(X, dtype=np.float64)) @ np.linspace(0.1, 0.5, len(self.FEATURES))
+
+class StubLSTM:
+    def predict(self, inputs, verbose=0):
+        X_seq, X_dir = inputs
+        return X_seq[:, -HORIZON_HOURS:, 0] + np.nan_to_num(X_dir) @ np.linspace(0.01, 0.14, X_dir.shape[1])[:, None]
+
+@pytest.fixture
+def resources():
+    return {"lgbm": StubLGBM(), "lstm": StubLSTM(), "scaler_seq": RowScaler(len(SEQ_COLS)),
+            "scaler_dir": RowScaler(len(DIR_COLS)), "scaler_target": RowScaler(1),
+            "weights": {"w_lgbm": 0.4, "w_lstm": 0.6}}
+
+def test_load_meters(tmp_path):
+    assert load_meters(str(tmp_path / "missing.json")) == [DEFAULT_METER]
+    path = tmp_path / "meters.json"
+    path.write_text(json.dumps([{"meter_id": "a", "pantry_id": "p1", "live_url": "http://live/a"},
+                                {"meter_id": "b", "pantry_id": "p2"}]), encoding="utf-8")
+    assert load_meters(str(path)) == [Meter("a", "p1", "http://live/a"), Meter("b", "p2", None)]
+
+def test_batched_forecast_matches_per_meter(resources):
+    histories = {f"m{i}": prepare_history(meter_frame(TAIL_HOURS + 48, 1.0 + i, seed=i)) for i in range(3)}
+    forecaster = MultiMeterForecaster()
+    for meter_id, df_ready in histories.items():
+        forecaster.update(meter_id, df_ready)
+    results = forecaster.forecast(resources)
+    assert list(results) == list(histories)
+    assert resources["lgbm"].calls == 1 # 所有電表疊成一批
+    for meter_id, df_ready in histories.items():
+        engine = FeatureEngine()
+        engine.update(df_ready)
+        target = engine.lgbm_features()
+        pred_lgbm, pred_lstm, pred_final = hybrid_predict(resources, target, engine.lstm_sequence(SEQ_COLS),
+                                                          engine.lstm_features()[DIR_COLS].iloc[:1])
+        got = results[meter_id]
+        assert (got.index == target.index).all()
+        np.testing.assert_allclose(got["LGBM"], pred_lgbm, rtol=1e-12)
+        np.testing.assert_allclose(got["LSTM"], pred_lstm, rtol=1e-12)
+        np.testing.assert_allclose(got["預測值"], pred_final, rtol=1e-12)
+
+def test_short_history_is_skipped(resources, capsys):
+    forecaster = MultiMeterForecaster()
+    forecaster.update("long", prepare_history(meter_frame(TAIL_HOURS + 48, 1.0, seed=0)))
+    forecaster.update("short", prepare_history(meter_frame(100, 1.0, seed=1)))
+    results = forecaster.forecast(resources)
+    assert list(results) == ["long"]
+    assert "short: 歷史不足" in capsys.readouterr().out
+
+def test_failed_meter_sync_is_skipped(monkeypatch, capsys):
+    stores = {"a": TimeSeriesStore(), "c": TimeSeriesStore()}
+    def refresh(meter, max_age):
+        if meter.meter_id == "b":
+            raise ConnectionError("timeout")
+        return stores[meter.meter_id]
+    monkeypatch.setattr(multi_meter, "refresh_meter_store", refresh)
+    meters = [Meter(m, f"p{m}", None) for m in ("a", "b", "c")]
+    result = refresh_meter_stores(meters, max_workers=3)
+    assert list(result) == ["a", "c"]
+    assert "b 同步失敗" in capsys.readouterr().out
+
+def test_forecast_meters_reuses_unchanged_versions(monkeypatch, resources):
+    stores = {}
+    for i, meter_id in enumerate(("a", "b")):
+        stores[meter_id] = TimeSeriesStore()
+        stores[meter_id].merge("live", meter_frame(TAIL_HOURS + 48, 1.0 + i, seed=i), interval_s=3600)
+    stores["empty"] = TimeSeriesStore()
+    monkeypatch.setattr(multi_meter, "refresh_meter_store", lambda meter, max_age: stores[meter.meter_id])
+    monkeypatch.setattr(multi_meter, "_forecaster", MultiMeterForecaster())
+    monkeypatch.setattr(multi_meter, "_latest", None)
+    meters = [Meter(m, f"p{m}", None) for m in ("a", "b", "empty")]
+
+    first = forecast_meters(meters, resources)
+    assert list(first) == ["a", "b"] # 沒有資料的電表不預測
+    assert forecast_meters(meters, resources) is first
+    assert resources["lgbm"].calls == 1
+    assert multi_meter.get_meter_forecasts().versions == {"a": stores["a"].version, "b": stores["b"].version}
+
+    tail = meter_frame(TAIL_HOURS + 49, 2.0, seed=1).iloc[-1:]
+    stores["b"].merge("live", tail, interval_s=3600)
+    second = forecast_meters(meters, resources)
+    assert second is not first and resources["lgbm"].calls == 2
+    assert second["b"].index[0] == tail.index[0] + pd.Timedelta(hours=1)
+    pd.testing.assert_frame_equal(second["a"], first["a"])
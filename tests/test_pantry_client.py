@@ -0,0 +1,60 @@
+# tests/test_pantry_client.py
+"""fetch_basket_result 的重試：429 與網路錯誤都經由共用的 RateLimitGate 退避，不在各執行緒各自 sleep"""
+import pytest
+
+import pantry_client
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"{}"):
+        self.status_code = status_code
+        self.content = body
+
+class FakeSession:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+class RecordingGate:
+    def __init__(self):
+        self.backoffs = []
+
+    def wait(self):
+        pass
+
+    def backoff(self, seconds):
+        self.backoffs.append(seconds)
+
+@pytest.fixture
+def gate(monkeypatch):
+    gate = RecordingGate()
+    monkeypatch.setattr(pantry_client, "_rate_gate", gate)
+    monkeypatch.setattr(pantry_client.time, "sleep", lambda s: pytest.fail("重試不應在執行緒內各自 sleep"))
+    return gate
+
+def use_session(monkeypatch, replies):
+    session = FakeSession(replies)
+    monkeypatch.setattr(pantry_client, "get_session", lambda: session)
+    return session
+
+def test_network_errors_back_off_through_gate(monkeypatch, gate):
+    session = use_session(monkeypatch, [ConnectionError(), FakeResponse(500), FakeResponse(200, b"raw")])
+    result = pantry_client.fetch_basket_result("pid", "2024-q1", raw=True)
+    assert result == pantry_client.BasketResult("ok", b"raw")
+    assert session.calls == 3 and gate.backoffs == [1.0, 1.0]
+
+def test_throttle_backs_off_with_attempt(monkeypatch, gate):
+    use_session(monkeypatch, [FakeResponse(429), FakeResponse(429), FakeResponse(404)])
+    assert pantry_client.fetch_basket_result("pid", "2030-q1").status == "missing"
+    assert gate.backoffs == [1.0, 2.0]
+
+def test_no_backoff_after_last_attempt(monkeypatch, gate):
+    use_session(monkeypatch, [ConnectionError()] * 3)
+    assert pantry_client.fetch_basket_result("pid", "2024-q1").status == "error"
+    assert gate.backoffs == [1.0, 1.0]
@@ -0,0 +1,99 @@
+# tests/test_pantry_parser.py
+"""串流解析 (parse_basket_stream / parse_basket_bytes) 與 json.loads + parse_basket_payload 的結果一致"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pantry_parser import (parse_basket_payload, parse_basket_stream, parse_basket_bytes,
+                           StreamParseUnsupported, BasketParseError)
+
+def records(periods=200, start="2024-03-01", **extra):
+    idx = pd.date_range(start, periods=periods, freq="15min")
+    rng = np.random.default_rng(1)
+    power = np.round(rng.gamma(2.0, 0.2, periods), 4)
+    power[::17] = 0.0
+    out = []
+    for i, t in enumerate(idx):
+        rec = {"date": t.strftime("%Y-%m-%d"), "time": t.strftime("%H:%M"), "power": float(power[i]),
+               "temperature": 20.0 + i % 10, "humidity": 60.0 + i % 7}
+        for key, make in extra.items():
+            rec[key] = make(i)
+        out.append(rec)
+    return out
+
+def encode(obj):
+    return json.dumps(obj).encode()
+
+def expected(payload):
+    return parse_basket_payload(json.loads(payload))
+
+def assert_same(got, want):
+    pd.testing.assert_frame_equal(got, want, check_dtype=False, check_freq=False)
+
+@pytest.mark.parametrize("segment_bytes", [1 << 20, 997]) # 小分段：紀錄跨越多個分段
+def test_top_level_data_is_streamed(segment_bytes):
+    payload = encode({"data": records()})
+    assert_same(parse_basket_stream(payload, segment_bytes=segment_bytes), expected(payload))
+
+def test_full_timestamp_and_power_kw_alias():
+    recs = [{"full_timestamp": f"{r['date']} {r['time']}:00", "power_kW": r["power"]} for r in records()]
+    payload = encode({"data": recs})
+    assert_same(parse_basket_stream(payload), expected(payload))
+
+def test_nested_ami_list_falls_back_to_json():
+    day = records(96, start="2024-03-02")
+    nested = [{"2024-03-02": {"listAMIBase15MinData": [{"time": r["time"], "power": r["power"]} for r in day]}}]
+    payload = encode({"data": nested})
+    with pytest.raises(StreamParseUnsupported):
+        parse_basket_stream(payload)
+    got = parse_basket_bytes(payload)
+    assert len(got) == 96
+    assert_same(got, expected(payload))
+
+@pytest.mark.parametrize("drop", ["temperature", "humidity", "both"])
+def test_missing_weather_columns(drop):
+    recs = records()
+    for r in recs:
+        if drop in ("temperature", "both"):
+            r.pop("temperature")
+        if drop in ("humidity", "both"):
+            r.pop("humidity")
+    payload = encode({"data": recs})
+    assert_same(parse_basket_stream(payload), expected(payload))
+
+def test_null_weather_values():
+    recs = records()
+    for r in recs[::3]:
+        r["temperature"] = None
+        r["humidity"] = None
+    payload = encode({"data": recs})
+    got = parse_basket_stream(payload)
+    assert got["temperature"].isna().sum() > 0
+    assert_same(got, expected(payload))
+
+@pytest.mark.parametrize("flag", [lambda i: i % 5 == 0, lambda i: int(i % 5 == 0)])
+def test_is_missing_data_flag(flag):
+    payload = encode({"data": records(isMissingData=flag)})
+    got = parse_basket_stream(payload)
+    assert_same(got, expected(payload))
+
+def test_escaped_strings():
+    note = lambda i: 'say "hi", {ok} [x]: \\ done' if i % 3 == 0 else "plain"
+    payload = encode({"data": records(note=note)})
+    assert b'\\"' in payload
+    assert_same(parse_basket_stream(payload), expected(payload)) # 字串內的結構字元不影響欄位切分
+
+def test_empty_data_is_empty():
+    assert parse_basket_bytes(b'{"data": []}').empty
+
+@pytest.mark.parametrize("payload", [
+    encode({"data": records()})[:-25], # 被截斷
+    b"<html><body>502 Bad Gateway</body></html>",
+    b"",
+    b'{"message": "basket not found"}',
+])
+def test_garbage_bodies_raise(payload):
+    with pytest.raises(BasketParseError):
+        parse_basket_bytes(payload)
@@ -0,0 +1,59 @@
+# tests/test_rollups.py
+"""用電彙總表：與直接把原始序列 (功率 × 原生間隔) resample 成每日 / 每月的結果一致，增量更新與整份重建相同"""
+import numpy as np
+import pandas as pd
+
+from timeseries_store import TimeSeriesStore
+from rollups import EnergyRollups
+
+def source(start, periods, freq, seed):
+    idx = pd.date_range(start, periods=periods, freq=freq, name="timestamp")
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"power_kW": 0.2 + rng.random(periods), "temperature": 25.0, "humidity": 70.0}, index=idx)
+
+def is_peak(index):
+    """參考規則：平日夏月 9~24 時、非夏月 6~11 與 14~24 時為尖峰"""
+    summer = (index.month >= 6) & (index.month <= 9)
+    hour = index.hour
+    peak_hour = np.where(summer, hour >= 9, ((hour >= 6) & (hour < 11)) | (hour >= 14))
+    return np.asarray(peak_hour & (index.dayofweek < 5))
+
+def raw_tables(*sources):
+    """各來源不重疊：kWh = 功率 × 原生間隔時數，直接 resample"""
+    kwh = pd.concat([df["power_kW"] * hours for df, hours in sources]).sort_index()
+    detail = pd.DataFrame({"kwh": kwh, "peak_kwh": kwh.where(is_peak(kwh.index), 0.0)})
+    detail["off_peak_kwh"] = detail["kwh"] - detail["peak_kwh"]
+    return detail, detail.resample("D").sum(), detail.resample("MS").sum()
+
+def assert_matches(rollups, detail, daily, monthly):
+    np.testing.assert_allclose(rollups.daily_frame().to_numpy(), daily.to_numpy(), atol=1e-9)
+    np.testing.assert_allclose(rollups.monthly_frame().to_numpy(), monthly.to_numpy(), atol=1e-9)
+    np.testing.assert_array_equal(rollups.daily_frame().index, daily.index)
+    hourly = detail.resample("h").sum()
+    np.testing.assert_allclose(rollups.last_hours(720), (hourly["kwh"].iloc[-720:].sum(),
+                               hourly["peak_kwh"].iloc[-720:].sum()), atol=1e-9)
+
+def test_rollups_match_raw_resample():
+    hourly = source("2024-05-01", 24 * 90, "h", 0)
+    quarter = source(hourly.index[-1] + pd.Timedelta(hours=1), 4 * 24 * 60, "15min", 1)
+    store = TimeSeriesStore()
+    store.merge("csv", hourly)
+    store.merge("live", quarter)
+    assert_matches(store.rollups(), *raw_tables((hourly, 1.0), (quarter, 0.25)))
+
+def test_incremental_update_matches_rebuild():
+    hourly = source("2024-08-20", 24 * 30, "h", 2)
+    quarter = source(hourly.index[-1] + pd.Timedelta(hours=1), 4 * 24 * 40, "15min", 3)
+    store = TimeSeriesStore()
+    store.merge("csv", hourly)
+    for rows in np.array_split(np.arange(len(quarter)), 25):
+        store.merge("live", quarter.iloc[rows])
+        store.rollups()
+    # 回補一段已併入的資料 (數值不同)，彙總表要從變動點重算
+    store.merge("live", quarter.iloc[500:600].assign(power_kW=3.0))
+    rebuilt = EnergyRollups.from_grid(store.grid())
+    np.testing.assert_allclose(store.rollups().daily_frame().to_numpy(), rebuilt.daily_frame().to_numpy())
+    np.testing.assert_allclose(store.rollups().monthly_frame().to_numpy(), rebuilt.monthly_frame().to_numpy())
+    patched = quarter.copy()
+    patched.iloc[500:600, 0] = 3.0
+    assert_matches(store.rollups(), *raw_tables((hourly, 1.0), (patched, 0.25)))
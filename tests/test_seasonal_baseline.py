@@ -0,0 +1,101 @@
+# tests/test_seasonal_baseline.py
+"""每週時段季節基準：門檻表與 pandas groupby (季節, 星期, 小時) 的中位數 / MAD 一致，增量更新與整段重建相同"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from seasonal_baseline import (SeasonalBaseline, baseline_cells, scan_households, MAD_SCALE, ROBUST_Z,
+                               MIN_SCALE_KW, MIN_SAMPLES, HOURS_PER_WEEK)
+from timeseries_store import TimeSeriesStore
+from tou_engine import SUMMER_MONTHS
+
+def make_history(start, hours, seed=0):
+    idx = pd.date_range(start, periods=hours, freq="h", name="timestamp")
+    rng = np.random.default_rng(seed)
+    power = 0.3 + 0.2 * rng.random(hours) + 0.8 * ((idx.hour >= 17) & (idx.hour < 22))
+    power[rng.random(hours) < 0.01] = 6.0 # 偶發的高耗電
+    power[300:340] = np.nan # 一段缺值
+    return pd.DataFrame({"power_kW": power, "temperature": 26.0, "humidity": 70.0}, index=idx)
+
+def make_store(df):
+    store = TimeSeriesStore()
+    store.merge("csv", df)
+    return store
+
+def reference_cells(index):
+    """參考作法：以 pandas 的月份 / 星期 / 小時算出格子"""
+    season = ((index.month >= SUMMER_MONTHS[0]) & (index.month <= SUMMER_MONTHS[1])).astype(int)
+    return np.asarray(season * HOURS_PER_WEEK + index.dayofweek * 24 + index.hour)
+
+def pandas_table(df):
+    """參考作法：groupby (季節, 每週第幾小時) 算中位數 / MAD"""
+    power = df['power_kW'].dropna()
+    groups = power.groupby(reference_cells(power.index))
+    table = pd.DataFrame({'count': groups.size(), 'median': groups.median(),
+                          'mad': groups.apply(lambda s: (s - s.median()).abs().median())})
+    scale = np.maximum(MAD_SCALE * table['mad'], MIN_SCALE_KW)
+    table['threshold'] = (table['median'] + ROBUST_Z * scale).where(table['count'] >= MIN_SAMPLES)
+    return table
+
+def assert_same(baseline, expected):
+    got = baseline.table().reset_index(drop=True)
+    got = got[got['count'] > 0]
+    np.testing.assert_array_equal(got.index.to_numpy(), expected.index.to_numpy())
+    np.testing.assert_array_equal(got['count'].to_numpy(), expected['count'].to_numpy())
+    for column in ('median', 'mad', 'threshold'):
+        np.testing.assert_allclose(got[column].to_numpy(), expected[column].to_numpy(), rtol=1e-12)
+
+def test_cells_match_pandas_calendar():
+    index = pd.date_range("1969-12-25", "2031-03-01", freq="37h")
+    np.testing.assert_array_equal(baseline_cells(index.asi8), reference_cells(index))
+
+@pytest.mark.parametrize("weeks", [3, 60]) # 3 週：有些格子樣本數不足 MIN_SAMPLES
+def test_table_matches_groupby(tmp_path, weeks):
+    store = make_store(make_history("2024-04-01", 24 * 7 * weeks))
+    baseline = SeasonalBaseline(str(tmp_path), source_csv=None)
+    baseline.update(store)
+    expected = pandas_table(store.grid().frame())
+    assert_same(baseline, expected)
+    assert baseline.table()['threshold'].isna().any() == (expected['count'] < MIN_SAMPLES).any()
+
+def test_incremental_updates_match_rebuild(tmp_path):
+    df = make_history("2024-05-20", 24 * 7 * 12, seed=1)
+    stream, baseline = TimeSeriesStore(), SeasonalBaseline(str(tmp_path / "stream"), source_csv=None)
+    stream.merge("csv", df.iloc[:24 * 7 * 6])
+    baseline.update(stream)
+    for start in range(24 * 7 * 6, len(df), 5): # 每批只動到少數格子
+        stream.merge("live", df.iloc[start:start + 5])
+        assert baseline.update(stream) <= 5
+    # 回補一段已併入的舊資料 (不同數值)
+    stream.merge("gap", df.iloc[100:148].assign(power_kW=9.0))
+    baseline.update(stream)
+    assert_same(baseline, pandas_table(stream.grid().frame()))
+
+    rebuilt = SeasonalBaseline(str(tmp_path / "rebuilt"), source_csv=None)
+    rebuilt.update(stream)
+    np.testing.assert_array_equal(baseline.threshold, rebuilt.threshold)
+
+def test_restart_loads_saved_series(tmp_path):
+    df = make_history("2024-06-03", 24 * 7 * 8, seed=2)
+    store = make_store(df)
+    first = SeasonalBaseline(str(tmp_path), source_csv=None)
+    first.update(store)
+    resumed = SeasonalBaseline(str(tmp_path), source_csv=None) # 新的行程：從保存的序列載入
+    np.testing.assert_array_equal(resumed.threshold, first.threshold)
+    assert resumed.update(store) == 0 # 資料沒變：不重算任何格子
+
+def test_scan_and_households_use_the_table(tmp_path):
+    df = make_history("2024-03-04", 24 * 7 * 30, seed=3)
+    baseline = SeasonalBaseline(str(tmp_path), source_csv=None)
+    baseline.update(make_store(df))
+    expected = pandas_table(df)
+    threshold = pd.Series(reference_cells(df.index)).map(expected['threshold']).to_numpy()
+    flagged = df['power_kW'].to_numpy() > threshold
+    scanned = baseline.scan(df)
+    assert scanned.index.equals(df.index[flagged])
+    np.testing.assert_allclose(scanned['threshold'].to_numpy(), threshold[flagged], rtol=1e-12)
+
+    power = np.stack([df['power_kW'].to_numpy(), df['power_kW'].to_numpy() * 2])
+    mask = scan_households(np.stack([baseline.threshold, baseline.threshold]), df.index, power)
+    np.testing.assert_array_equal(mask[0], flagged)
+    np.testing.assert_array_equal(mask[1], power[1] > threshold)
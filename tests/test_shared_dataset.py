@@ -0,0 +1,58 @@
+# tests/test_shared_dataset.py
+"""shared_dataset：同一資料版本的讀取端共用同一份唯讀網格，新版本換成新的物件而不改動舊的快照"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared_dataset
+from shared_dataset import get_dataset, get_snapshot, is_current, publish_forecast
+from timeseries_store import TimeSeriesStore
+
+def live_tick(hour):
+    idx = pd.date_range("2026-01-01", periods=4, freq="15min", name="timestamp") + pd.Timedelta(hours=hour)
+    return pd.DataFrame({"power_kW": 0.5 + hour * 0.1, "temperature": 25.0, "humidity": 70.0}, index=idx)
+
+@pytest.fixture
+def store(monkeypatch):
+    store = TimeSeriesStore()
+    store.merge("live", live_tick(0))
+    monkeypatch.setattr(shared_dataset, "get_store", lambda: store)
+    monkeypatch.setattr(shared_dataset, "_snapshot", None)
+    return store
+
+def test_same_version_shares_one_read_only_frame(store):
+    handle = store.version
+    first, second = get_dataset(), get_dataset()
+    assert second is first
+    assert is_current(handle)
+    with pytest.raises(ValueError):
+        first["power_kW"].to_numpy()[0] = 0.0
+
+def test_new_version_gets_new_frame_and_leaves_old_one_intact(store):
+    old_handle, old = store.version, get_dataset()
+    old_values = old.to_numpy().copy()
+    store.merge("live", live_tick(1))
+    assert not is_current(old_handle) and is_current(store.version)
+    new = get_dataset()
+    assert new is not old
+    assert len(new) == len(old) + 1
+    np.testing.assert_array_equal(old.to_numpy(), old_values)
+    np.testing.assert_array_equal(new.to_numpy()[:len(old)], old_values)
+
+def test_publish_replaces_snapshot_without_mutating_previous(store):
+    old_handle = store.version
+    publish_forecast(old_handle, pd.DataFrame({"pred": [1.0]}))
+    old = get_snapshot()
+    assert old.version == old_handle and get_snapshot() is old
+
+    store.merge("live", live_tick(1))
+    publish_forecast(store.version, pd.DataFrame({"pred": [2.0]}))
+    new = get_snapshot()
+    assert new is not old and new.version == store.version
+    assert old.version == old_handle and old.result["pred"].tolist() == [1.0]
+    assert old.watermark < new.watermark
+
+    # 較舊版本晚到的結果不會覆蓋較新的快照；沒有結果時也不會發佈
+    publish_forecast(old_handle, pd.DataFrame({"pred": [3.0]}))
+    publish_forecast(store.version, None)
+    assert get_snapshot() is new
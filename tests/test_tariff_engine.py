@@ -0,0 +1,54 @@
+# tests/test_tariff_engine.py
+"""多方案計價：tiered_cost 與逐月 calculate_progressive_cost 相同、price_plans 與原本的 _price_daily 兩種方案帳單相同"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app_utils import calculate_progressive_cost, _price_daily
+from tariff_engine import PROGRESSIVE_RATES, DEFAULT_PLANS, tiered_cost, usage_profile, price_plans
+from timeseries_store import TimeSeriesStore
+
+def bracket_edges():
+    """每個級距上限的前後 (含 0 與最後一級之後)"""
+    edges = np.cumsum([width for width, *_ in PROGRESSIVE_RATES[:-1]])
+    values = [0.0, 0.5, 5000.0]
+    for edge in edges:
+        values += [edge - 1e-6, float(edge), edge + 1e-6, edge + 0.5]
+    return np.array(values)
+
+@pytest.mark.parametrize("is_summer", [True, False])
+def test_tiered_cost_matches_progressive_at_bracket_edges(is_summer):
+    kwh = bracket_edges()
+    expected = [calculate_progressive_cost(x, is_summer) for x in kwh]
+    np.testing.assert_allclose(tiered_cost(kwh, np.full(len(kwh), is_summer)), expected, rtol=1e-12, atol=1e-9)
+
+def test_tiered_cost_mixed_seasons():
+    rng = np.random.default_rng(0)
+    kwh = rng.uniform(0, 3000, 48)
+    summer = rng.random(48) < 0.4
+    expected = [calculate_progressive_cost(x, s) for x, s in zip(kwh, summer)]
+    np.testing.assert_allclose(tiered_cost(kwh, summer), expected, rtol=1e-12)
+
+def rollups(seed=0):
+    """2024-04 ~ 2024-11 的每小時資料，7 月用電高到超過時間電價的加價門檻"""
+    idx = pd.date_range("2024-04-03 05:00", "2024-11-20 17:00", freq="h", name="timestamp")
+    rng = np.random.default_rng(seed)
+    power = 0.3 + 0.8 * rng.random(len(idx))
+    power[idx.month == 7] *= 5.0
+    store = TimeSeriesStore()
+    store.merge("csv", pd.DataFrame({"power_kW": power, "temperature": 25.0, "humidity": 70.0}, index=idx))
+    return store.rollups()
+
+@pytest.mark.parametrize("start, end", [(None, None), ("2024-05-17", "2024-09-03"), ("2024-07-01", "2024-07-31")])
+def test_price_plans_matches_price_daily_for_legacy_plans(start, end):
+    table = rollups()
+    expected, _ = _price_daily(table.daily_frame(start, end))
+    summary, monthly = price_plans(usage_profile(table, start, end), DEFAULT_PLANS)
+
+    progressive, tou = (plan['name'] for plan in DEFAULT_PLANS)
+    assert summary.loc[progressive, 'kwh'] == pytest.approx(expected['total_kwh'], rel=1e-12)
+    assert summary.loc[progressive, 'total_cost'] == pytest.approx(expected['cost_progressive'], rel=1e-12)
+    assert summary.loc[tou, 'total_cost'] == pytest.approx(expected['cost_tou'], rel=1e-12)
+    np.testing.assert_allclose(monthly.sum().to_numpy(), summary['total_cost'].to_numpy(), rtol=1e-12)
+    if start is None or start <= "2024-07-01":
+        assert summary.loc[tou, 'surcharge'] > 0 # 7 月超過門檻
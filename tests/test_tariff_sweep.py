@@ -0,0 +1,66 @@
+# tests/test_tariff_sweep.py
+"""費率 / 時段情境掃描：不調整的情境 (倍數 1、位移 0) 與 compare_plans 的帳單相同，調整後的情境與改寫方案後直接計價相同"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app_utils import compare_plans
+from tariff_engine import DEFAULT_PLANS, EXAMPLE_THREE_STAGE_PLAN, usage_profile, price_plans
+from tariff_sweep import run_sweep, sweep_frame, DEFAULT_BASE_PLAN, REFERENCE_PLAN
+from timeseries_store import TimeSeriesStore
+
+START, END = "2024-05-10", "2024-10-20"
+
+@pytest.fixture(scope="module")
+def history():
+    idx = pd.date_range("2024-04-01", "2024-11-30 23:00", freq="h", name="timestamp")
+    rng = np.random.default_rng(0)
+    power = 0.3 + 0.8 * rng.random(len(idx)) + 0.6 * ((idx.hour >= 17) & (idx.hour < 23))
+    power[idx.month == 8] *= 4.0 # 8 月超過加價門檻
+    store = TimeSeriesStore()
+    store.merge("csv", pd.DataFrame({"power_kW": power, "temperature": 25.0, "humidity": 70.0}, index=idx))
+    return store.grid().frame()
+
+@pytest.fixture(scope="module")
+def profile(history):
+    from app_utils import rollups_for
+    return usage_profile(rollups_for(history), START, END)
+
+@pytest.mark.parametrize("base_plan", [DEFAULT_BASE_PLAN, EXAMPLE_THREE_STAGE_PLAN])
+def test_identity_point_equals_compare_plans(history, profile, base_plan):
+    plan = base_plan if isinstance(base_plan, dict) else next(p for p in DEFAULT_PLANS if p['name'] == base_plan)
+    summary, monthly = compare_plans(history, START, END, plans=DEFAULT_PLANS + [EXAMPLE_THREE_STAGE_PLAN])
+    budgets = (1000.0, 3000.0)
+    result = run_sweep(profile, peak_scales=(0.8, 1.0, 1.3), off_peak_scales=(1.0, 1.1), peak_shifts=(-1, 0, 2),
+                       budgets=budgets, base_plan=base_plan)
+    identity = (1, 0, 1) # (peak_scale=1.0, off_peak_scale=1.0, peak_shift=0)
+    base_monthly = monthly[plan['name']]
+    assert result.total_cost[identity] == pytest.approx(summary.loc[plan['name'], 'total_cost'], rel=1e-12)
+    assert result.max_monthly_cost[identity] == pytest.approx(base_monthly.max(), rel=1e-12)
+    assert list(result.months_over_budget[identity]) == [int((base_monthly > b).sum()) for b in budgets]
+    assert result.reference_cost == pytest.approx(summary.loc[REFERENCE_PLAN, 'total_cost'], rel=1e-12)
+    assert result.n_months == len(base_monthly)
+
+    frame = sweep_frame(result)
+    assert frame.loc[(1.0, 1.0, 0), 'total_cost'] == pytest.approx(result.total_cost[identity])
+
+def scaled_shifted(plan, peak_scale, off_peak_scale, shift):
+    """把方案直接改寫成情境：費率乘上倍數 (半尖峰跟著尖峰)、非離峰時段往後移 shift 小時 (超出 24 時捨去)"""
+    rates = {season: {p: r * (off_peak_scale if p == 'off_peak' else peak_scale) for p, r in by_period.items()}
+             for season, by_period in plan['rates'].items()}
+    schedule = {season: {day: {p: [(max(0, a + shift), min(24, b + shift)) for a, b in spans if b + shift > 0 and a + shift < 24]
+                               for p, spans in periods.items()}
+                         for day, periods in days.items()}
+                for season, days in plan['schedule'].items()}
+    return dict(plan, name='scenario', rates=rates, schedule=schedule)
+
+@pytest.mark.parametrize("peak_scale, off_peak_scale, shift", [(1.3, 1.0, 0), (1.0, 1.1, 2), (0.8, 1.1, -1)])
+def test_scenarios_equal_rewritten_plan(profile, peak_scale, off_peak_scale, shift):
+    plan = EXAMPLE_THREE_STAGE_PLAN
+    result = run_sweep(profile, (peak_scale,), (off_peak_scale,), (shift,), base_plan=plan)
+    summary, _ = price_plans(profile, [scaled_shifted(plan, peak_scale, off_peak_scale, shift)])
+    assert result.total_cost[0, 0, 0] == pytest.approx(summary.loc['scenario', 'total_cost'], rel=1e-12)
+
+def test_plan_without_rates_is_rejected(profile):
+    with pytest.raises(ValueError):
+        run_sweep(profile, base_plan=REFERENCE_PLAN)
@@ -0,0 +1,33 @@
+# tests/test_tflite_engine.py
+"""TFLite 推論與 keras model.predict 的輸出在 float32 誤差內一致 (沒有安裝 TensorFlow 時略過)"""
+import os
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LSTM_PATH = os.path.join(ROOT, "lstm_model.keras")
+PARITY_ATOL = 1e-4 # 模型輸出為縮放後的數值 (0~1 左右)
+
+tf = pytest.importorskip("tensorflow")
+
+@pytest.fixture(scope="module")
+def models(tmp_path_factory):
+    from tflite_engine import TFLiteModel
+    keras_model = tf.keras.models.load_model(LSTM_PATH)
+    tflite_model = TFLiteModel.from_keras(LSTM_PATH, cache_dir=str(tmp_path_factory.mktemp("models")))
+    return keras_model, tflite_model
+
+def sample_inputs(shapes, batch, seed):
+    rng = np.random.default_rng(seed)
+    return [rng.random((batch,) + tuple(shape[1:])).astype(np.float32) for shape in shapes]
+
+@pytest.mark.parametrize("batch", [1, 5, 40, 70]) # 逐筆、補 0 的批次、整批 + 補 0、整批 + 逐筆
+def test_tflite_matches_keras(models, batch):
+    keras_model, tflite_model = models
+    for seed in range(3):
+        inputs = sample_inputs(tflite_model.input_shapes, batch, seed)
+        expected = keras_model.predict(inputs, verbose=0)
+        actual = tflite_model.predict(inputs)
+        assert actual.shape == expected.shape
+        np.testing.assert_allclose(actual, expected, atol=PARITY_ATOL, rtol=0)
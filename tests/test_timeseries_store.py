@@ -0,0 +1,77 @@
+# tests/test_timeseries_store.py
+"""統一時序資料庫：來源優先權 (CSV < 季度補洞 < 即時)、同優先權以新資料為準、重複併入不產生新版本、亂序併入的變動紀錄"""
+import numpy as np
+import pandas as pd
+
+from timeseries_store import TimeSeriesStore
+
+def frame(start, periods, power, freq="h"):
+    idx = pd.date_range(start, periods=periods, freq=freq, name="timestamp")
+    return pd.DataFrame({"power_kW": np.broadcast_to(np.asarray(power, dtype=np.float64), periods),
+                         "temperature": 25.0, "humidity": 70.0}, index=idx)
+
+def power_at(store, ts):
+    return store.frame().loc[pd.Timestamp(ts), "power_kW"]
+
+def test_source_priority_csv_gap_live():
+    store = TimeSeriesStore()
+    store.merge("live", frame("2024-01-01 02:00", 1, 3.0))
+    store.merge("gap", frame("2024-01-01 01:00", 3, 2.0)) # 低於即時資料：02:00 不被覆蓋
+    store.merge("csv", frame("2024-01-01", 5, 1.0)) # 最低：只補上沒有資料的小時
+    np.testing.assert_array_equal(store.frame()["power_kW"].to_numpy(), [1.0, 2.0, 3.0, 2.0, 1.0])
+
+    store.merge("live", frame("2024-01-01 01:00", 1, 4.0)) # 高優先權覆蓋舊的低優先權
+    assert power_at(store, "2024-01-01 01:00") == 4.0
+    assert len(store) == 5 and store.frame().index.is_unique
+
+def test_equal_priority_keeps_new_rows():
+    store = TimeSeriesStore()
+    store.merge("gap", frame("2024-01-01", 4, 1.0))
+    version = store.merge("gap", frame("2024-01-01 01:00", 2, 5.0)) # 季度資料被更正
+    assert version == store.version == 2
+    np.testing.assert_array_equal(store.frame()["power_kW"].to_numpy(), [1.0, 5.0, 5.0, 1.0])
+
+def test_remerging_identical_data_keeps_version():
+    store = TimeSeriesStore()
+    df = frame("2024-01-01", 24 * 7, np.arange(24 * 7))
+    df.iloc[10:12, 0] = np.nan # NaN 與 NaN 視為相同
+    store.merge("csv", df)
+    store.merge("live", frame("2024-01-08", 8, 0.5, freq="15min"))
+    version, grid = store.version, store.grid()
+    assert store.merge("csv", df) == version
+    assert store.merge("csv", df.iloc[50:60]) == version # 被覆蓋的部分也一樣
+    assert store.merge("live", frame("2024-01-08 01:00", 4, 0.5, freq="15min")) == version
+    assert store.merge("gap", frame("2024-01-08", 4, 9.0, freq="15min")) == version # 優先權較低，不會勝出
+    assert store.grid() is grid
+
+def test_changed_since_after_out_of_order_merge():
+    store = TimeSeriesStore()
+    store.merge("csv", frame("2024-01-01", 24 * 10, 1.0))
+    v1 = store.version
+    store.merge("live", frame("2024-01-11", 4, 2.0))
+    v2 = store.version
+    assert store.changed_since(v1) == pd.Timestamp("2024-01-11").value
+
+    store.merge("gap", frame("2024-01-03 05:00", 3, 7.0)) # 回補較早的一段
+    assert store.changed_since(v2) == pd.Timestamp("2024-01-03 05:00").value
+    assert store.changed_since(v1) == pd.Timestamp("2024-01-03 05:00").value # 兩次合併中較早的
+    assert store.changed_since(store.version) is None
+    assert store.changed_since(None) is None
+
+    # 前段相同、後段才不同：變動紀錄是實際改到的第一筆，不是這批資料的開頭
+    v3 = store.version
+    patch = frame("2024-01-05", 6, 1.0)
+    patch.iloc[4:, 0] = 3.0
+    store.merge("csv", patch)
+    assert store.changed_since(v3) == pd.Timestamp("2024-01-05 04:00").value
+
+def test_incremental_grid_matches_full_rebuild():
+    batches = [("csv", frame("2024-01-01", 24 * 10, np.linspace(0.2, 1.0, 24 * 10))),
+               ("live", frame("2024-01-11", 4 * 30, 2.0, freq="15min")),
+               ("gap", frame("2024-01-04 06:15", 9, 4.0, freq="15min"))] # 未對齊整點的回補
+    store, rebuilt = TimeSeriesStore(), TimeSeriesStore()
+    for source, df in batches:
+        store.merge(source, df)
+        store.grid() # 每一版都建網格：之後只重建變動點之後的部分
+        rebuilt.merge(source, df)
+    pd.testing.assert_frame_equal(store.grid().frame(), rebuilt.grid().frame())
@@ -0,0 +1,99 @@
+# tests/test_timestamps.py
+"""process_raw_data_to_df 的時間欄位解析與舊版 pd.to_datetime(date + " " + time) 逐列組字串的結果一致"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from pantry_parser import process_raw_data_to_df, detect_timestamp_layout
+
+def legacy_timestamps(df, date_context):
+    """舊版的時間組合邏輯 (比對基準)"""
+    if 'full_timestamp' in df.columns:
+        return pd.to_datetime(df['full_timestamp'], errors='coerce')
+    if 'date' in df.columns and 'time' in df.columns:
+        return pd.to_datetime(df['date'].astype(str) + " " + df['time'].astype(str), errors='coerce')
+    return pd.to_datetime(f"{date_context} " + df['time'], errors='coerce')
+
+def legacy_frame(target_list, date_context):
+    df = pd.DataFrame(target_list).rename(columns={'power': 'power_kW'})
+    df['timestamp'] = legacy_timestamps(df, date_context)
+    df = df.dropna(subset=['timestamp']).set_index('timestamp').sort_index(kind='stable')
+    df['power_kW'] = pd.to_numeric(df['power_kW'], errors='coerce')
+    df.loc[df['isMissingData'] == 1, 'power_kW'] = np.nan
+    df['power_kW'] = df['power_kW'].replace(0, np.nan).ffill().bfill()
+    return df[['power_kW', 'temperature', 'humidity']]
+
+def make_records(layout, periods=2 * 96):
+    idx = pd.date_range("2025-10-01", periods=periods, freq="15min")
+    rng = np.random.default_rng(0)
+    power = np.round(rng.gamma(2.0, 0.2, periods), 4)
+    power[::13] = 0.0
+    out = []
+    for i, t in enumerate(idx):
+        rec = {"power": float(power[i]), "isMissingData": int(i % 29 == 0), "temperature": 25.0, "humidity": 70.0}
+        if layout == "full_timestamp":
+            rec["full_timestamp"] = t.strftime("%Y-%m-%d %H:%M:%S")
+        elif layout == "date_time":
+            rec["date"], rec["time"] = t.strftime("%Y-%m-%d"), t.strftime("%H:%M")
+        else:
+            rec["time"] = idx[i % 96].strftime("%H:%M")
+        out.append(rec)
+    return out
+
+def assert_same(records, date_context):
+    got = process_raw_data_to_df(records, date_context)
+    want = legacy_frame(records, date_context)
+    pd.testing.assert_frame_equal(got, want, check_dtype=False, check_names=False)
+    return got
+
+@pytest.mark.parametrize("layout, context", [("full_timestamp", None), ("date_time", None),
+                                             ("context_time", "2025-10-01")])
+def test_layouts_match_legacy(layout, context):
+    records = make_records(layout, 96 if context else 2 * 96)
+    assert detect_timestamp_layout(pd.DataFrame(records).columns, context) == layout
+    got = assert_same(records, context)
+    assert len(got) == len(records)
+
+def test_full_timestamp_iso_t_separator():
+    records = make_records("full_timestamp")
+    for rec in records:
+        rec["full_timestamp"] = rec["full_timestamp"].replace(" ", "T")
+    assert_same(records, None)
+
+def test_unparseable_rows_are_dropped_like_legacy():
+    records = make_records("date_time")
+    records[3]["time"] = "24:00"         # 非法時刻
+    records[10]["date"] = "2025-13-01"   # 非法月份
+    records[20]["time"] = "garbage"
+    got = assert_same(records, None)
+    assert len(got) == len(records) - 3
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_full_timestamp_invalid_values_match_legacy():
+    records = make_records("full_timestamp")
+    records[3]["full_timestamp"] = "2025-02-29 01:00:00" # 不存在的日期
+    records[8]["full_timestamp"] = "2025-10-01 24:00:00" # 非法時刻
+    records[12]["full_timestamp"] = "2025-10-01 03:00:60" # 與舊版相同：進位成 03:01
+    got = assert_same(records, None)
+    assert len(got) == len(records) - 2
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+@pytest.mark.parametrize("value", ["2025-10-01 3:00:00", "2025/10/01 03:00:00", None])
+def test_full_timestamp_irregular_rows_fall_back(value):
+    # 長短不一、不是 ISO 格式或有缺值：整欄交給 pandas，結果仍與舊版相同
+    records = make_records("full_timestamp")
+    records[5]["full_timestamp"] = value
+    assert_same(records, None)
+
+def test_unsorted_input_is_sorted_like_legacy():
+    records = make_records("date_time")[::-1]
+    assert_same(records, None)
+
+@pytest.mark.filterwarnings("ignore::UserWarning") # 舊版對無法解析的字串會退回 dateutil 並發出警告
+def test_bad_date_context_drops_everything():
+    records = make_records("context_time", 96)
+    assert process_raw_data_to_df(records, "not-a-date").empty
+    assert legacy_frame(records, "not-a-date").empty
+
+def test_no_time_columns_returns_empty():
+    assert process_raw_data_to_df([{"power": 1.0}], None).empty
@@ -0,0 +1,54 @@
+# tests/test_tou_engine.py
+"""向量化時間電價：tou_engine.tou_details / tou_peak_mask 與逐筆 app_utils.get_tou_details 完全相同"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app_utils import get_tou_details
+from tou_engine import tou_details, tou_peak_mask
+
+def reference(index):
+    """逐筆 get_tou_details (比對基準)"""
+    tou = [get_tou_details(ts) for ts in index]
+    return ([cat for cat, rate, season in tou], np.array([rate for cat, rate, season in tou]),
+            np.array([season for cat, rate, season in tou], dtype=bool))
+
+def assert_same(index):
+    cats, rates, summer = reference(index)
+    got = tou_details(index)
+    assert got.index.equals(index)
+    assert got["tou_category"].tolist() == cats
+    np.testing.assert_array_equal(got["rate"].to_numpy(), rates) # 查表取值，應逐位元相同
+    np.testing.assert_array_equal(got["is_summer"].to_numpy(), summer)
+    np.testing.assert_array_equal(tou_peak_mask(index), np.array(cats) == "peak")
+
+def test_naive_year_with_new_year_and_leap_day():
+    assert_same(pd.date_range("2023-12-31 22:00", "2024-12-31 23:45", freq="15min", name="timestamp"))
+
+def test_int64_ns_input_matches_index():
+    index = pd.date_range("2024-05-30", "2024-06-03", freq="15min")
+    np.testing.assert_array_equal(tou_peak_mask(index.asi8), tou_peak_mask(index))
+
+@pytest.mark.parametrize("tz", ["Asia/Taipei", "America/New_York", "UTC"])
+def test_tz_aware_uses_local_wall_time(tz):
+    # 跨過夏月邊界與週末；美東還跨過日光節約時間的切換
+    assert_same(pd.date_range("2024-03-08", "2024-03-12", freq="15min", tz=tz))
+    assert_same(pd.date_range("2024-09-27 18:00", "2024-10-02", freq="15min", tz=tz))
+
+@pytest.mark.parametrize("start, end", [
+    ("1969-12-25 00:03", "1970-01-06"),        # 跨過 epoch (負的奈秒)
+    ("1965-05-28 05:11", "1965-06-04"),        # 1970 之前的夏月邊界
+    ("1999-12-31 05:59", "2000-03-02"),        # 千禧年、閏年 2 月
+    ("2031-09-26 13:07", "2031-10-03"),
+])
+def test_unaligned_index_before_and_after_1970(start, end):
+    assert_same(pd.date_range(start, end, freq="7min"))
+
+def test_irregular_unsorted_index():
+    rng = np.random.default_rng(0)
+    ns = rng.integers(pd.Timestamp("1960-01-01").value, pd.Timestamp("2040-01-01").value, 2000)
+    assert_same(pd.DatetimeIndex(ns))
+
+def test_empty_index():
+    got = tou_details(pd.DatetimeIndex([]))
+    assert got.empty and list(got.columns) == ["tou_category", "rate", "is_summer"]
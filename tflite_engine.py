@@ -0,0 +1,131 @@
+# tflite_engine.py
+import os
+import json
+import threading
+import numpy as np
+
+from history_cache import CACHE_DIR, atomic_save_json, file_sha1
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+TFLITE_CACHE_DIR = os.path.join(CACHE_DIR, "models")
+OUTPUT_NAME = "output_0" # model.export() 產生的 serving_default 輸出名稱
+BATCH_SIZE = 32 # 批次推論用的 flatbuffer 批次大小 (回測等多筆輸入時每 32 筆呼叫一次 invoke)
+
+def _load_interpreter_class():
+    """優先使用獨立的 LiteRT 套件 (不需匯入 TensorFlow)，沒有安裝時退回 tf.lite"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        import warnings
+        import tensorflow as tf
+        warnings.filterwarnings("ignore", message=".*tf.lite.Interpreter is deprecated.*")
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+# ==========================================
+# 🔁 Keras -> TFLite 轉換 (結果快取在磁碟)
+# ==========================================
+def convert_keras_to_tflite(keras_path, batch_size=1):
+    """
+    把 .keras 模型轉成固定 batch_size 的 TFLite flatbuffer。
+    LSTM 需要固定形狀才能轉成 TFLite 內建的融合 LSTM 運算，所以先以具體的 input_signature 匯出 SavedModel 再轉換
+    (直接從 keras 模型或 tf.function 轉換時，LSTM 迴圈內讀取的變數不會被凍結，推論時會失敗)。
+    批次大小會寫死在轉換後的 RESHAPE 運算裡，之後無法以 resize_tensor_input 改變，因此每種批次大小各轉一份。
+    回傳 (flatbuffer bytes, 依模型輸入順序排列的輸入名稱 list)。
+    """
+    import tempfile
+    import tensorflow as tf
+    from tensorflow import keras
+    model = keras.models.load_model(keras_path)
+    specs = [tf.TensorSpec((batch_size,) + tuple(t.shape[1:]), tf.float32, name=t.name) for t in model.inputs]
+    input_names = [spec.name for spec in specs]
+    with tempfile.TemporaryDirectory() as export_dir:
+        model.export(export_dir, input_signature=[specs], verbose=False)
+        converter = tf.lite.TFLiteConverter.from_saved_model(export_dir)
+        flatbuffer = converter.convert()
+    return flatbuffer, input_names
+
+def load_or_convert(keras_path, cache_dir=None, batch_size=1):
+    """
+    依 .keras 檔內容的 SHA1 與批次大小找快取的 .tflite；找不到才轉換並寫入 (meta 最後寫入，當作完成標記)。
+    回傳 (flatbuffer 路徑, 輸入名稱 list)。
+    """
+    cache_dir = cache_dir or TFLITE_CACHE_DIR
+    stem = os.path.splitext(os.path.basename(keras_path))[0]
+    digest = file_sha1(keras_path)[:16]
+    model_path = os.path.join(cache_dir, f"{stem}.{digest}.b{batch_size}.tflite")
+    meta_path = f"{model_path}.json"
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if os.path.exists(model_path):
+            return model_path, meta["input_names"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    print(f"🔁 [TFLite] 轉換 {keras_path} -> {model_path}")
+    flatbuffer, input_names = convert_keras_to_tflite(keras_path, batch_size)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{model_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(flatbuffer)
+    os.replace(tmp_path, model_path)
+    atomic_save_json(meta_path, {"source": keras_path, "sha1": digest, "batch_size": batch_size,
+                                 "input_names": input_names})
+    return model_path, input_names
+
+# ==========================================
+# ⚡ TFLite 推論引擎 (介面與 keras 模型的 predict 相同)
+# ==========================================
+class TFLiteModel:
+    """
+    以 TFLite 直譯器在 CPU 上執行 LSTM，predict([X_seq, X_dir]) 的輸入輸出與 keras 版本相同。
+    單筆輸入走 batch = 1 的直譯器；有 batch_model_path 時，多筆輸入每 BATCH_SIZE 筆只呼叫一次 invoke
+    (最後不足一批的部分補 0，只剩幾筆時改走單筆直譯器)。直譯器不是 thread-safe，以 lock 保護。
+    """
+    def __init__(self, model_path, input_names, num_threads=None, batch_model_path=None):
+        Interpreter = _load_interpreter_class()
+        self.input_names = list(input_names)
+        self._runner = Interpreter(model_path=model_path, num_threads=num_threads).get_signature_runner()
+        details = self._runner.get_input_details()
+        self.input_shapes = [tuple(details[name]["shape"]) for name in self.input_names]
+        self._batch_runner, self.batch_size = None, 1
+        if batch_model_path is not None:
+            self._batch_runner = Interpreter(model_path=batch_model_path, num_threads=num_threads).get_signature_runner()
+            self.batch_size = int(self._batch_runner.get_input_details()[self.input_names[0]]["shape"][0])
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_keras(cls, keras_path, cache_dir=None, num_threads=None, batch_size=BATCH_SIZE):
+        model_path, input_names = load_or_convert(keras_path, cache_dir)
+        batch_model_path = None
+        if batch_size > 1:
+            batch_model_path, _ = load_or_convert(keras_path, cache_dir, batch_size)
+        return cls(model_path, input_names, num_threads=num_threads, batch_model_path=batch_model_path)
+
+    def _run(self, runner, inputs, start, stop, pad_to=None):
+        feed = {}
+        for name, x in zip(self.input_names, inputs):
+            chunk = x[start:stop]
+            if pad_to is not None and len(chunk) < pad_to:
+                chunk = np.concatenate([chunk, np.zeros((pad_to - len(chunk),) + chunk.shape[1:], dtype=np.float32)])
+            feed[name] = chunk
+        return runner(**feed)[OUTPUT_NAME][:stop - start]
+
+    def predict(self, inputs, verbose=0):
+        inputs = [np.asarray(x, dtype=np.float32) for x in inputs]
+        n, batch = len(inputs[0]), self.batch_size
+        rows = []
+        with self._lock:
+            start = 0
+            if self._batch_runner is not None:
+                # 剩下的筆數至少有 1/4 批時才用批次直譯器 (補 0 的部分也要算，太少時逐筆反而較快)
+                while n - start >= max(2, batch // 4):
+                    stop = min(start + batch, n)
+                    rows.append(self._run(self._batch_runner, inputs, start, stop, pad_to=batch))
+                    start = stop
+            for i in range(start, n):
+                rows.append(self._run(self._runner, inputs, i, i + 1))
+        return np.concatenate(rows, axis=0)
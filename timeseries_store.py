@@ -0,0 +1,344 @@
+# timeseries_store.py
+import time
+import threading
+import numpy as np
+import pandas as pd
+
+from history_cache import load_history_csv
+from energy_grid import DEFAULT_INTERVAL, HOUR_NS, infer_interval, build_hourly_grid, splice_hourly_grid
+from rollups import EnergyRollups
+from pantry_client import LIVE_DATA_URL
+from data_sync import get_quarter_sync, quarter_baskets
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+HISTORY_CSV = "final_training_data_with_humidity.csv"
+HISTORY_PANTRY_ID = "6a2e85f5-4af4-4efd-bb9f-c5604fe8475e"
+HISTORY_YEARS = [2023, 2024, 2025, 2026] # 要同步的季度 basket 年份範圍
+STORE_TTL_SECONDS = 300 # 與原本 load_data 的 5 分鐘快取一致
+
+STORE_COLUMNS = ("power_kW", "temperature", "humidity")
+# 同一時間點有多個來源時，優先權高者勝出 (CSV < 雲端季度補洞 < 即時資料)
+SOURCE_PRIORITY = {"csv": 0, "gap": 1, "live": 2}
+MAX_CHANGE_LOG = 256 # 變動紀錄上限；超過時較舊的紀錄併成一筆 (落後太多版本的下游只會多重算一些)
+
+# ==========================================
+# 🧮 已排序陣列的線性合併
+# ==========================================
+def _merge_sorted(old_ts, old_src, old_step, old_cols, new_ts, new_src, new_step, new_cols):
+    """
+    合併兩段「各自已排序且不重複」的資料 (step 為每筆資料的原生間隔秒數，跟著來源走)。
+    穩定排序在兩段已排序 run 上等同 merge (timsort)，為線性時間；
+    同一時間點最多出現兩次，保留優先權較高者 (同優先權時以新資料為準)。
+    """
+    all_ts = np.concatenate([old_ts, new_ts])
+    order = np.argsort(all_ts, kind="stable")
+    ts = all_ts[order]
+    src = np.concatenate([old_src, new_src])[order]
+    step = np.concatenate([old_step, new_step])[order]
+    keep = np.ones(len(ts), dtype=bool)
+    dup = np.flatnonzero(ts[1:] == ts[:-1])
+    if len(dup):
+        first_wins = src[dup] > src[dup + 1]
+        keep[dup[~first_wins]] = False
+        keep[dup[first_wins] + 1] = False
+    cols = {c: np.concatenate([old_cols[c], new_cols[c]])[order][keep] for c in old_cols}
+    return ts[keep], src[keep], step[keep], cols
+
+def _first_change(old_ts, old_src, old_step, old_cols, ts, src, step, cols):
+    """
+    合併結果與原本資料第一個不同的位置 (合併只會新增或覆蓋，不會刪除，結果一定不短於原本)；
+    完全相同時回傳 None。NaN 與 NaN 視為相同。
+    """
+    m = len(old_ts)
+    same = (old_ts == ts[:m]) & (old_src == src[:m]) & (old_step == step[:m])
+    for c in old_cols:
+        a, b = old_cols[c], cols[c][:m]
+        same &= (a == b) | (np.isnan(a) & np.isnan(b))
+    diff = np.flatnonzero(~same)
+    if len(diff):
+        return int(diff[0])
+    return m if len(ts) > m else None
+
+# ==========================================
+# 🗃️ 統一時序資料庫 (append-only)
+# ==========================================
+class TimeSeriesStore:
+    """
+    全行程共用的時序資料：int64 (epoch ns) 排序索引 + 每欄一個 float64 陣列 + 來源與原生間隔標記。
+    新資料大多落在尾端，只需合併「插入點之後」的部分；
+    緩衝區以倍增方式預留容量，前段資料不會被搬動。
+    """
+    def __init__(self, columns=STORE_COLUMNS):
+        self.columns = tuple(columns)
+        self._lock = threading.RLock()
+        self._n = 0
+        self._ts = np.empty(0, dtype=np.int64)
+        self._src = np.empty(0, dtype=np.int8)
+        self._step = np.empty(0, dtype=np.int32) # 每筆資料的原生間隔 (秒)：CSV 3600、AMI 900
+        self._cols = {c: np.empty(0, dtype=np.float64) for c in self.columns}
+        self.version = 0
+        self._frame_cache = (None, None) # (version, DataFrame)
+        self._grid_cache = (None, None) # (version, HourlyGrid)
+        self._changes = [] # [(version, 該次合併最早的時間 ns)]，供彙總表判斷要從哪裡開始重算
+        self._rollups = EnergyRollups()
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def watermark(self):
+        """目前最新一筆資料的時間 (無資料時為 None)"""
+        with self._lock:
+            return pd.Timestamp(self._ts[self._n - 1]) if self._n else None
+
+    def _reserve(self, size):
+        capacity = len(self._ts)
+        if size <= capacity:
+            return
+        new_capacity = max(size, capacity * 2, 1024)
+        def grow(arr, dtype):
+            out = np.empty(new_capacity, dtype=dtype)
+            out[:self._n] = arr[:self._n]
+            return out
+        self._ts = grow(self._ts, np.int64)
+        self._src = grow(self._src, np.int8)
+        self._step = grow(self._step, np.int32)
+        self._cols = {c: grow(a, np.float64) for c, a in self._cols.items()}
+
+    def _normalize(self, df):
+        if 'power' in df.columns and 'power_kW' not in df.columns:
+            df = df.rename(columns={'power': 'power_kW'})
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index(kind="stable")
+        if not df.index.is_unique:
+            df = df[~df.index.duplicated(keep='last')]
+        ts = df.index.asi8
+        cols = {}
+        for c in self.columns:
+            if c in df.columns:
+                cols[c] = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64)
+            else:
+                cols[c] = np.full(len(df), np.nan)
+        return ts, cols
+
+    def merge(self, source, df, interval_s=None):
+        """
+        以 source ('csv' / 'gap' / 'live') 的優先權併入一個以時間為索引的 DataFrame，回傳版本號。
+        interval_s 為這批資料的原生間隔 (秒)，未指定時由時間差推斷。
+        合併後內容完全沒變時 (重複併入相同資料) 版本號不變。
+        """
+        if df is None or df.empty:
+            return self.version
+        new_ts, new_cols = self._normalize(df)
+        new_src = np.full(len(new_ts), SOURCE_PRIORITY[source], dtype=np.int8)
+        if interval_s is None:
+            interval_s = infer_interval(new_ts, default=DEFAULT_INTERVAL[source])
+        new_step = np.full(len(new_ts), interval_s, dtype=np.int32)
+
+        with self._lock:
+            n = self._n
+            # 只有插入點之後的資料需要參與合併 (即時資料通常直接接在尾端)
+            p = int(np.searchsorted(self._ts[:n], new_ts[0], side="left"))
+            if p == n:
+                ts, src, step, cols = new_ts, new_src, new_step, new_cols
+                d = 0
+            else:
+                old = (self._ts[p:n], self._src[p:n], self._step[p:n], {c: a[p:n] for c, a in self._cols.items()})
+                ts, src, step, cols = _merge_sorted(*old, new_ts, new_src, new_step, new_cols)
+                # 重複併入相同的資料 (例如每次同步都重抓的開放季度) 不產生新版本，下游不必重算
+                d = _first_change(*old, ts, src, step, cols)
+                if d is None:
+                    return self.version
+            self._reserve(p + len(ts))
+            self._ts[p + d:p + len(ts)] = ts[d:]
+            self._src[p + d:p + len(ts)] = src[d:]
+            self._step[p + d:p + len(ts)] = step[d:]
+            for c in self.columns:
+                self._cols[c][p + d:p + len(ts)] = cols[c][d:]
+            self._n = p + len(ts)
+            self.version += 1
+            self._changes.append((self.version, int(ts[d]))) # 實際有變動的最早時間
+            if len(self._changes) > MAX_CHANGE_LOG:
+                # 把較舊的一半併成 (其中最新的版本, 最早的時間)：查詢結果只會更早，不會漏掉變動
+                old_changes = self._changes[:MAX_CHANGE_LOG // 2]
+                self._changes = [(old_changes[-1][0], min(t for _, t in old_changes))] + \
+                                self._changes[MAX_CHANGE_LOG // 2:]
+            return self.version
+
+    def frame(self):
+        """
+        以 DataFrame 形式回傳目前內容 (index 名稱為 timestamp)。
+        每個版本只組一次，之後重複讀取都回傳同一個物件，呼叫端請勿原地修改。
+        """
+        with self._lock:
+            version, df = self._frame_cache
+            if version == self.version:
+                return df
+            n = self._n
+            index = pd.DatetimeIndex(self._ts[:n].copy().view("datetime64[ns]"), name="timestamp")
+            df = pd.DataFrame({c: self._cols[c][:n].copy() for c in self.columns}, index=index)
+            self._frame_cache = (self.version, df)
+            return df
+
+    def grid(self):
+        """
+        每小時標準網格 (HourlyGrid)：依各筆資料的原生間隔積分出 kWh，多個來源重疊時以 15 分鐘槽位取優先權最高者。
+        與 frame() 一樣每個版本只建一次；前一版的網格還在時，只重建最早變動點所在小時之後的部分。
+        """
+        with self._lock:
+            version, grid = self._grid_cache
+            if version == self.version:
+                return grid
+            n = self._n
+            changed = self.changed_since(version)
+            if grid is None or not len(grid) or changed is None or changed < grid.start_ns:
+                p, grid = 0, None
+            else:
+                cut = changed - (changed - grid.start_ns) % HOUR_NS
+                p = int(np.searchsorted(self._ts[:n], cut, side="left"))
+                # 前一筆資料的區間若跨進 cut 所在的小時 (未對齊整點)，從那一筆的小時開始重建
+                while p > 0 and self._ts[p - 1] + int(self._step[p - 1]) * 1_000_000_000 > cut:
+                    cut = self._ts[p - 1] - (self._ts[p - 1] - grid.start_ns) % HOUR_NS
+                    p = int(np.searchsorted(self._ts[:n], cut, side="left"))
+            tail = build_hourly_grid(self._ts[p:n], self._cols["power_kW"][p:n], self._step[p:n],
+                                     self._cols["temperature"][p:n], self._cols["humidity"][p:n],
+                                     priority=self._src[p:n])
+            grid = tail if grid is None else splice_hourly_grid(grid, tail)
+            self._grid_cache = (self.version, grid)
+            return grid
+
+    def versioned_grid(self):
+        """(版本號, 該版本的 HourlyGrid)，在同一把鎖內取得：背景工作拿到的網格一定就是這個版本"""
+        with self._lock:
+            return self.version, self.grid()
+
+    def changed_since(self, version):
+        """version 之後所有合併中最早的時間 (ns)；version 為 None 或沒有紀錄時回傳 None"""
+        with self._lock:
+            if version is None:
+                return None
+            changed = [ts for v, ts in self._changes if v > version]
+            return min(changed) if changed else None
+
+    def rollups(self):
+        """
+        每小時 / 每日 / 每月的用電彙總表 (EnergyRollups)。
+        資料有新版本時只重算最早變動點所在月份之後的部分。
+        """
+        with self._lock:
+            rollups = self._rollups
+            if rollups.version != self.version:
+                rollups.update(self.grid(), self.changed_since(rollups.version), version=self.version)
+            return rollups
+
+# ==========================================
+# 📥 唯一的資料匯入流程 (CSV -> 雲端季度 -> 即時資料)
+# ==========================================
+class StoreFeed:
+    """
+    把一組來源 (歷史 CSV + 一個 Pantry ID 的季度 basket + 即時資料) 依序併入一個 TimeSeriesStore：
+    - CSV 每個行程只讀一次 (走欄式快取)；csv_path 為 None 時沒有歷史 CSV。
+    - 封存季度在同步層確定封存 (拿到資料或確定不存在) 後才記為已併入，之後不再重複併入；
+      抓取失敗的季度下一次同步會再試。開放季度每次同步都併入。
+    - 即時資料第一次併入整段 tail (含上次行程保存的部分)，之後只併入新增的列。
+    多個 session / 背景執行緒同時呼叫時只會有一個真的去同步，其餘等待結果。
+    """
+    def __init__(self, store, pantry_id, live_url=LIVE_DATA_URL, years=HISTORY_YEARS, csv_path=None,
+                 sync=None, label="Store"):
+        self.store = store
+        self.pantry_id = pantry_id
+        self.live_url = live_url
+        self.years = years
+        self.csv_path = csv_path
+        self.label = label
+        self._sync = sync
+        self._lock = threading.Lock()
+        self.last_refresh = None
+        self.synced = False
+        self._csv_loaded = csv_path is None
+        self._merged_closed = set()
+        self._tail_merged = False
+
+    @property
+    def sync(self):
+        if self._sync is None:
+            self._sync = get_quarter_sync(self.pantry_id)
+        return self._sync
+
+    def is_fresh(self, max_age=STORE_TTL_SECONDS):
+        last = self.last_refresh
+        return last is not None and (time.monotonic() - last) < max_age
+
+    def mark_stale(self):
+        self.last_refresh = None
+
+    def refresh(self, max_age=STORE_TTL_SECONDS, on_progress=None):
+        """資料超過 max_age 秒才同步一次，回傳 store"""
+        with self._lock:
+            if self.is_fresh(max_age):
+                return self.store
+
+            if not self._csv_loaded:
+                try:
+                    self.store.merge("csv", load_history_csv(self.csv_path))
+                    self._csv_loaded = True
+                except FileNotFoundError:
+                    print(f"⚠️ [{self.label}] 找不到歷史 CSV: {self.csv_path}")
+
+            sync = self.sync
+            basket_names = quarter_baskets(self.years)
+            frames = sync.load_baskets(basket_names, on_progress=on_progress)
+            for name in basket_names:
+                if name in self._merged_closed:
+                    continue
+                self.store.merge("gap", frames[name])
+                if sync.is_archived(name):
+                    self._merged_closed.add(name)
+
+            if self.live_url:
+                delta = sync.sync_live(self.live_url)
+                self.store.merge("live", delta if self._tail_merged else sync.tail)
+                self._tail_merged = True
+
+            self.last_refresh = time.monotonic()
+            self.synced = True
+            print(f"🎉 [{self.label}] 同步完成！共 {len(self.store)} 筆，最新時間: {self.store.watermark}")
+            return self.store
+
+    def poll(self):
+        """
+        輕量輪詢：只抓即時資料 (一個請求)，有比 watermark 新的列才併入 store，回傳新增筆數。
+        還沒完整同步過 (CSV / 季度資料尚未載入) 時不做事，交給 refresh。
+        """
+        with self._lock:
+            if not self.synced or not self.live_url:
+                return 0
+            delta = self.sync.sync_live(self.live_url)
+            if delta.empty:
+                return 0
+            self.store.merge("live", delta)
+            print(f"📡 [{self.label}] 即時資料新增 {len(delta)} 筆，最新時間: {self.store.watermark}")
+            return len(delta)
+
+_store = TimeSeriesStore()
+_feed = StoreFeed(_store, HISTORY_PANTRY_ID, csv_path=HISTORY_CSV)
+
+def get_store():
+    return _store
+
+def is_store_fresh(max_age=STORE_TTL_SECONDS):
+    return _feed.is_fresh(max_age)
+
+def mark_stale():
+    """讓下一次 refresh_store 一定重新同步 (例如使用者按下「重新抓取數據」)"""
+    _feed.mark_stale()
+
+def refresh_store(max_age=STORE_TTL_SECONDS, on_progress=None):
+    """把 CSV、雲端季度與即時資料併入全行程共用的 TimeSeriesStore，回傳 store"""
+    return _feed.refresh(max_age, on_progress=on_progress)
+
+def poll_live():
+    """只抓即時資料併入共用的 store，回傳新增筆數 (見 StoreFeed.poll)"""
+    return _feed.poll()
@@ -0,0 +1,83 @@
+# tou_engine.py
+import numpy as np
+import pandas as pd
+
+from energy_grid import HOUR_NS, DAY_NS
+
+# ==========================================
+# ⚙️ 設定與常數
+# ==========================================
+TOU_RATES_DATA = {
+    'basic_fee_monthly': 75.0, 'surcharge_kwh_threshold': 2000.0, 'surcharge_rate_per_kwh': 0.99,
+    'rates': {'summer': {'peak': 4.71, 'off_peak': 1.85}, 'nonsummer': {'peak': 4.48, 'off_peak': 1.78}}
+}
+SEASONS = ("nonsummer", "summer")   # 索引 = is_summer
+CATEGORIES = ("off_peak", "peak")   # 索引 = is_peak
+SUMMER_MONTHS = (6, 9)              # 夏月 6~9 月 (含)
+
+# 尖峰時段表 [is_summer, hour]：夏月平日 09:00~24:00；非夏月平日 06:00~11:00、14:00~24:00
+_HOURS = np.arange(24)
+PEAK_HOURS = np.array([
+    ((_HOURS >= 6) & (_HOURS < 11)) | (_HOURS >= 14),
+    _HOURS >= 9,
+])
+
+def rate_table(rates=None):
+    """費率查表 [is_summer, is_peak] (元 / kWh)，由 TOU_RATES_DATA['rates'] 建立"""
+    rates = TOU_RATES_DATA['rates'] if rates is None else rates
+    return np.array([[rates[season][cat] for cat in CATEGORIES] for season in SEASONS], dtype=np.float64)
+
+RATE_TABLE = rate_table()
+
+# ==========================================
+# 🕒 向量化時間電價判斷
+# ==========================================
+def _wall_ns(index):
+    """時間索引 -> 牆上時間的 int64 奈秒 (帶時區的索引以當地時間判斷，與 Timestamp.hour 等屬性相同)"""
+    if isinstance(index, np.ndarray) and index.dtype.kind in "iu":
+        return index.astype(np.int64, copy=False)
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.asi8
+
+def tou_masks(index):
+    """
+    回傳 (is_summer, is_weekend, is_peak) 三個布林陣列，直接以 NumPy 對奈秒做整數運算，
+    不經過 DatetimeIndex 的 month / dayofweek / hour 屬性。
+    """
+    ns = _wall_ns(index)
+    month = ns.astype("datetime64[ns]").astype("datetime64[M]").astype(np.int64) % 12 + 1
+    hour = (ns // HOUR_NS) % 24
+    dayofweek = (ns // DAY_NS + 3) % 7 # 1970-01-01 是星期四 (Monday = 0)
+    is_summer = (month >= SUMMER_MONTHS[0]) & (month <= SUMMER_MONTHS[1])
+    is_weekend = dayofweek >= 5
+    is_peak = ~is_weekend & PEAK_HOURS[is_summer.astype(np.intp), hour]
+    return is_summer, is_weekend, is_peak
+
+def tou_peak_mask(index):
+    """整段時間的尖峰遮罩 (與 app_utils.get_tou_details 的 category == 'peak' 相同)"""
+    return tou_masks(index)[2]
+
+def tou_rates(index):
+    """整段時間的 (is_peak, 費率, is_summer)，費率由 RATE_TABLE 查表取得"""
+    is_summer, is_weekend, is_peak = tou_masks(index)
+    return is_peak, RATE_TABLE[is_summer.astype(np.intp), is_peak.astype(np.intp)], is_summer
+
+def season_rates(is_summer):
+    """依季節取 (尖峰費率, 離峰費率) 陣列，供每月彙總計價使用"""
+    rates = RATE_TABLE[np.asarray(is_summer).astype(np.intp)]
+    return rates[:, 1], rates[:, 0]
+
+def tou_details(index):
+    """
+    get_tou_details 的向量化版本：回傳以 index 為索引的 DataFrame，
+    欄位 tou_category ('peak' / 'off_peak')、rate、is_summer，逐列與 get_tou_details 的 tuple 相同。
+    """
+    is_peak, rate, is_summer = tou_rates(index)
+    out_index = index if isinstance(index, pd.Index) else pd.DatetimeIndex(_wall_ns(index))
+    return pd.DataFrame({
+        "tou_category": np.array(CATEGORIES, dtype=object)[is_peak.astype(np.intp)],
+        "rate": rate,
+        "is_summer": is_summer,
+    }, index=out_index)